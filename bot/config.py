@@ -14,12 +14,21 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 # Пример: ROLES_FILE=/var/lib/mybot/roles.json
 ROLES_FILE = Path(os.getenv("ROLES_FILE", str(ROOT_DIR / "roles.json"))).expanduser()
 
+# Файл хранилища состояний FSM (незавершенные сценарии переживают перезапуск)
+FSM_STORAGE_FILE = Path(os.getenv("FSM_STORAGE_FILE", str(ROOT_DIR / "data" / "fsm_storage.sqlite3"))).expanduser()
+
+# Через сколько часов бездействия незавершенный сценарий считается брошенным
+FSM_STATE_TTL_HOURS = float(os.getenv("FSM_STATE_TTL_HOURS", "24"))
+
 # ID владельца из .env
 OWNER_ID = int(os.getenv("OWNER_ID", "0"))
 
 # Токен бота
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 
+# Запускать VK бота в том же процессе (общие кэши и данные городов вместо двух копий)
+RUN_VK_BOT = os.getenv("RUN_VK_BOT", "0") == "1"
+
 # Список городов для выбора
 # CITIES = ["Назрань", "Магас", "Сунжа", "Карабулак", "Малгобек"]
 CITIES = ["Назрань", "Магас", "Сунжа", "Карабулак", "Малгобек", "ШК22Н", "ШК4Н"]
@@ -1,5 +1,4 @@
 """Обработчик истории действий"""
-import json
 import tempfile
 from pathlib import Path
 from datetime import datetime
@@ -7,17 +6,72 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, FSInputFile
 from aiogram.fsm.context import FSMContext
 from bot.services.action_logger import ActionLogger
+from bot.services.file_io import run_file_io, write_json_atomic
+from bot.services.paginator import fit_message
 from bot.keyboards.action_history_keyboards import (
     ActionHistoryCallback,
     ActionHistoryFilterCallback,
+    ActionHistoryPageCallback,
     get_action_history_keyboard,
-    get_action_history_filter_keyboard
+    get_action_history_filter_keyboard,
+    get_action_history_page_keyboard
 )
 from bot.keyboards.reply_keyboards import get_owner_menu
 
 router = Router()
 action_logger = ActionLogger()
 
+# Записей на одной странице истории
+LOGS_PAGE_SIZE = 10
+
+
+async def _show_logs_page(callback: CallbackQuery, filter_type: str, filter_value: str, page: int = 0):
+    """Показывает страницу истории действий (от новых к старым) с учетом фильтра"""
+    filters = {}
+    if filter_type == "action_type":
+        filters["action_type"] = filter_value
+    elif filter_type == "user_id":
+        try:
+            filters["user_id"] = int(filter_value)
+        except ValueError:
+            await callback.answer("❌ Неверный ID пользователя", show_alert=True)
+            return
+    elif filter_type == "city":
+        filters["city"] = filter_value
+    
+    logs, total = await run_file_io(
+        action_logger.get_logs_page, page=page, page_size=LOGS_PAGE_SIZE, **filters
+    )
+    
+    if not logs:
+        empty_text = "По выбранному фильтру ничего не найдено." if filters else "История пуста."
+        await callback.message.edit_text(
+            f"📜 <b>История действий</b>\n\n{empty_text}",
+            parse_mode="HTML",
+            reply_markup=get_action_history_keyboard()
+        )
+        await callback.answer()
+        return
+    
+    total_pages = (total + LOGS_PAGE_SIZE - 1) // LOGS_PAGE_SIZE
+    formatted_logs = [action_logger.format_log_entry(log) for log in logs]
+    
+    if filters:
+        header = f"📜 <b>История действий</b>\n\nФильтр: {filter_type} = {filter_value}"
+    else:
+        header = "📜 <b>Последние действия</b>"
+    header += f"\nСтраница {page + 1} из {total_pages} (всего записей: {total})\n\n"
+    
+    # Записи, не поместившиеся в лимит сообщения, отбрасываются целиком (не ломая HTML)
+    text = fit_message(header + "\n" + "─" * 30, formatted_logs)
+    
+    await callback.message.edit_text(
+        text,
+        parse_mode="HTML",
+        reply_markup=get_action_history_page_keyboard(filter_type, filter_value, page, total_pages)
+    )
+    await callback.answer()
+
 
 @router.message(F.text == "История действий")
 async def cmd_action_history(message: Message, user_role: str = None):
@@ -48,36 +102,8 @@ async def process_action_history(
     action = callback_data.action
     
     if action == "view_all":
-        # Показываем все действия
-        logs = action_logger.get_logs(limit=50)
-        
-        if not logs:
-            await callback.message.edit_text(
-                "📜 <b>История действий</b>\n\n"
-                "История пуста.",
-                parse_mode="HTML",
-                reply_markup=get_action_history_keyboard()
-            )
-            await callback.answer()
-            return
-        
-        # Формируем сообщение с последними действиями
-        formatted_logs = []
-        for log in reversed(logs[-10:]):  # Показываем последние 10
-            formatted_logs.append(action_logger.format_log_entry(log))
-        
-        text = "📜 <b>Последние действия</b>\n\n" + "\n\n" + "─" * 30 + "\n\n".join(formatted_logs)
-        
-        # Разбиваем на части, если слишком длинное
-        if len(text) > 4000:
-            text = text[:4000] + "\n\n... (показаны последние записи)"
-        
-        await callback.message.edit_text(
-            text,
-            parse_mode="HTML",
-            reply_markup=get_action_history_keyboard()
-        )
-        await callback.answer()
+        # Показываем все действия (первая страница)
+        await _show_logs_page(callback, "all", "")
         return
     
     if action == "filter":
@@ -97,7 +123,7 @@ async def process_action_history(
         
         try:
             # Получаем все логи (без ограничений)
-            all_logs = action_logger.get_logs(limit=0)  # 0 = без ограничений
+            all_logs = await run_file_io(action_logger.get_logs, limit=0)  # 0 = без ограничений
             
             if not all_logs:
                 await callback.message.answer(
@@ -113,8 +139,7 @@ async def process_action_history(
             json_path = temp_dir / json_filename
             
             # Сохраняем все логи в JSON файл
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(all_logs, f, ensure_ascii=False, indent=2)
+            await run_file_io(write_json_atomic, json_path, all_logs)
             
             # Отправляем файл
             document = FSInputFile(json_path, filename=json_filename)
@@ -158,48 +183,18 @@ async def process_action_history_filter(
         await callback.answer("❌ У вас нет доступа", show_alert=True)
         return
     
-    filter_type = callback_data.filter_type
-    filter_value = callback_data.filter_value
-    
-    # Получаем логи с фильтром
-    if filter_type == "action_type":
-        logs = action_logger.get_logs(action_type=filter_value, limit=50)
-    elif filter_type == "user_id":
-        try:
-            user_id = int(filter_value)
-            logs = action_logger.get_logs(user_id=user_id, limit=50)
-        except:
-            await callback.answer("❌ Неверный ID пользователя", show_alert=True)
-            return
-    elif filter_type == "city":
-        logs = action_logger.get_logs(city=filter_value, limit=50)
-    else:
-        logs = action_logger.get_logs(limit=50)
-    
-    if not logs:
-        await callback.message.edit_text(
-            f"📜 <b>История действий</b>\n\n"
-            f"По выбранному фильтру ничего не найдено.",
-            parse_mode="HTML",
-            reply_markup=get_action_history_keyboard()
-        )
-        await callback.answer()
+    await _show_logs_page(callback, callback_data.filter_type, callback_data.filter_value)
+
+
+@router.callback_query(ActionHistoryPageCallback.filter())
+async def process_action_history_page(
+    callback: CallbackQuery,
+    callback_data: ActionHistoryPageCallback,
+    user_role: str = None
+):
+    """Листание истории действий"""
+    if user_role != "owner":
+        await callback.answer("❌ У вас нет доступа", show_alert=True)
         return
     
-    # Формируем сообщение
-    formatted_logs = []
-    for log in reversed(logs[-10:]):  # Показываем последние 10
-        formatted_logs.append(action_logger.format_log_entry(log))
-    
-    text = f"📜 <b>История действий</b>\n\nФильтр: {filter_type} = {filter_value}\n\n" + "\n\n" + "─" * 30 + "\n\n".join(formatted_logs)
-    
-    if len(text) > 4000:
-        text = text[:4000] + "\n\n... (показаны последние записи)"
-    
-    await callback.message.edit_text(
-        text,
-        parse_mode="HTML",
-        reply_markup=get_action_history_keyboard()
-    )
-    await callback.answer()
-
+    await _show_logs_page(callback, callback_data.filter_type, callback_data.filter_value, max(callback_data.page, 0))
@@ -1,10 +1,9 @@
 """Обработчик добавления ученика"""
-import re
 import json
 import uuid
-from datetime import date, datetime
+from datetime import datetime
 
-from typing import Dict, Any, Tuple
+from typing import Dict, Any
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -27,8 +26,15 @@ from bot.keyboards.student_notification_keyboards import get_student_processed_k
 from bot.services.group_service import GroupService
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
-from bot.services.unprocessed_students_storage import UnprocessedStudentsStorage
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.unprocessed_students_storage import get_unprocessed_storage
+from bot.services.smm_tracking_service import get_smm_tracking
+from bot.services.student_form import (
+    get_template_text,
+    parse_student_data,
+    validate_student_data,
+    prepare_student_data
+)
+from bot.services.short_ids import resolve_short_id
 from bot.config import CITY_MAPPING, BOT_TOKEN, OWNER_ID
 from src.CRUD.crud_student import NotionStudentCRUD
 
@@ -36,173 +42,13 @@ router = Router()
 group_service = GroupService()
 role_storage = RoleStorage()
 action_logger = ActionLogger()
-unprocessed_storage = UnprocessedStudentsStorage()
-smm_tracking = SMMTrackingService()
-
-# Хранилище для уведомлений (notification_id -> информация об уведомлении)
-notification_storage = {}
-
-# Доступные тарифы и статусы
-AVAILABLE_TARIFFS = [
-    "Группа 2 раза",
-    "Группа 3 раза",
-    "Группа 1 раз",
-    "Индивидуальные 1 раз",
-    "Индивидуальные 2 раза",
-    "Индивидуальные 3 раза",
-    "Индивидуальные 4 раза",
-    "Индивидуальные 5 раз",
-]
-
-AVAILABLE_STATUSES = [
-    "Обучается",
-    "Не начал",
-    "Закончил",
-    "Не обучается",
-]
+unprocessed_storage = get_unprocessed_storage()
+smm_tracking = get_smm_tracking()
 
 
 def get_template_message() -> str:
     """Возвращает шаблон для ввода данных"""
-    return ("<pre>"
-            "ФИО: Сусуркиев Абдул-Азиз Назирович\n"
-            "Возраст: 21\n"
-            "Дата поступления: 2025-11-22\n"
-            "Номер родителя: +79623331909\n"
-            "Имя родителя: Назир\n"
-            "Тариф: Группа 2 раза\n"
-            "Статус: Обучается\n"
-            "Ссылка на WA, TG:\n"
-            "Комментарий: Доп информация"
-            "</pre>")
-
-
-def parse_student_data(text: str) -> Dict[str, Any]:
-    """
-    Парсит данные ученика из текста
-    Формат: Ключ: значение (каждая строка отдельно)
-    """
-    data = {}
-    text = text.strip()
-
-    # Разбиваем текст на строки
-    lines = text.split('\n')
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        # Ищем двоеточие для разделения ключа и значения
-        if ':' in line:
-            # Разделяем по первому двоеточию
-            parts = line.split(':', 1)
-            if len(parts) == 2:
-                key = parts[0].strip()
-                value = parts[1].strip()
-
-                # Пропускаем пустые ключи
-                if not key:
-                    continue
-
-                # Обработка разных типов данных
-                if key == "Возраст":
-                    if value:
-                        try:
-                            data[key] = int(value)
-                        except ValueError:
-                            data[key] = value  # Оставим строку для валидации
-                elif key == "Дата поступления":
-                    if value:  # Добавляем только если значение не пустое
-                        data[key] = value
-                elif key in ["ФИО", "Номер родителя"]:
-                    # Обязательные поля - добавляем даже если пустые (валидация поймает)
-                    data[key] = value
-                elif key in ["Имя родителя", "Ссылка на WA, TG", "Комментарий"]:
-                    # Необязательные поля - добавляем только если не пустые
-                    if value:
-                        data[key] = value
-                elif key in ["Тариф", "Статус"]:
-                    # Эти поля могут быть пустыми - используем значения по умолчанию
-                    if value:
-                        data[key] = value
-                else:
-                    # Неизвестные поля - добавляем только если не пустые
-                    if value:
-                        data[key] = value
-
-    return data
-
-
-def validate_student_data(data: Dict[str, Any]) -> Tuple[bool, str]:
-    """
-    Валидирует данные ученика
-    Возвращает (is_valid, error_message)
-    """
-    # Проверка обязательных полей
-    if not data.get("ФИО"):
-        return False, "❌ Поле 'ФИО' обязательно для заполнения"
-
-    if not data.get("Возраст"):
-        return False, "❌ Поле 'Возраст' обязательно для заполнения"
-
-    try:
-        age = int(data.get("Возраст"))
-        if age < 0 or age > 150:
-            return False, "❌ Возраст должен быть от 0 до 150"
-    except (ValueError, TypeError):
-        return False, "❌ Возраст должен быть числом"
-
-    if not data.get("Номер родителя"):
-        return False, "❌ Поле 'Номер родителя' обязательно для заполнения"
-
-    # Валидация номера телефона
-    phone = data.get("Номер родителя", "")
-    phone_digits = re.sub(r"\D", "", phone)
-    if len(phone_digits) != 11 or (not phone_digits.startswith("7") and not phone_digits.startswith("8")):
-        return False, "❌ Номер телефона должен быть в формате +7XXXXXXXXXX (11 цифр)"
-
-    # Нормализация номера
-    if phone_digits.startswith("8"):
-        phone_digits = "7" + phone_digits[1:]
-    if not phone.startswith("+"):
-        data["Номер родителя"] = f"+{phone_digits}"
-    else:
-        data["Номер родителя"] = f"+{phone_digits}"
-
-    # Валидация тарифа
-    if data.get("Тариф") and data.get("Тариф") not in AVAILABLE_TARIFFS:
-        return False, f"❌ Неверный тариф. Доступные: {', '.join(AVAILABLE_TARIFFS)}"
-
-    # Валидация статуса
-    if data.get("Статус") and data.get("Статус") not in AVAILABLE_STATUSES:
-        return False, f"❌ Неверный статус. Доступные: {', '.join(AVAILABLE_STATUSES)}"
-
-    return True, ""
-
-
-def prepare_student_data(data: Dict[str, Any], city_name: str) -> Dict[str, Any]:
-    """Подготавливает данные ученика для сохранения"""
-    # Устанавливаем дату поступления если не указана
-    if not data.get("Дата поступления"):
-        today = date.today()
-        data["Дата поступления"] = today.strftime("%Y-%m-%d")
-
-    # Устанавливаем значения по умолчанию
-    result = {
-        "ФИО": data.get("ФИО", ""),
-        "Возраст": int(data.get("Возраст", 0)) if data.get("Возраст") else 0,
-        "Дата поступления": data.get("Дата поступления", ""),
-        "Номер родителя": data.get("Номер родителя", ""),
-        "Имя родителя": data.get("Имя родителя", "") or "",  # Пустая строка если не указано
-        "Тариф": data.get("Тариф", "Группа 2 раза"),
-        "Статус": data.get("Статус", "Обучается"),
-        "Город": city_name,
-        "Ссылка на WA, TG": data.get("Ссылка на WA, TG", "") or "",  # Пустая строка если не указано
-        "Комментарий": data.get("Комментарий", "") or "",  # Пустая строка если не указано
-    }
-
-    return result
+    return f"<pre>{get_template_text()}</pre>"
 
 
 @router.message(F.text == "Добавить ученика")
@@ -285,7 +131,10 @@ async def process_group_selection(
         state: FSMContext
 ):
     """Обработка выбора группы"""
-    group_id = callback_data.group_id
+    group_id = resolve_short_id(callback_data.group_id)
+    if not group_id:
+        await callback.answer("❌ Группа не найдена", show_alert=True)
+        return
     state_data = await state.get_data()
     city_name = state_data.get("selected_city")
 
@@ -594,19 +443,7 @@ async def send_student_notifications(
         if notification_messages:
             short_id = notification_id[:8]
 
-            notification_storage[short_id] = {
-                "notification_id": notification_id,
-                "student_id": student_id,
-                "messages": notification_messages,
-                "student_data": student_data,
-                "group_name": group_name,
-                "city_name": city_name,
-                "added_by_name": added_by_name,
-                "added_by_username": added_by_username,
-                "added_time": added_time
-            }
-
-            # Сохраняем необработанного ученика для ежедневных напоминаний
+            # Сохраняем уведомление для кнопки "Обработано" и ежедневных напоминаний
             unprocessed_storage.add_unprocessed_student(short_id, {
                 "notification_id": notification_id,
                 "student_id": student_id,
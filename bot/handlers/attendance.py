@@ -19,7 +19,8 @@ from bot.services.attendance_service import AttendanceService
 from bot.services.group_service import GroupService
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.smm_tracking_service import get_smm_tracking
+from bot.services.short_ids import resolve_short_id
 from bot.keyboards.reply_keyboards import (
     get_owner_menu,
     get_manager_menu,
@@ -31,7 +32,7 @@ attendance_service = AttendanceService()
 group_service = GroupService()
 role_storage = RoleStorage()
 action_logger = ActionLogger()
-smm_tracking = SMMTrackingService()
+smm_tracking = get_smm_tracking()
 
 
 @router.message(F.text == "Посещаемость")
@@ -138,7 +139,7 @@ async def process_attendance_group(
     state: FSMContext
 ):
     """Обработка выбора группы при отметке посещаемости"""
-    group_id = callback_data.group_id
+    group_id = resolve_short_id(callback_data.group_id)
     data = await state.get_data()
     city_name = data.get("selected_city")
     
@@ -197,12 +198,16 @@ async def process_student_click(
     state: FSMContext
 ):
     """Обработка нажатия на ученика (циклическое изменение статуса)"""
-    student_id = callback_data.student_id
+    student_id = resolve_short_id(callback_data.student_id)
     data = await state.get_data()
     
     students = data.get("students", [])
     attendance_statuses = data.get("attendance_statuses", {})
     
+    if student_id not in attendance_statuses:
+        await callback.answer("❌ Ученик не найден", show_alert=True)
+        return
+    
     # Циклически меняем статус: 0 -> 1 -> 2 -> 3 -> 4 -> 0
     current_status = attendance_statuses.get(student_id, 0)
     new_status = (current_status + 1) % 5
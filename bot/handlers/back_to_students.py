@@ -2,34 +2,16 @@
 from aiogram import Router
 from aiogram.types import CallbackQuery
 from bot.keyboards.student_profile_keyboards import BackToStudentsCallback
-from bot.keyboards.info_keyboards import get_students_list_keyboard
+from bot.keyboards.info_keyboards import get_students_list_keyboard, STUDENTS_PAGE_SIZE
 from bot.services.group_service import GroupService
 from bot.services.role_storage import RoleStorage
-from bot.services.student_search import StudentSearchService
-from bot.config import CITY_MAPPING
+from bot.services.info_read_model import get_group_students_page
+from bot.services.short_ids import resolve_short_id
+from bot.services.file_io import run_file_io
 
 router = Router()
 group_service = GroupService()
 role_storage = RoleStorage()
-search_service = StudentSearchService()
-
-
-def get_group_students(city_name: str, group_id: str):
-    """Получает список учеников группы"""
-    students_data = search_service._load_city_students(city_name)
-    
-    if group_id not in students_data:
-        return []
-    
-    group_data = students_data[group_id]
-    students = group_data.get("students", [])
-    
-    # Добавляем group_id и group_name к каждому ученику
-    for student in students:
-        student["group_id"] = group_id
-        student["group_name"] = group_data.get("group_name", "")
-    
-    return students
 
 
 @router.callback_query(BackToStudentsCallback.filter())
@@ -39,18 +21,13 @@ async def handle_back_to_students(
     user_role: str = None
 ):
     """Обработка кнопки Назад к списку учеников группы"""
-    group_id_short = callback_data.group_id
-    city_en = callback_data.city_en
+    # Восстанавливаем полный ID группы и город по коротким кодам
+    group_id = resolve_short_id(callback_data.group_id)
+    city_name = resolve_short_id(callback_data.city)
     
-    # Преобразуем английское название обратно в русское
-    city_name = None
-    for ru_name, en_name in CITY_MAPPING.items():
-        if en_name == city_en or en_name.startswith(city_en):
-            city_name = ru_name
-            break
-    
-    if not city_name:
-        city_name = city_en  # Fallback
+    if not group_id or not city_name:
+        await callback.answer("❌ Кнопка устарела, откройте список заново", show_alert=True)
+        return
     
     # Проверяем права для преподавателя
     if user_role == "teacher":
@@ -61,32 +38,16 @@ async def handle_back_to_students(
                 await callback.answer("❌ У вас нет доступа к этому городу", show_alert=True)
                 return
     
-    # Ищем группу по сокращенному ID
-    groups = group_service.get_city_groups(city_name)
-    group_id_full = None
-    group_name = "Без названия"
-    
-    # Нормализуем group_id_short - берем первые 16 символов
-    group_id_short_normalized = group_id_short[:16] if len(group_id_short) > 16 else group_id_short
-    
-    for g in groups:
-        group_id_from_data = g.get("group_id", "")
-        group_id_no_dashes = group_id_from_data.replace("-", "")
-        group_id_short_from_data = group_id_no_dashes[:16]  # Берем первые 16 символов
-        # Используем точное сравнение первых 16 символов
-        if group_id_short_from_data == group_id_short_normalized:
-            group_id_full = group_id_from_data
-            group_name = g.get("group_name", "Без названия")
-            break
-    
-    if not group_id_full:
+    group = await run_file_io(group_service.get_group_by_id, city_name, group_id)
+    if not group:
         await callback.answer("❌ Группа не найдена", show_alert=True)
         return
+    group_name = group.get("group_name", "Без названия")
     
-    # Получаем список учеников
-    students = get_group_students(city_name, group_id_full)
+    # Первая страница списка учеников (тот же пагинатор, что и в меню информации)
+    students_page = await run_file_io(get_group_students_page, city_name, group_id, 0, STUDENTS_PAGE_SIZE)
     
-    if not students:
+    if not students_page.total_items:
         await callback.message.edit_text(
             "❌ В группе нет учеников",
             reply_markup=None
@@ -95,12 +56,14 @@ async def handle_back_to_students(
         return
     
     students_text = f"👥 <b>Ученики группы: {group_name}</b>\n\n"
-    students_text += f"Всего учеников: {len(students)}\n\n"
-    students_text += "Выберите ученика:"
+    students_text += f"Всего учеников: {students_page.total_items}\n"
+    if students_page.total_pages > 1:
+        students_text += f"Страница 1 из {students_page.total_pages}\n"
+    students_text += "\nВыберите ученика:"
     
     await callback.message.edit_text(
         students_text,
         parse_mode="HTML",
-        reply_markup=get_students_list_keyboard(students, group_id_full, city_name)
+        reply_markup=get_students_list_keyboard(students_page, group_id, city_name)
     )
     await callback.answer()
@@ -5,6 +5,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.filters import StateFilter, Command
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
+from bot.services.paginator import fit_message, get_paginator, paginate
 from bot.keyboards.broadcast_keyboards import (
     BroadcastCallback,
     BroadcastSelectUserCallback,
@@ -20,6 +21,24 @@ router = Router()
 storage = RoleStorage()
 action_logger = ActionLogger()
 
+# Размер страницы списка сотрудников
+USERS_PAGE_SIZE = 10
+
+
+def _active_users_key():
+    """Ключ списка сотрудников для рассылки в пагинаторе"""
+    return "broadcast_users", str(storage.file_path)
+
+
+def _build_active_users() -> list:
+    """Сотрудники для рассылки (кроме pending), отсортированные по ФИО"""
+    return [u for u in storage.get_all_users() if u.get("role") != "pending"]
+
+
+def _get_active_users() -> list:
+    """Все сотрудники для рассылки (список строится один раз на версию ролей)"""
+    return get_paginator().get_results(_active_users_key(), storage.get_revision(), _build_active_users)
+
 
 @router.message(F.text == "Рассылка")
 async def cmd_broadcast(message: Message, user_role: str = None):
@@ -57,8 +76,7 @@ async def process_broadcast_all(
         return
     
     # Получаем всех пользователей (кроме pending)
-    all_users = storage.get_all_users()
-    active_users = [u for u in all_users if u.get("role") != "pending"]
+    active_users = _get_active_users()
     
     # Сохраняем список получателей в состояние
     await state.update_data(recipients=[u.get("user_id") for u in active_users])
@@ -86,8 +104,7 @@ async def process_broadcast_select(
         return
     
     # Получаем всех пользователей (кроме pending)
-    all_users = storage.get_all_users()
-    active_users = [u for u in all_users if u.get("role") != "pending"]
+    active_users = _get_active_users()
     
     if not active_users:
         await callback.message.edit_text(
@@ -134,14 +151,13 @@ async def process_broadcast_page(
     data = await state.get_data()
     selected_users = data.get("selected_users", [])
     
-    # Получаем всех пользователей
-    all_users = storage.get_all_users()
-    active_users = [u for u in all_users if u.get("role") != "pending"]
-    
-    page_size = 10
-    total_pages = (len(active_users) + page_size - 1) // page_size
+    # Проверяем номер страницы по кэшу списка сотрудников
+    users_page = paginate(
+        _active_users_key(), storage.get_revision(), _build_active_users, page, USERS_PAGE_SIZE
+    )
+    active_users = _get_active_users()
     
-    if page < 0 or page >= total_pages:
+    if page != users_page.page:
         await callback.answer("❌ Неверная страница", show_alert=True)
         return
     
@@ -187,8 +203,7 @@ async def process_broadcast_toggle_user(
     await state.update_data(selected_users=selected_users)
     
     # Получаем всех пользователей
-    all_users = storage.get_all_users()
-    active_users = [u for u in all_users if u.get("role") != "pending"]
+    active_users = _get_active_users()
     
     await callback.message.edit_text(
         f"👥 <b>Выборочная рассылка</b>\n\n"
@@ -224,16 +239,19 @@ async def process_broadcast_confirm_select(
     await state.update_data(recipients=selected_users)
     
     # Получаем информацию о получателях
-    all_users = storage.get_all_users()
-    recipients_info = [u for u in all_users if u.get("user_id") in selected_users]
-    
-    recipients_text = "\n".join([f"• {u.get('fio', 'N/A')}" for u in recipients_info])
+    selected_set = set(selected_users)
+    recipients_info = [u for u in storage.get_all_users() if u.get("user_id") in selected_set]
     
+    # Список получателей обрезается так, чтобы сообщение не превысило лимит Telegram
     await callback.message.edit_text(
-        f"📢 <b>Выборочная рассылка</b>\n\n"
-        f"Получателей: {len(selected_users)}\n\n"
-        f"<b>Получатели:</b>\n{recipients_text}\n\n"
-        f"Отправьте текст сообщения или любой файл (фото, документ, видео и т.д.) для рассылки:",
+        fit_message(
+            f"📢 <b>Выборочная рассылка</b>\n\n"
+            f"Получателей: {len(selected_users)}\n\n"
+            f"<b>Получатели:</b>",
+            [f"• {u.get('fio', 'N/A')}" for u in recipients_info],
+            separator="\n",
+            footer="\n\nОтправьте текст сообщения или любой файл (фото, документ, видео и т.д.) для рассылки:"
+        ),
         parse_mode="HTML"
     )
     await callback.answer()
@@ -12,9 +12,12 @@ from bot.states.delete_student_state import DeleteStudentState
 from bot.states.payment_state import PaymentState
 from bot.services.student_search import StudentSearchService
 from bot.services.payment_service import PaymentService
+from bot.services.render_cache import render_cached
+from bot.services.file_io import run_file_io
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.smm_tracking_service import get_smm_tracking
+from bot.services.short_ids import resolve_short_id
 from bot.config import CITY_MAPPING
 from src.CRUD.crud_student import NotionStudentCRUD
 from bot.keyboards.reply_keyboards import (
@@ -29,7 +32,7 @@ search_service = StudentSearchService()
 payment_service = PaymentService()
 role_storage = RoleStorage()
 action_logger = ActionLogger()
-smm_tracking = SMMTrackingService()
+smm_tracking = get_smm_tracking()
 
 
 @router.callback_query(StudentPaymentCallback.filter())
@@ -44,51 +47,30 @@ async def handle_student_payment(
         await callback.answer("❌ У вас нет доступа", show_alert=True)
         return
     
-    student_id_short = callback_data.student_id
-    city_en = callback_data.city_en
+    # Восстанавливаем полный ID ученика и город по коротким кодам
+    student_id = resolve_short_id(callback_data.student_id)
+    city_name = resolve_short_id(callback_data.city)
     
-    # Преобразуем английское название обратно в русское
-    from bot.config import CITY_MAPPING
-    city_name = None
-    for ru_name, en_name in CITY_MAPPING.items():
-        if en_name == city_en or en_name.startswith(city_en):
-            city_name = ru_name
-            break
-    
-    if not city_name:
-        city_name = city_en  # Fallback
+    if not student_id or not city_name:
+        await callback.answer("❌ Кнопка устарела, откройте профиль ученика заново", show_alert=True)
+        return
     
     # Получаем данные ученика
     try:
-        # Ищем ученика по ID в файле students.json
-        students_data = search_service._load_city_students(city_name)
-        
-        student_data = None
-        student_id = None
-        for group_id, group_data in students_data.items():
-            for student in group_data.get("students", []):
-                # Ищем по частичному совпадению (первые символы UUID)
-                student_id_from_data = student.get("ID", "")
-                student_id_no_dashes = student_id_from_data.replace("-", "")
-                # Проверяем, начинается ли ID с сокращенного значения
-                if student_id_no_dashes.startswith(student_id_short):
-                    student_data = student.copy()
-                    student_data["group_name"] = group_data.get("group_name", "")
-                    student_data["group_id"] = group_id
-                    student_id = student_id_from_data  # Используем полный ID
-                    break
-            if student_data:
-                break
+        student_data = await run_file_io(search_service.get_student_by_id, city_name, student_id)
         
         if not student_data:
             await callback.answer("❌ Ученик не найден", show_alert=True)
             return
         
         # Получаем информацию об оплате
-        payment_data = payment_service.get_student_payment_info(city_name, student_data)
+        payment_data = await run_file_io(payment_service.get_student_payment_info, city_name, student_data)
         
         # Форматируем информацию
-        formatted = payment_service.format_student_info_with_payment_and_attendance(student_data, payment_data, city_name)
+        formatted = await run_file_io(
+            render_cached, "payment_card", city_name, student_id,
+            lambda: payment_service.format_student_info_with_payment_and_attendance(student_data, payment_data, city_name)
+        )
         
         # Сохраняем данные в состояние
         await state.update_data(
@@ -129,48 +111,19 @@ async def handle_student_delete(
         await callback.answer("❌ Только владелец и менеджер могут удалять учеников", show_alert=True)
         return
     
-    student_id_short = callback_data.student_id
-    city_en = callback_data.city_en
-    group_id_short = callback_data.group_id
+    # Восстанавливаем полный ID ученика и город по коротким кодам
+    student_id = resolve_short_id(callback_data.student_id)
+    city_name = resolve_short_id(callback_data.city)
     
-    # Преобразуем английское название обратно в русское
-    from bot.config import CITY_MAPPING
-    city_name = None
-    for ru_name, en_name in CITY_MAPPING.items():
-        if en_name == city_en or en_name.startswith(city_en):
-            city_name = ru_name
-            break
-    
-    if not city_name:
-        city_name = city_en  # Fallback
+    if not student_id or not city_name:
+        await callback.answer("❌ Кнопка устарела, откройте профиль ученика заново", show_alert=True)
+        return
     
-    # Ищем ученика по сокращенному ID для получения полных данных
+    # Проверяем, что ученик есть в данных города
     try:
-        students_data = search_service._load_city_students(city_name)
-        student_id = None
-        group_id = None
-        
-        for group_id_key, group_data in students_data.items():
-            for student in group_data.get("students", []):
-                student_id_from_data = student.get("ID", "")
-                student_id_no_dashes = student_id_from_data.replace("-", "")
-                # Проверяем, начинается ли ID с сокращенного значения
-                if student_id_no_dashes.startswith(student_id_short):
-                    student_id = student_id_from_data
-                    # Если group_id_short указан, проверяем совпадение
-                    if group_id_short:
-                        group_id_no_dashes = group_id_key.replace("-", "")
-                        if group_id_no_dashes.startswith(group_id_short):
-                            group_id = group_id_key
-                        else:
-                            group_id = group_id_key  # Используем найденную группу
-                    else:
-                        group_id = group_id_key
-                    break
-            if student_id:
-                break
+        student_data = await run_file_io(search_service.get_student_by_id, city_name, student_id)
         
-        if not student_id:
+        if not student_data:
             await callback.answer("❌ Ученик не найден", show_alert=True)
             return
         
@@ -178,7 +131,7 @@ async def handle_student_delete(
         await state.update_data(
             student_id=student_id,
             city_name=city_name,
-            group_id=group_id or ""
+            group_id=resolve_short_id(callback_data.group_id) or student_data.get("group_id", "")
         )
     except Exception as e:
         await callback.answer(f"❌ Ошибка при поиске ученика: {str(e)}", show_alert=True)
@@ -252,7 +205,7 @@ async def process_delete_reason(
     try:
         # Получаем данные ученика для логирования
         city_en = CITY_MAPPING.get(city_name, city_name)
-        students_data = search_service._load_city_students(city_name)
+        students_data = await run_file_io(search_service._load_city_students, city_name)
         
         student_fio = "Неизвестно"
         for group_data in students_data.values():
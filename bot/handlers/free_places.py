@@ -2,13 +2,13 @@
 from aiogram import Router, F
 from aiogram.types import Message
 from bot.services.group_service import GroupService
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.smm_tracking_service import get_smm_tracking
 from bot.services.role_storage import RoleStorage
 from bot.config import CITIES
 
 router = Router()
 group_service = GroupService()
-smm_tracking = SMMTrackingService()
+smm_tracking = get_smm_tracking()
 role_storage = RoleStorage()
 
 
@@ -32,14 +32,14 @@ async def cmd_free_places(message: Message, user_role: str = None):
     
     for city_name in CITIES:
         try:
-            # Получаем количество мест в классе
-            total_seats = group_service.get_city_seats(city_name)
+            # Места в классе и группы города из индекса заполненности
+            capacity = group_service.get_city_capacity(city_name)
+            total_seats = capacity["seats"]
             
             if total_seats == 0:
                 continue  # Пропускаем города без информации о местах
             
-            # Получаем группы города
-            groups = group_service.get_city_groups(city_name)
+            groups = capacity["groups"]
             
             if not groups:
                 continue  # Пропускаем города без групп
@@ -53,13 +53,10 @@ async def cmd_free_places(message: Message, user_role: str = None):
             # Обрабатываем каждую группу
             for group in groups:
                 group_name = group.get("group_name", "Без названия")
-                total_students = group.get("total_students", 0)
-                free_places = total_seats - total_students
-                
                 city_info["groups"].append({
                     "name": group_name,
-                    "total_students": total_students,
-                    "free_places": free_places,
+                    "total_students": group.get("total_students", 0),
+                    "free_places": group.get("free_places", 0),
                     "status": group.get("status", "")
                 })
             
@@ -205,11 +202,11 @@ async def show_smm_free_places(message: Message):
     
     for city_name in CITIES:
         try:
-            total_seats = group_service.get_city_seats(city_name)
-            if total_seats == 0:
+            capacity = group_service.get_city_capacity(city_name)
+            if capacity["seats"] == 0:
                 continue
             
-            groups = group_service.get_city_groups(city_name)
+            groups = capacity["groups"]
             if not groups:
                 continue
             
@@ -219,8 +216,7 @@ async def show_smm_free_places(message: Message):
             
             for group in groups:
                 group_name = group.get("group_name", "Без названия")
-                total_students = group.get("total_students", 0)
-                free_places = total_seats - total_students
+                free_places = group.get("free_places", 0)
                 
                 if free_places > 0:
                     city_groups.append({
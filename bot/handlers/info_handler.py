@@ -1,6 +1,4 @@
 """Обработчик информации о городе, группах и учениках"""
-import json
-from pathlib import Path
 from typing import Dict, Any, List
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
@@ -18,62 +16,24 @@ from bot.keyboards.info_keyboards import (
     get_groups_list_keyboard,
     get_group_info_keyboard,
     get_students_list_keyboard,
-    get_back_to_info_keyboard
+    get_back_to_info_keyboard,
+    STUDENTS_PAGE_SIZE
 )
 from bot.keyboards.student_profile_keyboards import get_student_profile_keyboard
-from bot.services.group_service import GroupService
+from bot.services.info_read_model import get_city_read_model, get_group_students_page
+from bot.services.render_cache import render_cached
+from bot.services.file_io import run_file_io
 from bot.services.role_storage import RoleStorage
-from bot.services.student_search import StudentSearchService
-from bot.config import CITIES, CITY_MAPPING, ROOT_DIR
+from bot.services.short_ids import resolve_short_id
+from bot.config import CITIES
 
 router = Router()
-group_service = GroupService()
 role_storage = RoleStorage()
-search_service = StudentSearchService()
-
-
-def convert_city_en_to_ru(city_en: str) -> str:
-    """Преобразует английское название города (возможно сокращенное) обратно в русское"""
-    if not city_en:
-        return ""
-    
-    # Сначала пробуем точное совпадение
-    for ru_name, en_name in CITY_MAPPING.items():
-        if en_name == city_en:
-            return ru_name
-    
-    # Если не нашли, пробуем по началу (так как city_en может быть обрезан до 6 символов)
-    # Важно: проверяем startswith первым, чтобы избежать неоднозначности
-    for ru_name, en_name in CITY_MAPPING.items():
-        # Проверяем, начинается ли полное название с сокращенного (без учета регистра)
-        if en_name.lower().startswith(city_en.lower()):
-            return ru_name
-    
-    # Последний fallback - пробуем найти в CITIES по частичному совпадению
-    for city in CITIES:
-        city_en_from_mapping = CITY_MAPPING.get(city, "")
-        if city_en_from_mapping and city_en_from_mapping.lower().startswith(city_en.lower()):
-            return city
-    
-    # Если ничего не нашли, выводим предупреждение и возвращаем пустую строку
-    print(f"⚠️ Не удалось преобразовать city_en={city_en} в русское название")
-    return ""
 
 
 def load_city_info(city_name: str) -> Dict[str, str]:
-    """Загружает информацию о городе из main_page_info.json"""
-    city_en = CITY_MAPPING.get(city_name, city_name)
-    info_path = ROOT_DIR / f"data/{city_en}/main_page_info.json"
-    
-    if not info_path.exists():
-        return {}
-    
-    try:
-        with open(info_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Ошибка загрузки main_page_info.json для {city_name}: {e}")
-        return {}
+    """Информация о городе из main_page_info.json"""
+    return get_city_read_model(city_name).city_info
 
 
 def format_city_info(info: Dict[str, str]) -> str:
@@ -95,25 +55,7 @@ def format_city_info(info: Dict[str, str]) -> str:
 
 def get_groups_statistics(city_name: str) -> Dict[str, Any]:
     """Получает статистику по группам города"""
-    groups = group_service.get_city_groups(city_name)
-    
-    if not groups:
-        return {
-            "total_groups": 0,
-            "total_students": 0,
-            "avg_students": 0,
-            "groups": []
-        }
-    
-    total_students = sum(group.get("total_students", 0) for group in groups)
-    avg_students = total_students / len(groups) if groups else 0
-    
-    return {
-        "total_groups": len(groups),
-        "total_students": total_students,
-        "avg_students": round(avg_students, 1),
-        "groups": groups
-    }
+    return get_city_read_model(city_name).get_groups_statistics()
 
 
 def format_groups_statistics(stats: Dict[str, Any]) -> str:
@@ -129,13 +71,7 @@ def format_groups_statistics(stats: Dict[str, Any]) -> str:
 
 def get_group_info(city_name: str, group_id: str) -> Dict[str, Any]:
     """Получает информацию о группе"""
-    groups = group_service.get_city_groups(city_name)
-    
-    for group in groups:
-        if group.get("group_id") == group_id:
-            return group
-    
-    return {}
+    return get_city_read_model(city_name).get_group(group_id) or {}
 
 
 def format_group_info(group: Dict[str, Any], city_name: str) -> str:
@@ -153,33 +89,8 @@ def format_group_info(group: Dict[str, Any], city_name: str) -> str:
 
 
 def get_group_students(city_name: str, group_id: str) -> List[Dict[str, Any]]:
-    """Получает список учеников группы"""
-    students_data = search_service._load_city_students(city_name)
-    
-    if not students_data:
-        print(f"⚠️ Не удалось загрузить данные учеников для города {city_name}")
-        return []
-    
-    if group_id not in students_data:
-        print(f"⚠️ Группа {group_id} не найдена в данных для города {city_name}")
-        return []
-    
-    group_data = students_data[group_id]
-    students = group_data.get("students", [])
-    
-    if not students:
-        print(f"⚠️ В группе {group_id} нет учеников")
-        return []
-    
-    # Добавляем group_id и group_name к каждому ученику
-    for student in students:
-        student["group_id"] = group_id
-        student["group_name"] = group_data.get("group_name", "")
-        # Убеждаемся, что у ученика есть ID
-        if not student.get("ID"):
-            print(f"⚠️ Ученик {student.get('ФИО', 'N/A')} не имеет ID")
-    
-    return students
+    """Получает список учеников группы (с group_id и group_name)"""
+    return get_city_read_model(city_name).get_group_students(group_id)
 
 
 @router.message(F.text == "Информация")
@@ -246,10 +157,7 @@ async def handle_info_action(
 ):
     """Обработка действий в информации (информация о городе или группы)"""
     action = callback_data.action
-    city_en = callback_data.city_en or ""
-    
-    # Преобразуем английское название обратно в русское
-    city_name = convert_city_en_to_ru(city_en)
+    city_name = resolve_short_id(callback_data.city) or ""
     
     # Проверяем права для преподавателя
     if user_role == "teacher":
@@ -262,7 +170,7 @@ async def handle_info_action(
     
     if action == "info":
         # Показываем информацию о городе
-        info = load_city_info(city_name)
+        info = await run_file_io(load_city_info, city_name)
         formatted = format_city_info(info)
         
         await callback.message.edit_text(
@@ -272,7 +180,7 @@ async def handle_info_action(
         )
     elif action == "groups":
         # Показываем статистику по группам и список групп
-        stats = get_groups_statistics(city_name)
+        stats = await run_file_io(get_groups_statistics, city_name)
         stats_text = format_groups_statistics(stats)
         
         await callback.message.edit_text(
@@ -291,11 +199,8 @@ async def handle_group_info(
     user_role: str = None
 ):
     """Обработка выбора группы"""
-    group_id_short = callback_data.group_id or ""
-    city_en = callback_data.city_en or ""
-    
-    # Преобразуем английское название обратно в русское
-    city_name = convert_city_en_to_ru(city_en)
+    group_id = resolve_short_id(callback_data.group_id) or ""
+    city_name = resolve_short_id(callback_data.city) or ""
     
     # Проверяем права для преподавателя
     if user_role == "teacher":
@@ -306,23 +211,7 @@ async def handle_group_info(
                 await callback.answer("❌ У вас нет доступа к этому городу", show_alert=True)
                 return
     
-    # Ищем группу по сокращенному ID
-    groups = group_service.get_city_groups(city_name)
-    group = None
-    group_id_full = None
-    
-    # Нормализуем group_id_short - берем первые 16 символов (как в клавиатуре)
-    group_id_short_normalized = group_id_short[:16] if len(group_id_short) > 16 else group_id_short
-    
-    for g in groups:
-        group_id_from_data = g.get("group_id", "")
-        group_id_no_dashes = group_id_from_data.replace("-", "")
-        group_id_short_from_data = group_id_no_dashes[:16]  # Берем первые 16 символов (как в клавиатуре)
-        # Используем точное сравнение первых 16 символов
-        if group_id_short_from_data == group_id_short_normalized:
-            group = g
-            group_id_full = group_id_from_data
-            break
+    group = await run_file_io(get_group_info, city_name, group_id)
     
     if not group:
         await callback.answer("❌ Группа не найдена", show_alert=True)
@@ -333,7 +222,7 @@ async def handle_group_info(
     await callback.message.edit_text(
         formatted,
         parse_mode="HTML",
-        reply_markup=get_group_info_keyboard(group_id_full, city_name)
+        reply_markup=get_group_info_keyboard(group_id, city_name)
     )
     await callback.answer()
 
@@ -345,11 +234,8 @@ async def handle_group_students(
     user_role: str = None
 ):
     """Обработка просмотра учеников группы"""
-    group_id_short = callback_data.group_id or ""
-    city_en = callback_data.city_en or ""
-    
-    # Преобразуем английское название обратно в русское
-    city_name = convert_city_en_to_ru(city_en)
+    group_id = resolve_short_id(callback_data.group_id) or ""
+    city_name = resolve_short_id(callback_data.city) or ""
     
     # Проверяем права для преподавателя
     if user_role == "teacher":
@@ -360,46 +246,43 @@ async def handle_group_students(
                 await callback.answer("❌ У вас нет доступа к этому городу", show_alert=True)
                 return
     
-    # Ищем группу по сокращенному ID
-    groups = group_service.get_city_groups(city_name)
-    group_id_full = None
-    group_name = "Без названия"
+    group = await run_file_io(get_group_info, city_name, group_id)
     
-    # Нормализуем group_id_short - берем первые 16 символов (как в клавиатуре)
-    group_id_short_normalized = group_id_short[:16] if len(group_id_short) > 16 else group_id_short
-    
-    for g in groups:
-        group_id_from_data = g.get("group_id", "")
-        group_id_no_dashes = group_id_from_data.replace("-", "")
-        group_id_short_from_data = group_id_no_dashes[:16]  # Берем первые 16 символов (как в клавиатуре)
-        # Используем точное сравнение первых 16 символов
-        if group_id_short_from_data == group_id_short_normalized:
-            group_id_full = group_id_from_data
-            group_name = g.get("group_name", "Без названия")
-            break
-    
-    if not group_id_full:
+    if not group:
         await callback.answer("❌ Группа не найдена", show_alert=True)
         return
+    group_name = group.get("group_name", "Без названия")
     
-    students = get_group_students(city_name, group_id_full)
+    # Номер страницы вне диапазона (список мог уменьшиться) пагинатор приводит к последней странице
+    students_page = await run_file_io(
+        get_group_students_page, city_name, group_id, callback_data.page, STUDENTS_PAGE_SIZE
+    )
     
-    if not students:
+    if not students_page.total_items:
         await callback.message.edit_text(
             "❌ В группе нет учеников",
             reply_markup=get_back_to_info_keyboard(city_name)
         )
         await callback.answer()
         return
-    
-    students_text = f"👥 <b>Ученики группы: {group_name}</b>\n\n"
-    students_text += f"Всего учеников: {len(students)}\n\n"
-    students_text += "Выберите ученика:"
+    page = students_page.page
+    
+    def render_students_list():
+        students_text = f"👥 <b>Ученики группы: {group_name}</b>\n\n"
+        students_text += f"Всего учеников: {students_page.total_items}\n"
+        if students_page.total_pages > 1:
+            students_text += f"Страница {page + 1} из {students_page.total_pages}\n"
+        students_text += "\nВыберите ученика:"
+        return students_text, get_students_list_keyboard(students_page, group_id, city_name)
+    
+    students_text, keyboard = render_cached(
+        "group_students", city_name, f"{group_id}:{page}", render_students_list
+    )
     
     await callback.message.edit_text(
         students_text,
         parse_mode="HTML",
-        reply_markup=get_students_list_keyboard(students, group_id_full, city_name)
+        reply_markup=keyboard
     )
     await callback.answer()
 
@@ -411,12 +294,10 @@ async def handle_student_select(
     user_role: str = None
 ):
     """Обработка выбора ученика из группы"""
-    student_id_short = callback_data.student_id or ""
-    city_en = callback_data.city_en or ""
-    group_id_short = callback_data.group_id or ""
-    
-    # Преобразуем английское название обратно в русское
-    city_name = convert_city_en_to_ru(city_en)
+    # Восстанавливаем полные ID и город по коротким кодам
+    student_id = resolve_short_id(callback_data.student_id)
+    city_name = resolve_short_id(callback_data.city) or ""
+    group_id = resolve_short_id(callback_data.group_id) or ""
     
     # Проверяем права для преподавателя
     if user_role == "teacher":
@@ -427,90 +308,21 @@ async def handle_student_select(
                 await callback.answer("❌ У вас нет доступа к этому городу", show_alert=True)
                 return
     
-    # Ищем группу по сокращенному ID
-    groups = group_service.get_city_groups(city_name)
-    group_id_full = None
-    
-    print(f"🔍 Восстановление группы: group_id_short={group_id_short} (len={len(group_id_short)}), city={city_name}")
-    
-    # Нормализуем group_id_short - берем первые 16 символов
-    group_id_short_normalized = group_id_short[:16] if len(group_id_short) > 16 else group_id_short
-    print(f"   Нормализованный group_id_short: {group_id_short_normalized}")
-    
-    for g in groups:
-        group_id_from_data = g.get("group_id", "")
-        group_id_no_dashes = group_id_from_data.replace("-", "")
-        group_id_short_from_data = group_id_no_dashes[:16]  # Берем первые 16 символов для сравнения
-        print(f"   Проверяю: {g.get('group_name', 'N/A')} -> ID={group_id_from_data[:30]}... -> short={group_id_short_from_data}")
-        # Используем точное сравнение первых 16 символов
-        if group_id_short_from_data == group_id_short_normalized:
-            group_id_full = group_id_from_data
-            print(f"✅ Найдена группа: {g.get('group_name', 'N/A')}, ID={group_id_full}")
-            break
-    
-    if not group_id_full:
-        print(f"❌ Группа не найдена для group_id_short={group_id_short} (normalized={group_id_short_normalized})")
-        print(f"   Доступные группы:")
-        for g in groups[:3]:
-            gid = g.get("group_id", "")
-            gid_short = gid.replace("-", "")[:16] if gid else ""
-            print(f"     - {g.get('group_name', 'N/A')}: {gid_short}")
-        await callback.answer("❌ Группа не найдена", show_alert=True)
+    if not student_id:
+        await callback.answer("❌ Кнопка устарела, откройте список учеников заново", show_alert=True)
         return
     
-    # Получаем данные ученика
-    students = get_group_students(city_name, group_id_full)
-    
-    if not students:
-        await callback.answer("❌ В группе нет учеников", show_alert=True)
-        return
-    
-    student_data = None
-    student_id_full = None
-    
-    # Отладочная информация
-    print(f"🔍 Поиск ученика: student_id_short={student_id_short}, group_id_full={group_id_full}, students_count={len(students)}")
-    
-    if not student_id_short:
-        print(f"❌ student_id_short пустой!")
-        await callback.answer("❌ Ошибка: ID ученика не указан", show_alert=True)
-        return
-    
-    for student in students:
-        student_id_from_data = student.get("ID", "")
-        if not student_id_from_data:
-            print(f"⚠️ Ученик {student.get('ФИО', 'N/A')} не имеет ID")
-            continue
-        
-        student_id_no_dashes = student_id_from_data.replace("-", "")
-        # Проверяем, начинается ли полный ID (без дефисов) с сокращенного
-        if student_id_no_dashes.startswith(student_id_short):
-            student_data = student.copy()
-            student_id_full = student_id_from_data
-            print(f"✅ Найден ученик: {student_data.get('ФИО', 'N/A')}, ID={student_id_full}")
-            break
+    student_data = await run_file_io(lambda: get_city_read_model(city_name).get_student(student_id))
     
     if not student_data:
-        # Дополнительная отладка
-        print(f"❌ Ученик не найден. Ищем: '{student_id_short}'")
-        print(f"   Проверяемые ID (первые 5):")
-        for i, student in enumerate(students[:5]):  # Показываем первые 5 для отладки
-            sid = student.get("ID", "")
-            sid_no_dashes = sid.replace("-", "") if sid else ""
-            sid_short = sid_no_dashes[:16] if sid_no_dashes else ""
-            matches = sid_no_dashes.startswith(student_id_short) if sid_no_dashes and student_id_short else False
-            print(f"   {i+1}. {student.get('ФИО', 'N/A')[:30]}:")
-            print(f"      ID={sid}")
-            print(f"      short={sid_short}")
-            print(f"      matches={matches}")
         await callback.answer("❌ Ученик не найден", show_alert=True)
         return
     
     # Форматируем и показываем профиль
     from bot.handlers.student_search import format_full_info
-    formatted = format_full_info(student_data)
+    formatted = render_cached("info_card", city_name, student_id, lambda: format_full_info(student_data))
     # Показываем кнопку "Назад", так как профиль получен через кнопки
-    keyboard = get_student_profile_keyboard(student_id_full, city_name, group_id_full, show_back=True, user_role=user_role)
+    keyboard = get_student_profile_keyboard(student_id, city_name, group_id or student_data.get("group_id", ""), show_back=True, user_role=user_role)
     
     if keyboard:
         await callback.message.edit_text(
@@ -535,20 +347,12 @@ async def handle_back(
     """Обработка кнопки Назад"""
     try:
         level = callback_data.level
-        city_en = callback_data.city_en or ""
-        group_id_short = callback_data.group_id or ""
-        
-        # Отладочная информация
-        print(f"🔙 Обработка кнопки Назад: level={level}, city_en={city_en}, group_id_short={group_id_short}")
-        
-        # Преобразуем английское название обратно в русское (если нужно)
-        city_name = convert_city_en_to_ru(city_en) if city_en else None
-        
-        print(f"🔙 Преобразование: city_en={city_en} -> city_name={city_name}")
+        # Восстанавливаем город и ID группы по коротким кодам
+        city_name = resolve_short_id(callback_data.city) if callback_data.city else None
+        group_id = resolve_short_id(callback_data.group_id) if callback_data.group_id else None
         
         # Если city_name пустой и level требует город, выводим ошибку
         if not city_name and level in ["city", "groups", "group"]:
-            print(f"❌ КРИТИЧЕСКАЯ ОШИБКА: не удалось преобразовать city_en={city_en} для level={level}")
             await callback.answer("❌ Ошибка: не удалось определить город", show_alert=True)
             return
         
@@ -580,13 +384,12 @@ async def handle_back(
                     reply_markup=get_info_menu_keyboard(city_name)
                 )
             else:
-                print(f"❌ Ошибка: city_name не найден для level=city, city_en={city_en}")
                 await callback.answer("❌ Ошибка: не удалось определить город", show_alert=True)
                 return
         elif level == "groups":
             # Возврат к списку групп
             if city_name:
-                stats = get_groups_statistics(city_name)
+                stats = await run_file_io(get_groups_statistics, city_name)
                 stats_text = format_groups_statistics(stats)
                 await callback.message.edit_text(
                     stats_text,
@@ -594,43 +397,24 @@ async def handle_back(
                     reply_markup=get_groups_list_keyboard(stats["groups"], city_name)
                 )
             else:
-                print(f"❌ Ошибка: city_name не найден для level=groups, city_en={city_en}")
                 await callback.answer("❌ Ошибка: не удалось определить город", show_alert=True)
                 return
         elif level == "group":
             # Возврат к информации о группе
-            if city_name and group_id_short:
-                # Ищем группу по сокращенному ID (используется 16 символов)
-                groups = group_service.get_city_groups(city_name)
-                group = None
-                group_id_full = None
-                
-                # Нормализуем group_id_short - берем первые 16 символов
-                group_id_short_normalized = group_id_short[:16] if len(group_id_short) > 16 else group_id_short
-                
-                for g in groups:
-                    group_id_from_data = g.get("group_id", "")
-                    group_id_no_dashes = group_id_from_data.replace("-", "")
-                    group_id_short_from_data = group_id_no_dashes[:16]  # Берем первые 16 символов
-                    # Используем точное сравнение первых 16 символов
-                    if group_id_short_from_data == group_id_short_normalized:
-                        group = g
-                        group_id_full = group_id_from_data
-                        break
+            if city_name and group_id:
+                group = await run_file_io(get_group_info, city_name, group_id)
                 
                 if group:
                     formatted = format_group_info(group, city_name)
                     await callback.message.edit_text(
                         formatted,
                         parse_mode="HTML",
-                        reply_markup=get_group_info_keyboard(group_id_full, city_name)
+                        reply_markup=get_group_info_keyboard(group_id, city_name)
                     )
                 else:
-                    print(f"❌ Ошибка: группа не найдена для group_id_short={group_id_short}")
                     await callback.answer("❌ Ошибка: группа не найдена", show_alert=True)
                     return
             else:
-                print(f"❌ Ошибка: недостаточно данных для level=group, city_name={city_name}, group_id_short={group_id_short}")
                 await callback.answer("❌ Ошибка: недостаточно данных", show_alert=True)
                 return
         
@@ -1,12 +1,16 @@
 """Обработчик отчета по сотрудникам для владельца"""
 from aiogram import Router, F
 from aiogram.types import Message
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.smm_tracking_service import get_smm_tracking
 from bot.services.role_storage import RoleStorage
-from datetime import datetime
+from bot.services.file_io import run_compute
+from bot.config import ROOT_DIR, CITIES, CITY_MAPPING
+from src.sync_data.history import HistoryStore, KIND_ATTENDANCE, KIND_PAYMENTS
+from datetime import datetime, timedelta
+from typing import Optional
 
 router = Router()
-smm_tracking = SMMTrackingService()
+smm_tracking = get_smm_tracking()
 role_storage = RoleStorage()
 
 # Русские названия месяцев
@@ -17,6 +21,88 @@ MONTH_NAMES = {
 }
 
 
+def _format_delta(value: float, suffix: str = "") -> str:
+    """Изменение с эмодзи знака"""
+    if value > 0:
+        return f"➕ {value}{suffix}"
+    if value < 0:
+        return f"➖ {abs(value)}{suffix}"
+    return f"0{suffix}"
+
+
+def _week_attendance_percent(record: Optional[dict]) -> Optional[float]:
+    """Процент присутствия за 7 дней из записи истории"""
+    if not record:
+        return None
+    week = record.get("week", {})
+    total = week.get("total", 0)
+    return round(week.get("present", 0) / total * 100, 1) if total else None
+
+
+def format_weekly_trends(days: int = 7) -> str:
+    """
+    Динамика посещаемости и оплат по городам за неделю
+
+    Строится по истории синхронизаций (data/{город}/history), без запросов к Notion.
+    """
+    lines = ["─" * 30, "\n📈 <b>Динамика за неделю:</b>\n"]
+    today = datetime.now().date()
+    seen_dirs = set()
+    has_data = False
+
+    for city_name in CITIES:
+        city_en = CITY_MAPPING.get(city_name, city_name)
+        if city_en in seen_dirs:
+            continue
+        seen_dirs.add(city_en)
+
+        store = HistoryStore(ROOT_DIR / f"data/{city_en}")
+        attendance = store.get_delta(KIND_ATTENDANCE, days, today)
+        payments = store.get_delta(KIND_PAYMENTS, days, today)
+        if not attendance and not payments:
+            continue
+        has_data = True
+
+        lines.append(f"🏙️ <b>{city_name}</b>:")
+
+        if attendance:
+            current_percent = _week_attendance_percent(attendance["current"])
+            previous_percent = _week_attendance_percent(attendance["previous"])
+            if current_percent is not None:
+                line = f"   📚 Посещаемость за 7 дней: {current_percent}%"
+                if previous_percent is not None:
+                    line += f" ({_format_delta(round(current_percent - previous_percent, 1), ' п.п.')})"
+                lines.append(line)
+
+        if payments:
+            current = payments["current"]
+            previous = payments["previous"]
+            # Сравниваем оплаты только внутри одного месяца
+            if previous and previous.get("month") != current.get("month"):
+                previous = None
+
+            paid_line = f"   💰 Оплатили за {current.get('month', '')}: {current.get('paid', 0)}"
+            not_paid_line = f"   ⏳ Не оплатили: {current.get('not_paid', 0)}"
+            if previous:
+                paid_line += f" ({_format_delta(current.get('paid', 0) - previous.get('paid', 0))})"
+                not_paid_line += f" ({_format_delta(current.get('not_paid', 0) - previous.get('not_paid', 0))})"
+            lines.append(paid_line)
+            lines.append(not_paid_line)
+
+            changes = sum(
+                record.get("changes_total", 0)
+                for record in store.iter_records(today - timedelta(days=days - 1), today, KIND_PAYMENTS)
+            )
+            lines.append(f"   🔄 Изменений статусов оплат: {changes}")
+
+        lines.append("")
+
+    if not has_data:
+        lines.append("   Нет истории синхронизаций")
+
+    return "\n".join(lines)
+
+
 @router.message(F.text == "Отчет по сотрудникам")
 async def cmd_owner_report(message: Message, user_role: str = None):
     """Обработчик кнопки 'Отчет по сотрудникам'"""
@@ -323,3 +409,7 @@ async def cmd_owner_report(message: Message, user_role: str = None):
             await message.answer(list_text, parse_mode="HTML")
     else:
         await message.answer(message_text, parse_mode="HTML")
+    
+    # Динамика по истории синхронизаций
+    trends_text = await run_compute(format_weekly_trends)
+    await message.answer(trends_text, parse_mode="HTML")
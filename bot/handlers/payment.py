@@ -7,9 +7,12 @@ from aiogram.filters import StateFilter, BaseFilter
 from bot.states.payment_state import PaymentState
 from bot.services.payment_service import PaymentService
 from bot.services.student_search import StudentSearchService
+from bot.services.render_cache import render_cached
+from bot.services.file_io import run_file_io, run_compute
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.smm_tracking_service import get_smm_tracking
+from bot.services.short_ids import resolve_short_id
 from bot.keyboards.payment_keyboards import (
     PaymentStatusCallback,
     PaymentBackCallback,
@@ -39,7 +42,7 @@ search_service = StudentSearchService()
 role_storage = RoleStorage()
 action_logger = ActionLogger()
 reminder_service = ReminderService()
-smm_tracking = SMMTrackingService()
+smm_tracking = get_smm_tracking()
 
 
 class PaymentQueryFilter(BaseFilter):
@@ -87,7 +90,10 @@ def parse_payment_query(text: str) -> Optional[Tuple[str, str]]:
 
 def format_payment_info(student_data: dict, payment_data: Optional[dict], city_name: str) -> str:
     """Форматирует информацию об ученике с данными об оплате и посещаемости"""
-    return payment_service.format_student_info_with_payment_and_attendance(student_data, payment_data, city_name)
+    return render_cached(
+        "payment_card", city_name, student_data.get("ID", ""),
+        lambda: payment_service.format_student_info_with_payment_and_attendance(student_data, payment_data, city_name)
+    )
 
 
 @router.message(F.text, ~F.text.startswith("/"), PaymentQueryFilter())
@@ -136,7 +142,7 @@ async def handle_payment_search(message: Message, state: FSMContext, user_role:
 
     # Выполняем поиск ученика
     try:
-        result_type, data = search_service.search(city_name, query)
+        result_type, data = await run_file_io(search_service.search, city_name, query)
 
         if result_type == "not_found":
             await message.answer(
@@ -147,10 +153,10 @@ async def handle_payment_search(message: Message, state: FSMContext, user_role:
             student_data = data
 
             # Получаем информацию об оплате
-            payment_data = payment_service.get_student_payment_info(city_name, student_data)
+            payment_data = await run_file_io(payment_service.get_student_payment_info, city_name, student_data)
 
             # Форматируем и показываем информацию
-            formatted = format_payment_info(student_data, payment_data, city_name)
+            formatted = await run_file_io(format_payment_info, student_data, payment_data, city_name)
 
             # Сохраняем данные в состояние
             await state.update_data(
@@ -206,7 +212,7 @@ async def process_payment_status(
         return
 
     # Получаем старый статус перед обновлением
-    payment_data = payment_service.get_student_payment_info(city_name, student_data)
+    payment_data = await run_file_io(payment_service.get_student_payment_info, city_name, student_data)
     current_month = payment_service.get_current_month(city_name)
     old_status = payment_service.get_payment_status_for_month(payment_data, current_month) if payment_data else ""
     old_status = old_status if old_status else "Не указан"
@@ -293,7 +299,7 @@ async def process_payment_status(
 async def send_upcoming_payments_report(user_id: int, bot) -> bool:
     """Отправляет отчет о ближайших платежах пользователю"""
     # Получаем учеников с предстоящими оплатами (сегодня, через 1, 2, 3 дня)
-    students_by_days = reminder_service.get_students_with_upcoming_payments()
+    students_by_days = await run_compute(reminder_service.get_students_with_upcoming_payments)
     
     # Проверяем, есть ли хоть один ученик в любом из периодов
     available_categories = [days for days in [0, 1, 2, 3] if students_by_days.get(days, [])]
@@ -326,8 +332,8 @@ async def send_upcoming_payments_report(user_id: int, bot) -> bool:
     first_category = available_categories[0]
     
     # Форматируем сообщение для первой категории
-    category_text = reminder_service.format_payment_reminder_category(
-        students_by_days, first_category
+    category_text = await run_compute(
+        reminder_service.format_payment_reminder_category, students_by_days, first_category
     )
     
     # Формируем полное сообщение
@@ -408,30 +414,26 @@ async def cmd_payments(message: Message, state: FSMContext, user_role: str = Non
         await state.update_data(selected_city=user_city)
         await state.set_state(PaymentState.waiting_student)
 
-        # Получаем учеников города
-        students = payment_service.get_city_students(user_city)
-        if not students:
+        # Показываем первую страницу учеников города (по 10 учеников)
+        students_page = await run_file_io(payment_service.get_city_students_page, user_city, 0)
+        if not students_page.total_items:
             await message.answer(f"❌ Ученики не найдены для города '{user_city}'")
             await state.clear()
             return
 
-        # Показываем первую страницу (по 10 учеников)
-        page = 0
-        page_size = 10
-        total_pages = (len(students) + page_size - 1) // page_size
-        page_students = students[page * page_size:(page + 1) * page_size]
-
         # Получаем статусы оплаты для учеников на странице
-        student_ids = [s.get("ID", "") for s in page_students]
-        payment_statuses = payment_service.get_payment_statuses_for_students(user_city, student_ids)
+        student_ids = [s.get("ID", "") for s in students_page.items]
+        payment_statuses = await run_file_io(payment_service.get_payment_statuses_for_students, user_city, student_ids)
 
-        await state.update_data(students=students, current_page=page)
+        await state.update_data(current_page=students_page.page)
 
         await message.answer(
             f"💰 Оплаты\n"
             f"🏙️ Город: {user_city}\n\n"
-            f"Выберите ученика (страница {page + 1} из {total_pages}):",
-            reply_markup=get_payment_students_keyboard(page_students, user_city, page, total_pages, payment_statuses)
+            f"Выберите ученика (страница {students_page.page + 1} из {students_page.total_pages}):",
+            reply_markup=get_payment_students_keyboard(
+                students_page.items, user_city, students_page.page, students_page.total_pages, payment_statuses
+            )
         )
         return
 
@@ -485,33 +487,29 @@ async def process_payment_city(
     city_name = callback_data.city
     await state.update_data(selected_city=city_name)
 
-    # Получаем учеников города
-    students = payment_service.get_city_students(city_name)
+    # Показываем первую страницу учеников города (по 10 учеников)
+    students_page = await run_file_io(payment_service.get_city_students_page, city_name, 0)
 
-    if not students:
+    if not students_page.total_items:
         await callback.message.edit_text(f"❌ Ученики не найдены для города '{city_name}'")
         await callback.answer("Ученики не найдены", show_alert=True)
         await state.clear()
         return
 
-    # Показываем первую страницу (по 10 учеников)
-    page = 0
-    page_size = 10
-    total_pages = (len(students) + page_size - 1) // page_size
-    page_students = students[page * page_size:(page + 1) * page_size]
-
     # Получаем статусы оплаты для учеников на странице
-    student_ids = [s.get("ID", "") for s in page_students]
-    payment_statuses = payment_service.get_payment_statuses_for_students(city_name, student_ids)
+    student_ids = [s.get("ID", "") for s in students_page.items]
+    payment_statuses = await run_file_io(payment_service.get_payment_statuses_for_students, city_name, student_ids)
 
-    await state.update_data(students=students, current_page=page)
+    await state.update_data(current_page=students_page.page)
     await state.set_state(PaymentState.waiting_student)
 
     await callback.message.edit_text(
         f"💰 Оплаты\n"
         f"🏙️ Город: {city_name}\n\n"
-        f"Выберите ученика (страница {page + 1} из {total_pages}):",
-        reply_markup=get_payment_students_keyboard(page_students, city_name, page, total_pages, payment_statuses)
+        f"Выберите ученика (страница {students_page.page + 1} из {students_page.total_pages}):",
+        reply_markup=get_payment_students_keyboard(
+            students_page.items, city_name, students_page.page, students_page.total_pages, payment_statuses
+        )
     )
     await callback.answer()
 
@@ -527,35 +525,32 @@ async def process_payment_pagination(
     page = callback_data.page
 
     data = await state.get_data()
-    students = data.get("students", [])
+    selected_city = data.get("selected_city", city_name)
 
-    if not students:
+    # Страница берется из кэша отсортированного списка учеников города
+    students_page = await run_file_io(payment_service.get_city_students_page, selected_city, page)
+
+    if not students_page.total_items:
         await callback.answer("❌ Список учеников не найден", show_alert=True)
         return
 
-    # Показываем страницу
-    page_size = 10
-    total_pages = (len(students) + page_size - 1) // page_size
-
-    if page < 0 or page >= total_pages:
+    if page != students_page.page:
         await callback.answer("❌ Неверная страница", show_alert=True)
         return
 
-    page_students = students[page * page_size:(page + 1) * page_size]
-
     # Получаем статусы оплаты для учеников на странице
-    student_ids = [s.get("ID", "") for s in page_students]
-    data = await state.get_data()
-    selected_city = data.get("selected_city", city_name)
-    payment_statuses = payment_service.get_payment_statuses_for_students(selected_city, student_ids)
+    student_ids = [s.get("ID", "") for s in students_page.items]
+    payment_statuses = await run_file_io(payment_service.get_payment_statuses_for_students, selected_city, student_ids)
 
     await state.update_data(current_page=page)
 
     await callback.message.edit_text(
         f"💰 Оплаты\n"
         f"🏙️ Город: {city_name}\n\n"
-        f"Выберите ученика (страница {page + 1} из {total_pages}):",
-        reply_markup=get_payment_students_keyboard(page_students, city_name, page, total_pages, payment_statuses)
+        f"Выберите ученика (страница {page + 1} из {students_page.total_pages}):",
+        reply_markup=get_payment_students_keyboard(
+            students_page.items, city_name, page, students_page.total_pages, payment_statuses
+        )
     )
     await callback.answer()
 
@@ -567,7 +562,7 @@ async def process_payment_student(
         state: FSMContext
 ):
     """Обработка выбора ученика"""
-    student_id = callback_data.student_id
+    student_id = resolve_short_id(callback_data.student_id)
     data = await state.get_data()
     city_name = data.get("selected_city")
 
@@ -577,17 +572,17 @@ async def process_payment_student(
         return
 
     # Получаем данные ученика
-    student_data = payment_service.get_student_by_id(city_name, student_id)
+    student_data = await run_file_io(payment_service.get_student_by_id, city_name, student_id)
 
     if not student_data:
         await callback.answer("❌ Ученик не найден", show_alert=True)
         return
 
     # Получаем информацию об оплате
-    payment_data = payment_service.get_student_payment_info(city_name, student_data)
+    payment_data = await run_file_io(payment_service.get_student_payment_info, city_name, student_data)
 
     # Форматируем и показываем информацию
-    formatted = format_payment_info(student_data, payment_data, city_name)
+    formatted = await run_file_io(format_payment_info, student_data, payment_data, city_name)
 
     # Сохраняем данные в состояние
     await state.update_data(
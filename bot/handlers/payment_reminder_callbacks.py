@@ -3,28 +3,25 @@ from aiogram import Router, Bot
 from aiogram.types import CallbackQuery
 from bot.keyboards.payment_reminder_keyboards import (
     PaymentReminderCategoryCallback,
+    PaymentReminderPageCallback,
     PaymentReminderRefreshCallback,
     get_payment_reminder_keyboard
 )
 from bot.services.reminder_service import ReminderService
+from bot.services.file_io import run_compute
 from bot.config import BOT_TOKEN
 
 router = Router()
 reminder_service = ReminderService()
 
 
-@router.callback_query(PaymentReminderCategoryCallback.filter())
-async def handle_payment_reminder_category(
-    callback: CallbackQuery,
-    callback_data: PaymentReminderCategoryCallback
-):
-    """Обработчик переключения категории напоминаний о платежах"""
-    category = callback_data.category
+async def _show_payment_reminder_page(callback: CallbackQuery, category: int, page: int = 0):
+    """Показывает страницу категории напоминаний о платежах в сообщении callback"""
     # Используем message_id из самого сообщения
     message_id = callback.message.message_id
     
-    # Получаем актуальные данные
-    students_by_days = reminder_service.get_students_with_upcoming_payments()
+    # Получаем актуальные данные (из кэша, если данные не менялись)
+    students_by_days = await run_compute(reminder_service.get_students_with_upcoming_payments)
     
     # Определяем доступные категории
     available_categories = [days for days in [0, 1, 2, 3] if students_by_days.get(days, [])]
@@ -33,32 +30,12 @@ async def handle_payment_reminder_category(
         await callback.answer("❌ Категория не найдена", show_alert=True)
         return
     
-    # Формируем статистику по категориям
-    day_labels = {
-        0: "Сегодня",
-        1: "Через 1 день",
-        2: "Через 2 дня",
-        3: "Через 3 дня"
-    }
-    
-    stats_lines = []
-    for days in [0, 1, 2, 3]:
-        count = len(students_by_days.get(days, []))
-        if count > 0:
-            stats_lines.append(f"{day_labels[days]}: {count} ученик(ов)")
-    
-    stats_text = "\n".join(stats_lines) if stats_lines else "Нет учеников"
-    
-    # Форматируем сообщение для выбранной категории
-    category_text = reminder_service.format_payment_reminder_category(
-        students_by_days, category
-    )
+    pages = await run_compute(reminder_service.get_payment_reminder_pages, students_by_days, category)
+    page = min(max(page, 0), len(pages) - 1)
     
     # Формируем полное сообщение
-    full_message = (
-        f"🔔 <b>Напоминание о предстоящих платежах</b>\n\n"
-        f"{stats_text}\n\n"
-        f"{category_text}"
+    full_message = await run_compute(
+        reminder_service.format_payment_reminder_message, students_by_days, category, page
     )
     
     # Обновляем сообщение
@@ -69,7 +46,9 @@ async def handle_payment_reminder_category(
             reply_markup=get_payment_reminder_keyboard(
                 current_category=category,
                 available_categories=available_categories,
-                message_id=message_id
+                message_id=message_id,
+                page=page,
+                total_pages=len(pages)
             )
         )
         await callback.answer()
@@ -78,6 +57,24 @@ async def handle_payment_reminder_category(
         await callback.answer("❌ Ошибка обновления", show_alert=True)
 
 
+@router.callback_query(PaymentReminderCategoryCallback.filter())
+async def handle_payment_reminder_category(
+    callback: CallbackQuery,
+    callback_data: PaymentReminderCategoryCallback
+):
+    """Обработчик переключения категории напоминаний о платежах"""
+    await _show_payment_reminder_page(callback, callback_data.category)
+
+
+@router.callback_query(PaymentReminderPageCallback.filter())
+async def handle_payment_reminder_page(
+    callback: CallbackQuery,
+    callback_data: PaymentReminderPageCallback
+):
+    """Обработчик переключения страницы внутри категории напоминаний о платежах"""
+    await _show_payment_reminder_page(callback, callback_data.category, callback_data.page)
+
+
 @router.callback_query(PaymentReminderRefreshCallback.filter())
 async def handle_payment_reminder_refresh(
     callback: CallbackQuery,
@@ -88,7 +85,7 @@ async def handle_payment_reminder_refresh(
     message_id = callback.message.message_id
     
     # Получаем актуальные данные
-    students_by_days = reminder_service.get_students_with_upcoming_payments()
+    students_by_days = await run_compute(reminder_service.get_students_with_upcoming_payments)
     
     # Определяем доступные категории
     available_categories = [days for days in [0, 1, 2, 3] if students_by_days.get(days, [])]
@@ -107,35 +104,13 @@ async def handle_payment_reminder_refresh(
             await callback.answer("❌ Ошибка обновления", show_alert=True)
         return
     
-    # Формируем статистику по категориям
-    day_labels = {
-        0: "Сегодня",
-        1: "Через 1 день",
-        2: "Через 2 дня",
-        3: "Через 3 дня"
-    }
-    
-    stats_lines = []
-    for days in [0, 1, 2, 3]:
-        count = len(students_by_days.get(days, []))
-        if count > 0:
-            stats_lines.append(f"{day_labels[days]}: {count} ученик(ов)")
-    
-    stats_text = "\n".join(stats_lines) if stats_lines else "Нет учеников"
-    
     # Определяем первую категорию для отображения
     first_category = available_categories[0]
-    
-    # Форматируем сообщение для первой категории
-    category_text = reminder_service.format_payment_reminder_category(
-        students_by_days, first_category
-    )
+    pages = await run_compute(reminder_service.get_payment_reminder_pages, students_by_days, first_category)
     
     # Формируем полное сообщение
-    full_message = (
-        f"🔔 <b>Напоминание о предстоящих платежах</b>\n\n"
-        f"{stats_text}\n\n"
-        f"{category_text}"
+    full_message = await run_compute(
+        reminder_service.format_payment_reminder_message, students_by_days, first_category
     )
     
     # Обновляем сообщение
@@ -146,7 +121,8 @@ async def handle_payment_reminder_refresh(
             reply_markup=get_payment_reminder_keyboard(
                 current_category=first_category,
                 available_categories=available_categories,
-                message_id=message_id
+                message_id=message_id,
+                total_pages=len(pages)
             )
         )
         await callback.answer("✅ Отчет обновлен")
@@ -1,13 +1,15 @@
 """Обработчик запросов отчетов по оплатам через текстовые команды"""
+import asyncio
 from typing import Optional, Tuple
 from aiogram import Router
 from aiogram.types import Message, FSInputFile
 from aiogram.fsm.context import FSMContext
 from bot.services.role_storage import RoleStorage
-from bot.services.report_payments import generate_payments_report
+from bot.services.report_cache import get_report_cache
 
 router = Router()
 role_storage = RoleStorage()
+report_cache = get_report_cache()
 
 MONTH_NAMES = [
     "январь", "февраль", "март", "апрель", "май", "июнь",
@@ -23,6 +25,7 @@ def parse_payment_report_query(text: str) -> Optional[Tuple[str, Optional[str]]]
     - "отчет по оплатам Назрань ноябрь" -> ("Назрань", "Ноябрь")
     - "отчет по оплатам все ноябрь" -> ("все", "Ноябрь")
     - "отчет по оплатам Назрань" -> ("Назрань", None)
+    - "отчет по оплатам Назрань csv" -> ("Назрань", None) (формат файла см. is_csv_report_query)
     
     Примечание: месяц сейчас игнорируется, т.к. generate_payments_report
     всегда использует текущий месяц. Но парсим для будущего расширения.
@@ -60,6 +63,12 @@ def parse_payment_report_query(text: str) -> Optional[Tuple[str, Optional[str]]]
     return (city, month)
 
 
+def is_csv_report_query(text: str) -> bool:
+    """Запрошен ли отчет в CSV (слово "csv" в конце запроса)"""
+    parts = text.strip().lower().split()
+    return bool(parts) and parts[-1] == "csv"
+
+
 @router.message()
 async def handle_payment_report_query(message: Message, state: FSMContext, user_role: str = None, user_city: str = None):
     """Обработчик запросов отчетов по оплатам"""
@@ -94,14 +103,17 @@ async def handle_payment_report_query(message: Message, state: FSMContext, user_
     try:
         await message.answer("⏳ Формирую отчет...")
         
-        # generate_payments_report возвращает (summary_text, excel_path)
-        summary_text, excel_path = generate_payments_report(city_name)
+        # Отчет берется из кэша, если данные не менялись: (summary_text, report_path)
+        export_format = "csv" if is_csv_report_query(text) else "xlsx"
+        summary_text, report_path = await asyncio.to_thread(
+            report_cache.get_payments_report, city_name, export_format
+        )
         
         # Отправляем текстовый отчет
         await message.answer(summary_text)
         
-        # Отправляем Excel файл
-        document = FSInputFile(excel_path)
+        # Отправляем файл отчета
+        document = FSInputFile(report_path)
         caption = f"📊 Отчет по оплатам: {city_name}"
         if city_name == "all":
             caption = "📊 Общий отчет по оплатам (все города)"
@@ -1,47 +1,109 @@
 """Обработчик напоминаний о посещаемости"""
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 from aiogram import Bot
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from bot.services.reminder_service import ReminderService
 from bot.services.role_storage import RoleStorage
-from bot.services.unprocessed_students_storage import UnprocessedStudentsStorage
+from bot.services.unprocessed_students_storage import get_unprocessed_storage
+from bot.services.delivery_queue import get_delivery_queue
+from bot.services.alert_service import AlertService
+from bot.services.file_io import run_compute
 from bot.config import BOT_TOKEN, OWNER_ID
 from bot.keyboards.payment_reminder_keyboards import (
     PaymentReminderCategoryCallback,
     PaymentReminderRefreshCallback,
     get_payment_reminder_keyboard
 )
-from bot.handlers.add_student import notification_storage
 
 
 class ReminderHandler:
     """Обработчик для отправки напоминаний преподавателям и менеджерам"""
     
+    # Сколько оповещений о риске ухода помещать в одно сообщение
+    ALERTS_PER_MESSAGE = 25
+    
     def __init__(self, bot: Bot):
         self.bot = bot
         self.reminder_service = ReminderService()
         self.role_storage = RoleStorage()
-        self.unprocessed_storage = UnprocessedStudentsStorage()
-        self.sent_reminders = set()  # Хранит уже отправленные напоминания (teacher_user_id, group_id, date)
-        self.sent_payment_reminders = set()  # Хранит уже отправленные напоминания о платежах (date_str)
-        self.sent_absence_reminders = set()  # Хранит уже отправленные напоминания об отсутствиях (date_str)
-        self.sent_unprocessed_reminders = set()  # Хранит уже отправленные напоминания о необработанных учениках (date_str)
+        self.unprocessed_storage = get_unprocessed_storage()
+        # Все исходящие напоминания идут через общую очередь доставки,
+        # ключи дедупликации хранятся в ней же и переживают перезапуск
+        self.delivery_queue = get_delivery_queue()
+        self.alert_service = AlertService()
     
-    def _get_reminder_key(self, teacher_user_id: int, group_id: str, date_str: str) -> tuple:
+    def _get_reminder_key(self, teacher_user_id: int, group_id: str, date_str: str) -> str:
         """Создает ключ для отслеживания отправленных напоминаний"""
-        return (teacher_user_id, group_id, date_str)
+        return f"attendance_reminder:{date_str}:{teacher_user_id}:{group_id}"
+    
+    def _get_managers_and_owner(self) -> List[Dict[str, Any]]:
+        """Получает всех менеджеров и владельца (владелец добавляется, даже если его нет в roles.json)"""
+        all_users = self.role_storage.get_all_users()
+        managers_and_owner = [
+            user for user in all_users
+            if user.get("role") in ["manager", "owner"]
+        ]
+        
+        # Добавляем владельца, если его нет в списке
+        owner_in_list = any(user.get("user_id") == OWNER_ID for user in managers_and_owner)
+        if not owner_in_list:
+            managers_and_owner.append({
+                "user_id": OWNER_ID,
+                "fio": "Владелец",
+                "username": "owner",
+                "role": "owner"
+            })
+        
+        return managers_and_owner
+    
+    def _enqueue_digest(
+        self,
+        digest_key: str,
+        text: str,
+        reply_markup=None
+    ) -> int:
+        """
+        Ставит ежедневную рассылку в очередь для всех менеджеров и владельца
+        
+        Args:
+            digest_key: Ключ рассылки (например, "payment_reminder:2025-11-25")
+            text: Текст сообщения
+            reply_markup: Inline-клавиатура
+        
+        Returns:
+            Количество поставленных в очередь сообщений
+        """
+        messages = []
+        for user in self._get_managers_and_owner():
+            user_id = user.get("user_id")
+            if not user_id:
+                continue
+            messages.append({
+                "chat_id": user_id,
+                "text": text,
+                "key": f"{digest_key}:{user_id}",
+                "reply_markup": reply_markup,
+                "pin": True
+            })
+        
+        queued = self.delivery_queue.enqueue_many(messages)
+        # Отмечаем рассылку как сформированную только после постановки в очередь
+        self.delivery_queue.mark_delivered(digest_key)
+        print(f"📬 Рассылка {digest_key} поставлена в очередь для {queued} получателей")
+        return queued
     
-    async def send_reminder(self, teacher_user_id: int, group_name: str, city: str):
+    async def send_reminder(self, teacher_user_id: int, group_name: str, city: str, key: Optional[str] = None):
         """
-        Отправляет напоминание преподавателю
+        Ставит в очередь напоминание преподавателю
         
         Args:
             teacher_user_id: ID преподавателя
             group_name: Название группы
             city: Название города
+            key: Ключ дедупликации (если None - напоминание отправляется всегда)
         """
         message = (
             f"🔔 <b>Напоминание о посещаемости</b>\n\n"
@@ -51,15 +113,8 @@ class ReminderHandler:
             f"Пожалуйста, отметьте посещаемость через раздел 'Посещаемость' в меню."
         )
         
-        try:
-            await self.bot.send_message(
-                chat_id=teacher_user_id,
-                text=message,
-                parse_mode="HTML"
-            )
-            print(f"✅ Напоминание отправлено преподавателю {teacher_user_id} для группы {group_name}")
-        except Exception as e:
-            print(f"❌ Ошибка отправки напоминания преподавателю {teacher_user_id}: {e}")
+        if self.delivery_queue.enqueue(chat_id=teacher_user_id, text=message, key=key):
+            print(f"✅ Напоминание поставлено в очередь для преподавателя {teacher_user_id}, группа {group_name}")
     
     async def check_and_send_reminders(self):
         """Проверяет и отправляет напоминания"""
@@ -77,24 +132,9 @@ class ReminderHandler:
             group_name = group_info["group_name"]
             city = group_info["city"]
             
-            # Проверяем, не отправляли ли уже напоминание сегодня
+            # Ключ дедупликации: не более одного напоминания на группу в день
             reminder_key = self._get_reminder_key(teacher_user_id, group_id, today_str)
-            if reminder_key in self.sent_reminders:
-                continue
-            
-            # Отправляем напоминание
-            await self.send_reminder(teacher_user_id, group_name, city)
-            
-            # Отмечаем, что напоминание отправлено
-            self.sent_reminders.add(reminder_key)
-        
-        # Очищаем старые записи (старше сегодняшнего дня)
-        # Это нужно делать, чтобы не накапливать память
-        if len(self.sent_reminders) > 1000:  # Если слишком много записей
-            self.sent_reminders = {
-                key for key in self.sent_reminders 
-                if key[2] == today_str  # Оставляем только сегодняшние
-            }
+            await self.send_reminder(teacher_user_id, group_name, city, key=reminder_key)
     
     async def send_payment_reminder(self):
         """Отправляет напоминания менеджерам и владельцу о предстоящих платежах"""
@@ -102,130 +142,44 @@ class ReminderHandler:
         if not self.reminder_service.should_send_payment_reminder_now():
             return
         
-        # Проверяем, не отправляли ли уже сегодня
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        if today_str in self.sent_payment_reminders:
+        # Проверяем, не формировали ли рассылку уже сегодня
+        digest_key = f"payment_reminder:{datetime.now().strftime('%Y-%m-%d')}"
+        if self.delivery_queue.is_known(digest_key):
             return
         
         # Получаем учеников с предстоящими оплатами (сегодня, через 1, 2, 3 дня)
-        students_by_days = self.reminder_service.get_students_with_upcoming_payments()
+        students_by_days = await run_compute(self.reminder_service.get_students_with_upcoming_payments)
         
         # Проверяем, есть ли хоть один ученик в любом из периодов
         available_categories = [days for days in [0, 1, 2, 3] if students_by_days.get(days, [])]
         
         if not available_categories:
             # Отмечаем, что проверка была выполнена, даже если учеников нет
-            self.sent_payment_reminders.add(today_str)
+            self.delivery_queue.mark_delivered(digest_key)
             return
         
         # Определяем первую категорию для отображения
         first_category = available_categories[0]
         
-        # Получаем всех менеджеров и владельца
-        all_users = self.role_storage.get_all_users()
-        managers_and_owner = [
-            user for user in all_users
-            if user.get("role") in ["manager", "owner"]
-        ]
-        
-        # Добавляем владельца, если его нет в списке
-        owner_in_list = any(user.get("user_id") == OWNER_ID for user in managers_and_owner)
-        if not owner_in_list:
-            managers_and_owner.append({
-                "user_id": OWNER_ID,
-                "fio": "Владелец",
-                "username": "owner",
-                "role": "owner"
-            })
-        
-        # Формируем статистику по категориям
-        day_labels = {
-            0: "Сегодня",
-            1: "Через 1 день",
-            2: "Через 2 дня",
-            3: "Через 3 дня"
-        }
-        
-        stats_lines = []
-        for days in [0, 1, 2, 3]:
-            count = len(students_by_days.get(days, []))
-            if count > 0:
-                stats_lines.append(f"{day_labels[days]}: {count} ученик(ов)")
-        
-        stats_text = "\n".join(stats_lines) if stats_lines else "Нет учеников"
+        pages = await run_compute(
+            self.reminder_service.get_payment_reminder_pages, students_by_days, first_category
+        )
         
-        # Форматируем сообщение для первой категории
-        category_text = self.reminder_service.format_payment_reminder_category(
+        # Формируем полное сообщение (первая страница первой категории)
+        full_message = self.reminder_service.format_payment_reminder_message(
             students_by_days, first_category
         )
         
-        # Формируем полное сообщение
-        full_message = (
-            f"🔔 <b>Напоминание о предстоящих платежах</b>\n\n"
-            f"{stats_text}\n\n"
-            f"{category_text}"
+        # Обработчики навигации берут message_id из самого сообщения,
+        # поэтому клавиатуру можно сформировать до отправки
+        keyboard = get_payment_reminder_keyboard(
+            current_category=first_category,
+            available_categories=available_categories,
+            message_id=0,
+            total_pages=len(pages)
         )
         
-        # Отправляем уведомления с навигацией
-        success_count = 0
-        for user in managers_and_owner:
-            user_id = user.get("user_id")
-            if not user_id:
-                continue
-            
-            try:
-                # Создаем клавиатуру с навигацией
-                keyboard = get_payment_reminder_keyboard(
-                    current_category=first_category,
-                    available_categories=available_categories,
-                    message_id=0  # Будет обновлено после отправки
-                )
-                
-                sent_message = await self.bot.send_message(
-                    chat_id=user_id,
-                    text=full_message,
-                    parse_mode="HTML",
-                    reply_markup=keyboard
-                )
-                
-                # Обновляем клавиатуру с правильным message_id
-                keyboard_with_id = get_payment_reminder_keyboard(
-                    current_category=first_category,
-                    available_categories=available_categories,
-                    message_id=sent_message.message_id
-                )
-                
-                await self.bot.edit_message_reply_markup(
-                    chat_id=user_id,
-                    message_id=sent_message.message_id,
-                    reply_markup=keyboard_with_id
-                )
-                
-                # Закрепляем сообщение
-                try:
-                    await self.bot.pin_chat_message(
-                        chat_id=user_id,
-                        message_id=sent_message.message_id
-                    )
-                except Exception as pin_error:
-                    print(f"⚠️ Не удалось закрепить сообщение для пользователя {user_id}: {pin_error}")
-                
-                success_count += 1
-                print(f"✅ Напоминание о платежах отправлено пользователю {user_id} ({user.get('fio', 'N/A')})")
-            except Exception as e:
-                print(f"❌ Ошибка отправки напоминания о платежах пользователю {user_id}: {e}")
-        
-        # Отмечаем, что напоминание отправлено
-        self.sent_payment_reminders.add(today_str)
-        
-        # Очищаем старые записи (старше недели)
-        if len(self.sent_payment_reminders) > 10:
-            from datetime import timedelta
-            week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-            self.sent_payment_reminders = {
-                date_str for date_str in self.sent_payment_reminders
-                if date_str >= week_ago
-            }
+        self._enqueue_digest(digest_key, full_message, reply_markup=keyboard)
     
     async def send_absence_reminder(self):
         """Отправляет напоминания менеджерам о учениках с двумя последними отсутствиями"""
@@ -233,36 +187,19 @@ class ReminderHandler:
         if not self.reminder_service.should_send_payment_reminder_now():
             return
         
-        # Проверяем, не отправляли ли уже сегодня
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        if today_str in self.sent_absence_reminders:
+        # Проверяем, не формировали ли рассылку уже сегодня
+        digest_key = f"absence_reminder:{datetime.now().strftime('%Y-%m-%d')}"
+        if self.delivery_queue.is_known(digest_key):
             return
         
         # Получаем учеников с двумя последними отсутствиями
-        students_with_absent = self.reminder_service.get_students_with_two_absent_marks()
+        students_with_absent = await run_compute(self.reminder_service.get_students_with_two_absent_marks)
         
         if not students_with_absent:
             # Отмечаем, что проверка была выполнена, даже если учеников нет
-            self.sent_absence_reminders.add(today_str)
+            self.delivery_queue.mark_delivered(digest_key)
             return
         
-        # Получаем всех менеджеров и владельца
-        all_users = self.role_storage.get_all_users()
-        managers_and_owner = [
-            user for user in all_users
-            if user.get("role") in ["manager", "owner"]
-        ]
-        
-        # Добавляем владельца, если его нет в списке
-        owner_in_list = any(user.get("user_id") == OWNER_ID for user in managers_and_owner)
-        if not owner_in_list:
-            managers_and_owner.append({
-                "user_id": OWNER_ID,
-                "fio": "Владелец",
-                "username": "owner",
-                "role": "owner"
-            })
-        
         # Формируем сообщение
         message_lines = [
             f"🔔 <b>Напоминание об отсутствующих учениках</b>\n\n",
@@ -296,45 +233,7 @@ class ReminderHandler:
         
         full_message = "\n".join(message_lines)
         
-        # Отправляем уведомления
-        success_count = 0
-        for user in managers_and_owner:
-            user_id = user.get("user_id")
-            if not user_id:
-                continue
-            
-            try:
-                sent_message = await self.bot.send_message(
-                    chat_id=user_id,
-                    text=full_message,
-                    parse_mode="HTML"
-                )
-                
-                # Закрепляем сообщение
-                try:
-                    await self.bot.pin_chat_message(
-                        chat_id=user_id,
-                        message_id=sent_message.message_id
-                    )
-                except Exception as pin_error:
-                    print(f"⚠️ Не удалось закрепить сообщение для пользователя {user_id}: {pin_error}")
-                
-                success_count += 1
-                print(f"✅ Напоминание об отсутствиях отправлено пользователю {user_id} ({user.get('fio', 'N/A')})")
-            except Exception as e:
-                print(f"❌ Ошибка отправки напоминания об отсутствиях пользователю {user_id}: {e}")
-        
-        # Отмечаем, что напоминание отправлено
-        self.sent_absence_reminders.add(today_str)
-        
-        # Очищаем старые записи (старше недели)
-        if len(self.sent_absence_reminders) > 10:
-            from datetime import timedelta
-            week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-            self.sent_absence_reminders = {
-                date_str for date_str in self.sent_absence_reminders
-                if date_str >= week_ago
-            }
+        self._enqueue_digest(digest_key, full_message)
     
     async def send_unprocessed_students_reminder(self):
         """Отправляет ежедневные напоминания о необработанных учениках менеджерам и владельцу"""
@@ -342,9 +241,9 @@ class ReminderHandler:
         if not self.reminder_service.should_send_unprocessed_students_reminder_now():
             return
         
-        # Проверяем, не отправляли ли уже сегодня
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        if today_str in self.sent_unprocessed_reminders:
+        # Проверяем, не формировали ли рассылку уже сегодня
+        digest_key = f"unprocessed_reminder:{datetime.now().strftime('%Y-%m-%d')}"
+        if self.delivery_queue.is_known(digest_key):
             return
         
         # Получаем всех необработанных учеников
@@ -352,26 +251,9 @@ class ReminderHandler:
         
         if not unprocessed_students:
             # Отмечаем, что проверка была выполнена, даже если учеников нет
-            self.sent_unprocessed_reminders.add(today_str)
+            self.delivery_queue.mark_delivered(digest_key)
             return
         
-        # Получаем всех менеджеров и владельца
-        all_users = self.role_storage.get_all_users()
-        managers_and_owner = [
-            user for user in all_users
-            if user.get("role") in ["manager", "owner"]
-        ]
-        
-        # Добавляем владельца, если его нет в списке
-        owner_in_list = any(user.get("user_id") == OWNER_ID for user in managers_and_owner)
-        if not owner_in_list:
-            managers_and_owner.append({
-                "user_id": OWNER_ID,
-                "fio": "Владелец",
-                "username": "owner",
-                "role": "owner"
-            })
-        
         # Группируем по городам
         students_by_city = {}
         for student in unprocessed_students:
@@ -403,44 +285,39 @@ class ReminderHandler:
         
         full_message = "\n".join(message_lines)
         
-        # Отправляем уведомления
-        success_count = 0
-        for user in managers_and_owner:
-            user_id = user.get("user_id")
-            if not user_id:
-                continue
-            
-            try:
-                sent_message = await self.bot.send_message(
-                    chat_id=user_id,
-                    text=full_message,
-                    parse_mode="HTML"
-                )
-                
-                # Закрепляем сообщение
-                try:
-                    await self.bot.pin_chat_message(
-                        chat_id=user_id,
-                        message_id=sent_message.message_id
-                    )
-                except Exception as pin_error:
-                    print(f"⚠️ Не удалось закрепить сообщение для пользователя {user_id}: {pin_error}")
-                
-                success_count += 1
-                print(f"✅ Напоминание о необработанных учениках отправлено пользователю {user_id} ({user.get('fio', 'N/A')})")
-            except Exception as e:
-                print(f"❌ Ошибка отправки напоминания о необработанных учениках пользователю {user_id}: {e}")
-        
-        # Отмечаем, что напоминание отправлено
-        self.sent_unprocessed_reminders.add(today_str)
-        
-        # Очищаем старые записи (старше недели)
-        if len(self.sent_unprocessed_reminders) > 10:
-            week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-            self.sent_unprocessed_reminders = {
-                date_str for date_str in self.sent_unprocessed_reminders
-                if date_str >= week_ago
-            }
+        self._enqueue_digest(digest_key, full_message)
+    
+    async def send_risk_alerts(self):
+        """Отправляет менеджерам городов оповещения по правилам риска ухода учеников"""
+        # Оповещения формируются вместе с остальными дневными рассылками (13:00)
+        if not self.reminder_service.should_send_payment_reminder_now():
+            return
+        
+        # Проверяем, не формировали ли рассылку уже сегодня
+        digest_key = f"risk_alerts:{datetime.now().strftime('%Y-%m-%d')}"
+        if self.delivery_queue.is_known(digest_key):
+            return
+        
+        new_alerts = await run_compute(self.alert_service.evaluate)
+        
+        # Распределяем оповещения по получателям в зависимости от города
+        alerts_by_recipient = {}
+        for alert in new_alerts:
+            for user_id in self.alert_service.get_recipients(alert["city"]):
+                alerts_by_recipient.setdefault(user_id, []).append(alert)
+        
+        messages = []
+        for user_id, alerts in alerts_by_recipient.items():
+            # Делим на части, чтобы не превысить лимит сообщения Telegram
+            for part_idx, start in enumerate(range(0, len(alerts), self.ALERTS_PER_MESSAGE)):
+                messages.append({
+                    "chat_id": user_id,
+                    "text": self.alert_service.format_alerts(alerts[start:start + self.ALERTS_PER_MESSAGE]),
+                    "key": f"{digest_key}:{user_id}:{part_idx}"
+                })
+        
+        self.delivery_queue.enqueue_many(messages)
+        self.delivery_queue.mark_delivered(digest_key)
     
     async def run_reminder_loop(self):
         """Запускает цикл проверки напоминаний"""
@@ -449,6 +326,7 @@ class ReminderHandler:
                 await self.check_and_send_reminders()
                 await self.send_payment_reminder()
                 await self.send_absence_reminder()
+                await self.send_risk_alerts()
                 await self.send_unprocessed_students_reminder()
             except Exception as e:
                 print(f"❌ Ошибка в цикле напоминаний: {e}")
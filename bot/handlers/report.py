@@ -1,10 +1,12 @@
 """Обработчик отчетов"""
+import asyncio
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
 from bot.services.report_service import ReportService
-from bot.services.report_payments import generate_payments_report
+from bot.services.report_cache import get_report_cache
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
+from bot.services.short_ids import resolve_short_id
 from bot.keyboards.report_keyboards import (
     ReportTypeCallback,
     ReportCityCallback,
@@ -14,17 +16,13 @@ from bot.keyboards.report_keyboards import (
     get_groups_keyboard
 )
 from bot.config import CITY_MAPPING
-from typing import Dict
 
 router = Router()
 report_service = ReportService()
+report_cache = get_report_cache()
 role_storage = RoleStorage()
 action_logger = ActionLogger()
 
-# Временное хранилище для маппинга групп (city + idx -> group_id)
-# Очищается при получении нового списка групп
-_groups_cache: Dict[str, Dict[int, str]] = {}
-
 
 @router.message(F.text == "Отчёты")
 async def cmd_reports(message: Message, user_role: str = None):
@@ -159,7 +157,7 @@ async def process_report_type(
                 # Общий отчет по оплатам
                 try:
                     await callback.message.edit_text("⏳ Генерация общего отчета по оплатам...")
-                    summary_text, excel_path = generate_payments_report("all")
+                    summary_text, excel_path = await asyncio.to_thread(report_cache.get_payments_report, "all")
                     
                     # Отправляем текстовый отчет
                     await callback.message.edit_text(
@@ -182,7 +180,7 @@ async def process_report_type(
             elif report_type == "summary":
                 # Общий отчет - сводка
                 await callback.message.edit_text("⏳ Генерация общего отчета...")
-                all_cities_report = report_service.get_all_cities_report()
+                all_cities_report = await asyncio.to_thread(report_cache.get_all_cities_report)
                 
                 # Логируем действие
                 user_data = role_storage.get_user(callback.from_user.id)
@@ -213,7 +211,7 @@ async def process_report_type(
         if report_type == "payments":
             # Новый отчет по оплатам
             try:
-                summary_text, excel_path = generate_payments_report(city)
+                summary_text, excel_path = await asyncio.to_thread(report_cache.get_payments_report, city)
                 
                 # Отправляем текстовый отчет
                 await callback.message.edit_text(
@@ -234,7 +232,7 @@ async def process_report_type(
                 print(f"Ошибка генерации отчета по оплатам: {e}")
         else:
             # Остальные отчеты
-            report = report_service.get_city_report(city)
+            report = await asyncio.to_thread(report_cache.get_city_report, city)
             
             if report_type == "summary":
                 formatted = report_service.format_city_summary(report)
@@ -245,20 +243,12 @@ async def process_report_type(
                 )
             elif report_type == "groups_attendance":
                 # Новый формат отчета по посещаемости с кнопками групп
-                formatted, groups_list, idx_to_group_id = report_service.format_groups_attendance(report)
-                
-                # Сохраняем mapping в кэш (ключ: city_short + user_id, значение: {idx_to_group_id, full_city})
-                city_short = city[:8]  # Используем первые 8 символов для callback
-                cache_key = f"{city_short}_{callback.from_user.id}"
-                _groups_cache[cache_key] = {
-                    "idx_to_group_id": idx_to_group_id,
-                    "full_city": city
-                }
+                formatted, groups_list, _ = report_service.format_groups_attendance(report)
                 
                 await callback.message.edit_text(
                     formatted,
                     parse_mode="HTML",
-                    reply_markup=get_groups_keyboard(city_short, groups_list)
+                    reply_markup=get_groups_keyboard(city, groups_list)
                 )
             else:
                 formatted = "❌ Неизвестный тип отчета"
@@ -285,33 +275,24 @@ async def process_group_attendance(
         await callback.answer("❌ У вас нет доступа", show_alert=True)
         return
     
-    # Восстанавливаем данные из кэша
-    cache_key = f"{callback_data.city}_{callback.from_user.id}"
-    cache_data = _groups_cache.get(cache_key)
+    # Восстанавливаем город и ID группы по коротким кодам
+    city = resolve_short_id(callback_data.city)
+    group_id = resolve_short_id(callback_data.group_id)
     
-    if not cache_data:
-        await callback.answer("❌ Сессия истекла. Пожалуйста, выберите отчет заново.", show_alert=True)
-        return
-    
-    idx_to_group_id = cache_data.get("idx_to_group_id", {})
-    city = cache_data.get("full_city", callback_data.city)
-    
-    # Получаем group_id по индексу
-    group_id = idx_to_group_id.get(str(callback_data.idx))
-    
-    if not group_id:
-        await callback.answer("❌ Группа не найдена", show_alert=True)
+    if not city or not group_id:
+        await callback.answer("❌ Кнопка устарела. Пожалуйста, выберите отчет заново.", show_alert=True)
         return
     
     try:
-        formatted, report_city = report_service.get_group_detailed_attendance(city, group_id)
+        formatted, report_city = await asyncio.to_thread(
+            report_service.get_group_detailed_attendance, city, group_id
+        )
         
-        # Кнопка возврата к списку групп (используем сокращенное название для callback)
+        # Кнопка возврата к списку групп
         from bot.keyboards.report_keyboards import ReportTypeCallback
-        city_short = city[:8] if len(city) > 8 else city
         keyboard = [[InlineKeyboardButton(
             text="🔙 Назад к группам",
-            callback_data=ReportTypeCallback(report_type="groups_attendance", city=city_short).pack()
+            callback_data=ReportTypeCallback(report_type="groups_attendance", city=city).pack()
         )]]
         
         await callback.message.edit_text(
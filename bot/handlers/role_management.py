@@ -4,6 +4,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
+from bot.services.paginator import get_paginator
 from bot.keyboards.role_management_keyboards import (
     RoleManagementCallback,
     RoleDeleteCallback,
@@ -36,6 +37,13 @@ storage = RoleStorage()
 action_logger = ActionLogger()
 
 
+def _get_users() -> list:
+    """Все работники, отсортированные по ФИО (список строится один раз на версию ролей)"""
+    return get_paginator().get_results(
+        ("role_users", str(storage.file_path)), storage.get_revision(), storage.get_all_users
+    )
+
+
 @router.message(F.text == "Управление ролями")
 async def cmd_role_management(message: Message, user_role: str = None):
     """Обработчик кнопки 'Управление ролями'"""
@@ -71,7 +79,7 @@ async def process_role_management(
     
     if action == "view":
         # Показываем список работников
-        users = storage.get_all_users()
+        users = _get_users()
         
         if not users:
             await callback.message.edit_text(
@@ -106,7 +114,7 @@ async def process_role_management(
         except:
             page = 0
         
-        users = storage.get_all_users()
+        users = _get_users()
         page_size = 10
         total_pages = (len(users) + page_size - 1) // page_size
         
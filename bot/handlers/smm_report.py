@@ -1,12 +1,12 @@
 """Обработчик отчета по привлеченным ученикам для SMM"""
 from aiogram import Router, F
 from aiogram.types import Message
-from bot.services.smm_tracking_service import SMMTrackingService
+from bot.services.smm_tracking_service import get_smm_tracking
 from bot.services.role_storage import RoleStorage
 from datetime import datetime
 
 router = Router()
-smm_tracking = SMMTrackingService()
+smm_tracking = get_smm_tracking()
 role_storage = RoleStorage()
 
 
@@ -1,90 +1,98 @@
 """Обработчик просмотра посещаемости ученика"""
-import json
-from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List
 from aiogram import Router
 from aiogram.types import CallbackQuery
 from bot.keyboards.student_profile_keyboards import StudentAttendanceCallback, get_student_profile_keyboard
 from bot.services.student_search import StudentSearchService
+from bot.services.file_io import run_file_io
+from bot.services.info_read_model import get_city_read_model
+from bot.services.render_cache import render_cached
+from bot.services.short_ids import resolve_short_id
 from bot.config import CITY_MAPPING, ROOT_DIR
+from src.sync_data.student_stats import RECENT_DAYS, load_student_stats
+from src.sync_data.sqlite_mirror import DATASET_ATTENDANCE, get_mirror
 
 router = Router()
 search_service = StudentSearchService()
 
 
-def parse_date(date_str: str) -> Optional[datetime]:
-    """Парсит дату из формата дд.мм.гггг"""
-    try:
-        # Убираем пробелы
-        date_str = date_str.strip()
-        return datetime.strptime(date_str, "%d.%m.%Y")
-    except:
-        return None
+def _status_emoji(status: str) -> str:
+    """Эмодзи статуса посещаемости по тексту статуса из Notion"""
+    status_lower = status.lower() if status else ""
+    if "присутствовал" in status_lower or status == "✅":
+        return "✅"
+    if "отсутствовал" in status_lower or status == "❌":
+        return "❌"
+    return "⚪"
+
 
+def _records_from_mirror(city_name: str, student_id: str, start_iso: str, end_iso: str) -> List[Dict[str, Any]]:
+    """Отметки ученика по группам из зеркала SQLite (запрос по ученику и дате)"""
+    city_en = CITY_MAPPING.get(city_name, city_name)
+    read_model = get_city_read_model(city_name)
+    student = read_model.get_student(student_id) or {}
 
-def get_student_attendance(city_name: str, student_id: str, days: int = 30) -> Dict[str, Any]:
+    records: Dict[str, Dict[str, Any]] = {}
+    for mark in get_mirror().get_student_attendance(city_en, student_id, start_iso, end_iso):
+        group_id = mark["group_id"]
+        if group_id not in records:
+            group = read_model.get_group(group_id) or {}
+            records[group_id] = {
+                "group_name": group.get("group_name") or "Без названия",
+                "student_name": student.get("ФИО") or "Неизвестно",
+                "marks": []
+            }
+        records[group_id]["marks"].append([mark["date"], mark["date_key"], mark["status"], mark["status_text"]])
+    return list(records.values())
+
+
+def get_student_attendance(city_name: str, student_id: str, days: int = RECENT_DAYS) -> Dict[str, Any]:
     """
     Получает посещаемость ученика за последние N дней
     
+    Если посещаемость города загружена в зеркало SQLite, отметки читаются из него
+    (включая отметки, сделанные в боте после синхронизации). Иначе они берутся из
+    таблицы статистики учеников, построенной при синхронизации (хранит последние
+    RECENT_DAYS дней).
+    
     Args:
         city_name: Название города (русское)
         student_id: ID ученика
-        days: Количество дней для просмотра (по умолчанию 30)
+        days: Количество дней для просмотра (по умолчанию 30, не больше RECENT_DAYS)
     
     Returns:
         Словарь с данными посещаемости
     """
     city_en = CITY_MAPPING.get(city_name, city_name)
-    attendance_path = ROOT_DIR / f"data/{city_en}/attendance.json"
-    
-    if not attendance_path.exists():
-        return {
-            "found": False,
-            "message": "❌ Файл посещаемости не найден"
-        }
     
     try:
-        with open(attendance_path, "r", encoding="utf-8") as f:
-            attendance_data = json.load(f)
-        
         # Вычисляем дату начала периода
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
-        
-        # Ищем ученика во всех группах
-        student_records = []
-        
-        for group_id, group_info in attendance_data.items():
-            attendance_records = group_info.get("attendance", [])
-            date_fields = group_info.get("fields", [])[2:]  # Пропускаем № и ФИО
+        start_iso = (end_date.date() - timedelta(days=days - 1)).isoformat()
+        
+        mirror = get_mirror()
+        if mirror and mirror.has_city(city_en, DATASET_ATTENDANCE):
+            student_records = _records_from_mirror(city_name, student_id, start_iso, end_date.date().isoformat())
+        else:
+            stats_table = load_student_stats(ROOT_DIR / f"data/{city_en}")
+            if not stats_table.groups:
+                return {
+                    "found": False,
+                    "message": "❌ Файл посещаемости не найден"
+                }
             
-            for record in attendance_records:
-                record_student_id = record.get("student_id", "")
-                # Проверяем полное совпадение ID (без учета дефисов)
-                record_id_no_dashes = record_student_id.replace("-", "")
-                student_id_no_dashes = student_id.replace("-", "")
-                
-                if record_id_no_dashes == student_id_no_dashes:
-                    att_data = record.get("attendance", {})
-                    student_name = record.get("ФИО", "Неизвестно")
-                    
-                    # Фильтруем даты за последний месяц
-                    filtered_attendance = {}
-                    for date_str, status in att_data.items():
-                        if not date_str or not date_str.strip():
-                            continue
-                        
-                        date_obj = parse_date(date_str)
-                        if date_obj and start_date <= date_obj <= end_date:
-                            filtered_attendance[date_str] = status
-                    
-                    if filtered_attendance:
-                        student_records.append({
-                            "group_name": group_info.get("group_name", "Без названия"),
-                            "student_name": student_name,
-                            "attendance": filtered_attendance
-                        })
+            # Ученик во всех группах
+            student_records = []
+            for group_id, row in stats_table.find_student(student_id):
+                marks = [mark for mark in row.get("recent", []) if mark[0] >= start_iso]
+                if marks:
+                    student_records.append({
+                        "group_name": stats_table.get_group(group_id).get("group_name") or "Без названия",
+                        "student_name": row.get("ФИО") or "Неизвестно",
+                        "marks": marks
+                    })
         
         if not student_records:
             return {
@@ -126,13 +134,12 @@ def format_attendance_message(attendance_data: Dict[str, Any]) -> str:
     absent_days = 0
     
     for record in records:
-        attendance = record.get("attendance", {})
-        for date_str, status in attendance.items():
+        for mark in record.get("marks", []):
             total_days += 1
-            status_lower = status.lower() if status else ""
-            if "присутствовал" in status_lower or status == "✅":
+            status_emoji = _status_emoji(mark[3] if len(mark) > 3 else "")
+            if status_emoji == "✅":
                 present_days += 1
-            elif "отсутствовал" in status_lower or status == "❌":
+            elif status_emoji == "❌":
                 absent_days += 1
     
     if total_days > 0:
@@ -142,63 +149,38 @@ def format_attendance_message(attendance_data: Dict[str, Any]) -> str:
         lines.append(f"❌ Отсутствовал: {absent_days}")
         lines.append(f"📅 Всего занятий: {total_days}\n")
     
+    # Словарь для перевода месяцев
+    month_names_ru = {
+        1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
+        5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
+        9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
+    }
+    
     # Детальная информация по группам
     for record in records:
         group_name = record.get("group_name", "Без названия")
         student_name = record.get("student_name", "Неизвестно")
-        attendance = record.get("attendance", {})
+        marks = record.get("marks", [])
         
         lines.append(f"\n🏫 <b>{group_name}</b>")
         lines.append(f"👤 {student_name}\n")
         
-        # Сортируем даты
-        sorted_dates = sorted(
-            attendance.items(),
-            key=lambda x: parse_date(x[0]) or datetime.min,
-            reverse=True
-        )
-        
-        if not sorted_dates:
+        if not marks:
             lines.append("   Нет данных за этот период")
             continue
         
-        # Группируем по месяцам
+        # Даты в ISO формате: месяц - первые 7 символов, новые отметки сверху
         current_month = None
-        month_lines = []
-        
-        # Словарь для перевода месяцев
-        month_names_ru = {
-            1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
-            5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
-            9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
-        }
-        
-        for date_str, status in sorted_dates:
-            date_obj = parse_date(date_str)
-            if date_obj:
-                month_key = date_obj.strftime("%Y-%m")
-                month_name_ru = month_names_ru.get(date_obj.month, date_obj.strftime("%B"))
-                month_name = f"{month_name_ru} {date_obj.year}"
-                
-                if month_key != current_month:
-                    if month_lines:
-                        lines.extend(month_lines)
-                        month_lines = []
-                    month_lines.append(f"\n   📅 <b>{month_name}</b>")
-                    current_month = month_key
-                
-                # Форматируем статус
-                status_lower = status.lower() if status else ""
-                if "присутствовал" in status_lower or status == "✅":
-                    status_emoji = "✅"
-                elif "отсутствовал" in status_lower or status == "❌":
-                    status_emoji = "❌"
-                else:
-                    status_emoji = "⚪"
-                month_lines.append(f"   {status_emoji} {date_str}: {status if status else 'Не указано'}")
-        
-        if month_lines:
-            lines.extend(month_lines)
+        for mark in reversed(marks):
+            date_iso, date_key = mark[0], mark[1]
+            status = mark[3] if len(mark) > 3 else ""
+            month_key = date_iso[:7]
+            if month_key != current_month:
+                year, month = month_key.split("-")
+                lines.append(f"\n   📅 <b>{month_names_ru[int(month)]} {year}</b>")
+                current_month = month_key
+            
+            lines.append(f"   {_status_emoji(status)} {date_key}: {status if status else 'Не указано'}")
     
     return "\n".join(lines)
 
@@ -214,49 +196,24 @@ async def handle_student_attendance(
         await callback.answer("❌ У вас нет доступа", show_alert=True)
         return
     
-    student_id_short = callback_data.student_id
-    city_en = callback_data.city_en
-    
-    # Преобразуем английское название обратно в русское
-    city_name = None
-    for ru_name, en_name in CITY_MAPPING.items():
-        if en_name == city_en or en_name.startswith(city_en):
-            city_name = ru_name
-            break
+    # Восстанавливаем полный ID ученика и город по коротким кодам
+    student_id = resolve_short_id(callback_data.student_id)
+    city_name = resolve_short_id(callback_data.city)
     
-    if not city_name:
-        city_name = city_en  # Fallback
+    if not student_id or not city_name:
+        await callback.answer("❌ Кнопка устарела, откройте профиль ученика заново", show_alert=True)
+        return
     
-    # Получаем полный ID ученика
     try:
-        students_data = search_service._load_city_students(city_name)
-        
-        student_id = None
-        group_id = None
-        student_data = None
-        
-        for group_id_key, group_data in students_data.items():
-            for student in group_data.get("students", []):
-                student_id_from_data = student.get("ID", "")
-                student_id_no_dashes = student_id_from_data.replace("-", "")
-                # Проверяем, начинается ли ID с сокращенного значения
-                if student_id_no_dashes.startswith(student_id_short):
-                    student_id = student_id_from_data
-                    group_id = group_id_key
-                    student_data = student.copy()
-                    student_data["group_name"] = group_data.get("group_name", "")
-                    student_data["group_id"] = group_id
-                    break
-            if student_id:
-                break
-        
-        if not student_id:
+        if not await run_file_io(search_service.get_student_by_id, city_name, student_id):
             await callback.answer("❌ Ученик не найден", show_alert=True)
             return
         
         # Получаем посещаемость
-        attendance_data = get_student_attendance(city_name, student_id, days=30)
-        attendance_message = format_attendance_message(attendance_data)
+        attendance_message = await run_file_io(
+            render_cached, "attendance", city_name, student_id,
+            lambda: format_attendance_message(get_student_attendance(city_name, student_id, days=30))
+        )
         
         # Показываем посещаемость
         await callback.message.answer(
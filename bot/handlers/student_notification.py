@@ -5,18 +5,15 @@ from aiogram.types import CallbackQuery
 from bot.keyboards.student_notification_keyboards import StudentProcessedCallback
 from bot.config import BOT_TOKEN, OWNER_ID
 from bot.services.role_storage import RoleStorage
-from bot.services.unprocessed_students_storage import UnprocessedStudentsStorage
+from bot.services.unprocessed_students_storage import get_unprocessed_storage
 from bot.services.action_logger import ActionLogger
 from datetime import datetime
 
 router = Router()
 role_storage = RoleStorage()
-unprocessed_storage = UnprocessedStudentsStorage()
+unprocessed_storage = get_unprocessed_storage()
 action_logger = ActionLogger()
 
-# Импортируем хранилище уведомлений из add_student
-from bot.handlers.add_student import notification_storage
-
 
 @router.callback_query(StudentProcessedCallback.filter())
 async def process_student_notification(
@@ -27,12 +24,11 @@ async def process_student_notification(
     short_id = callback_data.notif
     processed_by_user = callback.from_user
 
-    if short_id not in notification_storage:
+    info = unprocessed_storage.get_unprocessed_by_notification_id(short_id)
+    if not info:
         await callback.answer("❌ Уведомление не найдено", show_alert=True)
         return
 
-    info = notification_storage[short_id]
-
     student_data = info["student_data"]
     group_name = info["group_name"]
     city_name = info["city_name"]
@@ -93,9 +89,6 @@ async def process_student_notification(
             except:
                 pass
 
-        # Удаляем уведомление из памяти
-        del notification_storage[short_id]
-        
         # Удаляем из необработанных учеников
         unprocessed_storage.remove_unprocessed_student(short_id)
         
@@ -6,6 +6,8 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from bot.services.student_search import StudentSearchService
 from bot.config import CITIES, CITY_MAPPING
+from bot.services.render_cache import render_cached
+from bot.services.file_io import run_file_io
 from bot.services.role_storage import RoleStorage
 
 router = Router()
@@ -143,7 +145,7 @@ async def handle_search(message: Message, state: FSMContext, user_role: str = No
         
         # Выполняем поиск по всем городам (или только по городу преподавателя)
         try:
-            results = search_service.search_all_cities(query, user_city=user_city)
+            results = await run_file_io(search_service.search_all_cities, query, user_city=user_city)
             
             if not results:
                 if user_role == "teacher":
@@ -158,7 +160,10 @@ async def handle_search(message: Message, state: FSMContext, user_role: str = No
                 # Если найден один ученик - показываем профиль с кнопками
                 if len(results) == 1:
                     student = results[0]
-                    formatted = format_full_info(student)
+                    formatted = render_cached(
+                        "search_card", student.get("Город", ""), student.get("ID", ""),
+                        lambda: format_full_info(student)
+                    )
                     from bot.keyboards.student_profile_keyboards import get_student_profile_keyboard
                     student_id = student.get("ID", "")
                     city = student.get("Город", "")
@@ -201,14 +206,14 @@ async def handle_search(message: Message, state: FSMContext, user_role: str = No
     
     # Выполняем поиск
     try:
-        result_type, data = search_service.search(city_name, query)
+        result_type, data = await run_file_io(search_service.search, city_name, query)
         
         if result_type == "not_found":
             await message.answer(
                 f"❌ Ученик не найден в городе '{city_name}' по запросу: {query}"
             )
         elif result_type == "full_info":
-            formatted = format_full_info(data)
+            formatted = render_cached("search_card", city_name, data.get("ID", ""), lambda: format_full_info(data))
             # Добавляем кнопки Оплата и Удалить
             from bot.keyboards.student_profile_keyboards import get_student_profile_keyboard
             student_id = data.get("ID", "")
@@ -21,6 +21,7 @@ from src.sync_data.students import NotionStudentsFetcher
 from src.sync_data.attendance import NotionAttendanceFetcher
 from src.sync_data.payments import NotionPaymentsFetcher
 from src.sync_data.full_sync import full_city_sync, full_all_cities_sync
+from bot.services.render_cache import get_render_cache
 from src.config import CITIES as NOTION_CITIES  # Английские названия для Notion
 from bot.services.role_storage import RoleStorage
 from bot.services.action_logger import ActionLogger
@@ -205,6 +206,9 @@ async def process_sync_type(
         elif sync_type == "main_info":
             success = await sync_main_info(city_en)
     
+    # Сообщения, отрисованные по старым данным города, больше не нужны
+    get_render_cache().invalidate_city(city)
+    
     if success:
         # Логируем действие
         user_data = role_storage.get_user(callback.from_user.id)
@@ -237,6 +241,7 @@ async def sync_all_cities_task(message: Message):
     """Задача для синхронизации всех городов"""
     try:
         await full_all_cities_sync()
+        get_render_cache().invalidate_all()
         await message.answer("✅ Полная синхронизация всех городов завершена успешно!")
     except Exception as e:
         await message.answer(
@@ -1,4 +1,5 @@
 """Обработчик команды для тестирования напоминаний об отсутствиях"""
+from datetime import datetime
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
@@ -51,8 +52,8 @@ async def test_absence_command(message: Message, bot):
         
         await message.answer(info_text, parse_mode="HTML")
         
-        # Очищаем set отправленных уведомлений, чтобы можно было отправить сейчас
-        reminder_handler.sent_absence_reminders.clear()
+        # Сбрасываем отметку о сегодняшней рассылке, чтобы можно было отправить сейчас
+        reminder_handler.delivery_queue.forget(f"absence_reminder:{datetime.now().strftime('%Y-%m-%d')}")
         
         # Отправляем уведомления
         await reminder_handler.send_absence_reminder()
@@ -248,9 +249,6 @@ async def test_attendance_reminder_command(message: Message, bot):
         
         await message.answer(info_text, parse_mode="HTML")
         
-        # Очищаем set отправленных напоминаний, чтобы можно было отправить сейчас
-        reminder_handler.sent_reminders.clear()
-        
         # Отправляем напоминания
         success_count = 0
         for group_info in groups_needing_reminder:
@@ -15,6 +15,13 @@ class ActionHistoryFilterCallback(CallbackData, prefix="action_filter"):
     filter_value: str
 
 
+class ActionHistoryPageCallback(CallbackData, prefix="action_page"):
+    """Callback для листания истории действий"""
+    filter_type: str  # all, action_type, user_id, city
+    filter_value: str
+    page: int
+
+
 def get_action_history_keyboard() -> InlineKeyboardMarkup:
     """Главная клавиатура истории действий"""
     keyboard = [
@@ -38,6 +45,35 @@ def get_action_history_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def get_action_history_page_keyboard(
+    filter_type: str,
+    filter_value: str,
+    page: int,
+    total_pages: int
+) -> InlineKeyboardMarkup:
+    """Клавиатура страницы истории: листание и главное меню истории"""
+    keyboard = []
+    if total_pages > 1:
+        nav_row = []
+        if page > 0:
+            nav_row.append(InlineKeyboardButton(
+                text="◀️ Новее",
+                callback_data=ActionHistoryPageCallback(
+                    filter_type=filter_type, filter_value=filter_value, page=page - 1
+                ).pack()
+            ))
+        if page < total_pages - 1:
+            nav_row.append(InlineKeyboardButton(
+                text="Старее ▶️",
+                callback_data=ActionHistoryPageCallback(
+                    filter_type=filter_type, filter_value=filter_value, page=page + 1
+                ).pack()
+            ))
+        keyboard.append(nav_row)
+    keyboard.extend(get_action_history_keyboard().inline_keyboard)
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def get_action_history_filter_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура фильтров истории"""
     keyboard = [
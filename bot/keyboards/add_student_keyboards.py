@@ -2,6 +2,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
 from bot.config import CITIES
+from bot.services.short_ids import short_id
 
 
 class CitySelectCallback(CallbackData, prefix="city_select"):
@@ -11,7 +12,7 @@ class CitySelectCallback(CallbackData, prefix="city_select"):
 
 class GroupSelectCallback(CallbackData, prefix="group_select"):
     """Callback для выбора группы при добавлении ученика"""
-    group_id: str
+    group_id: str  # Короткий код ID группы
 
 
 class CancelCallback(CallbackData, prefix="cancel_add"):
@@ -58,7 +59,7 @@ def get_groups_keyboard(groups: list[dict]) -> InlineKeyboardMarkup:
         
         keyboard.append([InlineKeyboardButton(
             text=button_text,
-            callback_data=GroupSelectCallback(group_id=group_id).pack()
+            callback_data=GroupSelectCallback(group_id=short_id(group_id)).pack()
         )])
     
     # Добавляем кнопку отмены
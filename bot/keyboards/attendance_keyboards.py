@@ -2,6 +2,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
 from bot.config import CITIES
+from bot.services.short_ids import short_id
 from typing import List, Dict
 
 
@@ -12,12 +13,12 @@ class AttendanceCityCallback(CallbackData, prefix="att_city"):
 
 class AttendanceGroupCallback(CallbackData, prefix="att_group"):
     """Callback для выбора группы при отметке посещаемости"""
-    group_id: str
+    group_id: str  # Короткий код ID группы
 
 
 class AttendanceStudentCallback(CallbackData, prefix="att_student"):
     """Callback для изменения статуса ученика"""
-    student_id: str
+    student_id: str  # Короткий код ID ученика
 
 
 class AttendanceConfirmCallback(CallbackData, prefix="att_confirm"):
@@ -59,7 +60,7 @@ def get_attendance_groups_keyboard(groups: List[Dict], show_back: bool = False)
         
         keyboard.append([InlineKeyboardButton(
             text=group_name,
-            callback_data=AttendanceGroupCallback(group_id=group_id).pack()
+            callback_data=AttendanceGroupCallback(group_id=short_id(group_id)).pack()
         )])
     
     # Добавляем кнопку "Назад" если нужно
@@ -104,7 +105,7 @@ def get_students_keyboard(students: List[Dict], attendance_statuses: Dict[str, i
         
         keyboard.append([InlineKeyboardButton(
             text=button_text,
-            callback_data=AttendanceStudentCallback(student_id=student_id).pack()
+            callback_data=AttendanceStudentCallback(student_id=short_id(student_id)).pack()
         )])
     
     # Кнопки подтверждения и отмены
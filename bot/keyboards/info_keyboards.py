@@ -2,21 +2,12 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
 from typing import List, Dict
+from bot.services.short_ids import short_id
+from bot.services.paginator import Page
 
 
-def _get_city_en_short(city: str) -> str:
-    """Вспомогательная функция для получения сокращенного английского названия города"""
-    from bot.config import CITY_MAPPING
-    
-    # Получаем английское название из маппинга
-    city_en_full = CITY_MAPPING.get(city, "")
-    if not city_en_full:
-        # Если не нашли в маппинге, пробуем использовать city как есть (если это уже английское)
-        # Проверяем, что это не русские символы
-        city_en_full = city if city and not any(ord(c) > 127 for c in city) else ""
-    
-    # Сокращаем до 6 символов для экономии места в callback_data
-    return city_en_full[:6] if city_en_full else ""
+# Учеников на одной странице списка группы (Telegram ограничивает число кнопок)
+STUDENTS_PAGE_SIZE = 20
 
 
 class InfoMenuCallback(CallbackData, prefix="info_menu"):
@@ -32,33 +23,34 @@ class CityInfoCallback(CallbackData, prefix="city_info"):
 class InfoActionCallback(CallbackData, prefix="ia"):
     """Callback для действий в информации (информация, группы)"""
     action: str  # "info" или "groups"
-    city_en: str  # Английское название города (сокращенное до 6 символов)
+    city: str  # Короткий код названия города
 
 
 class GroupInfoCallback(CallbackData, prefix="gi"):
     """Callback для выбора группы"""
-    group_id: str  # Сокращенный ID (первые 16 символов без дефисов)
-    city_en: str  # Английское название города (сокращенное до 6 символов)
+    group_id: str  # Короткий код ID группы
+    city: str  # Короткий код названия города
 
 
 class GroupStudentsCallback(CallbackData, prefix="gs"):
     """Callback для просмотра учеников группы"""
-    group_id: str  # Сокращенный ID (первые 16 символов без дефисов)
-    city_en: str  # Английское название города (сокращенное до 6 символов)
+    group_id: str  # Короткий код ID группы
+    city: str  # Короткий код названия города
+    page: int = 0  # Страница списка учеников
 
 
 class StudentSelectCallback(CallbackData, prefix="ss"):
     """Callback для выбора ученика из группы"""
-    student_id: str  # Сокращенный ID (первые 16 символов без дефисов)
-    city_en: str  # Английское название города (сокращенное до 6 символов)
-    group_id: str  # Сокращенный ID (первые 16 символов без дефисов)
+    student_id: str  # Короткий код ID ученика
+    city: str  # Короткий код названия города
+    group_id: str  # Короткий код ID группы
 
 
 class BackCallback(CallbackData, prefix="back"):
     """Callback для кнопки Назад"""
     level: str  # "main", "city", "groups", "group", "students"
-    city_en: str = ""  # Английское название города (сокращенное до 6 символов)
-    group_id: str = ""  # Сокращенный ID (первые 16 символов без дефисов)
+    city: str = ""  # Короткий код названия города
+    group_id: str = ""  # Короткий код ID группы
 
 
 def get_info_cities_keyboard(cities: List[str]) -> InlineKeyboardMarkup:
@@ -76,18 +68,18 @@ def get_info_cities_keyboard(cities: List[str]) -> InlineKeyboardMarkup:
 
 def get_info_menu_keyboard(city: str) -> InlineKeyboardMarkup:
     """Клавиатура главного меню информации для города"""
-    # Сокращаем данные для callback
-    city_en = _get_city_en_short(city)
+    # Короткие коды для callback
+    city_code = short_id(city)
     
     keyboard = [
         [
             InlineKeyboardButton(
                 text="📋 Информация",
-                callback_data=InfoActionCallback(action="info", city_en=city_en).pack()
+                callback_data=InfoActionCallback(action="info", city=city_code).pack()
             ),
             InlineKeyboardButton(
                 text="👥 Группы",
-                callback_data=InfoActionCallback(action="groups", city_en=city_en).pack()
+                callback_data=InfoActionCallback(action="groups", city=city_code).pack()
             )
         ],
         [
@@ -102,27 +94,24 @@ def get_info_menu_keyboard(city: str) -> InlineKeyboardMarkup:
 
 def get_groups_list_keyboard(groups: List[Dict], city: str) -> InlineKeyboardMarkup:
     """Клавиатура со списком групп"""
-    # Сокращаем данные для callback
-    city_en = _get_city_en_short(city)
+    # Короткие коды для callback
+    city_code = short_id(city)
     
     keyboard = []
     for group in groups:
         group_name = group.get("group_name", "Без названия")
-        group_id_full = group.get("group_id", "")
-        # Сокращаем group_id до 16 символов без дефисов
-        group_id_short = group_id_full.replace("-", "")[:16] if group_id_full else ""
         
         keyboard.append([
             InlineKeyboardButton(
                 text=group_name,
-                callback_data=GroupInfoCallback(group_id=group_id_short, city_en=city_en).pack()
+                callback_data=GroupInfoCallback(group_id=short_id(group.get("group_id", "")), city=city_code).pack()
             )
         ])
     
     keyboard.append([
         InlineKeyboardButton(
             text="◀️ Назад",
-            callback_data=BackCallback(level="city", city_en=city_en).pack()
+            callback_data=BackCallback(level="city", city=city_code).pack()
         )
     ])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -130,15 +119,15 @@ def get_groups_list_keyboard(groups: List[Dict], city: str) -> InlineKeyboardMar
 
 def get_group_info_keyboard(group_id: str, city: str) -> InlineKeyboardMarkup:
     """Клавиатура для информации о группе"""
-    # Сокращаем данные для callback
-    city_en = _get_city_en_short(city)
-    group_id_short = group_id.replace("-", "")[:16] if group_id else ""
+    # Короткие коды для callback
+    city_code = short_id(city)
+    group_code = short_id(group_id)
     
     keyboard = [
         [
             InlineKeyboardButton(
                 text="👥 Ученики",
-                callback_data=GroupStudentsCallback(group_id=group_id_short, city_en=city_en).pack()
+                callback_data=GroupStudentsCallback(group_id=group_code, city=city_code).pack()
             ),
             InlineKeyboardButton(
                 text="📜 Сформировать сертификаты",
@@ -148,30 +137,29 @@ def get_group_info_keyboard(group_id: str, city: str) -> InlineKeyboardMarkup:
         [
             InlineKeyboardButton(
                 text="◀️ Назад",
-                callback_data=BackCallback(level="groups", city_en=city_en).pack()
+                callback_data=BackCallback(level="groups", city=city_code).pack()
             )
         ]
     ]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def get_students_list_keyboard(students: List[Dict], group_id: str, city: str) -> InlineKeyboardMarkup:
-    """Клавиатура со списком учеников группы"""
-    # Сокращаем данные для callback
-    city_en = _get_city_en_short(city)
-    group_id_short = group_id.replace("-", "")[:16] if group_id else ""
-    
-    # Отладочная информация
-    print(f"🔘 Создаю клавиатуру учеников: group_id_full={group_id}, group_id_short={group_id_short}, students_count={len(students)}")
+def get_students_list_keyboard(
+    students_page: Page,
+    group_id: str,
+    city: str
+) -> InlineKeyboardMarkup:
+    """Клавиатура со страницей списка учеников группы"""
+    # Короткие коды для callback
+    city_code = short_id(city)
+    group_code = short_id(group_id)
     
     keyboard = []
-    for student in students:
+    for student in students_page.items:
         student_name = student.get("ФИО", "Без имени")
-        student_id_full = student.get("ID", "")
-        # Сокращаем ID до 16 символов без дефисов
-        student_id_short = student_id_full.replace("-", "")[:16] if student_id_full else ""
+        student_code = short_id(student.get("ID", ""))
         
-        if not student_id_short:
+        if not student_code:
             print(f"⚠️ Ученик {student_name} не имеет ID для создания кнопки")
             continue
         
@@ -179,24 +167,36 @@ def get_students_list_keyboard(students: List[Dict], group_id: str, city: str) -
         if len(student_name) > 30:
             student_name = student_name[:27] + "..."
         
-        # Отладочная информация
-        print(f"🔘 Создаю кнопку для ученика: {student_name[:30]}, ID_full={student_id_full}, ID_short={student_id_short}, group_id_short={group_id_short}")
-        
         keyboard.append([
             InlineKeyboardButton(
                 text=student_name,
                 callback_data=StudentSelectCallback(
-                    student_id=student_id_short,
-                    city_en=city_en,
-                    group_id=group_id_short
+                    student_id=student_code,
+                    city=city_code,
+                    group_id=group_code
                 ).pack()
             )
         ])
     
+    # Кнопки пагинации
+    nav_buttons = []
+    if students_page.has_prev:
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️",
+            callback_data=GroupStudentsCallback(group_id=group_code, city=city_code, page=students_page.page - 1).pack()
+        ))
+    if students_page.has_next:
+        nav_buttons.append(InlineKeyboardButton(
+            text="➡️",
+            callback_data=GroupStudentsCallback(group_id=group_code, city=city_code, page=students_page.page + 1).pack()
+        ))
+    if nav_buttons:
+        keyboard.append(nav_buttons)
+    
     keyboard.append([
         InlineKeyboardButton(
             text="◀️ Назад",
-            callback_data=BackCallback(level="group", city_en=city_en, group_id=group_id_short).pack()
+            callback_data=BackCallback(level="group", city=city_code, group_id=group_code).pack()
         )
     ])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -204,13 +204,13 @@ def get_students_list_keyboard(students: List[Dict], group_id: str, city: str) -
 
 def get_back_to_info_keyboard(city: str) -> InlineKeyboardMarkup:
     """Клавиатура только с кнопкой Назад к информации"""
-    # Получаем английское название и сокращаем до 6 символов
-    city_en = _get_city_en_short(city)
+    # Короткий код города для callback
+    city_code = short_id(city)
     
     keyboard = [[
         InlineKeyboardButton(
             text="◀️ Назад",
-            callback_data=BackCallback(level="city", city_en=city_en).pack()
+            callback_data=BackCallback(level="city", city=city_code).pack()
         )
     ]]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
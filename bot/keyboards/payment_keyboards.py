@@ -2,6 +2,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
 from bot.config import CITIES
+from bot.services.short_ids import short_id
 from typing import List, Dict
 
 
@@ -22,7 +23,7 @@ class PaymentCityCallback(CallbackData, prefix="pay_city"):
 
 class PaymentStudentCallback(CallbackData, prefix="pay_student"):
     """Callback для выбора ученика"""
-    student_id: str
+    student_id: str  # Короткий код ID ученика
 
 
 class PaymentPaginationCallback(CallbackData, prefix="pay_page"):
@@ -122,7 +123,7 @@ def get_payment_students_keyboard(
         
         keyboard.append([InlineKeyboardButton(
             text=button_text,
-            callback_data=PaymentStudentCallback(student_id=student_id).pack()
+            callback_data=PaymentStudentCallback(student_id=short_id(student_id)).pack()
         )])
     
     # Кнопки пагинации
@@ -10,6 +10,12 @@ class PaymentReminderCategoryCallback(CallbackData, prefix="pmt_rem_cat"):
     message_id: int
 
 
+class PaymentReminderPageCallback(CallbackData, prefix="pmt_rem_page"):
+    """Callback для переключения страницы категории напоминаний о платежах"""
+    category: int
+    page: int  # Номер страницы (начинается с 0)
+
+
 class PaymentReminderRefreshCallback(CallbackData, prefix="pmt_rem_refresh"):
     """Callback для обновления отчета о платежах"""
     message_id: int
@@ -18,7 +24,9 @@ class PaymentReminderRefreshCallback(CallbackData, prefix="pmt_rem_refresh"):
 def get_payment_reminder_keyboard(
     current_category: int,
     available_categories: List[int],
-    message_id: int
+    message_id: int,
+    page: int = 0,
+    total_pages: int = 1
 ) -> InlineKeyboardMarkup:
     """
     Клавиатура для навигации по категориям напоминаний о платежах
@@ -27,6 +35,8 @@ def get_payment_reminder_keyboard(
         current_category: Текущая категория (0-3)
         available_categories: Список доступных категорий с учениками
         message_id: ID сообщения для обновления
+        page: Текущая страница категории
+        total_pages: Всего страниц в категории
     """
     keyboard = []
     
@@ -80,6 +90,29 @@ def get_payment_reminder_keyboard(
     if category_row_2:
         keyboard.append(category_row_2)
     
+    # Кнопки пагинации внутри категории
+    pagination_row = []
+    if page > 0:
+        pagination_row.append(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=PaymentReminderPageCallback(
+                category=current_category,
+                page=page - 1
+            ).pack()
+        ))
+    
+    if page < total_pages - 1:
+        pagination_row.append(InlineKeyboardButton(
+            text="Вперед ▶️",
+            callback_data=PaymentReminderPageCallback(
+                category=current_category,
+                page=page + 1
+            ).pack()
+        ))
+    
+    if pagination_row:
+        keyboard.append(pagination_row)
+    
     # Кнопка обновления
     keyboard.append([InlineKeyboardButton(
         text="🔄 Обновить",
@@ -2,6 +2,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
 from bot.config import CITIES
+from bot.services.short_ids import short_id
 
 
 class ReportTypeCallback(CallbackData, prefix="report_type"):
@@ -23,8 +24,8 @@ class PaymentsPaginationCallback(CallbackData, prefix="payments_page"):
 
 class GroupAttendanceCallback(CallbackData, prefix="grp_att"):
     """Callback для выбора группы для детального отчета по посещаемости"""
-    city: str  # Название города (сокращенное)
-    idx: int  # Индекс группы в списке
+    city: str  # Короткий код названия города
+    group_id: str  # Короткий код ID группы
 
 
 def get_report_city_keyboard() -> InlineKeyboardMarkup:
@@ -77,9 +78,10 @@ def get_report_keyboard(city: str = "", is_owner: bool = False) -> InlineKeyboar
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def get_groups_keyboard(city_short: str, groups: list) -> InlineKeyboardMarkup:
+def get_groups_keyboard(city: str, groups: list) -> InlineKeyboardMarkup:
     """Клавиатура для выбора группы в отчете по посещаемости"""
     keyboard = []
+    city_code = short_id(city)
     
     # Создаем кнопки по 2 в ряд
     for i in range(0, len(groups), 2):
@@ -87,20 +89,20 @@ def get_groups_keyboard(city_short: str, groups: list) -> InlineKeyboardMarkup:
         group1 = groups[i]
         row.append(InlineKeyboardButton(
             text=group1["group_name"],
-            callback_data=GroupAttendanceCallback(city=city_short, idx=i).pack()
+            callback_data=GroupAttendanceCallback(city=city_code, group_id=short_id(group1["group_id"])).pack()
         ))
         if i + 1 < len(groups):
             group2 = groups[i + 1]
             row.append(InlineKeyboardButton(
                 text=group2["group_name"],
-                callback_data=GroupAttendanceCallback(city=city_short, idx=i + 1).pack()
+                callback_data=GroupAttendanceCallback(city=city_code, group_id=short_id(group2["group_id"])).pack()
             ))
         keyboard.append(row)
     
-    # Кнопка возврата к отчетам (используем полное название из кэша)
+    # Кнопка возврата к отчетам
     keyboard.append([InlineKeyboardButton(
         text="🔙 Назад к отчетам",
-        callback_data=ReportTypeCallback(report_type="back_to_menu", city=city_short).pack()
+        callback_data=ReportTypeCallback(report_type="back_to_menu", city=city).pack()
     )])
     
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -1,19 +1,20 @@
 """Клавиатуры для профиля ученика"""
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
+from bot.services.short_ids import short_id
 
 
 class StudentPaymentCallback(CallbackData, prefix="sp"):
     """Callback для оплаты ученика из профиля"""
-    student_id: str
-    city_en: str  # Используем английское название города для экономии места
+    student_id: str  # Короткий код ID ученика
+    city: str  # Короткий код названия города
 
 
 class StudentDeleteCallback(CallbackData, prefix="sd"):
     """Callback для удаления ученика из профиля"""
-    student_id: str
-    city_en: str  # Используем английское название города для экономии места
-    group_id: str = ""
+    student_id: str  # Короткий код ID ученика
+    city: str  # Короткий код названия города
+    group_id: str = ""  # Короткий код ID группы
 
 
 class CancelDeleteCallback(CallbackData, prefix="cancel_delete"):
@@ -23,14 +24,14 @@ class CancelDeleteCallback(CallbackData, prefix="cancel_delete"):
 
 class StudentAttendanceCallback(CallbackData, prefix="sa"):
     """Callback для просмотра посещаемости ученика"""
-    student_id: str
-    city_en: str
+    student_id: str  # Короткий код ID ученика
+    city: str  # Короткий код названия города
 
 
 class BackToStudentsCallback(CallbackData, prefix="bts"):
     """Callback для возврата к списку учеников группы"""
-    group_id: str  # Сокращенный ID группы (первые 16 символов)
-    city_en: str  # Английское название города (сокращенное до 6 символов)
+    group_id: str  # Короткий код ID группы
+    city: str  # Короткий код названия города
 
 
 def get_student_profile_keyboard(student_id: str, city: str, group_id: str = "", show_back: bool = False, user_role: str = None) -> InlineKeyboardMarkup:
@@ -55,44 +56,37 @@ def get_student_profile_keyboard(student_id: str, city: str, group_id: str = "",
         keyboard = []
         # Если есть кнопка "Назад", все равно показываем её
         if show_back and group_id:
-            from bot.config import CITY_MAPPING
-            city_en = CITY_MAPPING.get(city, city)[:6]
-            group_id_short = group_id.replace("-", "")[:16] if group_id else ""
             keyboard.append([
                 InlineKeyboardButton(
                     text="◀️ Назад",
-                    callback_data=BackToStudentsCallback(group_id=group_id_short, city_en=city_en).pack()
+                    callback_data=BackToStudentsCallback(group_id=short_id(group_id), city=short_id(city)).pack()
                 )
             ])
         return InlineKeyboardMarkup(inline_keyboard=keyboard) if keyboard else None
     
-    from bot.config import CITY_MAPPING
-    # Используем английское название города для callback_data, сокращаем до 6 символов
-    city_en = CITY_MAPPING.get(city, city)[:6]
-    
-    # Убираем дефисы из UUID и сокращаем до 16 символов для экономии места
-    # Первые 16 символов UUID обычно достаточно уникальны
-    student_id_short = student_id.replace("-", "")[:16] if student_id else ""
-    group_id_short = group_id.replace("-", "")[:16] if group_id else ""
+    # Короткие коды вместо UUID и названия города (ограничение callback_data - 64 байта)
+    city_code = short_id(city)
+    student_code = short_id(student_id)
+    group_code = short_id(group_id)
     
     keyboard = []
     
     # Кнопка "Оплата" - доступна для owner, manager, teacher
     payment_button = InlineKeyboardButton(
         text="💰 Оплата",
-        callback_data=StudentPaymentCallback(student_id=student_id_short, city_en=city_en).pack()
+        callback_data=StudentPaymentCallback(student_id=student_code, city=city_code).pack()
     )
     
     # Кнопка "Удалить" - только для owner и manager
     delete_button = InlineKeyboardButton(
         text="🗑️ Удалить",
-        callback_data=StudentDeleteCallback(student_id=student_id_short, city_en=city_en, group_id=group_id_short).pack()
+        callback_data=StudentDeleteCallback(student_id=student_code, city=city_code, group_id=group_code).pack()
     )
     
     # Кнопка "Просмотр посещаемости" - доступна для owner, manager, teacher
     attendance_button = InlineKeyboardButton(
         text="📊 Просмотр посещаемости",
-        callback_data=StudentAttendanceCallback(student_id=student_id_short, city_en=city_en).pack()
+        callback_data=StudentAttendanceCallback(student_id=student_code, city=city_code).pack()
     )
     
     # Формируем кнопки в зависимости от роли
@@ -106,11 +100,11 @@ def get_student_profile_keyboard(student_id: str, city: str, group_id: str = "",
         keyboard.append([attendance_button])
     
     # Добавляем кнопку "Назад" только если профиль получен через кнопки
-    if show_back and group_id_short:
+    if show_back and group_code:
         keyboard.append([
             InlineKeyboardButton(
                 text="◀️ Назад",
-                callback_data=BackToStudentsCallback(group_id=group_id_short, city_en=city_en).pack()
+                callback_data=BackToStudentsCallback(group_id=group_code, city=city_code).pack()
             )
         ])
     
@@ -2,14 +2,8 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from bot.config import BOT_TOKEN
-from bot.middlewares.role_middleware import RoleMiddleware
-from bot.handlers import start, owner_role_assign, student_search, add_student, report, attendance, payment, sync, \
-    role_management, action_history, free_places, student_notification, delete_student, payment_reminder_callbacks, \
-    test_absence, info_handler, student_attendance, back_to_students, smm_report, owner_report, broadcast
-# payment_report_query - роутер закомментирован, импорт удален
-from bot.handlers.reminder_handler import ReminderHandler
+from bot.config import BOT_TOKEN, RUN_VK_BOT
+from bot.services.report_executor import get_report_executor, shutdown_report_executor
 
 # Настройка логирования
 logging.basicConfig(
@@ -21,9 +15,26 @@ logger = logging.getLogger(__name__)
 
 async def main():
     """Главная функция запуска бота"""
+    # Пул процессов отчетов создается до запуска фоновых потоков
+    get_report_executor()
+
+    # Обработчики и сервисы импортируются здесь, а не на уровне модуля: процессы
+    # пула отчетов (spawn) заново импортируют этот модуль, и хранилища обработчиков
+    # (роли, журнал действий, необработанные ученики) не должны создаваться в них
+    from bot.middlewares.role_middleware import RoleMiddleware
+    from bot.handlers import start, owner_role_assign, student_search, add_student, report, attendance, payment, \
+        sync, role_management, action_history, free_places, student_notification, delete_student, \
+        payment_reminder_callbacks, test_absence, info_handler, student_attendance, back_to_students, smm_report, \
+        owner_report, broadcast
+    # payment_report_query - роутер закомментирован, импорт удален
+    from bot.handlers.reminder_handler import ReminderHandler
+    from bot.services.loop_monitor import get_loop_monitor
+    from bot.services.fsm_storage import SQLiteStorage
+
     # Создаем бота и диспетчер
     bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
+    # Состояния FSM хранятся на диске, чтобы перезапуск не прерывал сценарии
+    dp = Dispatcher(storage=SQLiteStorage())
 
     # Регистрируем middleware
     dp.message.middleware(RoleMiddleware())
@@ -58,18 +69,30 @@ async def main():
     # Создаем и запускаем обработчик напоминаний в фоне
     reminder_handler = ReminderHandler(bot)
     reminder_task = asyncio.create_task(reminder_handler.run_reminder_loop())
+    delivery_task = asyncio.create_task(reminder_handler.delivery_queue.run(bot))
+    monitor_task = asyncio.create_task(get_loop_monitor().run())
     logger.info("Система напоминаний запущена")
 
+    background_tasks = [reminder_task, delivery_task, monitor_task]
+
+    # VK бот в этом же процессе: те же снимки городов, индексы и кэши
+    if RUN_VK_BOT:
+        from vk_bot.main import main as run_vk_bot
+        background_tasks.append(asyncio.create_task(run_vk_bot()))
+        logger.info("VK бот запущен в том же процессе")
+
     # Запускаем polling
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
-        reminder_task.cancel()
-        try:
-            await reminder_task
-        except asyncio.CancelledError:
-            pass
+        for task in background_tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
         await bot.session.close()
+        shutdown_report_executor()
 
 
 if __name__ == "__main__":
@@ -48,7 +48,7 @@ class RoleMiddleware(BaseMiddleware):
             data["user_role"] = "owner"
             data["user_city"] = "all"
         else:
-            # Загружаем роль из хранилища
+            # Роль из реестра в памяти (файл читается только при его изменении)
             user_data = self.storage.get_user(user_id)
             if user_data:
                 data["user_role"] = user_data.get("role")
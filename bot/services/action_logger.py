@@ -1,51 +1,268 @@
 """Сервис для логирования действий пользователей"""
 import json
+import threading
+from bisect import bisect_left
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from bot.config import ROOT_DIR
+from bot.services.file_io import submit_file_io
 
 
-class ActionLogger:
-    """Класс для логирования действий пользователей"""
-    
-    def __init__(self):
-        self.logs_dir = ROOT_DIR / "logs"
+# Сколько последних записей держать в памяти (и в активном файле до ротации)
+MAX_LOG_ENTRIES = 10000
+# Сколько архивных файлов хранить после ротации
+MAX_LOG_ARCHIVES = 10
+
+
+class ActionLogStore:
+    """
+    Журнал действий: файл JSON Lines, в который записи только дописываются
+
+    Последние MAX_LOG_ENTRIES записей хранятся в памяти вместе с индексами по
+    пользователю, типу действия, городу и дате, поэтому запись - это одна строка
+    в конце файла, а выборка не зависит от общего размера журнала. Когда в
+    активном файле набирается MAX_LOG_ENTRIES записей, он переименовывается в
+    архив actions-ГГГГММДД_ЧЧММСС_мкс.jsonl.
+
+    В журнал может писать и другой процесс (VK бот), поэтому перед выборкой
+    проверяется размер файла и дочитываются только новые строки с его конца;
+    после ротации файла записи загружаются заново.
+    """
+
+    INDEX_FIELDS = ("user_id", "action_type", "city", "date")
+
+    def __init__(self, logs_dir: Path):
+        self.logs_dir = logs_dir
         self.logs_dir.mkdir(parents=True, exist_ok=True)
-        self.logs_file = self.logs_dir / "actions.json"
-        self._ensure_logs_file()
-    
-    def _ensure_logs_file(self):
-        """Создает файл логов если его нет"""
-        if not self.logs_file.exists():
-            with open(self.logs_file, "w", encoding="utf-8") as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
-    
-    def _load_logs(self) -> List[Dict[str, Any]]:
-        """Загружает логи из файла"""
+        self.logs_file = self.logs_dir / "actions.jsonl"
+        self.legacy_file = self.logs_dir / "actions.json"
+        self._lock = threading.Lock()
+        self._migrate_legacy_file()
+        self._load()
+
+    @staticmethod
+    def _index_keys(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Значения индексируемых полей записи"""
+        return {
+            "user_id": entry.get("user", {}).get("id"),
+            "action_type": entry.get("action_type"),
+            "city": entry.get("city"),
+            "date": entry.get("date"),
+        }
+
+    def _migrate_legacy_file(self):
+        """Переносит записи из старого actions.json (один JSON массив) в actions.jsonl"""
+        if not self.legacy_file.exists() or self.logs_file.exists():
+            return
         try:
-            if not self.logs_file.exists():
-                return []
-            
-            with open(self.logs_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
+            with open(self.legacy_file, "r", encoding="utf-8") as f:
+                legacy_logs = json.load(f)
+            temp_file = self.logs_file.with_suffix('.tmp')
+            with open(temp_file, "w", encoding="utf-8") as f:
+                for entry in legacy_logs:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            temp_file.replace(self.logs_file)
+            self.legacy_file.replace(self.legacy_file.with_suffix('.json.bak'))
+            print(f"📦 Журнал действий перенесен в {self.logs_file} ({len(legacy_logs)} записей)")
         except Exception as e:
-            print(f"⚠️ Ошибка при загрузке логов: {e}")
-            return []
-    
-    def _save_logs(self, logs: List[Dict[str, Any]]):
-        """Сохраняет логи в файл"""
+            print(f"⚠️ Ошибка при переносе журнала действий: {e}")
+
+    def _archives(self) -> List[Path]:
+        """Архивные файлы журнала (от старых к новым)"""
+        return sorted(self.logs_dir.glob("actions-*.jsonl"))
+
+    @staticmethod
+    def _read_file(path: Path) -> List[Dict[str, Any]]:
+        """Читает записи файла JSON Lines (поврежденные строки пропускаются)"""
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def _read_new_lines(self) -> List[Dict[str, Any]]:
+        """Дочитывает записи активного файла с позиции self._offset (только целые строки)"""
+        with open(self.logs_file, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+
+        entries = []
+        for line in chunk[:end].splitlines():
+            try:
+                entries.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+        return entries
+
+    def _load(self):
+        """Загружает последние записи (активный файл и, при нехватке, последний архив)"""
+        # Записи в памяти; номер записи = self._base + позиция в списке
+        self._entries: List[Dict[str, Any]] = []
+        self._base = 0
+        # Поле -> значение -> номера записей (по возрастанию)
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.INDEX_FIELDS}
+        # Прочитанная часть активного файла: (устройство, inode) и позиция
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._offset = 0
+        self._file_entries = 0
+
         try:
-            # Ограничиваем количество логов (храним последние 10000 записей)
-            if len(logs) > 10000:
-                logs = logs[-10000:]
-            
-            with open(self.logs_file, "w", encoding="utf-8") as f:
-                json.dump(logs, f, ensure_ascii=False, indent=2)
+            entries = []
+            if self.logs_file.exists():
+                stat = self.logs_file.stat()
+                self._file_id = (stat.st_dev, stat.st_ino)
+                entries = self._read_new_lines()
+            self._file_entries = len(entries)
+            archives = self._archives()
+            if len(entries) < MAX_LOG_ENTRIES and archives:
+                entries = self._read_file(archives[-1]) + entries
         except Exception as e:
-            print(f"⚠️ Ошибка при сохранении логов: {e}")
+            print(f"⚠️ Ошибка при загрузке логов: {e}")
+            entries = []
+
+        for entry in entries[-MAX_LOG_ENTRIES:]:
+            self._add_to_memory(entry)
+
+    def _sync(self):
+        """Дочитывает записи, добавленные в активный файл (в том числе другим процессом)"""
+        try:
+            stat = self.logs_file.stat()
+        except FileNotFoundError:
+            if self._file_id is not None:
+                # Файл ушел в архив, нового еще нет
+                self._load()
+            return
+
+        if (stat.st_dev, stat.st_ino) != self._file_id or stat.st_size < self._offset:
+            # Файл заменен (ротация) - загружаем заново
+            self._load()
+        elif stat.st_size > self._offset:
+            for entry in self._read_new_lines():
+                self._file_entries += 1
+                self._add_to_memory(entry)
+
+    def _add_to_memory(self, entry: Dict[str, Any]):
+        """Добавляет запись в память и индексы"""
+        seq = self._base + len(self._entries)
+        self._entries.append(entry)
+        for field, value in self._index_keys(entry).items():
+            if value is not None:
+                self._indexes[field].setdefault(value, []).append(seq)
+
+        # Старые записи отбрасываем пачкой, чтобы добавление оставалось O(1) в среднем
+        if len(self._entries) >= 2 * MAX_LOG_ENTRIES:
+            drop = len(self._entries) - MAX_LOG_ENTRIES
+            self._entries = self._entries[drop:]
+            self._base += drop
+            for index in self._indexes.values():
+                for value in list(index):
+                    seqs = index[value]
+                    keep_from = bisect_left(seqs, self._base)
+                    if keep_from >= len(seqs):
+                        del index[value]
+                    elif keep_from:
+                        index[value] = seqs[keep_from:]
+
+    def _rotate(self):
+        """Переносит заполненный активный файл в архив"""
+        archive = self.logs_dir / f"actions-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl"
+        self.logs_file.replace(archive)
+        self._file_entries = 0
+        for old_archive in self._archives()[:-MAX_LOG_ARCHIVES]:
+            old_archive.unlink(missing_ok=True)
+
+    def append(self, entry: Dict[str, Any]):
+        """Дописывает запись в конец журнала"""
+        with self._lock:
+            try:
+                self._sync()
+                if self._file_entries >= MAX_LOG_ENTRIES:
+                    self._rotate()
+                with open(self.logs_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                # Своя запись попадает в память вместе с записями других процессов
+                self._sync()
+            except Exception as e:
+                print(f"⚠️ Ошибка при сохранении логов: {e}")
+                self._add_to_memory(entry)
+
+    def _matching_seqs(self, filters: Dict[str, Any]) -> List[int]:
+        """Номера записей в памяти, подходящих под фильтры (по возрастанию)"""
+        filters = {field: value for field, value in filters.items() if value}
+        if not filters:
+            return list(range(self._base, self._base + len(self._entries)))
+
+        # Начинаем с самого короткого индекса, остальные условия проверяем по записи
+        candidates = min(
+            (self._indexes[field].get(value, []) for field, value in filters.items()),
+            key=len
+        )
+        result = []
+        for seq in candidates:
+            if seq < self._base:
+                continue
+            keys = self._index_keys(self._entries[seq - self._base])
+            if all(keys[field] == value for field, value in filters.items()):
+                result.append(seq)
+        return result
+
+    def query(
+        self,
+        user_id: Optional[int] = None,
+        action_type: Optional[str] = None,
+        city: Optional[str] = None,
+        date: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 10
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Страница записей (от новых к старым)
+
+        Returns:
+            Tuple[записи страницы, всего подходящих записей]
+        """
+        with self._lock:
+            try:
+                self._sync()
+            except Exception as e:
+                print(f"⚠️ Ошибка при чтении новых логов: {e}")
+            seqs = self._matching_seqs({
+                "user_id": user_id, "action_type": action_type, "city": city, "date": date
+            })
+            total = len(seqs)
+            end = total - offset
+            start = max(0, end - limit) if limit else 0
+            page = [self._entries[seq - self._base] for seq in reversed(seqs[start:max(end, 0)])]
+        return page, total
+
+
+_log_store: Optional[ActionLogStore] = None
+_log_store_lock = threading.Lock()
+
+
+def get_action_log_store() -> ActionLogStore:
+    """Возвращает общий журнал действий (один на процесс для всех ActionLogger)"""
+    global _log_store
+    if _log_store is None:
+        with _log_store_lock:
+            if _log_store is None:
+                _log_store = ActionLogStore(ROOT_DIR / "logs")
+    return _log_store
+
+
+class ActionLogger:
+    """Класс для логирования действий пользователей"""
+    
+    def __init__(self):
+        self.store = get_action_log_store()
+        self.logs_dir = self.store.logs_dir
+        self.logs_file = self.store.logs_file
     
     def log_action(
         self,
@@ -84,9 +301,8 @@ class ActionLogger:
             "city": city
         }
         
-        logs = self._load_logs()
-        logs.append(log_entry)
-        self._save_logs(logs)
+        # Запись в файл выполняется в фоне, не блокируя обработчик
+        submit_file_io(self.store.append, log_entry)
     
     def get_logs(
         self,
@@ -105,23 +321,29 @@ class ActionLogger:
             limit: Максимальное количество записей (0 = без ограничений)
         
         Returns:
-            Список логов
+            Список логов (от старых к новым)
         """
-        logs = self._load_logs()
-        
-        # Применяем фильтры
-        filtered_logs = logs
-        if user_id:
-            filtered_logs = [log for log in filtered_logs if log.get("user", {}).get("id") == user_id]
-        if action_type:
-            filtered_logs = [log for log in filtered_logs if log.get("action_type") == action_type]
-        if city:
-            filtered_logs = [log for log in filtered_logs if log.get("city") == city]
+        logs, _ = self.store.query(user_id=user_id, action_type=action_type, city=city, limit=limit)
+        return list(reversed(logs))
+    
+    def get_logs_page(
+        self,
+        user_id: Optional[int] = None,
+        action_type: Optional[str] = None,
+        city: Optional[str] = None,
+        page: int = 0,
+        page_size: int = 10
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Получает страницу логов с фильтрацией (от новых к старым)
         
-        # Возвращаем последние записи (или все, если limit=0)
-        if limit == 0:
-            return filtered_logs
-        return filtered_logs[-limit:]
+        Returns:
+            Tuple[записи страницы, всего подходящих записей]
+        """
+        return self.store.query(
+            user_id=user_id, action_type=action_type, city=city,
+            offset=page * page_size, limit=page_size
+        )
     
     def format_log_entry(self, log: Dict[str, Any]) -> str:
         """Форматирует запись лога для красивого отображения"""
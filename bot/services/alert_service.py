@@ -0,0 +1,308 @@
+"""Сервис правил оповещений о риске ухода учеников"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from bot.config import ROOT_DIR, CITY_MAPPING, CITIES, OWNER_ID
+from bot.services.role_storage import RoleStorage
+from bot.services.payment_service import PaymentService
+from src.sync_data.attendance_matrix import ABSENT, AttendanceMatrix, load_city_matrices
+
+
+class AlertService:
+    """
+    Оценивает настраиваемые правила по матрицам посещаемости и оплатам
+
+    Правила (data/alert_rules.json, значения по умолчанию - DEFAULT_RULES):
+    - absence_streak: N последних отметок подряд - "Отсутствовал"
+    - low_attendance: посещаемость за текущий период оплаты ниже X%
+    - unpaid_absent: "Не оплатил" за текущий месяц и последняя отметка - "Отсутствовал"
+    - group_no_marks: у группы K последних занятий без единой отметки
+
+    Оценка инкрементальная: правила, зависящие только от данных (серии
+    отсутствий), кэшируются по хэшу данных группы и пересчитываются только после
+    их изменения; правила, зависящие от даты (неотмеченные занятия, период
+    оплаты, текущий месяц), проверяются при каждом запуске. Отправленное
+    оповещение не повторяется, пока оно действует.
+    """
+
+    DEFAULT_RULES = {
+        "absence_streak": {"enabled": True, "min_streak": 3},
+        "low_attendance": {"enabled": True, "max_percent": 50, "min_lessons": 4},
+        "unpaid_absent": {"enabled": True, "min_streak": 1},
+        "group_no_marks": {"enabled": True, "lessons": 2},
+    }
+
+    def __init__(self, rules_path: Path = None, state_path: Path = None):
+        self.root_dir = ROOT_DIR
+        self.rules_path = rules_path or ROOT_DIR / "data" / "alert_rules.json"
+        self.state_path = state_path or ROOT_DIR / "data" / "alert_state.json"
+        self.role_storage = RoleStorage()
+        self.payment_service = PaymentService()
+
+    def _load_json(self, path: Path) -> Dict[str, Any]:
+        """Безопасная загрузка JSON"""
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Ошибка загрузки {path}: {e}")
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        """Сохраняет состояние оценки (атомарная запись)"""
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.state_path.with_suffix('.tmp')
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            temp_file.replace(self.state_path)
+        except Exception as e:
+            print(f"⚠️ Ошибка при сохранении состояния оповещений: {e}")
+
+    def get_rules(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает правила: значения по умолчанию, переопределенные из alert_rules.json"""
+        custom_rules = self._load_json(self.rules_path)
+        return {
+            name: {**defaults, **custom_rules.get(name, {})}
+            for name, defaults in self.DEFAULT_RULES.items()
+        }
+
+    def _get_payments_by_student(self, city_en: str) -> Dict[str, Dict[str, Any]]:
+        """Карта student_id -> запись из payments.json"""
+        payments_data = self._load_json(self.root_dir / f"data/{city_en}/payments.json")
+        return {
+            payment.get("student_id"): payment
+            for payment in payments_data.get("payments", [])
+            if payment.get("student_id")
+        }
+
+    def _group_fingerprint(
+        self,
+        matrix: AttendanceMatrix,
+        payments_by_student: Dict[str, Dict[str, Any]],
+        rules: Dict[str, Any]
+    ) -> str:
+        """Хэш данных группы (правила, даты, отметки, оплаты), от которых зависят правила"""
+        digest = hashlib.sha1()
+        digest.update(json.dumps(rules, sort_keys=True).encode())
+        digest.update("|".join(matrix.dates).encode())
+        for student, row in zip(matrix.students, matrix.rows):
+            student_id = student.get("student_id", "")
+            payment = payments_by_student.get(student_id, {})
+            digest.update(f"{student_id}:{row}:{payment.get('Дата оплаты', '')}".encode())
+            digest.update(json.dumps(payment.get("payments_data", {}), sort_keys=True, ensure_ascii=False).encode())
+        return digest.hexdigest()
+
+    def _make_alert(
+        self,
+        rule: str,
+        city_name: str,
+        group_id: str,
+        matrix: AttendanceMatrix,
+        text: str,
+        student_id: str = "",
+        fio: str = ""
+    ) -> Dict[str, Any]:
+        """Оповещение по правилу для группы или ученика"""
+        last_date = matrix.dates[-1] if matrix.dates else ""
+        return {
+            # Ключ меняется вместе с последней датой, поэтому оповещение повторяется только при новых данных
+            "alert_id": f"{rule}:{group_id}:{student_id}:{last_date}",
+            "rule": rule,
+            "city": city_name,
+            "group_name": matrix.group_name,
+            "student_id": student_id,
+            "fio": fio,
+            "text": text,
+        }
+
+    def _evaluate_group_data(
+        self,
+        city_name: str,
+        group_id: str,
+        matrix: AttendanceMatrix,
+        rules: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Правила, зависящие только от данных группы (кэшируются по хэшу данных)
+
+        Returns:
+            {"streaks": {student_id: серия отсутствий}, "alerts": [оповещения absence_streak]}
+        """
+        streaks = {}
+        alerts = []
+        streak_rule = rules["absence_streak"]
+        for idx, student in enumerate(matrix.students):
+            student_id = student.get("student_id", "")
+            fio = student.get("ФИО", "")
+            if not student_id or not fio:
+                continue
+
+            streak = matrix.trailing_streak(idx, ABSENT)
+            streaks[student_id] = streak
+            if streak_rule.get("enabled") and streak >= streak_rule["min_streak"]:
+                alerts.append(self._make_alert(
+                    "absence_streak", city_name, group_id, matrix, f"{streak} отсутствий подряд", student_id, fio
+                ))
+        return {"streaks": streaks, "alerts": alerts}
+
+    def _evaluate_group_daily(
+        self,
+        city_name: str,
+        group_id: str,
+        matrix: AttendanceMatrix,
+        payments_by_student: Dict[str, Dict[str, Any]],
+        streaks: Dict[str, int],
+        rules: Dict[str, Dict[str, Any]],
+        now: datetime
+    ) -> List[Dict[str, Any]]:
+        """Правила, зависящие от текущей даты: неотмеченные занятия, период оплаты, текущий месяц"""
+        alerts = []
+        current_month = self.payment_service.get_current_month(city_name)
+
+        group_rule = rules["group_no_marks"]
+        if group_rule.get("enabled"):
+            unmarked = matrix.unmarked_recent_lessons(now.date())
+            if unmarked >= group_rule["lessons"]:
+                alerts.append(self._make_alert(
+                    "group_no_marks", city_name, group_id, matrix, f"нет отметок за последние {unmarked} занятий"
+                ))
+
+        low_rule = rules["low_attendance"]
+        unpaid_rule = rules["unpaid_absent"]
+        for idx, student in enumerate(matrix.students):
+            student_id = student.get("student_id", "")
+            fio = student.get("ФИО", "")
+            if not student_id or not fio:
+                continue
+
+            payment = payments_by_student.get(student_id, {})
+
+            if low_rule.get("enabled"):
+                period_start, next_period_start = self.payment_service.get_payment_period(
+                    payment.get("Дата оплаты", ""), now
+                )
+                period_end = min(now, next_period_start - timedelta(days=1))
+                stats = matrix.counts(idx, period_start.date(), period_end.date())
+                if stats["total"] >= low_rule["min_lessons"]:
+                    percent = round(stats["present"] / stats["total"] * 100)
+                    if percent < low_rule["max_percent"]:
+                        alerts.append(self._make_alert(
+                            "low_attendance", city_name, group_id, matrix,
+                            f"посещаемость {percent}% за период оплаты ({stats['present']}/{stats['total']})",
+                            student_id, fio
+                        ))
+
+            if unpaid_rule.get("enabled") and streaks.get(student_id, 0) >= unpaid_rule["min_streak"]:
+                status = str(payment.get("payments_data", {}).get(current_month, "")).strip().lower()
+                if status == "не оплатил":
+                    alerts.append(self._make_alert(
+                        "unpaid_absent", city_name, group_id, matrix,
+                        f"не оплатил за {current_month.lower()} и отсутствует", student_id, fio
+                    ))
+
+        return alerts
+
+    def evaluate(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Оценивает правила по всем городам и возвращает только новые оповещения
+
+        Returns:
+            Список оповещений: [{"alert_id", "rule", "city", "group_name", "student_id", "fio", "text"}, ...]
+        """
+        if now is None:
+            now = datetime.now()
+
+        rules = self.get_rules()
+        state = self._load_json(self.state_path)
+        cached_groups = state.get("groups", {})
+        notified = state.get("notified", {})
+
+        groups = {}
+        active_alerts = []
+        evaluated_groups = 0
+        for city_name in CITIES:
+            city_en = CITY_MAPPING.get(city_name, city_name)
+            matrices = load_city_matrices(self.root_dir / f"data/{city_en}")
+            if not matrices:
+                continue
+
+            payments_by_student = self._get_payments_by_student(city_en)
+
+            for group_id, matrix in matrices.items():
+                group_key = f"{city_name}:{group_id}"
+                fingerprint = self._group_fingerprint(matrix, payments_by_student, rules)
+                cached = cached_groups.get(group_key)
+                if cached and cached.get("fingerprint") == fingerprint:
+                    group_data = cached
+                else:
+                    group_data = {"fingerprint": fingerprint, **self._evaluate_group_data(city_name, group_id, matrix, rules)}
+                    evaluated_groups += 1
+                groups[group_key] = group_data
+
+                active_alerts.extend(group_data["alerts"])
+                active_alerts.extend(self._evaluate_group_daily(
+                    city_name, group_id, matrix, payments_by_student, group_data["streaks"], rules, now
+                ))
+
+        new_alerts = []
+        for alert in active_alerts:
+            if alert["alert_id"] not in notified:
+                new_alerts.append(alert)
+                notified[alert["alert_id"]] = now.isoformat()
+
+        # Помним только действующие оповещения: пропавшее и вернувшееся оповещение отправляется снова
+        active_ids = {alert["alert_id"] for alert in active_alerts}
+        notified = {
+            alert_id: notified_at for alert_id, notified_at in notified.items()
+            if alert_id in active_ids
+        }
+
+        self._save_state({
+            "groups": groups,
+            "notified": notified,
+        })
+        print(
+            f"🔎 Правила оповещений: групп {len(groups)} (данные изменились у {evaluated_groups}), "
+            f"новых оповещений {len(new_alerts)}"
+        )
+        return new_alerts
+
+    def get_recipients(self, city_name: str) -> List[int]:
+        """
+        Получатели оповещений по городу: менеджеры этого города (или всех городов),
+        а если таких нет - владелец
+        """
+        recipients = [
+            user["user_id"] for user in self.role_storage.get_all_users()
+            if user.get("role") == "manager" and user.get("city") in (city_name, "all")
+        ]
+        return recipients or [OWNER_ID]
+
+    def format_alerts(self, alerts: List[Dict[str, Any]]) -> str:
+        """Форматирует оповещения одного получателя в сообщение"""
+        rule_titles = {
+            "absence_streak": "🚫 Серия отсутствий",
+            "low_attendance": "📉 Низкая посещаемость",
+            "unpaid_absent": "💸 Не оплатил и отсутствует",
+            "group_no_marks": "📝 Посещаемость не отмечается",
+        }
+
+        lines = ["⚠️ <b>Риск ухода учеников</b>", ""]
+        for rule, title in rule_titles.items():
+            rule_alerts = [alert for alert in alerts if alert["rule"] == rule]
+            if not rule_alerts:
+                continue
+            lines.append(f"<b>{title}:</b>")
+            for alert in rule_alerts:
+                if alert["fio"]:
+                    lines.append(f"• {alert['city']} <code>{alert['fio']}</code> ({alert['group_name']}) - {alert['text']}")
+                else:
+                    lines.append(f"• {alert['city']} <code>{alert['group_name']}</code> - {alert['text']}")
+            lines.append("")
+
+        return "\n".join(lines).strip()
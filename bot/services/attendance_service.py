@@ -4,7 +4,11 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from bot.config import ROOT_DIR, CITY_MAPPING
+from bot.services.render_cache import get_render_cache
+from bot.services.file_io import run_file_io
 from src.CRUD.crud_attendance import NotionAttendanceUpdater
+from src.sync_data.attendance_matrix import encode_status, normalize_date_key
+from src.sync_data.sqlite_mirror import DATASET_ATTENDANCE, get_mirror
 
 
 class AttendanceService:
@@ -13,6 +17,7 @@ class AttendanceService:
     def __init__(self):
         self.root_dir = ROOT_DIR
         self.attendance_updater = NotionAttendanceUpdater()
+        self.mirror = get_mirror()
     
     def get_group_students(self, city_name: str, group_id: str) -> List[Dict[str, Any]]:
         """
@@ -155,6 +160,12 @@ class AttendanceService:
         if date_str is None:
             date_str = self.format_date()
         
+        city_en = CITY_MAPPING.get(city_name, city_name)
+        mirror = None
+        if self.mirror and await run_file_io(self.mirror.has_city, city_en, DATASET_ATTENDANCE):
+            mirror = self.mirror
+        iso_date = normalize_date_key(date_str)
+        
         try:
             # Сохраняем посещаемость для каждого ученика
             for student_id, status_index in attendance_data.items():
@@ -172,9 +183,19 @@ class AttendanceService:
                     date_str=date_str,
                     status=status_str
                 )
+                
+                # Построчное обновление зеркала SQLite (до следующей синхронизации)
+                if mirror and iso_date:
+                    await run_file_io(
+                        mirror.set_attendance, city_en, group_id, student_id, iso_date,
+                        encode_status(status_str), date_str, status_str
+                    )
             
             return True
         except Exception as e:
             print(f"❌ Ошибка сохранения посещаемости: {e}")
             return False
+        finally:
+            # Часть отметок могла сохраниться и при ошибке
+            get_render_cache().invalidate_city(city_name)
 
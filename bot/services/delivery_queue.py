@@ -0,0 +1,334 @@
+"""Персистентная очередь доставки уведомлений"""
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramRetryAfter,
+    TelegramNetworkError,
+    TelegramServerError,
+)
+from aiogram.types import InlineKeyboardMarkup
+from bot.config import ROOT_DIR
+
+
+class DeliveryQueue:
+    """
+    Очередь исходящих уведомлений (напоминания менеджерам, владельцу, преподавателям)
+
+    Задания хранятся в data/delivery_queue.json, поэтому перезапуск бота
+    не теряет неотправленные сообщения. Ключ дедупликации защищает от
+    повторной отправки одного и того же уведомления.
+    """
+
+    # Сколько одновременно отправляемых сообщений
+    CONCURRENCY = 5
+
+    # Максимальное количество попыток для временных ошибок
+    MAX_ATTEMPTS = 5
+
+    # Базовая задержка повтора (секунды), растет как 2^attempt
+    RETRY_BASE_DELAY = 5
+
+    # Сколько дней хранить ключи отправленных уведомлений
+    KEEP_DELIVERED_DAYS = 7
+
+    def __init__(self, file_path: Path = None):
+        if file_path is None:
+            file_path = ROOT_DIR / "data" / "delivery_queue.json"
+        self.file_path = file_path
+        data = self._load()
+        self.jobs: Dict[str, Dict[str, Any]] = data.get("jobs", {})
+        self.delivered: Dict[str, str] = data.get("delivered", {})
+        self.metrics = {
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+        }
+        self._wakeup = asyncio.Event()
+
+    def _load(self) -> Dict[str, Any]:
+        """Загружает состояние очереди из файла"""
+        try:
+            if not self.file_path.exists():
+                return {}
+
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ Ошибка при загрузке очереди доставки: {e}")
+            return {}
+
+    def _save(self) -> None:
+        """Сохраняет состояние очереди в файл (атомарная запись)"""
+        try:
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.file_path.with_suffix('.tmp')
+
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"jobs": self.jobs, "delivered": self.delivered},
+                    f, ensure_ascii=False, indent=2
+                )
+
+            temp_file.replace(self.file_path)
+        except Exception as e:
+            print(f"⚠️ Ошибка при сохранении очереди доставки: {e}")
+
+    def is_known(self, key: str) -> bool:
+        """Проверяет, было ли уведомление с таким ключом уже поставлено или отправлено"""
+        return key in self.jobs or key in self.delivered
+
+    def mark_delivered(self, key: str) -> None:
+        """Отмечает ключ как обработанный (например, ежедневная рассылка уже сформирована)"""
+        self.delivered[key] = datetime.now().isoformat()
+        self._save()
+
+    def forget(self, prefix: str) -> int:
+        """
+        Удаляет отметки об отправке для ключей с указанным префиксом,
+        чтобы уведомление можно было отправить повторно
+
+        Returns:
+            Количество удаленных отметок
+        """
+        keys = [key for key in self.delivered if key.startswith(prefix)]
+        for key in keys:
+            del self.delivered[key]
+        if keys:
+            self._save()
+        return len(keys)
+
+    def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        key: Optional[str] = None,
+        parse_mode: Optional[str] = "HTML",
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        pin: bool = False
+    ) -> bool:
+        """
+        Ставит сообщение в очередь доставки
+
+        Args:
+            chat_id: ID получателя
+            text: Текст сообщения
+            key: Ключ дедупликации (если None - сообщение всегда ставится в очередь)
+            parse_mode: Режим разметки
+            reply_markup: Inline-клавиатура
+            pin: Закрепить сообщение после отправки
+
+        Returns:
+            True если сообщение поставлено, False если такой ключ уже известен
+        """
+        added = self._add_job(chat_id, text, key, parse_mode, reply_markup, pin)
+        if added:
+            self._save()
+            self._wakeup.set()
+        return added
+
+    def enqueue_many(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Ставит в очередь несколько сообщений за одну запись файла
+
+        Args:
+            messages: Список словарей с аргументами enqueue()
+
+        Returns:
+            Количество поставленных сообщений
+        """
+        added = 0
+        for message in messages:
+            if self._add_job(
+                message["chat_id"],
+                message["text"],
+                message.get("key"),
+                message.get("parse_mode", "HTML"),
+                message.get("reply_markup"),
+                message.get("pin", False)
+            ):
+                added += 1
+        if added:
+            self._save()
+            self._wakeup.set()
+        return added
+
+    def _add_job(
+        self,
+        chat_id: int,
+        text: str,
+        key: Optional[str],
+        parse_mode: Optional[str],
+        reply_markup: Optional[InlineKeyboardMarkup],
+        pin: bool
+    ) -> bool:
+        """Добавляет задание в очередь без записи в файл"""
+        if key is None:
+            key = f"message:{uuid.uuid4().hex}"
+        if self.is_known(key):
+            return False
+
+        now = datetime.now().isoformat()
+        self.jobs[key] = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "reply_markup": reply_markup.model_dump(mode="json", exclude_none=True) if reply_markup else None,
+            "pin": pin,
+            "attempts": 0,
+            "enqueued_at": now,
+            "next_attempt_at": now,
+        }
+        return True
+
+    async def _deliver(self, bot: Bot, key: str, job: Dict[str, Any]) -> None:
+        """Отправляет одно сообщение и обновляет состояние задания"""
+        reply_markup = None
+        if job.get("reply_markup"):
+            reply_markup = InlineKeyboardMarkup.model_validate(job["reply_markup"])
+
+        try:
+            sent_message = await bot.send_message(
+                chat_id=job["chat_id"],
+                text=job["text"],
+                parse_mode=job.get("parse_mode"),
+                reply_markup=reply_markup
+            )
+        except (TelegramRetryAfter, TelegramNetworkError, TelegramServerError) as e:
+            job["attempts"] += 1
+            if job["attempts"] >= self.MAX_ATTEMPTS:
+                print(f"❌ Уведомление {key} не доставлено после {job['attempts']} попыток: {e}")
+                self.jobs.pop(key, None)
+                self.metrics["failed"] += 1
+                return
+
+            if isinstance(e, TelegramRetryAfter):
+                delay = e.retry_after
+            else:
+                delay = self.RETRY_BASE_DELAY * (2 ** (job["attempts"] - 1))
+            job["next_attempt_at"] = (datetime.now() + timedelta(seconds=delay)).isoformat()
+            self.metrics["retries"] += 1
+            print(f"⚠️ Временная ошибка доставки {key}, повтор через {delay} сек: {e}")
+            return
+        except Exception as e:
+            # Постоянные ошибки (бот заблокирован, чат не найден и т.п.) не повторяем
+            print(f"❌ Ошибка отправки уведомления пользователю {job['chat_id']}: {e}")
+            self.jobs.pop(key, None)
+            self.metrics["failed"] += 1
+            return
+
+        # Сначала отмечаем доставку, чтобы сбой при закреплении не привел к повторной отправке
+        self.jobs.pop(key, None)
+        self.delivered[key] = datetime.now().isoformat()
+        self._save()
+
+        lag = (datetime.now() - datetime.fromisoformat(job["enqueued_at"])).total_seconds()
+        self.metrics["sent"] += 1
+        self.metrics["last_lag_seconds"] = lag
+        self.metrics["max_lag_seconds"] = max(self.metrics["max_lag_seconds"], lag)
+
+        if job.get("pin"):
+            try:
+                await bot.pin_chat_message(
+                    chat_id=job["chat_id"],
+                    message_id=sent_message.message_id
+                )
+            except Exception as pin_error:
+                print(f"⚠️ Не удалось закрепить сообщение для пользователя {job['chat_id']}: {pin_error}")
+
+    async def process_pending(self, bot: Bot) -> int:
+        """
+        Отправляет все задания, время которых наступило
+
+        Returns:
+            Количество обработанных заданий
+        """
+        now = datetime.now().isoformat()
+        due = [
+            (key, job) for key, job in self.jobs.items()
+            if job.get("next_attempt_at", "") <= now
+        ]
+        if not due:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+
+        async def deliver_limited(key: str, job: Dict[str, Any]) -> None:
+            async with semaphore:
+                try:
+                    await self._deliver(bot, key, job)
+                finally:
+                    # Состояние сохраняется после каждого задания: сбой или остановка
+                    # посреди пачки не приводят к повторной отправке доставленных
+                    self._save()
+
+        await asyncio.gather(*(deliver_limited(key, job) for key, job in due))
+
+        self._cleanup_delivered()
+        self._save()
+        return len(due)
+
+    def _cleanup_delivered(self) -> None:
+        """Удаляет ключи отправленных уведомлений старше KEEP_DELIVERED_DAYS"""
+        border = (datetime.now() - timedelta(days=self.KEEP_DELIVERED_DAYS)).isoformat()
+        self.delivered = {
+            key: delivered_at for key, delivered_at in self.delivered.items()
+            if delivered_at >= border
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Возвращает метрики очереди: размер, отправлено, ошибки, задержка доставки"""
+        oldest_lag = 0.0
+        if self.jobs:
+            oldest = min(job["enqueued_at"] for job in self.jobs.values())
+            oldest_lag = (datetime.now() - datetime.fromisoformat(oldest)).total_seconds()
+
+        return {
+            **self.metrics,
+            "pending": len(self.jobs),
+            "oldest_pending_lag_seconds": oldest_lag,
+        }
+
+    async def run(self, bot: Bot, poll_interval: float = 5.0):
+        """Запускает фоновую доставку уведомлений"""
+        if self.jobs:
+            print(f"📬 Восстановлено {len(self.jobs)} неотправленных уведомлений")
+
+        while True:
+            # Сбрасываем до обработки, чтобы не потерять enqueue во время отправки пачки
+            self._wakeup.clear()
+            try:
+                processed = await self.process_pending(bot)
+                if processed:
+                    metrics = self.get_metrics()
+                    print(
+                        f"📬 Очередь доставки: отправлено {metrics['sent']}, "
+                        f"ошибок {metrics['failed']}, в очереди {metrics['pending']}, "
+                        f"задержка {metrics['last_lag_seconds']:.1f} сек"
+                    )
+            except Exception as e:
+                print(f"❌ Ошибка в очереди доставки: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+_delivery_queue = None
+
+
+def get_delivery_queue() -> DeliveryQueue:
+    """Возвращает общий экземпляр очереди доставки"""
+    global _delivery_queue
+    if _delivery_queue is None:
+        _delivery_queue = DeliveryQueue()
+    return _delivery_queue
@@ -0,0 +1,104 @@
+"""
+Файловый ввод-вывод вне цикла событий
+
+Вся работа с файлами из асинхронного кода выполняется в отдельном пуле
+с одним потоком: чтение и запись JSON не блокируют обработку обновлений
+Telegram, а операции выполняются строго по очереди (как и раньше в одном
+потоке), поэтому чтение-изменение-запись файлов не гоняются между собой.
+
+Долгие расчеты по всем городам (напоминания, оповещения, тренды) выполняются
+в отдельном пуле (run_compute), чтобы не задерживать короткие файловые
+операции за ними в очереди.
+"""
+import asyncio
+import functools
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+# Потоков для долгих расчетов
+COMPUTE_WORKERS = 2
+
+_executor: Optional[ThreadPoolExecutor] = None
+_compute_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_file_executor() -> ThreadPoolExecutor:
+    """Возвращает пул для файловых операций (создается при первом обращении)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-io")
+    return _executor
+
+
+async def run_file_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет блокирующую функцию (чтение/запись файлов) в пуле файловых операций
+
+    Пример:
+        user_data = await run_file_io(role_storage.get_user, user_id)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_file_executor(), functools.partial(func, *args, **kwargs))
+
+
+def get_compute_executor() -> ThreadPoolExecutor:
+    """Возвращает пул для долгих расчетов (создается при первом обращении)"""
+    global _compute_executor
+    if _compute_executor is None:
+        _compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="compute")
+    return _compute_executor
+
+
+async def run_compute(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет долгий расчет (обход всех городов и групп) в пуле расчетов
+
+    Очередь файловых операций при этом остается свободной.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_compute_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _log_background_error(future: Future) -> None:
+    """Печатает ошибку фоновой файловой операции"""
+    error = future.exception()
+    if error:
+        print(f"⚠️ Ошибка фоновой файловой операции: {error}")
+
+
+def submit_file_io(func: Callable[..., Any], *args, **kwargs) -> Future:
+    """
+    Ставит блокирующую функцию в очередь пула файловых операций, не дожидаясь результата
+
+    Операции выполняются по порядку постановки, поэтому последующий run_file_io
+    увидит результат записи.
+    """
+    future = get_file_executor().submit(func, *args, **kwargs)
+    future.add_done_callback(_log_background_error)
+    return future
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Читает JSON файл; при отсутствии или ошибке разбора возвращает default"""
+    try:
+        if not path.exists():
+            return default
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return default
+    except Exception as e:
+        print(f"⚠️ Ошибка при загрузке {path}: {e}")
+        return default
+
+
+def write_json_atomic(path: Path, data: Any, indent: Optional[int] = 2) -> None:
+    """Записывает JSON файл атомарно (временный файл + замена)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = path.with_suffix('.tmp')
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    temp_file.replace(path)
+
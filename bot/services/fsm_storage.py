@@ -0,0 +1,173 @@
+"""
+Хранилище состояний FSM на диске (SQLite)
+
+Заменяет MemoryStorage: незавершенные сценарии (добавление ученика, отметка
+посещаемости, оплата) переживают перезапуск бота. Каждая запись хранит
+состояние, данные (JSON) и время последнего изменения:
+
+    fsm_states(key, state, data, updated_at)
+
+Записи, не менявшиеся дольше FSM_STATE_TTL_HOURS, считаются брошенными: при
+чтении они возвращаются пустыми, а периодическая очистка удаляет их из базы.
+В памяти держится не больше MAX_CACHED_KEYS последних ключей (LRU), остальные
+читаются из базы. Запросы к базе выполняются в собственном потоке хранилища,
+поэтому шаги сценариев не ждут в общей очереди файловых операций.
+"""
+import asyncio
+import functools
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from bot.config import FSM_STORAGE_FILE, FSM_STATE_TTL_HOURS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at);
+"""
+
+# Сколько ключей держать в памяти
+MAX_CACHED_KEYS = 1000
+
+# Как часто удалять брошенные записи из базы (секунд)
+PURGE_INTERVAL = 600
+
+
+def _key_to_str(key: StorageKey) -> str:
+    """Строковый ключ записи"""
+    return ":".join(str(part) if part is not None else "" for part in (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny
+    ))
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM хранилище в файле SQLite с истечением брошенных состояний"""
+
+    def __init__(
+        self,
+        db_path: Path = FSM_STORAGE_FILE,
+        ttl_seconds: float = FSM_STATE_TTL_HOURS * 3600,
+        max_cached_keys: int = MAX_CACHED_KEYS
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_cached_keys = max_cached_keys
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Соединение используется только из собственного потока хранилища
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        # ключ -> (состояние, данные, время изменения)
+        self._cache: "OrderedDict[str, Tuple[Optional[str], Dict[str, Any], float]]" = OrderedDict()
+        self._last_purge = 0.0
+
+    # ---------- Работа с базой (в потоке хранилища) ----------
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        """Выполняет запрос к базе в потоке хранилища"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def _read(self, key: str) -> Tuple[Optional[str], Dict[str, Any], float]:
+        """Читает запись из базы (пустая запись, если ее нет)"""
+        row = self._conn.execute(
+            "SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None, {}, 0.0
+        try:
+            data = json.loads(row[1])
+        except json.JSONDecodeError:
+            data = {}
+        return row[0], data, row[2]
+
+    def _write(self, key: str, state: Optional[str], data: Dict[str, Any], updated_at: float) -> None:
+        """Сохраняет запись (пустая запись удаляется) и периодически чистит брошенные"""
+        if state is None and not data:
+            self._conn.execute("DELETE FROM fsm_states WHERE key = ?", (key,))
+        else:
+            try:
+                data_json = json.dumps(data, ensure_ascii=False)
+            except (TypeError, ValueError) as e:
+                # Запись остается только в памяти
+                print(f"⚠️ Данные FSM для {key} не сохранены на диск: {e}")
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                (key, state, data_json, updated_at)
+            )
+
+        if updated_at - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = updated_at
+            deleted = self._conn.execute(
+                "DELETE FROM fsm_states WHERE updated_at < ?", (updated_at - self.ttl_seconds,)
+            ).rowcount
+            if deleted:
+                print(f"🧹 Удалено брошенных состояний FSM: {deleted}")
+        self._conn.commit()
+
+    # ---------- Кэш в памяти ----------
+
+    def _is_expired(self, updated_at: float) -> bool:
+        """Истек ли срок хранения записи"""
+        return bool(updated_at) and time.time() - updated_at > self.ttl_seconds
+
+    def _remember(self, key: str, record: Tuple[Optional[str], Dict[str, Any], float]) -> None:
+        """Кладет запись в кэш, вытесняя самые давние ключи"""
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached_keys:
+            self._cache.popitem(last=False)
+
+    async def _get_record(self, key: str) -> Tuple[Optional[str], Dict[str, Any], float]:
+        """Запись по ключу (из кэша или базы); брошенная запись считается пустой"""
+        record = self._cache.get(key)
+        if record is None:
+            record = await self._run(self._read, key)
+        if self._is_expired(record[2]):
+            record = (None, {}, 0.0)
+        self._remember(key, record)
+        return record
+
+    async def _set_record(self, key: str, state: Optional[str], data: Dict[str, Any]) -> None:
+        """Обновляет запись в кэше и на диске"""
+        updated_at = time.time()
+        self._remember(key, (state, data, updated_at))
+        await self._run(self._write, key, state, data, updated_at)
+
+    # ---------- BaseStorage ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        str_key = _key_to_str(key)
+        _, data, _ = await self._get_record(str_key)
+        await self._set_record(str_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _, _ = await self._get_record(_key_to_str(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        str_key = _key_to_str(key)
+        state, _, _ = await self._get_record(str_key)
+        await self._set_record(str_key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data, _ = await self._get_record(_key_to_str(key))
+        return data.copy()
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
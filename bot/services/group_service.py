@@ -1,8 +1,7 @@
 """Сервис для работы с группами"""
-import json
-from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from bot.config import ROOT_DIR, CITY_MAPPING
+from src.sync_data.capacity_index import CapacityIndex, load_capacity_index
 
 
 class GroupService:
@@ -11,68 +10,37 @@ class GroupService:
     def __init__(self):
         self.root_dir = ROOT_DIR
     
+    def _get_capacity(self, city_name: str) -> CapacityIndex:
+        """Индекс заполненности групп города (src/sync_data/capacity_index.py)"""
+        city_en = CITY_MAPPING.get(city_name, city_name)
+        return load_capacity_index(self.root_dir / f"data/{city_en}")
+    
     def get_city_seats(self, city_name: str) -> int:
         """Получает количество мест в классе для города из main_page_info.json"""
-        city_en = CITY_MAPPING.get(city_name, city_name)
-        main_info_path = self.root_dir / f"data/{city_en}/main_page_info.json"
-        
-        if not main_info_path.exists():
-            return 0
-        
-        try:
-            with open(main_info_path, "r", encoding="utf-8") as f:
-                info = json.load(f)
-            
-            seats_raw = info.get("number_seats", "")
-            # Извлекаем цифры из строки
-            digits = "".join(ch for ch in seats_raw if ch.isdigit())
-            if digits:
-                return int(digits)
-            return 0
-        except Exception as e:
-            print(f"Ошибка загрузки main_page_info.json для {city_name}: {e}")
-            return 0
+        return self._get_capacity(city_name).seats or 0
     
     def get_city_groups(self, city_name: str) -> List[Dict[str, Any]]:
         """Получает список всех групп для города с количеством учеников"""
-        # Преобразуем русское название в английское для пути
-        city_en = CITY_MAPPING.get(city_name, city_name)
-        groups_path = self.root_dir / f"data/{city_en}/groups.json"
-        students_path = self.root_dir / f"data/{city_en}/students.json"
-        
-        if not groups_path.exists():
-            return []
+        return self._get_capacity(city_name).get_groups(city_name)
+    
+    def get_city_capacity(self, city_name: str) -> Dict[str, Any]:
+        """
+        Свободные места в городе одним вызовом
         
-        try:
-            with open(groups_path, "r", encoding="utf-8") as f:
-                groups_data = json.load(f)
-            
-            # Загружаем данные о студентах для подсчета
-            students_data = {}
-            if students_path.exists():
-                try:
-                    with open(students_path, "r", encoding="utf-8") as f:
-                        students_data = json.load(f)
-                except Exception:
-                    pass
-            
-            groups = []
-            for group_id, group_info in groups_data.items():
-                # Получаем количество учеников из students.json
-                total_students = 0
-                if group_id in students_data:
-                    total_students = students_data[group_id].get("total_students", 0)
-                
-                groups.append({
-                    "group_id": group_id,
-                    "group_name": group_info.get("Название группы", "Без названия"),
-                    "city": group_info.get("Город", city_name),
-                    "status": group_info.get("Статус группы", ""),
-                    "total_students": total_students,
-                })
-            
-            return groups
-        except Exception as e:
-            print(f"Ошибка загрузки groups.json для {city_name}: {e}")
-            return []
-
+        Returns:
+            {"seats": мест в классе (0, если неизвестно), "groups": [... с free_places]}
+        """
+        capacity = self._get_capacity(city_name)
+        return {
+            "seats": capacity.seats or 0,
+            "groups": capacity.get_groups(city_name)
+        }
+    
+    def get_group_by_id(self, city_name: str, group_id: str) -> Optional[Dict[str, Any]]:
+        """Получает группу города по полному ID (как в get_city_groups) или None"""
+        if not group_id:
+            return None
+        for group in self.get_city_groups(city_name):
+            if group.get("group_id") == group_id:
+                return group
+        return None
@@ -0,0 +1,147 @@
+"""
+Модель чтения для меню "Информация"
+
+Все, что показывает меню (информация о городе, группы, ученики групп, карточка
+ученика и его оплата), собирается один раз на снимок файлов города:
+main_page_info.json, students.json и payments.json. Пока файлы не менялись,
+обработчики кнопок только форматируют готовые данные; после синхронизации
+или записи оплаты снимок пересобирается при следующем обращении.
+
+Число учеников и статус групп берутся из индекса заполненности
+(src/sync_data/capacity_index.py), который учитывает добавления через бота.
+"""
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from bot.config import ROOT_DIR, CITY_MAPPING
+from bot.services.file_io import read_json
+from bot.services.paginator import DEFAULT_PAGE_SIZE, Page, paginate
+from src.sync_data.capacity_index import load_capacity_index
+
+
+# Файлы, из которых строится снимок
+SOURCE_FILES = ("main_page_info.json", "students.json", "payments.json")
+
+
+def _files_version(city_dir: Path) -> Tuple[Tuple[int, int], ...]:
+    """Время изменения и размер исходных файлов города"""
+    version = []
+    for filename in SOURCE_FILES:
+        path = city_dir / filename
+        if path.exists():
+            stat = path.stat()
+            version.append((stat.st_mtime_ns, stat.st_size))
+        else:
+            version.append((0, 0))
+    return tuple(version)
+
+
+class CityReadModel:
+    """Снимок данных города для меню информации"""
+
+    def __init__(self, city_name: str, city_dir: Path):
+        self.city_name = city_name
+        self.city_dir = city_dir
+        self.city_info: Dict[str, str] = read_json(city_dir / "main_page_info.json", {}) or {}
+
+        # group_id -> ученики группы (с group_id и group_name); ID ученика -> ученик
+        self.students_by_group: Dict[str, List[Dict[str, Any]]] = {}
+        self.students_by_id: Dict[str, Dict[str, Any]] = {}
+        for group_id, group_data in (read_json(city_dir / "students.json", {}) or {}).items():
+            group_name = group_data.get("group_name", "")
+            students = []
+            for student in group_data.get("students", []):
+                student = {**student, "group_id": group_id, "group_name": group_name}
+                students.append(student)
+                if student.get("ID"):
+                    self.students_by_id.setdefault(student["ID"], student)
+            self.students_by_group[group_id] = students
+
+        # Оплаты и позиции первых записей по ID ученика и по ФИО
+        self.payments: List[Dict[str, Any]] = (read_json(city_dir / "payments.json", {}) or {}).get("payments", [])
+        self._payment_by_id: Dict[str, int] = {}
+        self._payment_by_fio: Dict[str, int] = {}
+        for position, payment in enumerate(self.payments):
+            if payment.get("student_id"):
+                self._payment_by_id.setdefault(payment["student_id"], position)
+            self._payment_by_fio.setdefault(payment.get("ФИО", "").strip().lower(), position)
+
+    def get_groups(self) -> List[Dict[str, Any]]:
+        """Группы города с числом учеников"""
+        return load_capacity_index(self.city_dir).get_groups(self.city_name)
+
+    def get_groups_statistics(self) -> Dict[str, Any]:
+        """Статистика по группам города"""
+        groups = self.get_groups()
+        total_students = sum(group.get("total_students", 0) for group in groups)
+        avg_students = total_students / len(groups) if groups else 0
+
+        return {
+            "total_groups": len(groups),
+            "total_students": total_students,
+            "avg_students": round(avg_students, 1),
+            "groups": groups
+        }
+
+    def get_group(self, group_id: str) -> Optional[Dict[str, Any]]:
+        """Группа по полному ID или None"""
+        for group in self.get_groups():
+            if group.get("group_id") == group_id:
+                return group
+        return None
+
+    def get_group_students(self, group_id: str) -> List[Dict[str, Any]]:
+        """Ученики группы"""
+        return self.students_by_group.get(group_id, [])
+
+    def get_student(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """Копия данных ученика (с group_name и group_id) или None"""
+        student = self.students_by_id.get(student_id)
+        return student.copy() if student else None
+
+    def get_payment(self, student_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Первая запись об оплате, совпадающая с учеником по ФИО или ID"""
+        positions = [
+            position for position in (
+                self._payment_by_fio.get(student_data.get("ФИО", "").strip().lower()),
+                self._payment_by_id.get(student_data.get("ID", "")) if student_data.get("ID") else None
+            )
+            if position is not None
+        ]
+        return self.payments[min(positions)] if positions else None
+
+
+# Кэш снимков: город -> (версия файлов, снимок)
+_models: Dict[str, Tuple[Tuple[Tuple[int, int], ...], CityReadModel]] = {}
+
+
+def _city_dir(city_name: str) -> Path:
+    return ROOT_DIR / f"data/{CITY_MAPPING.get(city_name, city_name)}"
+
+
+def get_read_model_version(city_name: str) -> Tuple[Tuple[int, int], ...]:
+    """Версия снимка города (время изменения и размер исходных файлов)"""
+    return _files_version(_city_dir(city_name))
+
+
+def get_city_read_model(city_name: str) -> CityReadModel:
+    """Снимок данных города (пересобирается при изменении файлов)"""
+    city_dir = _city_dir(city_name)
+    version = _files_version(city_dir)
+    cached = _models.get(city_name)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    model = CityReadModel(city_name, city_dir)
+    _models[city_name] = (version, model)
+    return model
+
+
+def get_group_students_page(city_name: str, group_id: str, page: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> Page:
+    """Страница учеников группы из общего пагинатора (ключ версии - снимок города)"""
+    return paginate(
+        ("group_students", city_name, group_id),
+        get_read_model_version(city_name),
+        lambda: get_city_read_model(city_name).get_group_students(group_id),
+        page,
+        page_size
+    )
@@ -0,0 +1,82 @@
+"""Мониторинг задержек цикла событий"""
+import asyncio
+import time
+from typing import Dict, Any, Optional
+
+
+class LoopLagMonitor:
+    """
+    Измеряет, насколько цикл событий опаздывает с пробуждением
+
+    Каждые interval секунд задача засыпает и сравнивает фактическое время
+    пробуждения с ожидаемым. Большая задержка означает, что какой-то обработчик
+    выполнял блокирующую работу (файлы, вычисления) прямо в цикле событий.
+    """
+
+    def __init__(self, interval: float = 0.5, warn_threshold: float = 0.25, report_interval: float = 600):
+        """
+        Args:
+            interval: Период измерения (секунды)
+            warn_threshold: Задержка, при которой печатается предупреждение (секунды)
+            report_interval: Период печати сводной статистики (секунды)
+        """
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.report_interval = report_interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.slow_ticks = 0
+        self.started_at: Optional[float] = None
+
+    def record(self, lag: float) -> None:
+        """Учитывает одно измерение задержки"""
+        self.samples += 1
+        self.total_lag += lag
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.warn_threshold:
+            self.slow_ticks += 1
+            print(f"🐢 Цикл событий заблокирован на {lag * 1000:.0f} мс")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Статистика задержек (в миллисекундах)"""
+        return {
+            "samples": self.samples,
+            "avg_lag_ms": round(self.total_lag / self.samples * 1000, 1) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "slow_ticks": self.slow_ticks,
+            "uptime_sec": round(time.monotonic() - self.started_at) if self.started_at else 0,
+        }
+
+    async def run(self) -> None:
+        """Бесконечный цикл измерений"""
+        self.started_at = time.monotonic()
+        next_report = self.started_at + self.report_interval
+        print(f"⏱️ Мониторинг цикла событий запущен (порог {self.warn_threshold * 1000:.0f} мс)")
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.record(max(0.0, now - expected))
+
+            if now >= next_report:
+                next_report = now + self.report_interval
+                metrics = self.get_metrics()
+                print(
+                    f"⏱️ Цикл событий: средняя задержка {metrics['avg_lag_ms']} мс, "
+                    f"максимальная {metrics['max_lag_ms']} мс, блокировок {metrics['slow_ticks']}"
+                )
+
+
+_loop_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Возвращает общий монитор цикла событий"""
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopLagMonitor()
+    return _loop_monitor
@@ -0,0 +1,162 @@
+"""
+Постраничный вывод длинных списков (клавиатуры и сообщения)
+
+Отсортированный список для запроса (например, ученики города в оплатах или
+сотрудники в рассылке) строится один раз и хранится по ключу запроса вместе с
+версией данных (время изменения файла, версия реестра ролей). Переход по
+страницам только берет срез готового списка; если версия изменилась, список
+строится заново. Хранится не больше MAX_RESULTS последних списков (LRU).
+
+fit_message собирает сообщение из блоков так, чтобы оно не превышало лимит
+Telegram (4096 символов): блоки, которые не поместились, не обрезаются
+посередине (иначе ломается HTML разметка), а отбрасываются целиком с пометкой.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+# Лимит длины сообщения Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Сколько отсортированных списков держать в памяти
+MAX_RESULTS = 100
+
+# Размер страницы по умолчанию
+DEFAULT_PAGE_SIZE = 10
+
+
+def file_version(path: Path) -> Tuple[int, int]:
+    """Версия файла для ключа кэша: время изменения и размер ((0, 0), если файла нет)"""
+    if not path.exists():
+        return 0, 0
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Page:
+    """Страница списка"""
+
+    def __init__(self, items: List[Any], page: int, page_size: int, total_items: int):
+        self.items = items
+        self.page = page
+        self.page_size = page_size
+        self.total_items = total_items
+
+    @property
+    def total_pages(self) -> int:
+        """Число страниц (хотя бы одна, даже для пустого списка)"""
+        return max((self.total_items + self.page_size - 1) // self.page_size, 1)
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.total_pages - 1
+
+
+class Paginator:
+    """LRU кэш отсортированных списков с выдачей страниц"""
+
+    def __init__(self, max_results: int = MAX_RESULTS):
+        self.max_results = max_results
+        # ключ запроса -> (версия данных, отсортированный список)
+        self._results: "OrderedDict[Hashable, Tuple[Any, List[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_results(self, query_key: Hashable, version: Any, build: Callable[[], List[Any]]) -> List[Any]:
+        """Весь отсортированный список запроса (build вызывается, если версия изменилась)"""
+        with self._lock:
+            cached = self._results.get(query_key)
+            if cached and cached[0] == version:
+                self._results.move_to_end(query_key)
+                return cached[1]
+
+        results = build()
+        with self._lock:
+            self._results[query_key] = (version, results)
+            self._results.move_to_end(query_key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return results
+
+    def get_page(
+        self,
+        query_key: Hashable,
+        version: Any,
+        build: Callable[[], List[Any]],
+        page: int = 0,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Page:
+        """Страница списка; номер страницы вне диапазона приводится к ближайшему допустимому"""
+        results = self.get_results(query_key, version, build)
+        total_pages = max((len(results) + page_size - 1) // page_size, 1)
+        page = min(max(page, 0), total_pages - 1)
+        start = page * page_size
+        return Page(results[start:start + page_size], page, page_size, len(results))
+
+    def invalidate(self, query_key: Optional[Hashable] = None) -> None:
+        """Сбрасывает список запроса (или все списки)"""
+        with self._lock:
+            if query_key is None:
+                self._results.clear()
+            else:
+                self._results.pop(query_key, None)
+
+
+_paginator: Optional[Paginator] = None
+
+
+def get_paginator() -> Paginator:
+    """Возвращает общий пагинатор"""
+    global _paginator
+    if _paginator is None:
+        _paginator = Paginator()
+    return _paginator
+
+
+def paginate(
+    query_key: Hashable,
+    version: Any,
+    build: Callable[[], List[Any]],
+    page: int = 0,
+    page_size: int = DEFAULT_PAGE_SIZE
+) -> Page:
+    """Страница списка из общего пагинатора"""
+    return get_paginator().get_page(query_key, version, build, page, page_size)
+
+
+def fit_message(
+    header: str,
+    blocks: List[str],
+    separator: str = "\n\n",
+    footer: str = "",
+    limit: int = TELEGRAM_MESSAGE_LIMIT
+) -> str:
+    """
+    Собирает сообщение из заголовка, блоков и подвала не длиннее limit
+
+    Блоки добавляются по порядку, пока помещаются; об остальных добавляется
+    пометка "... и еще N не поместились".
+    """
+    parts = [header] if header else []
+    length = len(header) + len(footer)
+
+    for position, block in enumerate(blocks):
+        omitted = len(blocks) - position - 1
+        # Резерв под пометку о пропущенных блоках, если после этого блока еще что-то есть
+        note_reserve = len(separator) + 40 if omitted else 0
+        added = len(block) + (len(separator) if parts else 0)
+        if length + added + note_reserve > limit:
+            parts.append(f"... и еще {len(blocks) - position} не поместились")
+            break
+        parts.append(block)
+        length += added
+
+    text = separator.join(parts)
+    if footer:
+        text += footer
+    return text[:limit]
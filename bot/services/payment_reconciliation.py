@@ -0,0 +1,147 @@
+"""
+Сверка учеников с таблицей оплат за месяц ("отчет по оплатам <город> <месяц>")
+
+Ученики и оплаты берутся из общего снимка города (bot/services/info_read_model.py),
+который уже используют меню информации и карточки оплат, поэтому повторные
+отчеты не перечитывают students.json и payments.json, пока они не изменились.
+Отчет формируется текстом и не зависит от платформы (используется VK ботом).
+"""
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from bot.config import ROOT_DIR, CITY_MAPPING
+from bot.services.info_read_model import get_city_read_model
+
+
+MONTH_NAMES = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+]
+
+# Папка города -> русское название (первое из CITY_MAPPING), чтобы снимок был общим
+_CITY_BY_FOLDER: Dict[str, str] = {}
+for _city_name, _city_en in CITY_MAPPING.items():
+    _CITY_BY_FOLDER.setdefault(_city_en, _city_name)
+
+
+def get_month_name(month_num: int) -> Optional[str]:
+    """Название месяца по номеру (1-12) или None"""
+    if 1 <= month_num <= 12:
+        return MONTH_NAMES[month_num - 1]
+    return None
+
+
+def _find_city_folders(city_name: str) -> Optional[List[str]]:
+    """
+    Папки городов для отчета: все папки для "все", иначе папка по названию
+    города (русскому или английскому, без учета регистра). None, если папки
+    с данными нет.
+    """
+    data_dir = ROOT_DIR / "data"
+    if not data_dir.is_dir():
+        return None
+
+    folders = sorted(item.name for item in data_dir.iterdir() if item.is_dir())
+    if city_name.lower() == "все":
+        return folders
+
+    target = city_name.lower()
+    for name, city_en in CITY_MAPPING.items():
+        if name.lower() == target and city_en in folders:
+            return [city_en]
+    return [folder for folder in folders if folder.lower() == target][:1]
+
+
+def process_city(city_folder: str, month: str) -> str:
+    """Текст сверки учеников и оплат одного города за месяц"""
+    city_dir = ROOT_DIR / "data" / city_folder
+    if not (city_dir / "students.json").exists() or not (city_dir / "payments.json").exists():
+        return f"Данные для города {city_folder} не найдены (отсутствует students.json или payments.json)."
+
+    model = get_city_read_model(_CITY_BY_FOLDER.get(city_folder, city_folder))
+
+    # Ученики по ID (порядок первого появления)
+    all_students: Dict[str, Dict[str, Any]] = {}
+    for students in model.students_by_group.values():
+        for student in students:
+            s_id = student.get("ID")
+            if s_id:
+                all_students[s_id] = {
+                    "name": student.get("ФИО", "Unknown"),
+                    "url": student.get("student_url", ""),
+                    "phone": student.get("Номер родителя", "")
+                }
+
+    # Записи оплат со статусом за месяц: по ID ученика и без ID
+    payments_with_id: Dict[str, Dict[str, Any]] = {}
+    payments_without_id: List[Dict[str, Any]] = []
+    for payment in model.payments:
+        p_record = {
+            "name": payment.get("ФИО", "Unknown"),
+            "url": payment.get("payment_url", ""),
+            "phone": payment.get("Phone", ""),
+            "status": payment.get("payments_data", {}).get(month)
+        }
+        s_id = payment.get("student_id")
+        if s_id:
+            payments_with_id[s_id] = p_record
+        else:
+            payments_without_id.append(p_record)
+
+    # Не оплатили: нет записи в оплатах или статус за месяц не "Оплатил"
+    not_paid_list = []
+    for s_id, s_data in all_students.items():
+        p_rec = payments_with_id.get(s_id)
+        if p_rec is None:
+            not_paid_list.append({**s_data, "reason": "Нет записи в таблице оплат"})
+        elif p_rec.get("status") != "Оплатил":
+            status = p_rec.get("status")
+            not_paid_list.append({**s_data, "reason": f"Статус: {status if status else 'Пусто'}"})
+
+    # Записи оплат без соответствующего ученика
+    missing_in_students = [p_data for s_id, p_data in payments_with_id.items() if s_id not in all_students]
+    missing_in_students.extend(payments_without_id)
+
+    output = [
+        f"Город: {city_folder}",
+        f"Месяц: {month}",
+        f"Ученики: {len(all_students)}",
+        f"Оплатили: {len(all_students) - len(not_paid_list)}",
+        f"Не оплатили: {len(not_paid_list)}",
+        "",
+    ]
+
+    if not_paid_list:
+        output.append("Список не оплативших:")
+        for s in not_paid_list:
+            output.append(f"{s['name']} ({s['phone']}) - {s.get('reason')} {s['url']}")
+    else:
+        output.append("Все ученики оплатили!")
+
+    output.append("")
+
+    if missing_in_students:
+        output.append("Отсутствуют в базе учеников (но есть в оплатах):")
+        for p in missing_in_students:
+            output.append(f"{p['name']} ({p['phone']}) {p['url']}")
+
+    return "\n".join(output)
+
+
+def generate_report(city_name: str, month: Optional[str] = None) -> str:
+    """Отчет сверки по городу (или "все") за месяц (по умолчанию текущий)"""
+    if not month:
+        month = get_month_name(datetime.now().month)
+    month = month.capitalize()
+
+    city_folders = _find_city_folders(city_name)
+    if city_folders is None:
+        return "Ошибка: Папка с данными не найдена."
+    if not city_folders and city_name.lower() != "все":
+        return f"Ошибка: Город '{city_name}' не найден."
+
+    report_lines = []
+    for city_folder in city_folders:
+        report_lines.append(process_city(city_folder, month))
+        report_lines.append("\n" + "-" * 20 + "\n")
+
+    return "".join(report_lines)
@@ -3,9 +3,16 @@ import json
 import re
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple, List
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from bot.config import ROOT_DIR, CITY_MAPPING
+from bot.services.info_read_model import get_city_read_model
+from bot.services.paginator import Page, file_version, paginate
+from bot.services.render_cache import get_render_cache
+from bot.services.file_io import run_file_io
 from src.CRUD.crud_payment import NotionPaymentUpdater
+from src.sync_data.attendance_matrix import load_city_matrices
+from src.sync_data.student_stats import payment_period
+from src.sync_data.sqlite_mirror import CRMMirror, DATASET_PAYMENTS, get_mirror
 
 
 class PaymentService:
@@ -13,6 +20,13 @@ class PaymentService:
     
     def __init__(self):
         self.root_dir = ROOT_DIR
+        self.mirror = get_mirror()
+    
+    def _get_mirror(self, city_en: str) -> Optional[CRMMirror]:
+        """Зеркало SQLite, если оно включено и оплаты города в него загружены"""
+        if self.mirror and self.mirror.has_city(city_en, DATASET_PAYMENTS):
+            return self.mirror
+        return None
     
     def get_current_month(self, city_name: str) -> str:
         """Получает текущий месяц на русском"""
@@ -35,32 +49,12 @@ class PaymentService:
             Словарь с информацией об оплате или None
         """
         city_en = CITY_MAPPING.get(city_name, city_name)
-        payments_path = self.root_dir / f"data/{city_en}/payments.json"
+        mirror = self._get_mirror(city_en)
+        if mirror:
+            return mirror.get_payment(city_en, student_data.get("ID", ""), student_data.get("ФИО", ""))
         
-        if not payments_path.exists():
-            return None
-        
-        try:
-            with open(payments_path, "r", encoding="utf-8") as f:
-                payments_data = json.load(f)
-            
-            student_fio = student_data.get("ФИО", "").strip().lower()
-            student_id = student_data.get("ID", "")
-            
-            payments_list = payments_data.get("payments", [])
-            
-            # Ищем по ФИО или student_id
-            for payment in payments_list:
-                payment_fio = payment.get("ФИО", "").strip().lower()
-                payment_student_id = payment.get("student_id", "")
-                
-                if payment_fio == student_fio or payment_student_id == student_id:
-                    return payment
-            
-            return None
-        except Exception as e:
-            print(f"Ошибка загрузки информации об оплате: {e}")
-            return None
+        # Поиск по ФИО или student_id в снимке payments.json
+        return get_city_read_model(city_name).get_payment(student_data)
     
     def get_payment_status_for_month(self, payment_data: Optional[Dict[str, Any]], month: str) -> str:
         """
@@ -155,6 +149,11 @@ class PaymentService:
             city_en = CITY_MAPPING.get(city_name, city_name)
             updater = NotionPaymentUpdater(city_en)
             await updater.mark_payment(student_identifier, status, month)
+            # Построчное обновление зеркала (до следующей синхронизации)
+            mirror = await run_file_io(self._get_mirror, city_en)
+            if mirror:
+                await run_file_io(mirror.set_payment_status, city_en, student_identifier, month, status)
+            get_render_cache().invalidate_city(city_name)
             return True
         except Exception as e:
             print(f"❌ Ошибка обновления статуса оплаты: {e}")
@@ -182,6 +181,10 @@ class PaymentService:
             city_en = CITY_MAPPING.get(city_name, city_name)
             updater = NotionPaymentUpdater(city_en)
             await updater.update_comment(student_identifier, comment)
+            mirror = await run_file_io(self._get_mirror, city_en)
+            if mirror:
+                await run_file_io(mirror.set_payment_comment, city_en, student_identifier, comment)
+            get_render_cache().invalidate_city(city_name)
             return True
         except Exception as e:
             print(f"❌ Ошибка обновления комментария: {e}")
@@ -235,6 +238,22 @@ class PaymentService:
             print(f"Ошибка загрузки учеников для города {city_name}: {e}")
             return []
     
+    def get_city_students_page(self, city_name: str, page: int = 0, page_size: int = 10) -> Page:
+        """
+        Страница отсортированного списка учеников города
+
+        Список строится один раз на версию students.json, страницы берутся срезом.
+        """
+        city_en = CITY_MAPPING.get(city_name, city_name)
+        students_path = self.root_dir / f"data/{city_en}/students.json"
+        return paginate(
+            ("payment_students", city_en),
+            file_version(students_path),
+            lambda: self.get_city_students(city_name),
+            page,
+            page_size
+        )
+    
     def get_student_by_id(self, city_name: str, student_id: str) -> Optional[Dict[str, Any]]:
         """
         Получает данные ученика по ID
@@ -264,6 +283,10 @@ class PaymentService:
             Словарь {student_id: status}
         """
         city_en = CITY_MAPPING.get(city_name, city_name)
+        mirror = self._get_mirror(city_en)
+        if mirror:
+            return mirror.get_payment_statuses(city_en, student_ids, self.get_current_month(city_name))
+        
         payments_path = self.root_dir / f"data/{city_en}/payments.json"
         
         if not payments_path.exists():
@@ -301,71 +324,27 @@ class PaymentService:
             return int(match.group(1))
         return 1
     
-    def _calculate_student_attendance_stats(
+    def get_payment_period(
         self,
-        attendance_data: Dict[str, str],
-        date_fields: List[str],
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> Dict[str, int]:
-        """Рассчитывает статистику посещаемости ученика"""
-        stats = {
-            "total": 0,
-            "present": 0,
-            "late": 0,
-            "absent": 0,
-            "absent_reason": 0
-        }
-        
-        for date_key, status in attendance_data.items():
-            try:
-                date_str = date_key.strip()
-                try:
-                    date_obj = datetime.strptime(date_str, "%d.%m.%Y")
-                except ValueError:
-                    date_obj = datetime.strptime(date_str.strip(), "%d.%m.%Y")
-                
-                # Проверяем границы дат
-                if start_date:
-                    start_date_only = datetime(start_date.year, start_date.month, start_date.day)
-                    date_obj_only = datetime(date_obj.year, date_obj.month, date_obj.day)
-                    if date_obj_only < start_date_only:
-                        continue
-                if end_date:
-                    end_date_only = datetime(end_date.year, end_date.month, end_date.day)
-                    date_obj_only = datetime(date_obj.year, date_obj.month, date_obj.day)
-                    if date_obj_only > end_date_only:
-                        continue
-                
-                # Проверяем, есть ли эта дата в date_fields
-                if date_fields:
-                    date_found = False
-                    for df in date_fields:
-                        if df.strip() == date_str.strip():
-                            date_found = True
-                            break
-                    if not date_found:
-                        continue
-                
-                status_clean = str(status).strip()
-                if not status_clean:
-                    continue
-                
-                stats["total"] += 1
-                
-                if status_clean.lower() == "присутствовал":
-                    stats["present"] += 1
-                elif status_clean.lower() == "опоздал":
-                    stats["late"] += 1
-                    stats["present"] += 1  # Опоздал тоже считается присутствием
-                elif status_clean.lower() == "отсутствовал по причине":
-                    stats["absent_reason"] += 1
-                elif status_clean.lower() == "отсутствовал":
-                    stats["absent"] += 1
-            except (ValueError, AttributeError):
-                continue
-        
-        return stats
+        payment_date_str: str = "",
+        now: Optional[datetime] = None
+    ) -> Tuple[datetime, datetime]:
+        """
+        Определяет текущий период оплаты ученика на основе дня оплаты
+        
+        Args:
+            payment_date_str: Дата оплаты (например, "17 числа")
+            now: Текущий момент (по умолчанию datetime.now())
+        
+        Returns:
+            Tuple[начало_периода, начало_следующего_периода]
+        """
+        payment_day = self._parse_payment_date(payment_date_str)
+        if now is None:
+            now = datetime.now()
+        
+        month_start, next_month_start = payment_period(payment_day, now.date())
+        return datetime.combine(month_start, time()), datetime.combine(next_month_start, time())
     
     def get_student_monthly_attendance(
         self,
@@ -385,70 +364,43 @@ class PaymentService:
             Tuple[строка_периода, статистика]
         """
         city_en = CITY_MAPPING.get(city_name, city_name)
-        attendance_path = self.root_dir / f"data/{city_en}/attendance.json"
-        
-        if not attendance_path.exists():
-            return "период не определен", {"total": 0, "present": 0, "late": 0, "absent": 0, "absent_reason": 0}
+        empty_stats = {"total": 0, "present": 0, "late": 0, "absent": 0, "absent_reason": 0}
         
         try:
-            with open(attendance_path, "r", encoding="utf-8") as f:
-                attendance_data = json.load(f)
+            # Ищем ученика в матрицах посещаемости (по группам)
+            matrices = load_city_matrices(self.root_dir / f"data/{city_en}")
             
-            # Ищем ученика в данных посещаемости
-            for group_id, group_info in attendance_data.items():
-                attendance_records = group_info.get("attendance", [])
-                date_fields = group_info.get("fields", [])[2:]  # Пропускаем № и ФИО
+            for group_id, matrix in matrices.items():
+                idx = matrix.student_index(student_id)
+                if idx is None:
+                    continue
+                
+                # Определяем период месяца на основе дня оплаты
+                month_start, next_month_start = self.get_payment_period(payment_date_str)
+                
+                # Для расчета статистики учитываем только до текущей даты
+                month_end_for_stats = min(datetime.now(), next_month_start - timedelta(days=1))
+                
+                stats = matrix.counts(idx, month_start.date(), month_end_for_stats.date())
+                
+                # Формируем строку периода
+                month_names = {
+                    1: "января", 2: "февраля", 3: "марта", 4: "апреля",
+                    5: "мая", 6: "июня", 7: "июля", 8: "августа",
+                    9: "сентября", 10: "октября", 11: "ноября", 12: "декабря"
+                }
+                
+                current_month_name = month_names[month_start.month]
+                next_month_name = month_names[next_month_start.month]
+                
+                period_str = f"с {month_start.strftime('%d')} {current_month_name} до {next_month_start.strftime('%d')} {next_month_name}"
                 
-                for record in attendance_records:
-                    if record.get("student_id") == student_id:
-                        att_data = record.get("attendance", {})
-                        
-                        # Определяем период месяца на основе дня оплаты
-                        payment_day = self._parse_payment_date(payment_date_str)
-                        now = datetime.now()
-                        today_day = now.day
-                        
-                        if today_day >= payment_day:
-                            # День оплаты уже прошел - считаем текущий период оплаты
-                            month_start = datetime(now.year, now.month, min(payment_day, 28))
-                            if now.month == 12:
-                                next_month_start = datetime(now.year + 1, 1, min(payment_day, 28))
-                            else:
-                                next_month_start = datetime(now.year, now.month + 1, min(payment_day, 28))
-                        else:
-                            # День оплаты еще не наступил - считаем предыдущий период оплаты
-                            if now.month == 1:
-                                month_start = datetime(now.year - 1, 12, min(payment_day, 28))
-                                next_month_start = datetime(now.year, 1, min(payment_day, 28))
-                            else:
-                                month_start = datetime(now.year, now.month - 1, min(payment_day, 28))
-                                next_month_start = datetime(now.year, now.month, min(payment_day, 28))
-                        
-                        # Для расчета статистики учитываем только до текущей даты
-                        month_end_for_stats = min(now, next_month_start - timedelta(days=1))
-                        
-                        stats = self._calculate_student_attendance_stats(
-                            att_data, date_fields, month_start, month_end_for_stats
-                        )
-                        
-                        # Формируем строку периода
-                        month_names = {
-                            1: "января", 2: "февраля", 3: "марта", 4: "апреля",
-                            5: "мая", 6: "июня", 7: "июля", 8: "августа",
-                            9: "сентября", 10: "октября", 11: "ноября", 12: "декабря"
-                        }
-                        
-                        current_month_name = month_names[month_start.month]
-                        next_month_name = month_names[next_month_start.month]
-                        
-                        period_str = f"с {month_start.strftime('%d')} {current_month_name} до {next_month_start.strftime('%d')} {next_month_name}"
-                        
-                        return period_str, stats
+                return period_str, stats
             
-            return "период не определен", {"total": 0, "present": 0, "late": 0, "absent": 0, "absent_reason": 0}
+            return "период не определен", empty_stats
         except Exception as e:
             print(f"Ошибка расчета посещаемости: {e}")
-            return "период не определен", {"total": 0, "present": 0, "late": 0, "absent": 0, "absent_reason": 0}
+            return "период не определен", empty_stats
     
     def format_student_info_with_payment_and_attendance(
         self,
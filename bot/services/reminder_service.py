@@ -9,6 +9,8 @@ from bot.services.role_storage import RoleStorage
 from bot.services.attendance_service import AttendanceService
 from bot.services.payment_service import PaymentService
 from src.CRUD.crud_attendance import NotionAttendanceUpdater
+from src.sync_data.attendance_matrix import ABSENT, load_city_matrices, normalize_date_key
+from src.sync_data.payments_calendar import get_due_entries, load_payments_calendar
 
 
 class ReminderService:
@@ -34,12 +36,39 @@ class ReminderService:
     # Время напоминаний о необработанных учениках
     UNPROCESSED_STUDENTS_REMINDER_TIME = time(10, 0)
     
+    # Максимальная длина списка учеников на одной странице напоминания о платежах
+    # (с заголовком и статистикой сообщение остается в пределах 4096 символов Telegram)
+    PAYMENT_REMINDER_PAGE_CHARS = 3500
+    
+    # Файлы города, от которых зависят напоминания о платежах
+    SNAPSHOT_FILES = (
+        "payments.json", "students.json", "attendance.json",
+        "payments_calendar.json", "attendance_matrix.json"
+    )
+    
     def __init__(self):
         self.root_dir = ROOT_DIR
         self.role_storage = RoleStorage()
         self.attendance_service = AttendanceService()
         self.attendance_updater = NotionAttendanceUpdater()
         self.payment_service = PaymentService()
+        # Кэш напоминаний о платежах: (дата, версия данных) -> ученики по категориям
+        self._upcoming_cache: Dict[Tuple[str, tuple], Dict[int, List[Dict[str, any]]]] = {}
+        # Кэш страниц категорий: (дата, категория, версия данных) -> список страниц
+        self._category_pages_cache: Dict[Tuple[str, int, tuple], List[str]] = {}
+    
+    def get_snapshot_version(self) -> tuple:
+        """
+        Версия локальных данных оплат и посещаемости (время изменения файлов всех городов).
+        Меняется при каждой синхронизации, что сбрасывает кэши напоминаний.
+        """
+        version = []
+        for city_name in CITIES:
+            city_dir = self.root_dir / f"data/{CITY_MAPPING.get(city_name, city_name)}"
+            for filename in self.SNAPSHOT_FILES:
+                path = city_dir / filename
+                version.append(path.stat().st_mtime if path.exists() else 0)
+        return tuple(version)
     
     def parse_schedule(self, group_name: str) -> Optional[Tuple[List[int], str]]:
         """
@@ -275,17 +304,6 @@ class ReminderService:
         now = datetime.now().time()
         return now.hour == self.UNPROCESSED_STUDENTS_REMINDER_TIME.hour and now.minute == self.UNPROCESSED_STUDENTS_REMINDER_TIME.minute
     
-    def _parse_payment_date(self, payment_date_str: str) -> int:
-        """Извлекает число из строки типа '27 числа' или '6 числа'"""
-        if not payment_date_str:
-            return 0
-        
-        # Убираем пробелы и ищем число
-        match = re.search(r'(\d+)', payment_date_str)
-        if match:
-            return int(match.group(1))
-        return 0
-    
     def _should_include_student(self, payment_data: Dict[str, any], city_name: str) -> bool:
         """
         Проверяет, должен ли ученик быть включен в отчет о предстоящих платежах
@@ -320,61 +338,6 @@ class ReminderService:
         # Включаем если пусто или "Не оплатил"
         return True
     
-    def _calculate_days_until_payment(self, payment_day: int, today: datetime) -> Optional[int]:
-        """
-        Вычисляет количество дней до ближайшей даты оплаты
-        
-        Args:
-            payment_day: День месяца оплаты (1-31)
-            today: Текущая дата
-        
-        Returns:
-            Количество дней до оплаты (0-3) или None если оплата не в ближайшие 3 дня
-        """
-        if payment_day <= 0:
-            return None
-        
-        today_date = today.date()
-        current_month = today_date.month
-        current_year = today_date.year
-        current_day = today_date.day
-        
-        # Вычисляем дату оплаты в текущем месяце
-        try:
-            payment_date_current_month = datetime(current_year, current_month, payment_day).date()
-        except ValueError:
-            # Если дня нет в этом месяце (например, 31 в феврале), пропускаем
-            return None
-        
-        # Вычисляем дату оплаты в следующем месяце
-        if current_month == 12:
-            next_month = 1
-            next_year = current_year + 1
-        else:
-            next_month = current_month + 1
-            next_year = current_year
-        
-        try:
-            payment_date_next_month = datetime(next_year, next_month, payment_day).date()
-        except ValueError:
-            # Если дня нет в следующем месяце, пропускаем
-            return None
-        
-        # Выбираем ближайшую дату оплаты
-        if payment_date_current_month >= today_date:
-            payment_date = payment_date_current_month
-        else:
-            payment_date = payment_date_next_month
-        
-        # Вычисляем разницу в днях
-        days_diff = (payment_date - today_date).days
-        
-        # Возвращаем только если оплата в ближайшие 3 дня (0, 1, 2, 3)
-        if 0 <= days_diff <= 3:
-            return days_diff
-        
-        return None
-    
     def get_students_with_upcoming_payments(self) -> Dict[int, List[Dict[str, any]]]:
         """
         Получает список всех учеников с предстоящими оплатами (сегодня, через 1, 2, 3 дня)
@@ -382,6 +345,10 @@ class ReminderService:
         Returns:
             Словарь {days: [students]} где days - количество дней до оплаты (0, 1, 2, 3)
         """
+        cache_key = (datetime.now().strftime("%Y-%m-%d"), self.get_snapshot_version())
+        if cache_key in self._upcoming_cache:
+            return self._upcoming_cache[cache_key]
+        
         students_by_days = {
             0: [],  # Сегодня
             1: [],  # Через 1 день
@@ -389,82 +356,61 @@ class ReminderService:
             3: []   # Через 3 дня
         }
         
-        today = datetime.now()
+        today = datetime.now().date()
         
         # Проходим по всем городам
         for city_name in CITIES:
             city_en = CITY_MAPPING.get(city_name, city_name)
-            payments_path = self.root_dir / f"data/{city_en}/payments.json"
-            
-            if not payments_path.exists():
-                continue
             
             try:
-                with open(payments_path, "r", encoding="utf-8") as f:
-                    payments_data = json.load(f)
-                
-                payments_list = payments_data.get("payments", [])
-                
-                # Получаем всех учеников города для получения данных
-                students = self.payment_service.get_city_students(city_name)
-                students_dict = {s.get("ID"): s for s in students}
+                # Календарь оплат строится при синхронизации: день месяца -> ученики
+                payments_calendar = load_payments_calendar(self.root_dir / f"data/{city_en}")
+                if not payments_calendar:
+                    continue
                 
-                for payment in payments_list:
-                    payment_date_str = payment.get("Дата оплаты", "")
-                    if not payment_date_str:
-                        continue
-                    
-                    # Проверяем, должен ли ученик быть включен в отчет
-                    if not self._should_include_student(payment, city_name):
-                        continue
+                for days_until_payment in students_by_days:
+                    target_date = today + timedelta(days=days_until_payment)
                     
-                    payment_day = self._parse_payment_date(payment_date_str)
-                    
-                    # Вычисляем количество дней до оплаты
-                    days_until_payment = self._calculate_days_until_payment(payment_day, today)
-                    
-                    if days_until_payment is not None:
-                        student_id = payment.get("student_id", "")
-                        fio = payment.get("ФИО", "").strip()
-                        
-                        # Получаем данные ученика
-                        student_data = students_dict.get(student_id, {})
-                        if not student_data:
-                            # Если не нашли по ID, ищем по ФИО
-                            for s in students:
-                                if s.get("ФИО", "").strip().lower() == fio.lower():
-                                    student_data = s
-                                    break
+                    for entry in get_due_entries(payments_calendar, target_date):
+                        # Проверяем, должен ли ученик быть включен в отчет
+                        if not self._should_include_student(entry["payment_data"], city_name):
+                            continue
                         
                         students_by_days[days_until_payment].append({
                             "city": city_name,
-                            "fio": fio,
-                            "payment_date": payment_date_str,
-                            "student_id": student_id,
-                            "student_data": student_data,
-                            "payment_data": payment
+                            **entry
                         })
             except Exception as e:
                 print(f"❌ Ошибка при обработке города {city_name}: {e}")
                 continue
         
+        # Храним только актуальную версию
+        self._upcoming_cache = {cache_key: students_by_days}
         return students_by_days
     
-    def format_payment_reminder_category(
-        self, 
-        students_by_days: Dict[int, List[Dict[str, any]]], 
+    def get_payment_reminder_pages(
+        self,
+        students_by_days: Dict[int, List[Dict[str, any]]],
         category: int
-    ) -> str:
+    ) -> List[str]:
         """
-        Форматирует сообщение о предстоящих платежах для одной категории
+        Форматирует категорию напоминания о платежах, разбитую на страницы
+        
+        Страницы кэшируются по (дата, категория, версия данных), поэтому посещаемость
+        учеников пересчитывается только после синхронизации или на следующий день.
+        students_by_days должен быть получен из get_students_with_upcoming_payments().
         
         Args:
             students_by_days: Словарь {days: [students]} где days - количество дней до оплаты
             category: Категория для отображения (0-3)
             
         Returns:
-            Отформатированное сообщение для категории
+            Список страниц (минимум одна)
         """
+        cache_key = (datetime.now().strftime("%Y-%m-%d"), category, self.get_snapshot_version())
+        if cache_key in self._category_pages_cache:
+            return self._category_pages_cache[cache_key]
+        
         # Заголовки для каждого периода
         day_labels = {
             0: "Сегодня:",
@@ -476,9 +422,11 @@ class ReminderService:
         students = students_by_days.get(category, [])
         
         if not students:
-            return f"{day_labels[category]}\nНет учеников"
+            return [f"{day_labels[category]}\nНет учеников"]
         
+        pages = []
         lines = [day_labels[category]]
+        page_length = len(lines[0])
         
         # Добавляем учеников этой категории
         for student_info in students:
@@ -506,9 +454,78 @@ class ReminderService:
             
             # Форматируем строку ученика
             student_line = f"<code>{city} {fio}</code> - {payment_date_formatted} {attendance_str}"
+            
+            # Начинаем новую страницу, если строка не помещается
+            if len(lines) > 1 and page_length + len(student_line) + 1 > self.PAYMENT_REMINDER_PAGE_CHARS:
+                pages.append("\n".join(lines))
+                lines = [day_labels[category]]
+                page_length = len(lines[0])
+            
             lines.append(student_line)
+            page_length += len(student_line) + 1
+        
+        pages.append("\n".join(lines))
+        
+        # Храним страницы только актуальной версии данных
+        self._category_pages_cache = {
+            key: value for key, value in self._category_pages_cache.items()
+            if key[0] == cache_key[0] and key[2] == cache_key[2]
+        }
+        self._category_pages_cache[cache_key] = pages
+        return pages
+    
+    def format_payment_reminder_category(
+        self, 
+        students_by_days: Dict[int, List[Dict[str, any]]], 
+        category: int,
+        page: int = 0
+    ) -> str:
+        """
+        Форматирует сообщение о предстоящих платежах для одной категории
         
-        return "\n".join(lines)
+        Args:
+            students_by_days: Словарь {days: [students]} где days - количество дней до оплаты
+            category: Категория для отображения (0-3)
+            page: Номер страницы (начинается с 0)
+            
+        Returns:
+            Отформатированное сообщение для категории
+        """
+        pages = self.get_payment_reminder_pages(students_by_days, category)
+        return pages[min(max(page, 0), len(pages) - 1)]
+    
+    def format_payment_reminder_message(
+        self,
+        students_by_days: Dict[int, List[Dict[str, any]]],
+        category: int,
+        page: int = 0
+    ) -> str:
+        """
+        Формирует полное сообщение напоминания о платежах: статистика по категориям
+        и страница выбранной категории
+        """
+        day_labels = {
+            0: "Сегодня",
+            1: "Через 1 день",
+            2: "Через 2 дня",
+            3: "Через 3 дня"
+        }
+        
+        stats_lines = []
+        for days in [0, 1, 2, 3]:
+            count = len(students_by_days.get(days, []))
+            if count > 0:
+                stats_lines.append(f"{day_labels[days]}: {count} ученик(ов)")
+        
+        stats_text = "\n".join(stats_lines) if stats_lines else "Нет учеников"
+        
+        category_text = self.format_payment_reminder_category(students_by_days, category, page)
+        
+        return (
+            f"🔔 <b>Напоминание о предстоящих платежах</b>\n\n"
+            f"{stats_text}\n\n"
+            f"{category_text}"
+        )
     
     def _parse_date_field(self, date_str: str) -> Optional[datetime]:
         """
@@ -520,13 +537,8 @@ class ReminderService:
         Returns:
             Объект datetime или None если не удалось распарсить
         """
-        try:
-            # Убираем пробелы
-            date_str = date_str.strip()
-            # Парсим дату
-            return datetime.strptime(date_str, "%d.%m.%Y")
-        except (ValueError, AttributeError):
-            return None
+        iso_date = normalize_date_key(date_str)
+        return datetime.fromisoformat(iso_date) if iso_date else None
     
     def get_students_with_two_absent_marks(self) -> List[Dict[str, any]]:
         """
@@ -542,42 +554,15 @@ class ReminderService:
         # Проходим по всем городам
         for city_name in CITIES:
             city_en = CITY_MAPPING.get(city_name, city_name)
-            attendance_path = self.root_dir / f"data/{city_en}/attendance.json"
-            
-            if not attendance_path.exists():
-                continue
             
             try:
-                with open(attendance_path, "r", encoding="utf-8") as f:
-                    attendance_data = json.load(f)
+                # Матрицы посещаемости строятся при синхронизации: даты уже разобраны и отсортированы
+                matrices = load_city_matrices(self.root_dir / f"data/{city_en}")
                 
-                # Проходим по всем группам
-                for group_id, group_info in attendance_data.items():
-                    group_name = group_info.get("group_name", "")
-                    attendance_records = group_info.get("attendance", [])
-                    date_fields = group_info.get("fields", [])
-                    
-                    # Фильтруем только поля с датами (исключаем "№" и "ФИО")
-                    date_fields_only = [
-                        field for field in date_fields 
-                        if field not in ("№", "ФИО")
-                    ]
-                    
-                    # Парсим даты и сортируем по убыванию (самые свежие первыми)
-                    parsed_dates = []
-                    for date_str in date_fields_only:
-                        parsed_date = self._parse_date_field(date_str)
-                        if parsed_date:
-                            parsed_dates.append((parsed_date, date_str))
-                    
-                    # Сортируем по дате (от новых к старым)
-                    parsed_dates.sort(key=lambda x: x[0], reverse=True)
-                    
-                    # Проходим по каждому ученику
-                    for record in attendance_records:
-                        student_id = record.get("student_id", "")
-                        fio = record.get("ФИО", "").strip()
-                        attendance_dict = record.get("attendance", {})
+                for group_id, matrix in matrices.items():
+                    for idx, student in enumerate(matrix.students):
+                        student_id = student.get("student_id", "")
+                        fio = student.get("ФИО", "")
                         
                         if not student_id or not fio:
                             continue
@@ -586,38 +571,20 @@ class ReminderService:
                         if student_id in seen_student_ids:
                             continue
                         
-                        # Получаем последние 2 отметки посещаемости (по дате)
-                        last_two_marks = []
-                        for parsed_date, date_str in parsed_dates:
-                            if date_str in attendance_dict:
-                                status = attendance_dict[date_str]
-                                if status:
-                                    # Нормализуем статус (убираем пробелы, приводим к нижнему регистру)
-                                    status_clean = str(status).strip().lower()
-                                    last_two_marks.append((date_str, status_clean))
-                                    
-                                    # Нам нужно только последние 2 отметки
-                                    if len(last_two_marks) >= 2:
-                                        break
-                        
-                        # Проверяем, есть ли хотя бы 2 отметки
-                        if len(last_two_marks) < 2:
-                            continue
-                        
-                        # Проверяем, обе ли последние отметки - "Отсутствовал"
+                        # Последние 2 непустые отметки должны быть "Отсутствовал"
                         # Важно: "Отсутствовал по причине" НЕ считается как "Отсутствовал"
-                        first_status = last_two_marks[0][1]  # Самая последняя отметка
-                        second_status = last_two_marks[1][1]  # Предпоследняя отметка
+                        if matrix.trailing_streak(idx, ABSENT) < 2:
+                            continue
                         
-                        if first_status == "отсутствовал" and second_status == "отсутствовал":
-                            students_with_absent.append({
-                                "city": city_name,
-                                "fio": fio,
-                                "student_id": student_id,
-                                "group_name": group_name,
-                                "last_two_dates": [last_two_marks[0][0], last_two_marks[1][0]]
-                            })
-                            seen_student_ids.add(student_id)
+                        last_two_marks = matrix.last_marks(idx, 2)
+                        students_with_absent.append({
+                            "city": city_name,
+                            "fio": fio,
+                            "student_id": student_id,
+                            "group_name": matrix.group_name,
+                            "last_two_dates": [last_two_marks[0][0], last_two_marks[1][0]]
+                        })
+                        seen_student_ids.add(student_id)
                             
             except Exception as e:
                 print(f"❌ Ошибка при обработке города {city_name}: {e}")
@@ -0,0 +1,102 @@
+"""
+Кэш отрисованных сообщений (карточки учеников, списки учеников групп)
+
+Готовый текст (или текст с клавиатурой) хранится по ключу
+(вид, русское название города, ID сущности) вместе с версией данных, на которой он построен:
+время изменения файлов города и текущая дата (периоды оплаты и "последние
+30 дней" зависят от нее). Если версия изменилась, сообщение рисуется заново.
+Ключ - русское название, а не папка: несколько городов могут делить одну
+папку данных (ШК22Н и ШК4Н), но карточки и списки у них разные.
+
+Запись оплаты и посещаемости уходит в Notion и зеркало SQLite, не меняя файлы
+города, поэтому после нее (и после синхронизации) сервисы вызывают
+invalidate_city. Хранится не больше MAX_RENDERED последних сообщений (LRU),
+поэтому часто открываемые ученики отдаются из кэша. Кэшем можно пользоваться
+и из пула файловых операций (доступ к словарю под блокировкой).
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Optional, Tuple
+from bot.config import ROOT_DIR, CITY_MAPPING
+
+
+# Сколько отрисованных сообщений держать в памяти
+MAX_RENDERED = 500
+
+# Файлы города, из которых рисуются карточки и списки
+CITY_FILES = (
+    "students.json", "payments.json", "attendance.json", "attendance_matrix.json",
+    "student_stats.json", "groups.json", "capacity.json"
+)
+
+
+class RenderCache:
+    """LRU кэш отрисованных сообщений с версией данных города"""
+
+    def __init__(self, max_entries: int = MAX_RENDERED):
+        self.max_entries = max_entries
+        # (вид, город, ID) -> (версия данных, отрисованное сообщение)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Tuple[Any, ...], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def data_version(self, city_en: str) -> Tuple[Any, ...]:
+        """Версия данных города: файлы и текущая дата"""
+        city_dir = ROOT_DIR / f"data/{city_en}"
+        files = []
+        for filename in CITY_FILES:
+            path = city_dir / filename
+            if path.exists():
+                stat = path.stat()
+                files.append((stat.st_mtime_ns, stat.st_size))
+            else:
+                files.append((0, 0))
+        return tuple(files), date.today().isoformat()
+
+    def get_or_render(self, view: str, city_name: str, entity_id: str, render: Callable[[], Any]) -> Any:
+        """Сообщение из кэша или отрисованное заново (render вызывается без аргументов)"""
+        key = (view, city_name, entity_id)
+        version = self.data_version(CITY_MAPPING.get(city_name, city_name))
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] == version:
+                self._entries.move_to_end(key)
+                return cached[1]
+
+        rendered = render()
+        with self._lock:
+            self._entries[key] = (version, rendered)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def invalidate_city(self, city_name: str) -> None:
+        """Сбрасывает все сообщения города по русскому названию (после записи или синхронизации)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == city_name]:
+                del self._entries[key]
+
+    def invalidate_all(self) -> None:
+        """Сбрасывает все сообщения (после синхронизации всех городов)"""
+        with self._lock:
+            self._entries.clear()
+
+
+_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> RenderCache:
+    """Возвращает общий кэш отрисованных сообщений"""
+    global _cache
+    if _cache is None:
+        _cache = RenderCache()
+    return _cache
+
+
+def render_cached(view: str, city_name: str, entity_id: str, render: Callable[[], Any]) -> Any:
+    """Сообщение из общего кэша (без ID сущности рисуется без кэша)"""
+    if not entity_id:
+        return render()
+    return get_render_cache().get_or_render(view, city_name, entity_id, render)
@@ -0,0 +1,197 @@
+"""Материализованные отчеты: вычисляются один раз на версию данных"""
+import hashlib
+import json
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from bot.config import ROOT_DIR, CITY_MAPPING, CITIES
+from bot.services.report_service import ReportService
+from bot.services.report_payments import generate_payments_report
+
+
+class ReportCache:
+    """
+    Кэш отчетов по городам и по всем городам
+
+    Версия данных - время изменения файлов города (их перезаписывают синхронизация
+    и локальные изменения), поэтому отчет пересчитывается только после изменения
+    данных. Готовые отчеты хранятся в памяти и на диске (data/report_cache/),
+    вместе с файлами Excel/CSV, и переживают перезапуск бота.
+
+    Методы блокирующие и рассчитаны на вызов из потока (asyncio.to_thread):
+    одинаковые отчеты, запрошенные одновременно, строятся один раз.
+    """
+
+    # Файлы города, от которых зависят отчеты
+    CITY_FILES = (
+        "groups.json", "students.json", "attendance.json", "attendance_matrix.json",
+        "main_page_info.json", "payments.json"
+    )
+
+    def __init__(self, cache_dir: Path = None):
+        self.root_dir = ROOT_DIR
+        self.cache_dir = cache_dir or ROOT_DIR / "data" / "report_cache"
+        self.report_service = ReportService()
+        # Кэш в памяти: ключ отчета -> (версия данных, отчет)
+        self._memory: Dict[str, Tuple[List[Any], Any]] = {}
+        # Блокировки построения по ключу отчета
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def get_data_version(self, city_names: List[str]) -> List[float]:
+        """Версия данных городов: время изменения файлов каждого города"""
+        version = []
+        for city_name in city_names:
+            city_dir = self.root_dir / f"data/{CITY_MAPPING.get(city_name, city_name)}"
+            for filename in self.CITY_FILES:
+                path = city_dir / filename
+                version.append(path.stat().st_mtime if path.exists() else 0)
+        return version
+
+    def _cache_path(self, key: str) -> Path:
+        """Файл отчета на диске"""
+        return self.cache_dir / f"{key.replace(':', '_')}.json"
+
+    def _load_from_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Загружает сохраненный отчет"""
+        path = self._cache_path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Ошибка загрузки кэша отчета {key}: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, version: List[Any], value: Any) -> None:
+        """Сохраняет отчет на диск (атомарная запись)"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._cache_path(key)
+            temp_file = path.with_suffix('.tmp')
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": version,
+                    "built_at": datetime.now().isoformat(),
+                    "value": value,
+                }, f, ensure_ascii=False)
+            temp_file.replace(path)
+        except Exception as e:
+            print(f"⚠️ Ошибка при сохранении кэша отчета {key}: {e}")
+
+    def get_or_build(self, key: str, version: List[Any], builder: Callable[[], Any]) -> Any:
+        """
+        Возвращает отчет из кэша или строит его
+
+        Args:
+            key: Ключ отчета
+            version: Версия данных, при изменении которой отчет строится заново
+            builder: Функция построения отчета (результат должен сериализоваться в JSON)
+        """
+        cached = self._memory.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            # Пока ждали блокировку, отчет мог построить другой поток
+            cached = self._memory.get(key)
+            if cached and cached[0] == version:
+                return cached[1]
+
+            stored = self._load_from_disk(key)
+            if stored and stored.get("version") == version:
+                self._memory[key] = (version, stored["value"])
+                return stored["value"]
+
+            value = builder()
+            self._memory[key] = (version, value)
+            self._save_to_disk(key, version, value)
+            return value
+
+    def _remove_old_files(self, prefix: str, keep: Path) -> None:
+        """Удаляет сохраненные файлы прошлых версий отчета (имя: префикс + версия)"""
+        # Копия, сохраненная до появления версии в имени
+        old_paths = [self.cache_dir / f"{prefix[:-1]}{keep.suffix}"]
+        for path in self.cache_dir.glob(f"{prefix}*"):
+            tag = path.name[len(prefix):].split(".", 1)[0]
+            if len(tag) == 12 and all(c in "0123456789abcdef" for c in tag) and path.suffix != ".json":
+                old_paths.append(path)
+
+        for path in old_paths:
+            if path == keep or not path.exists():
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"⚠️ Не удалось удалить старый файл отчета {path.name}: {e}")
+
+    def get_city_report(self, city_name: str) -> Dict[str, Any]:
+        """Отчет по городу (см. ReportService.get_city_report)"""
+        return self.get_or_build(
+            f"city_report:{CITY_MAPPING.get(city_name, city_name)}:{city_name}",
+            self.get_data_version([city_name]),
+            lambda: self.report_service.get_city_report(city_name)
+        )
+
+    def get_all_cities_report(self) -> Dict[str, Any]:
+        """Общий отчет по всем городам (см. ReportService.get_all_cities_report)"""
+        return self.get_or_build(
+            "all_cities_report",
+            self.get_data_version(CITIES),
+            self.report_service.get_all_cities_report
+        )
+
+    def get_payments_report(self, city_name: str, export_format: str = "xlsx") -> Tuple[str, Path]:
+        """
+        Отчет по оплатам (см. generate_payments_report) с сохраненным файлом
+
+        Отчет зависит от текущего месяца, поэтому месяц входит в версию.
+        Если файл отчета был удален, отчет строится заново.
+
+        Returns:
+            Tuple[str, Path]: (текстовый отчет, путь к файлу отчета)
+        """
+        city_names = CITIES if city_name == "all" else [city_name]
+        city_key = "all" if city_name == "all" else f"{CITY_MAPPING.get(city_name, city_name)}:{city_name}"
+        key = f"payments_report:{city_key}:{export_format}"
+        version = [datetime.now().strftime("%Y-%m")] + self.get_data_version(city_names)
+
+        def build() -> Dict[str, str]:
+            summary_text, report_path = generate_payments_report(city_name, export_format)
+            # Храним копию файла в кэше: исходный файл может быть перезаписан другим отчетом.
+            # Имя копии содержит версию, старые версии этого отчета удаляются
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            prefix = f"{key.replace(':', '_')}_"
+            version_tag = hashlib.sha1(json.dumps(version).encode("utf-8")).hexdigest()[:12]
+            cached_path = self.cache_dir / f"{prefix}{version_tag}{report_path.suffix}"
+            shutil.copyfile(report_path, cached_path)
+            self._remove_old_files(prefix, cached_path)
+            # Общий отчет пишется в temp под новым именем при каждом построении
+            if report_path.parent == self.root_dir / "temp":
+                report_path.unlink(missing_ok=True)
+            return {"summary_text": summary_text, "path": str(cached_path)}
+
+        cached = self.get_or_build(key, version, build)
+        if not Path(cached["path"]).exists():
+            self._memory.pop(key, None)
+            self._cache_path(key).unlink(missing_ok=True)
+            cached = self.get_or_build(key, version, build)
+
+        return cached["summary_text"], Path(cached["path"])
+
+
+_report_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Возвращает общий кэш отчетов"""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache()
+    return _report_cache
@@ -0,0 +1,89 @@
+"""
+Пул процессов для построения отчетов по городам
+
+Процессы запускаются методом spawn: к моменту построения отчета в боте уже
+работают потоки (файловые операции, SQLite, расчеты), а fork многопоточного
+процесса может унаследовать захваченную блокировку и зависнуть. Пул создается
+при запуске бота (get_report_executor в bot/main.py).
+
+Процесс spawn заново импортирует модуль запуска (bot/main.py как __mp_main__),
+поэтому там на уровне модуля импортируются только конфигурация и этот модуль;
+в процессах пула загружаются только модули отчетов (bot.services.report_*, src.*).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Tuple
+from bot.config import CITIES
+
+# Не больше процессов, чем городов
+REPORT_WORKERS = max(1, min(len(CITIES), os.cpu_count() or 1))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_report_executor() -> ProcessPoolExecutor:
+    """Возвращает общий пул процессов для отчетов (создается при первом обращении)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=REPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def shutdown_report_executor() -> None:
+    """Останавливает пул процессов отчетов (при остановке бота)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def map_cities(func: Callable[[str], Any], city_names: List[str]) -> List[Tuple[str, Any, Optional[Exception]]]:
+    """
+    Выполняет func(city_name) для каждого города параллельно в пуле процессов
+
+    func должна быть функцией уровня модуля (передается в другой процесс).
+    Если пул недоступен, города обрабатываются последовательно в текущем процессе.
+
+    Returns:
+        Список (город, результат, ошибка) в порядке city_names
+    """
+    global _executor
+    try:
+        executor = get_report_executor()
+        futures = [(city_name, executor.submit(func, city_name)) for city_name in city_names]
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        print(f"⚠️ Пул процессов отчетов недоступен, считаем последовательно: {e}")
+        _executor = None
+        futures = None
+
+    results = []
+    if futures is None:
+        for city_name in city_names:
+            try:
+                results.append((city_name, func(city_name), None))
+            except Exception as e:
+                results.append((city_name, None, e))
+        return results
+
+    for city_name, future in futures:
+        try:
+            results.append((city_name, future.result(), None))
+        except BrokenProcessPool:
+            # Процесс упал - пересоздаем пул при следующем обращении и считаем город здесь
+            _executor = None
+            try:
+                results.append((city_name, func(city_name), None))
+            except Exception as city_error:
+                results.append((city_name, None, city_error))
+        except Exception as e:
+            results.append((city_name, None, e))
+    return results
@@ -1,13 +1,16 @@
 """Модуль для генерации отчетов по оплатам"""
+import csv
 import json
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
 from collections import Counter
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle
 from openpyxl.utils import get_column_letter
 from bot.config import ROOT_DIR, CITY_MAPPING, CITIES
+from bot.services.report_executor import map_cities
 
 # Константы
 PRICE_PER_MONTH = 5000
@@ -24,6 +27,410 @@ STATUS_NOT_STUDYING = "Не учился"
 # Поля для исключения из месяцев
 EXCLUDED_FIELDS = {"Дата оплаты", "ФИО", "Phone", "Комментарий"}
 
+MONTH_ORDER = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+]
+
+# Коды статусов в колоночной таблице (по байту на ячейку)
+CODE_NOT_STUDYING = 0
+CODE_PAID = 1
+CODE_WROTE = 2
+CODE_NOT_PAID = 3
+CODE_DEFERRED = 4
+CODE_OTHER = 5  # Нестандартный статус, исходный текст хранится отдельно
+
+STATUS_CODES = {
+    STATUS_NOT_STUDYING: CODE_NOT_STUDYING,
+    STATUS_PAID: CODE_PAID,
+    STATUS_WROTE: CODE_WROTE,
+    STATUS_NOT_PAID: CODE_NOT_PAID,
+    STATUS_DEFERRED: CODE_DEFERRED,
+}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+
+# Код статуса -> ключ статистики
+STATS_KEYS = {
+    CODE_PAID: "paid",
+    CODE_WROTE: "wrote",
+    CODE_NOT_PAID: "not_paid",
+    CODE_DEFERRED: "deferred",
+}
+
+
+class PaymentsTable:
+    """
+    Колоночная таблица оплат: строки - ученики, столбцы - месяцы
+
+    Статусы хранятся кодами (bytearray на месяц), телефоны - номерами семей,
+    поэтому статистика, финансы и скидки за все месяцы считаются за один проход
+    по столбцам (см. aggregate).
+    """
+
+    TEXT_COLUMNS = ("fio", "student_id", "student_url", "payment_url", "phone", "comment")
+
+    def __init__(self, months: List[str]):
+        self.months = list(months)
+        self.columns: Dict[str, List[str]] = {name: [] for name in self.TEXT_COLUMNS}
+        # Номер семьи (общий телефон) для каждой строки, -1 если телефона нет
+        self.families: List[int] = []
+        self.statuses: List[bytearray] = [bytearray() for _ in self.months]
+        # Нестандартные статусы: (строка, номер месяца) -> исходный текст
+        self.other_statuses: Dict[Tuple[int, int], str] = {}
+        # Диапазоны строк городов: [(город, начало, конец)]
+        self.city_ranges: List[Tuple[str, int, int]] = []
+        self._family_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.families)
+
+    def _family_id(self, phone: str) -> int:
+        """Номер семьи по телефону"""
+        if not phone:
+            return -1
+        return self._family_ids.setdefault(phone, len(self._family_ids))
+
+    def add_row(
+        self,
+        fio: str,
+        student_id: str,
+        student_url: str,
+        payment_url: str,
+        phone: str,
+        comment: str,
+        month_statuses: Dict[str, str]
+    ) -> None:
+        """Добавляет ученика; месяцы без статуса считаются 'Не учился'"""
+        row = len(self)
+        for name, value in zip(self.TEXT_COLUMNS, (fio, student_id, student_url, payment_url, phone, comment)):
+            self.columns[name].append(value)
+        self.families.append(self._family_id(phone))
+
+        for month_idx, month in enumerate(self.months):
+            status = month_statuses.get(month) or STATUS_NOT_STUDYING
+            code = STATUS_CODES.get(status, CODE_OTHER)
+            if code == CODE_OTHER:
+                self.other_statuses[(row, month_idx)] = status
+            self.statuses[month_idx].append(code)
+
+    def set_city(self, city_name: str) -> None:
+        """Отмечает все строки таблицы как строки одного города"""
+        self.city_ranges = [(city_name, 0, len(self))]
+
+    @classmethod
+    def concat(cls, tables: List[Tuple[str, "PaymentsTable"]], months: List[str]) -> "PaymentsTable":
+        """
+        Объединяет таблицы городов в одну с общим набором месяцев
+
+        Семьи определяются по телефону во всех городах сразу.
+        """
+        result = cls(months)
+        for city_name, table in tables:
+            offset = len(result)
+            for name in cls.TEXT_COLUMNS:
+                result.columns[name].extend(table.columns[name])
+            result.families.extend(result._family_id(phone) for phone in table.columns["phone"])
+
+            source_index = {month: idx for idx, month in enumerate(table.months)}
+            for month_idx, month in enumerate(months):
+                source_idx = source_index.get(month)
+                if source_idx is None:
+                    result.statuses[month_idx].extend(bytes(len(table)))
+                    continue
+                result.statuses[month_idx].extend(table.statuses[source_idx])
+                for (row, idx), status in table.other_statuses.items():
+                    if idx == source_idx:
+                        result.other_statuses[(offset + row, month_idx)] = status
+
+            result.city_ranges.append((city_name, offset, len(result)))
+        return result
+
+    def row_statuses(self, row: int) -> List[str]:
+        """Статусы ученика по всем месяцам (текстом)"""
+        statuses = []
+        for month_idx, column in enumerate(self.statuses):
+            code = column[row]
+            if code == CODE_OTHER:
+                statuses.append(self.other_statuses[(row, month_idx)])
+            else:
+                statuses.append(STATUS_NAMES[code])
+        return statuses
+
+    def aggregate(self) -> Dict[str, Any]:
+        """
+        Считает статистику и финансы по всем месяцам за один проход по столбцам
+
+        Returns:
+            {
+                "months": {месяц: {"paid", "wrote", "not_paid", "deferred", "total",
+                                   "duplicate_children", "paid_duplicate_children",
+                                   "expected_turnover", "current_turnover", "debt"}},
+                "cities": {город: {месяц: {"paid", "wrote", "not_paid", "deferred"}}}
+            }
+        """
+        months: Dict[str, Dict[str, int]] = {}
+        cities: Dict[str, Dict[str, Dict[str, int]]] = {city: {} for city, _, _ in self.city_ranges}
+
+        for month, column in zip(self.months, self.statuses):
+            for city, start, end in self.city_ranges:
+                segment = column[start:end]
+                cities[city][month] = {key: segment.count(code) for code, key in STATS_KEYS.items()}
+
+            counts = {key: column.count(code) for code, key in STATS_KEYS.items()}
+
+            # Дети одной семьи за месяц: все учившиеся и только оплатившие
+            active_families = Counter()
+            paid_families = Counter()
+            for family, code in zip(self.families, column):
+                if family < 0 or code == CODE_NOT_STUDYING:
+                    continue
+                active_families[family] += 1
+                if code == CODE_PAID:
+                    paid_families[family] += 1
+
+            duplicate_children = sum(
+                count for count in active_families.values() if count >= MIN_CHILDREN_FOR_DISCOUNT
+            )
+            paid_duplicate_children = sum(
+                count for count in paid_families.values() if count >= MIN_CHILDREN_FOR_DISCOUNT
+            )
+
+            # Активные в этом месяце (кроме "Не учился" и нестандартных статусов)
+            total = sum(counts.values())
+            expected_turnover = total * PRICE_PER_MONTH - DISCOUNT_PER_CHILD * duplicate_children
+            current_turnover = counts["paid"] * PRICE_PER_MONTH - DISCOUNT_PER_CHILD * paid_duplicate_children
+
+            months[month] = {
+                **counts,
+                "total": total,
+                "duplicate_children": duplicate_children,
+                "paid_duplicate_children": paid_duplicate_children,
+                "expected_turnover": expected_turnover,
+                "current_turnover": current_turnover,
+                "debt": expected_turnover - current_turnover,
+            }
+
+        return {"months": months, "cities": cities}
+
+
+def _get_report_month(months: List[str]) -> str:
+    """Текущий календарный месяц, если он есть в данных, иначе последний из имеющихся"""
+    current_name = MONTH_ORDER[datetime.now().month - 1]
+    if current_name in months:
+        return current_name
+    return months[-1] if months else current_name
+
+
+# Цвета статусов
+STATUS_COLORS = {
+    STATUS_PAID: "92D050",  # зеленый
+    STATUS_NOT_PAID: "FF0000",  # красный
+    STATUS_DEFERRED: "FFD966",  # желтый
+    STATUS_WROTE: "5B9BD5",  # синий
+    STATUS_NOT_STUDYING: "C0C0C0"  # серый
+}
+
+# Цвета финансов
+FINANCE_COLORS = {
+    "expected_turnover": "5B9BD5",  # синий
+    "current_turnover": "92D050",  # зеленый
+    "debt": "FF0000"  # красный
+}
+
+SUMMARY_METRICS = [
+    ("Всего учеников", "total"),
+    ("Оплатили", "paid"),
+    ("Не оплатили", "not_paid"),
+    ("Отсрочка", "deferred"),
+    ("Написали", "wrote"),
+]
+
+FINANCE_METRICS = [
+    ("Ожидаемый оборот", "expected_turnover"),
+    ("Оборот сейчас", "current_turnover"),
+    ("Долг", "debt"),
+]
+
+
+def _fill_style(name: str, color: str) -> NamedStyle:
+    """Именованный стиль со сплошной заливкой"""
+    return NamedStyle(name=name, fill=PatternFill(start_color=color, end_color=color, fill_type="solid"))
+
+
+def _add_report_styles(wb: Workbook) -> Dict[str, str]:
+    """
+    Регистрирует в книге общие именованные стили отчета
+
+    Returns:
+        Словарь: статус/показатель -> имя стиля ("header" и "total" - заголовки и подписи)
+    """
+    styles = {
+        "header": NamedStyle(
+            name="payments_header",
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+            alignment=Alignment(horizontal="center", vertical="center")
+        ),
+        "total": NamedStyle(name="payments_total", font=Font(bold=True)),
+    }
+    for idx, (status, color) in enumerate(STATUS_COLORS.items()):
+        styles[status] = _fill_style(f"payments_status_{idx}", color)
+    for key, color in FINANCE_COLORS.items():
+        styles[key] = _fill_style(f"payments_{key}", color)
+
+    for style in styles.values():
+        wb.add_named_style(style)
+    return {key: style.name for key, style in styles.items()}
+
+
+def _iter_report_rows(table: PaymentsTable, summary: Dict[str, Any], with_city: bool = False):
+    """
+    Строки отчета по оплатам: заголовок, ученики, итоги по месяцам и финансы
+
+    Генерирует кортежи (тип строки, значения), где тип - "header", "student",
+    "empty", "metric" или (для финансов) ключ показателя. Строки учеников
+    читаются из таблицы по мере записи, без промежуточных списков.
+    """
+    months = table.months
+    month_summary = summary["months"]
+    # Столбцы между суммой (B) и месяцами пустые
+    padding = [""] * (3 if with_city else 2)
+
+    header = ["Город"] if with_city else []
+    header.extend(["ФИО", "Телефон", "URL профиля", "URL оплаты"])
+    header.extend(months)
+    header.append("Комментарий")
+    yield "header", header
+
+    columns = table.columns
+    for city_name, start, end in table.city_ranges:
+        for row in range(start, end):
+            values = [city_name] if with_city else []
+            values.extend([
+                columns["fio"][row],
+                columns["phone"][row],
+                columns["student_url"][row],
+                columns["payment_url"][row],
+            ])
+            values.extend(table.row_statuses(row))
+            values.append(columns["comment"][row])
+            yield "student", values
+
+    yield "empty", []
+    yield "empty", []
+
+    for name, key in SUMMARY_METRICS:
+        values = [name, sum(month_summary[m][key] for m in months)]
+        values.extend(padding)
+        values.extend(month_summary[m][key] for m in months)
+        yield "metric", values
+
+    for name, key in FINANCE_METRICS:
+        values = [name, sum(month_summary[m][key] for m in months)]
+        values.extend([None] * len(padding))
+        values.extend(month_summary[m][key] for m in months)
+        yield key, values
+
+
+def _write_payments_workbook(
+    table: PaymentsTable,
+    summary: Dict[str, Any],
+    output_path: Path,
+    with_city: bool = False
+) -> Path:
+    """
+    Записывает Excel-отчет по оплатам из колоночной таблицы
+
+    Книга создается в режиме write_only: строки пишутся в файл потоком,
+    стили - общие именованные, поэтому память не растет с числом учеников.
+
+    Args:
+        table: Таблица оплат
+        summary: Результат table.aggregate()
+        output_path: Путь к файлу
+        with_city: Добавить столбец "Город" перед ФИО (общий отчет)
+    """
+    wb = Workbook(write_only=True)
+    styles = _add_report_styles(wb)
+    ws = wb.create_sheet("Отчет по оплатам")
+
+    months = table.months
+    first_month_col = 6 if with_city else 5
+    status_slice = slice(first_month_col - 1, first_month_col - 1 + len(months))
+
+    # Ширина столбцов (задается до записи строк)
+    if with_city:
+        base_widths = [15, 30, 18, 50, 50]  # Город, ФИО, Телефон, URL профиля, URL оплаты
+    else:
+        base_widths = [30, 18, 50, 50]
+    for idx, width in enumerate(base_widths, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    for idx in range(first_month_col, first_month_col + len(months)):
+        ws.column_dimensions[get_column_letter(idx)].width = 20
+    ws.column_dimensions[get_column_letter(first_month_col + len(months))].width = 30  # Комментарий
+
+    def styled(value: Any, style_name: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style_name
+        return cell
+
+    for row_type, values in _iter_report_rows(table, summary, with_city):
+        if row_type == "header":
+            ws.append([styled(value, styles["header"]) for value in values])
+        elif row_type == "student":
+            # Окрашивание статусов
+            values[status_slice] = [
+                styled(status, styles[status]) if status in STATUS_COLORS else status
+                for status in values[status_slice]
+            ]
+            ws.append(values)
+        elif row_type == "metric":
+            values[0] = styled(values[0], styles["total"])
+            ws.append(values)
+        elif row_type in FINANCE_COLORS:
+            values[0] = styled(values[0], styles["total"])
+            values[1:] = [
+                value if value is None else styled(value, styles[row_type])
+                for value in values[1:]
+            ]
+            ws.append(values)
+        else:
+            ws.append(values)
+
+    wb.save(output_path)
+    return output_path
+
+
+def _write_payments_csv(
+    table: PaymentsTable,
+    summary: Dict[str, Any],
+    output_path: Path,
+    with_city: bool = False
+) -> Path:
+    """
+    Быстрый экспорт отчета по оплатам в CSV (те же строки, что и в Excel, без оформления)
+
+    Файл в UTF-8 с BOM и разделителем ";", чтобы Excel открывал его без настройки.
+    """
+    with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        for _, values in _iter_report_rows(table, summary, with_city):
+            writer.writerow(values)
+    return output_path
+
+
+def _write_payments_export(
+    table: PaymentsTable,
+    summary: Dict[str, Any],
+    output_path: Path,
+    export_format: str = "xlsx",
+    with_city: bool = False
+) -> Path:
+    """Записывает отчет в выбранном формате ("xlsx" или "csv"), расширение файла подставляется"""
+    if export_format == "csv":
+        return _write_payments_csv(table, summary, output_path.with_suffix(".csv"), with_city)
+    return _write_payments_workbook(table, summary, output_path.with_suffix(".xlsx"), with_city)
+
 
 class PaymentsReportGenerator:
     """Генератор отчетов по оплатам"""
@@ -31,7 +438,7 @@ class PaymentsReportGenerator:
     def __init__(self, city_name: str):
         """
         Инициализация генератора отчетов
-        
+
         Args:
             city_name: Название города (русское)
         """
@@ -44,8 +451,9 @@ class PaymentsReportGenerator:
         self.payments_data: Dict[str, Any] = {}
         self.groups_data: Dict[str, Any] = {}
 
-        # Объединенные данные
-        self.merged_data: List[Dict[str, Any]] = []
+        # Объединенные данные (колоночная таблица)
+        self.table = PaymentsTable([])
+        self._summary: Optional[Dict[str, Any]] = None
 
         # Месяцы (динамические)
         self.months: List[str] = []
@@ -87,19 +495,7 @@ class PaymentsReportGenerator:
 
     def _get_current_month(self) -> str:
         """Возвращает название текущего месяца, который есть в self.months."""
-        month_order = [
-            "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-            "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-        ]
-
-        now_month_index = datetime.now().month - 1  # 0..11
-        current_name = month_order[now_month_index]
-
-        if current_name in self.months:
-            return current_name
-
-        # если в данных нет текущего календарного месяца — берём последний из имеющихся
-        return self.months[-1] if self.months else current_name
+        return _get_report_month(self.months)
 
     def _extract_months(self) -> List[str]:
         """Извлекает список всех месяцев из payments.json"""
@@ -117,15 +513,7 @@ class PaymentsReportGenerator:
                     months.add(month)
 
         # Сортируем месяцы по порядку
-        month_order = [
-            "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-            "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-        ]
-
-        sorted_months = []
-        for month in month_order:
-            if month in months:
-                sorted_months.append(month)
+        sorted_months = [month for month in MONTH_ORDER if month in months]
 
         # Добавляем месяцы, которых нет в стандартном списке
         for month in sorted(months):
@@ -134,97 +522,55 @@ class PaymentsReportGenerator:
 
         return sorted_months
 
-    def _find_student_in_students(self, student_id: str, fio: str) -> Optional[Dict[str, Any]]:
-        """Находит ученика в students.json по student_id или ФИО"""
-        if not self.students_data:
-            return None
-
-        # Сначала ищем по student_id
-        for group_id, group_data in self.students_data.items():
-            students_list = group_data.get("students", [])
-            for student in students_list:
-                if student.get("ID") == student_id:
-                    return student
-
-        # Если не нашли по ID, ищем по ФИО
-        fio_clean = fio.strip().lower()
-        for group_id, group_data in self.students_data.items():
-            students_list = group_data.get("students", [])
-            for student in students_list:
-                student_fio = student.get("ФИО", "").strip().lower()
-                if student_fio == fio_clean:
-                    return student
-
-        return None
-
     def merge_data(self) -> None:
-        """Объединяет данные из students.json и payments.json"""
+        """Объединяет данные из students.json и payments.json в колоночную таблицу"""
         self.months = self._extract_months()
-
-        # Создаем карту учеников из students.json
-        students_map: Dict[str, Dict[str, Any]] = {}
-        for group_id, group_data in self.students_data.items():
-            students_list = group_data.get("students", [])
-            for student in students_list:
+        self.table = PaymentsTable(self.months)
+        self._summary = None
+
+        # Индексы учеников из students.json (первое совпадение, как при поиске по списку)
+        students_by_id: Dict[str, Dict[str, Any]] = {}
+        students_by_fio: Dict[str, Dict[str, Any]] = {}
+        for group_data in self.students_data.values():
+            for student in group_data.get("students", []):
                 student_id = student.get("ID", "")
                 fio = student.get("ФИО", "").strip()
                 if student_id:
-                    students_map[student_id] = student
+                    students_by_id.setdefault(student_id, student)
                 if fio:
-                    students_map[fio.lower()] = student
+                    students_by_fio.setdefault(fio.lower(), student)
 
-        # Обрабатываем payments
-        payments_list = self.payments_data.get("payments", [])
+        processed_student_ids = set()
+        processed_fios = set()
 
-        for payment in payments_list:
+        # Обрабатываем payments
+        for payment in self.payments_data.get("payments", []):
             student_id = payment.get("student_id", "")
             fio = payment.get("ФИО", "").strip()
-            phone = payment.get("Phone", "").strip()
-            comment = payment.get("Комментарий", "").strip()
-            payment_url = payment.get("payment_url", "")
             payments_data = payment.get("payments_data", {})
 
-            # Ищем ученика в students.json
+            # Ищем ученика в students.json: по ID, затем по ФИО
             student_info = None
             if student_id:
-                student_info = self._find_student_in_students(student_id, fio)
-            elif fio:
-                student_info = self._find_student_in_students("", fio)
-
-            # Получаем student_url
-            student_url = ""
-            if student_info:
-                student_url = student_info.get("student_url", "")
-
-            # Формируем статусы по месяцам
-            month_statuses: Dict[str, str] = {}
-            for month in self.months:
-                status = payments_data.get(month, "").strip()
-                if status:
-                    month_statuses[month] = status
-                else:
-                    month_statuses[month] = STATUS_NOT_STUDYING
-
-            # Добавляем объединенные данные
-            merged_record = {
-                "fio": fio,
-                "student_id": student_id,
-                "student_url": student_url,
-                "payment_url": payment_url,
-                "phone": phone,
-                "comment": comment,
-                "months": month_statuses
-            }
-
-            self.merged_data.append(merged_record)
+                student_info = students_by_id.get(student_id)
+            if student_info is None and fio:
+                student_info = students_by_fio.get(fio.lower())
+
+            self.table.add_row(
+                fio=fio,
+                student_id=student_id,
+                student_url=student_info.get("student_url", "") if student_info else "",
+                payment_url=payment.get("payment_url", ""),
+                phone=payment.get("Phone", "").strip(),
+                comment=payment.get("Комментарий", "").strip(),
+                month_statuses={month: payments_data.get(month, "").strip() for month in self.months}
+            )
+            processed_student_ids.add(student_id)
+            processed_fios.add(fio.lower())
 
         # Добавляем учеников из students.json, которых нет в payments.json
-        processed_student_ids = {record.get("student_id", "") for record in self.merged_data}
-        processed_fios = {record.get("fio", "").lower() for record in self.merged_data}
-
-        for group_id, group_data in self.students_data.items():
-            students_list = group_data.get("students", [])
-            for student in students_list:
+        for group_data in self.students_data.values():
+            for student in group_data.get("students", []):
                 student_id = student.get("ID", "")
                 fio = student.get("ФИО", "").strip()
 
@@ -234,383 +580,56 @@ class PaymentsReportGenerator:
                 if fio and fio.lower() in processed_fios:
                     continue
 
-                # Добавляем с статусом "Не учился" для всех месяцев
-                month_statuses = {month: STATUS_NOT_STUDYING for month in self.months}
-
-                merged_record = {
-                    "fio": fio,
-                    "student_id": student_id,
-                    "student_url": student.get("student_url", ""),
-                    "payment_url": "",
-                    "phone": student.get("Номер родителя", "").strip(),
-                    "comment": "",
-                    "months": month_statuses
-                }
-
-                self.merged_data.append(merged_record)
+                # Добавляем со статусом "Не учился" для всех месяцев
+                self.table.add_row(
+                    fio=fio,
+                    student_id=student_id,
+                    student_url=student.get("student_url", ""),
+                    payment_url="",
+                    phone=student.get("Номер родителя", "").strip(),
+                    comment="",
+                    month_statuses={}
+                )
+
+        self.table.set_city(self.city_name)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Статистика и финансы по всем месяцам (считается один раз после merge_data)"""
+        if self._summary is None:
+            self._summary = self.table.aggregate()
+        return self._summary
 
     def calculate_stats(self, month: Optional[str] = None) -> None:
         """Рассчитывает статистику по оплатам за один месяц (по умолчанию — текущий)."""
         if month is None:
             month = self._get_current_month()
 
+        month_summary = self.get_summary()["months"].get(month, {})
         self.stats = {
-            "paid": 0,
-            "wrote": 0,
-            "not_paid": 0,
-            "deferred": 0
+            key: month_summary.get(key, 0)
+            for key in ("paid", "wrote", "not_paid", "deferred")
         }
 
-        for record in self.merged_data:
-            months_data = record.get("months", {})
-            status = months_data.get(month, STATUS_NOT_STUDYING)
-
-            if status == STATUS_PAID:
-                self.stats["paid"] += 1
-            elif status == STATUS_WROTE:
-                self.stats["wrote"] += 1
-            elif status == STATUS_NOT_PAID:
-                self.stats["not_paid"] += 1
-            elif status == STATUS_DEFERRED:
-                self.stats["deferred"] += 1
-
-    def _count_duplicate_children_for_month(self, month: str, only_paid: bool = False) -> int:
-        """
-        Считает количество детей в семьях с 2+ детьми за один конкретный месяц.
-        Если only_paid=True — считаем только тех, кто в этом месяце имеет статус 'Оплатил'.
-        """
-        phone_counter = Counter()
-
-        for record in self.merged_data:
-            months_data = record.get("months", {})
-            status = months_data.get(month, STATUS_NOT_STUDYING)
-
-            if status == STATUS_NOT_STUDYING:
-                continue  # в этом месяце не учился — в расчёт не идёт
-
-            if only_paid and status != STATUS_PAID:
-                continue
-
-            phone = record.get("phone", "").strip()
-            if phone:
-                phone_counter[phone] += 1
-
-        total_children = 0
-        for phone, count in phone_counter.items():
-            if count >= MIN_CHILDREN_FOR_DISCOUNT:
-                total_children += count
-
-        return total_children
-
-    def _count_paid_students(self) -> int:
-        """Подсчитывает количество учеников, которые оплатили хотя бы один месяц"""
-        paid_students = set()
-
-        for record in self.merged_data:
-            months_data = record.get("months", {})
-            for month in self.months:
-                status = months_data.get(month, STATUS_NOT_STUDYING)
-                if status == STATUS_PAID:
-                    # Используем комбинацию student_id и fio для уникальности
-                    student_id = record.get("student_id", "")
-                    fio = record.get("fio", "")
-                    key = f"{student_id}_{fio}"
-                    paid_students.add(key)
-                    break  # Достаточно одного месяца с оплатой
-
-        return len(paid_students)
-
-    def _count_duplicate_children(self, only_paid: bool = False) -> int:
-        """
-        Подсчитывает количество детей в семьях с 2+ детьми (для расчета скидки)
-        
-        Args:
-            only_paid: Учитывать только оплативших
-        
-        Returns:
-            Количество детей в семьях с 2+ детьми
-        """
-        phone_counter = Counter()
-
-        # Определяем, какие ученики учитываются
-        students_to_count = set()
-        for record in self.merged_data:
-            if only_paid:
-                # Проверяем, есть ли хотя бы один месяц с оплатой
-                has_paid = False
-                months_data = record.get("months", {})
-                for month in self.months:
-                    status = months_data.get(month, STATUS_NOT_STUDYING)
-                    if status == STATUS_PAID:
-                        has_paid = True
-                        break
-                if not has_paid:
-                    continue
-
-            student_id = record.get("student_id", "")
-            fio = record.get("fio", "")
-            key = f"{student_id}_{fio}"
-            students_to_count.add(key)
-
-        # Подсчитываем номера телефонов
-        for record in self.merged_data:
-            student_id = record.get("student_id", "")
-            fio = record.get("fio", "")
-            key = f"{student_id}_{fio}"
-
-            if key not in students_to_count:
-                continue
-
-            phone = record.get("phone", "").strip()
-            if phone:
-                phone_counter[phone] += 1
-
-        # Считаем общее количество детей в семьях с 2+ детьми
-        total_children = 0
-        for phone, count in phone_counter.items():
-            if count >= MIN_CHILDREN_FOR_DISCOUNT:
-                total_children += count
-
-        return total_children
-
     def calculate_finances(self, month: Optional[str] = None) -> None:
         """Рассчитывает финансовые показатели за один месяц (по умолчанию — текущий месяц)."""
         if month is None:
             month = self._get_current_month()
 
-        # считаем по месячным totals (ниже в export_excel мы делаем то же самое)
-        totals_for_month = {
-            "paid": 0,
-            "not_paid": 0,
-            "deferred": 0,
-            "wrote": 0
+        month_summary = self.get_summary()["months"].get(month, {})
+        self.finances = {
+            key: month_summary.get(key, 0)
+            for key in ("expected_turnover", "current_turnover", "debt")
         }
 
-        for record in self.merged_data:
-            status = record.get("months", {}).get(month, STATUS_NOT_STUDYING)
-            if status == STATUS_PAID:
-                totals_for_month["paid"] += 1
-            elif status == STATUS_NOT_PAID:
-                totals_for_month["not_paid"] += 1
-            elif status == STATUS_DEFERRED:
-                totals_for_month["deferred"] += 1
-            elif status == STATUS_WROTE:
-                totals_for_month["wrote"] += 1
-
-        # активные в этом месяце (кроме "Не учился")
-        total_students_month = sum(totals_for_month.values())
-        paid_students_month = totals_for_month["paid"]
-
-        # дубли по телефону
-        total_duplicate_children = self._count_duplicate_children_for_month(month, only_paid=False)
-        paid_duplicate_children = self._count_duplicate_children_for_month(month, only_paid=True)
-
-        self.finances["expected_turnover"] = (
-                total_students_month * PRICE_PER_MONTH
-                - DISCOUNT_PER_CHILD * total_duplicate_children
-        )
-        self.finances["current_turnover"] = (
-                paid_students_month * PRICE_PER_MONTH
-                - DISCOUNT_PER_CHILD * paid_duplicate_children
-        )
-        self.finances["debt"] = (
-                self.finances["expected_turnover"] - self.finances["current_turnover"]
-        )
-
     def export_excel(self) -> Path:
         """Экспортирует данные в Excel файл"""
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Отчет по оплатам"
-
-        # Стили
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        total_font = Font(bold=True)
-
-        # === Цвета статусов ===
-        status_colors = {
-            STATUS_PAID: "92D050",  # зеленый
-            STATUS_NOT_PAID: "FF0000",  # красный
-            STATUS_DEFERRED: "FFD966",  # желтый
-            STATUS_WROTE: "5B9BD5",  # синий
-            STATUS_NOT_STUDYING: "C0C0C0"  # серый
-        }
-
-        # Цвета финансов
-        finance_colors = {
-            "expected_turnover": "5B9BD5",  # синий
-            "current_turnover": "92D050",  # зеленый
-            "debt": "FF0000"  # красный
-        }
-
-        # Заголовки основной таблицы
-        headers = ["ФИО", "Телефон", "URL профиля", "URL оплаты"]
-        headers.extend(self.months)
-        headers.append("Комментарий")
-
-        # Записываем заголовки
-        for col_idx, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_idx, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # === Записываем учеников ===
-        row_idx = 2
-        for record in self.merged_data:
-            ws.cell(row=row_idx, column=1, value=record.get("fio", ""))
-            ws.cell(row=row_idx, column=2, value=record.get("phone", ""))
-            ws.cell(row=row_idx, column=3, value=record.get("student_url", ""))
-            ws.cell(row=row_idx, column=4, value=record.get("payment_url", ""))
-
-            # Месяцы
-            months_data = record.get("months", {})
-            for month_idx, month in enumerate(self.months, 5):
-                status = months_data.get(month, STATUS_NOT_STUDYING)
-                cell = ws.cell(row=row_idx, column=month_idx, value=status)
-
-                # Окрашивание статуса
-                fill_color = status_colors.get(status)
-                if fill_color:
-                    cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
-
-            # Комментарий
-            comment_col = 5 + len(self.months)
-            ws.cell(row=row_idx, column=comment_col, value=record.get("comment", ""))
-
-            row_idx += 1
-
-        # === Подсчёт итогов по месяцам ===
-        total_row = row_idx
-
-        month_totals = {
-            month: {"paid": 0, "not_paid": 0, "deferred": 0, "wrote": 0}
-            for month in self.months
-        }
-
-        for record in self.merged_data:
-            for month in self.months:
-                status = record["months"][month]
-                if status == STATUS_PAID:
-                    month_totals[month]["paid"] += 1
-                elif status == STATUS_NOT_PAID:
-                    month_totals[month]["not_paid"] += 1
-                elif status == STATUS_DEFERRED:
-                    month_totals[month]["deferred"] += 1
-                elif status == STATUS_WROTE:
-                    month_totals[month]["wrote"] += 1
-
-        # === Нижний блок — суммарно по всем месяцам ===
-        summary_start = total_row + 2
-
-        metrics = [
-            ("Всего учеников", lambda t: t["paid"] + t["not_paid"] + t["deferred"] + t["wrote"]),
-            ("Оплатили", lambda t: t["paid"]),
-            ("Не оплатили", lambda t: t["not_paid"]),
-            ("Отсрочка", lambda t: t["deferred"]),
-            ("Написали", lambda t: t["wrote"]),
-        ]
-
-        # Сумма за все месяцы
-        totals_all = {
-            "total_students": sum(metrics[0][1](month_totals[m]) for m in self.months),
-            "paid": sum(month_totals[m]["paid"] for m in self.months),
-            "not_paid": sum(month_totals[m]["not_paid"] for m in self.months),
-            "deferred": sum(month_totals[m]["deferred"] for m in self.months),
-            "wrote": sum(month_totals[m]["wrote"] for m in self.months),
-        }
-
-        # Финансы по месяцам и суммарно
-        finance_all = {"expected_turnover": 0, "current_turnover": 0, "debt": 0}
-        finance_by_month = {}
-
-        for month in self.months:
-            self.calculate_finances(month)
-            finance_by_month[month] = dict(self.finances)
-            finance_all["expected_turnover"] += self.finances["expected_turnover"]
-            finance_all["current_turnover"] += self.finances["current_turnover"]
-            finance_all["debt"] += self.finances["debt"]
-
-        # === Формируем строки метрик (A, B, E..N) ===
-        current_row = summary_start
-
-        for name, getter in metrics:
-            ws.cell(row=current_row, column=1, value=name).font = total_font
-
-            # Сумма всех месяцев (столбец B)
-            key = {
-                "Всего учеников": "total_students",
-                "Оплатили": "paid",
-                "Не оплатили": "not_paid",
-                "Отсрочка": "deferred",
-                "Написали": "wrote"
-            }[name]
-
-            ws.cell(row=current_row, column=2, value=totals_all[key])
-
-            # C и D пустые
-            ws.cell(row=current_row, column=3, value="")
-            ws.cell(row=current_row, column=4, value="")
-
-            # Значения по каждому месяцу
-            for idx_m, month in enumerate(self.months, start=5):
-                ws.cell(row=current_row, column=idx_m, value=getter(month_totals[month]))
-
-            current_row += 1
-
-        # === Финансы ===
-
-        # Ожидаемый оборот
-        ws.cell(row=current_row, column=1, value="Ожидаемый оборот").font = total_font
-        cell = ws.cell(row=current_row, column=2, value=finance_all["expected_turnover"])
-        cell.fill = PatternFill(start_color=finance_colors["expected_turnover"],
-                                end_color=finance_colors["expected_turnover"], fill_type="solid")
-
-        for idx_m, month in enumerate(self.months, start=5):
-            c = ws.cell(row=current_row, column=idx_m, value=finance_by_month[month]["expected_turnover"])
-            c.fill = PatternFill(start_color=finance_colors["expected_turnover"],
-                                 end_color=finance_colors["expected_turnover"], fill_type="solid")
-
-        current_row += 1
-
-        # Оборот сейчас
-        ws.cell(row=current_row, column=1, value="Оборот сейчас").font = total_font
-        cell = ws.cell(row=current_row, column=2, value=finance_all["current_turnover"])
-        cell.fill = PatternFill(start_color=finance_colors["current_turnover"],
-                                end_color=finance_colors["current_turnover"], fill_type="solid")
-
-        for idx_m, month in enumerate(self.months, start=5):
-            c = ws.cell(row=current_row, column=idx_m, value=finance_by_month[month]["current_turnover"])
-            c.fill = PatternFill(start_color=finance_colors["current_turnover"],
-                                 end_color=finance_colors["current_turnover"], fill_type="solid")
-
-        current_row += 1
-
-        # Долг
-        ws.cell(row=current_row, column=1, value="Долг").font = total_font
-        cell = ws.cell(row=current_row, column=2, value=finance_all["debt"])
-        cell.fill = PatternFill(start_color=finance_colors["debt"], end_color=finance_colors["debt"], fill_type="solid")
-
-        for idx_m, month in enumerate(self.months, start=5):
-            c = ws.cell(row=current_row, column=idx_m, value=finance_by_month[month]["debt"])
-            c.fill = PatternFill(start_color=finance_colors["debt"], end_color=finance_colors["debt"],
-                                 fill_type="solid")
-
-        # Ширина столбцов
-        ws.column_dimensions["A"].width = 30
-        ws.column_dimensions["B"].width = 18
-        ws.column_dimensions["C"].width = 50
-        ws.column_dimensions["D"].width = 50
-
-        for idx in range(5, 5 + len(self.months)):
-            ws.column_dimensions[get_column_letter(idx)].width = 20
-
-        ws.column_dimensions[get_column_letter(5 + len(self.months))].width = 30
-
         output_path = self.base_path / "payments_report.xlsx"
-        wb.save(output_path)
-        return output_path
+        return _write_payments_workbook(self.table, self.get_summary(), output_path)
+
+    def export_csv(self) -> Path:
+        """Экспортирует данные в CSV файл (быстрый вариант без оформления)"""
+        output_path = self.base_path / "payments_report.csv"
+        return _write_payments_csv(self.table, self.get_summary(), output_path)
 
     def build_summary_text(self) -> str:
         """Формирует текстовый отчет для Telegram (по текущему месяцу)"""
@@ -641,12 +660,15 @@ class PaymentsReportGenerator:
 
         return "\n".join(lines)
 
-    def generate_report(self) -> Tuple[str, Path]:
+    def generate_report(self, export_format: str = "xlsx") -> Tuple[str, Path]:
         """
         Генерирует полный отчет
-        
+
+        Args:
+            export_format: Формат файла: "xlsx" или "csv"
+
         Returns:
-            Tuple[str, Path]: (текстовый отчет, путь к Excel файлу)
+            Tuple[str, Path]: (текстовый отчет, путь к файлу отчета)
         """
         self.load_data()
         self.merge_data()
@@ -654,430 +676,104 @@ class PaymentsReportGenerator:
         self.calculate_finances()
 
         summary_text = self.build_summary_text()
-        excel_path = self.export_excel()
+        if export_format == "csv":
+            report_path = self.export_csv()
+        else:
+            report_path = self.export_excel()
+
+        return summary_text, report_path
+
 
-        return summary_text, excel_path
+def _load_city_table(city_name: str) -> PaymentsTable:
+    """Загружает и объединяет данные города (выполняется в пуле процессов)"""
+    generator = PaymentsReportGenerator(city_name)
+    generator.load_data()
+    generator.merge_data()
+    return generator.table
 
 
-def generate_payments_report(city_name: str) -> Tuple[str, Path]:
+def generate_payments_report(city_name: str, export_format: str = "xlsx") -> Tuple[str, Path]:
     """
     Генерирует отчет по оплатам для города
-    
+
     Args:
         city_name: Название города (русское) или "all" для всех городов
-    
+        export_format: Формат файла: "xlsx" или "csv"
+
     Returns:
-        Tuple[str, Path]: (текстовый отчет, путь к Excel файлу)
+        Tuple[str, Path]: (текстовый отчет, путь к файлу отчета)
     """
     if city_name == "all":
-        return generate_all_cities_payments_report()
-    
+        return generate_all_cities_payments_report(export_format)
+
     generator = PaymentsReportGenerator(city_name)
-    return generator.generate_report()
+    return generator.generate_report(export_format)
 
 
-def generate_all_cities_payments_report() -> Tuple[str, Path]:
+def generate_all_cities_payments_report(export_format: str = "xlsx") -> Tuple[str, Path]:
     """
     Генерирует общий отчет по оплатам для всех городов
     Использует те же правила, что и простой отчет, но с добавлением столбца "Город"
-    
+
+    Args:
+        export_format: Формат файла: "xlsx" или "csv"
+
     Returns:
-        Tuple[str, Path]: (текстовый отчет, путь к Excel файлу)
+        Tuple[str, Path]: (текстовый отчет, путь к файлу отчета)
     """
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from openpyxl.utils import get_column_letter
-    from datetime import datetime
-    from collections import Counter
-    
-    # Собираем данные по всем городам
-    all_cities_data = []
+    # Собираем таблицы всех городов (параллельно, по процессу на город)
+    city_tables = []
     all_months = set()
-    
-    # Собираем данные из всех городов
-    for city_name in CITIES:
-        try:
-            generator = PaymentsReportGenerator(city_name)
-            generator.load_data()
-            generator.merge_data()
-            
-            # Собираем месяцы
-            all_months.update(generator.months)
-            
-            # Добавляем данные города с указанием города
-            for record in generator.merged_data:
-                record_with_city = dict(record)
-                record_with_city["city"] = city_name
-                all_cities_data.append(record_with_city)
-        except Exception as e:
-            print(f"Ошибка при загрузке данных для города {city_name}: {e}")
+
+    for city_name, table, error in map_cities(_load_city_table, CITIES):
+        if error:
+            print(f"Ошибка при загрузке данных для города {city_name}: {error}")
             continue
-    
+
+        all_months.update(table.months)
+        city_tables.append((city_name, table))
+
     # Сортируем месяцы
-    month_order = [
-        "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-    ]
-    sorted_months = [m for m in month_order if m in all_months]
-    
-    # Используем те же методы расчета, что и в простом отчете
-    # Определяем текущий месяц (используем метод из класса PaymentsReportGenerator)
-    def _get_current_month() -> str:
-        """Возвращает название текущего месяца, который есть в sorted_months."""
-        now_month_index = datetime.now().month - 1  # 0..11
-        current_name = month_order[now_month_index]
-        
-        if current_name in sorted_months:
-            return current_name
-        
-        # Если текущего месяца нет в данных, берем последний доступный месяц
-        if sorted_months:
-            return sorted_months[-1]
-        
-        return ""
-    
+    sorted_months = [m for m in MONTH_ORDER if m in all_months]
+
     # Проверяем, что есть данные
     if not sorted_months:
         raise ValueError("Нет данных о месяцах для генерации отчета")
-    
-    if not all_cities_data:
+
+    # Объединяем города в одну таблицу (скидки на семьи считаются по всем городам)
+    table = PaymentsTable.concat(city_tables, sorted_months)
+
+    if not len(table):
         raise ValueError("Нет данных об учениках для генерации отчета")
-    
-    current_month = _get_current_month()
-    
-    if not current_month:
-        # Если не удалось определить текущий месяц, берем первый доступный
-        current_month = sorted_months[0] if sorted_months else ""
-        if not current_month:
-            raise ValueError("Не удалось определить месяц для отчета")
-    
-    stats = {
-        "paid": 0,
-        "wrote": 0,
-        "not_paid": 0,
-        "deferred": 0
-    }
-    
-    for record in all_cities_data:
-        months_data = record.get("months", {})
-        if not months_data:
-            continue
-        status = months_data.get(current_month, STATUS_NOT_STUDYING)
-        
-        if status == STATUS_PAID:
-            stats["paid"] += 1
-        elif status == STATUS_WROTE:
-            stats["wrote"] += 1
-        elif status == STATUS_NOT_PAID:
-            stats["not_paid"] += 1
-        elif status == STATUS_DEFERRED:
-            stats["deferred"] += 1
-    
-    # Рассчитываем финансы по текущему месяцу (те же правила)
-    total_students_month = stats["paid"] + stats["not_paid"] + stats["deferred"] + stats["wrote"]
-    
-    # Подсчет дублей по телефону для текущего месяца
-    phone_counter = Counter()
-    for record in all_cities_data:
-        months_data = record.get("months", {})
-        status = months_data.get(current_month, STATUS_NOT_STUDYING)
-        
-        if status == STATUS_NOT_STUDYING:
-            continue
-        
-        phone = record.get("phone", "").strip()
-        if phone:
-            phone_counter[phone] += 1
-    
-    total_duplicate_children = sum(count for phone, count in phone_counter.items() if count >= MIN_CHILDREN_FOR_DISCOUNT)
-    
-    # Подсчет дублей только для оплативших
-    paid_phone_counter = Counter()
-    for record in all_cities_data:
-        months_data = record.get("months", {})
-        status = months_data.get(current_month, STATUS_NOT_STUDYING)
-        
-        if status != STATUS_PAID:
-            continue
-        
-        phone = record.get("phone", "").strip()
-        if phone:
-            paid_phone_counter[phone] += 1
-    
-    paid_duplicate_children = sum(count for phone, count in paid_phone_counter.items() if count >= MIN_CHILDREN_FOR_DISCOUNT)
-    
-    # Расчет финансов (те же формулы)
-    expected_turnover = (
-        total_students_month * PRICE_PER_MONTH
-        - DISCOUNT_PER_CHILD * total_duplicate_children
-    )
-    current_turnover = (
-        stats["paid"] * PRICE_PER_MONTH
-        - DISCOUNT_PER_CHILD * paid_duplicate_children
-    )
-    debt = expected_turnover - current_turnover
-    
+
+    current_month = _get_report_month(sorted_months)
+
+    summary = table.aggregate()
+    month_summary = summary["months"][current_month]
+
     # Формируем текстовый отчет (те же правила)
-    total_students = stats["paid"] + stats["not_paid"] + stats["deferred"] + stats["wrote"]
-    
     summary_lines = [
         "Общий отчёт по оплатам (все города)",
         f"Месяц: {current_month}",
         "",
-        f"Всего учеников: {total_students}",
+        f"Всего учеников: {month_summary['total']}",
         "",
-        f"Оплатили: {stats['paid']}",
-        f"Написали: {stats['wrote']}",
-        f"Не оплатили: {stats['not_paid']}",
-        f"Отсрочка: {stats['deferred']}",
+        f"Оплатили: {month_summary['paid']}",
+        f"Написали: {month_summary['wrote']}",
+        f"Не оплатили: {month_summary['not_paid']}",
+        f"Отсрочка: {month_summary['deferred']}",
         "",
-        f"Ожидаемый оборот: {expected_turnover:,}".replace(",", " "),
-        f"Оборот сейчас: {current_turnover:,}".replace(",", " "),
-        f"Долг: {debt:,}".replace(",", " ")
+        f"Ожидаемый оборот: {month_summary['expected_turnover']:,}".replace(",", " "),
+        f"Оборот сейчас: {month_summary['current_turnover']:,}".replace(",", " "),
+        f"Долг: {month_summary['debt']:,}".replace(",", " ")
     ]
-    
+
     summary_text = "\n".join(summary_lines)
-    
-    # Создаем Excel файл (те же стили и структура, но с добавлением столбца "Город")
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Отчет по оплатам"
-    
-    # Стили (те же, что и в простом отчете)
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    total_font = Font(bold=True)
-    
-    # Цвета статусов (те же)
-    status_colors = {
-        STATUS_PAID: "92D050",  # зеленый
-        STATUS_NOT_PAID: "FF0000",  # красный
-        STATUS_DEFERRED: "FFD966",  # желтый
-        STATUS_WROTE: "5B9BD5",  # синий
-        STATUS_NOT_STUDYING: "C0C0C0"  # серый
-    }
-    
-    # Цвета финансов (те же)
-    finance_colors = {
-        "expected_turnover": "5B9BD5",  # синий
-        "current_turnover": "92D050",  # зеленый
-        "debt": "FF0000"  # красный
-    }
-    
-    # Заголовки (добавляем "Город" перед ФИО)
-    headers = ["Город", "ФИО", "Телефон", "URL профиля", "URL оплаты"]
-    headers.extend(sorted_months)
-    headers.append("Комментарий")
-    
-    # Записываем заголовки
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Записываем учеников
-    row_idx = 2
-    for record in all_cities_data:
-        ws.cell(row=row_idx, column=1, value=record.get("city", ""))  # Город
-        ws.cell(row=row_idx, column=2, value=record.get("fio", ""))  # ФИО
-        ws.cell(row=row_idx, column=3, value=record.get("phone", ""))  # Телефон
-        ws.cell(row=row_idx, column=4, value=record.get("student_url", ""))  # URL профиля
-        ws.cell(row=row_idx, column=5, value=record.get("payment_url", ""))  # URL оплаты
-        
-        # Месяцы (начинаем с колонки 6, так как добавили "Город")
-        months_data = record.get("months", {})
-        for month_idx, month in enumerate(sorted_months, 6):
-            status = months_data.get(month, STATUS_NOT_STUDYING)
-            cell = ws.cell(row=row_idx, column=month_idx, value=status)
-            
-            # Окрашивание статуса
-            fill_color = status_colors.get(status)
-            if fill_color:
-                cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
-        
-        # Комментарий
-        comment_col = 6 + len(sorted_months)
-        ws.cell(row=row_idx, column=comment_col, value=record.get("comment", ""))
-        
-        row_idx += 1
-    
-    # Подсчет итогов по месяцам (те же правила)
-    total_row = row_idx
-    
-    month_totals = {
-        month: {"paid": 0, "not_paid": 0, "deferred": 0, "wrote": 0}
-        for month in sorted_months
-    }
-    
-    for record in all_cities_data:
-        months_data = record.get("months", {})
-        if not months_data:
-            continue
-        for month in sorted_months:
-            status = months_data.get(month, STATUS_NOT_STUDYING)
-            if status == STATUS_PAID:
-                month_totals[month]["paid"] += 1
-            elif status == STATUS_NOT_PAID:
-                month_totals[month]["not_paid"] += 1
-            elif status == STATUS_DEFERRED:
-                month_totals[month]["deferred"] += 1
-            elif status == STATUS_WROTE:
-                month_totals[month]["wrote"] += 1
-    
-    # Нижний блок — суммарно по всем месяцам (те же метрики)
-    summary_start = total_row + 2
-    
-    metrics = [
-        ("Всего учеников", lambda t: t["paid"] + t["not_paid"] + t["deferred"] + t["wrote"]),
-        ("Оплатили", lambda t: t["paid"]),
-        ("Не оплатили", lambda t: t["not_paid"]),
-        ("Отсрочка", lambda t: t["deferred"]),
-        ("Написали", lambda t: t["wrote"]),
-    ]
-    
-    # Сумма за все месяцы
-    totals_all = {
-        "total_students": sum(metrics[0][1](month_totals[m]) for m in sorted_months),
-        "paid": sum(month_totals[m]["paid"] for m in sorted_months),
-        "not_paid": sum(month_totals[m]["not_paid"] for m in sorted_months),
-        "deferred": sum(month_totals[m]["deferred"] for m in sorted_months),
-        "wrote": sum(month_totals[m]["wrote"] for m in sorted_months),
-    }
-    
-    # Финансы по месяцам и суммарно (те же расчеты)
-    finance_all = {"expected_turnover": 0, "current_turnover": 0, "debt": 0}
-    finance_by_month = {}
-    
-    for month in sorted_months:
-        # Расчет финансов для каждого месяца
-        month_total = month_totals[month]["paid"] + month_totals[month]["not_paid"] + month_totals[month]["deferred"] + month_totals[month]["wrote"]
-        
-        # Подсчет дублей для этого месяца
-        month_phone_counter = Counter()
-        month_paid_phone_counter = Counter()
-        
-        for record in all_cities_data:
-            months_data = record.get("months", {})
-            status = months_data.get(month, STATUS_NOT_STUDYING)
-            
-            if status != STATUS_NOT_STUDYING:
-                phone = record.get("phone", "").strip()
-                if phone:
-                    month_phone_counter[phone] += 1
-                    if status == STATUS_PAID:
-                        month_paid_phone_counter[phone] += 1
-        
-        month_duplicate = sum(count for phone, count in month_phone_counter.items() if count >= MIN_CHILDREN_FOR_DISCOUNT)
-        month_paid_duplicate = sum(count for phone, count in month_paid_phone_counter.items() if count >= MIN_CHILDREN_FOR_DISCOUNT)
-        
-        month_expected = month_total * PRICE_PER_MONTH - DISCOUNT_PER_CHILD * month_duplicate
-        month_current = month_totals[month]["paid"] * PRICE_PER_MONTH - DISCOUNT_PER_CHILD * month_paid_duplicate
-        month_debt = month_expected - month_current
-        
-        finance_by_month[month] = {
-            "expected_turnover": month_expected,
-            "current_turnover": month_current,
-            "debt": month_debt
-        }
-        
-        finance_all["expected_turnover"] += month_expected
-        finance_all["current_turnover"] += month_current
-        finance_all["debt"] += month_debt
-    
-    # Формируем строки метрик (те же, что и в простом отчете)
-    current_row = summary_start
-    
-    for name, getter in metrics:
-        ws.cell(row=current_row, column=1, value=name).font = total_font
-        
-        # Сумма всех месяцев (столбец B)
-        key = {
-            "Всего учеников": "total_students",
-            "Оплатили": "paid",
-            "Не оплатили": "not_paid",
-            "Отсрочка": "deferred",
-            "Написали": "wrote"
-        }[name]
-        ws.cell(row=current_row, column=2, value=totals_all[key])
-        
-        # C, D, E пустые (Город, ФИО, Телефон)
-        ws.cell(row=current_row, column=3, value="")
-        ws.cell(row=current_row, column=4, value="")
-        ws.cell(row=current_row, column=5, value="")
-        
-        # Значения по каждому месяцу (начинаем с колонки 6)
-        for idx_m, month in enumerate(sorted_months, start=6):
-            ws.cell(row=current_row, column=idx_m, value=getter(month_totals[month]))
-        
-        current_row += 1
-    
-    # Финансы (те же строки)
-    # Ожидаемый оборот
-    ws.cell(row=current_row, column=1, value="Ожидаемый оборот").font = total_font
-    cell = ws.cell(row=current_row, column=2, value=finance_all["expected_turnover"])
-    cell.fill = PatternFill(start_color=finance_colors["expected_turnover"],
-                            end_color=finance_colors["expected_turnover"], fill_type="solid")
-    
-    ws.cell(row=current_row, column=3, value="")
-    ws.cell(row=current_row, column=4, value="")
-    ws.cell(row=current_row, column=5, value="")
-    
-    for idx_m, month in enumerate(sorted_months, start=6):
-        c = ws.cell(row=current_row, column=idx_m, value=finance_by_month[month]["expected_turnover"])
-        c.fill = PatternFill(start_color=finance_colors["expected_turnover"],
-                             end_color=finance_colors["expected_turnover"], fill_type="solid")
-    
-    current_row += 1
-    
-    # Оборот сейчас
-    ws.cell(row=current_row, column=1, value="Оборот сейчас").font = total_font
-    cell = ws.cell(row=current_row, column=2, value=finance_all["current_turnover"])
-    cell.fill = PatternFill(start_color=finance_colors["current_turnover"],
-                            end_color=finance_colors["current_turnover"], fill_type="solid")
-    
-    ws.cell(row=current_row, column=3, value="")
-    ws.cell(row=current_row, column=4, value="")
-    ws.cell(row=current_row, column=5, value="")
-    
-    for idx_m, month in enumerate(sorted_months, start=6):
-        c = ws.cell(row=current_row, column=idx_m, value=finance_by_month[month]["current_turnover"])
-        c.fill = PatternFill(start_color=finance_colors["current_turnover"],
-                             end_color=finance_colors["current_turnover"], fill_type="solid")
-    
-    current_row += 1
-    
-    # Долг
-    ws.cell(row=current_row, column=1, value="Долг").font = total_font
-    cell = ws.cell(row=current_row, column=2, value=finance_all["debt"])
-    cell.fill = PatternFill(start_color=finance_colors["debt"], end_color=finance_colors["debt"], fill_type="solid")
-    
-    ws.cell(row=current_row, column=3, value="")
-    ws.cell(row=current_row, column=4, value="")
-    ws.cell(row=current_row, column=5, value="")
-    
-    for idx_m, month in enumerate(sorted_months, start=6):
-        c = ws.cell(row=current_row, column=idx_m, value=finance_by_month[month]["debt"])
-        c.fill = PatternFill(start_color=finance_colors["debt"], end_color=finance_colors["debt"],
-                             fill_type="solid")
-    
-    # Ширина столбцов (те же, но с учетом добавленного столбца "Город")
-    ws.column_dimensions["A"].width = 15  # Город
-    ws.column_dimensions["B"].width = 30  # ФИО
-    ws.column_dimensions["C"].width = 18  # Телефон
-    ws.column_dimensions["D"].width = 50  # URL профиля
-    ws.column_dimensions["E"].width = 50  # URL оплаты
-    
-    for idx in range(6, 6 + len(sorted_months)):
-        ws.column_dimensions[get_column_letter(idx)].width = 20
-    
-    ws.column_dimensions[get_column_letter(6 + len(sorted_months))].width = 30  # Комментарий
-    
-    # Сохраняем файл
+
+    # Сохраняем файл (те же стили и структура, но с добавлением столбца "Город")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"payments_report_all_cities_{timestamp}.xlsx"
-    excel_path = ROOT_DIR / "temp" / filename
-    excel_path.parent.mkdir(parents=True, exist_ok=True)
-    wb.save(excel_path)
-    
-    return summary_text, excel_path
+    report_path = ROOT_DIR / "temp" / f"payments_report_all_cities_{timestamp}"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path = _write_payments_export(table, summary, report_path, export_format, with_city=True)
+
+    return summary_text, report_path
@@ -3,9 +3,11 @@ import json
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 from statistics import mean
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from bot.config import ROOT_DIR, CITY_MAPPING, CITIES
-from statistics import mean
+from src.sync_data.attendance_matrix import load_city_matrices
+from src.sync_data.student_stats import load_student_stats
+from bot.services.report_executor import map_cities
 
 
 class ReportService:
@@ -32,8 +34,7 @@ class ReportService:
 
         groups = self._load_json(base / "groups.json")
         students = self._load_json(base / "students.json")
-        attendance = self._load_json(base / "attendance.json")
-        payments = self._load_json(base / "payments.json")
+        attendance_matrices = load_city_matrices(base)
         main_info = self._load_json(base / "main_page_info.json")
 
         report = {
@@ -51,36 +52,23 @@ class ReportService:
         for group_id, group_data in groups.items():
             group_name = group_data.get("Название группы", "Без названия")
             group_students_block = students.get(group_id, {})
-            group_attendance_block = attendance.get(group_id, {})
+            group_matrix = attendance_matrices.get(group_id)
 
             # Список учеников
             student_list = group_students_block.get("students", [])
             total_group_students = group_students_block.get("total_students", 0)
             report["total_students"] += total_group_students
 
-            # Посещаемость
-            attendance_records = group_attendance_block.get("attendance", [])
-            attendance_fields = group_attendance_block.get("fields", [])
-            # Пропускаем первые 2 поля (№, ФИО), остальное - даты
-            date_fields = attendance_fields[2:] if len(attendance_fields) > 2 else []
-            total_lessons = len(date_fields)
+            # Посещаемость (матрица: ученики × даты занятий)
+            total_lessons = len(group_matrix.dates) if group_matrix else 0
+            attendance_records_count = len(group_matrix.students) if group_matrix else 0
 
             attendance_percent = 0
             if total_lessons > 0 and total_group_students > 0:
-                visited = 0
+                # Считаем как присутствие: "Присутствовал", "Был", "Опоздал"
+                visited = group_matrix.present_total(include_was=True)
                 total_possible = total_lessons * total_group_students
 
-                for rec in attendance_records:
-                    attendance_data = rec.get("attendance", {})
-                    # Считаем присутствия (разные варианты статусов)
-                    for date_field in date_fields:
-                        status = str(attendance_data.get(date_field, "")).strip()
-                        # Считаем как присутствие: "Присутствовал", "Был", "Опоздал"
-                        # Приводим к нижнему регистру для сравнения
-                        status_lower = status.lower()
-                        if status_lower in ["присутствовал", "был", "опоздал"]:
-                            visited += 1
-
                 if total_possible > 0:
                     attendance_percent = round((visited / total_possible) * 100, 2)
 
@@ -93,7 +81,7 @@ class ReportService:
                 "total_students": total_group_students,
                 "attendance_percent": attendance_percent,
                 "total_lessons": total_lessons,
-                "attendance_records": len(attendance_records),
+                "attendance_records": attendance_records_count,
             })
 
         # Итоги по городу
@@ -178,130 +166,35 @@ class ReportService:
 
         return "\n".join(lines), groups_list, idx_to_group_id
 
-    def _parse_payment_date(self, payment_date_str: str) -> int:
-        """Извлекает число из строки типа '27 числа' или '6 числа'"""
-        if not payment_date_str:
-            return 1  # По умолчанию 1 число
-
-        # Убираем пробелы и ищем число
-        import re
-        match = re.search(r'(\d+)', payment_date_str)
-        if match:
-            return int(match.group(1))
-        return 1
-
-    def _calculate_student_stats(self, attendance_data: Dict[str, str], date_fields: List[str] = None,
-                                 start_date: datetime = None, end_date: datetime = None) -> Dict[str, int]:
-        """Рассчитывает статистику ученика"""
-        stats = {
-            "total": 0,
-            "present": 0,
-            "late": 0,
-            "absent": 0,
-            "absent_reason": 0
-        }
-
-        # Итерируемся по всем записям в attendance_data (это более надежно, чем по date_fields)
-        # так как ключи могут отличаться наличием пробелов
-        for date_key, status in attendance_data.items():
-            # Парсим дату из формата "DD.MM.YYYY" или "DD.MM.YYYY " (с пробелом)
-            try:
-                date_str = date_key.strip()
-                # Пробуем разные форматы
-                try:
-                    date_obj = datetime.strptime(date_str, "%d.%m.%Y")
-                except ValueError:
-                    # Пробуем с пробелом в конце
-                    date_obj = datetime.strptime(date_str.strip(), "%d.%m.%Y")
-
-                # Если заданы границы дат, проверяем (сравниваем только даты, без времени)
-                if start_date:
-                    start_date_only = datetime(start_date.year, start_date.month, start_date.day)
-                    date_obj_only = datetime(date_obj.year, date_obj.month, date_obj.day)
-                    if date_obj_only < start_date_only:
-                        continue
-                if end_date:
-                    end_date_only = datetime(end_date.year, end_date.month, end_date.day)
-                    date_obj_only = datetime(date_obj.year, date_obj.month, date_obj.day)
-                    if date_obj_only > end_date_only:
-                        continue
-
-                # Если указаны date_fields, проверяем, что эта дата есть в списке
-                if date_fields:
-                    # Проверяем, есть ли эта дата в date_fields (с учетом пробелов)
-                    date_found = False
-                    for df in date_fields:
-                        if df.strip() == date_str.strip():
-                            date_found = True
-                            break
-                    if not date_found:
-                        continue
-                
-                status_clean = str(status).strip()
-                
-                # Пропускаем пустые ячейки - они не учитываются в отчете
-                if not status_clean:
-                    continue
-                
-                stats["total"] += 1
-
-                if status_clean.lower() == "присутствовал":
-                    stats["present"] += 1
-                elif status_clean.lower() == "опоздал":
-                    stats["late"] += 1
-                    stats["present"] += 1  # Опоздал тоже считается присутствием
-                elif status_clean.lower() == "отсутствовал по причине":
-                    stats["absent_reason"] += 1
-                elif status_clean.lower() == "отсутствовал":
-                    stats["absent"] += 1
-            except (ValueError, AttributeError) as e:
-                # Пропускаем некорректные даты
-                continue
-
-        return stats
-
     def get_group_detailed_attendance(self, city_name: str, group_id: str) -> Tuple[str, str]:
         """
         Получает детальный отчет по группе.
         Возвращает: (текст отчета, название города)
+
+        Статистика учеников берется из таблицы, построенной при синхронизации
+        (src/sync_data/student_stats.py), здесь выполняется только форматирование.
         """
         city_en = CITY_MAPPING.get(city_name, city_name)
-        base = self.root_dir / f"data/{city_en}"
-
-        attendance = self._load_json(base / "attendance.json")
-        payments = self._load_json(base / "payments.json")
-        students = self._load_json(base / "students.json")
+        group = load_student_stats(self.root_dir / f"data/{city_en}").get_group(group_id)
 
-        group_data = attendance.get(group_id, {})
-        if not group_data:
+        if not group:
             return f"❌ Группа не найдена", city_name
 
-        group_name = group_data.get("group_name", "Без названия")
-        date_fields = group_data.get("fields", [])[2:]  # Пропускаем № и ФИО
-        attendance_records = group_data.get("attendance", [])
-
-        # Получаем информацию о группе
-        students_data = students.get(group_id, {})
-        total_students = students_data.get("total_students", 0)
+        group_name = group.get("group_name") or "Без названия"
+        lessons = group.get("lessons", 0)
+        total_students = group.get("total_students", 0)
 
         lines = [
             f"🏫 {group_name}",
             "",
             f"   👥 Учеников: {total_students}",
-            f"   📅 Уроков: {len(date_fields)}",
+            f"   📅 Уроков: {lessons}",
         ]
 
         # Рассчитываем посещаемость группы
-        if len(date_fields) > 0 and total_students > 0:
-            total_possible = len(date_fields) * total_students
-            present_count = 0
-
-            for record in attendance_records:
-                att_data = record.get("attendance", {})
-                for date_field in date_fields:
-                    status = att_data.get(date_field, "").strip().lower()
-                    if status in ["присутствовал", "опоздал"]:
-                        present_count += 1
+        if lessons > 0 and total_students > 0:
+            total_possible = lessons * total_students
+            present_count = group.get("present_total", 0)
 
             attendance_percent = round((present_count / total_possible) * 100, 2) if total_possible > 0 else 0
             lines.append(f"   📈 Посещаемость: {attendance_percent}%")
@@ -321,58 +214,21 @@ class ReportService:
         lines.append("─" * 40)
         lines.append("")
 
-        # Создаем карту платежей для получения даты оплаты
-        payments_map = {}
-        payments_list = payments.get("payments", [])
-        for payment in payments_list:
-            student_id = payment.get("student_id", "")
-            payment_date = payment.get("Дата оплаты", "")
-            payments_map[student_id] = payment_date
-
-        # Получаем текущую дату
-        now = datetime.now()
-        current_month_start = datetime(now.year, now.month, 1)
-        next_month_start = (current_month_start + timedelta(days=32)).replace(day=1)
+        month_names = {
+            1: "января", 2: "февраля", 3: "марта", 4: "апреля",
+            5: "мая", 6: "июня", 7: "июля", 8: "августа",
+            9: "сентября", 10: "октября", 11: "ноября", 12: "декабря"
+        }
+        current_month_name = month_names[datetime.now().month]
 
         # Обрабатываем каждого ученика
-        for record in attendance_records:
-            student_id = record.get("student_id", "")
-            fio = record.get("ФИО", "Неизвестно")
-            student_url = record.get("student_url", "")
-            att_data = record.get("attendance", {})
-
-            # Статистика за все время
-            stats_all_time = self._calculate_student_stats(att_data, date_fields)
-
-            # Статистика за текущий месяц
-            payment_date_str = payments_map.get(student_id, "")
-            payment_day = self._parse_payment_date(payment_date_str)
-
-            # Определяем период месяца на основе дня оплаты
-            # Если день оплаты уже прошел в текущем месяце, то период: с дня оплаты текущего месяца до дня оплаты следующего месяца
-            # Если день оплаты еще не наступил, то период: с дня оплаты предыдущего месяца до дня оплаты текущего месяца
-            today_day = now.day
-
-            if today_day >= payment_day:
-                # День оплаты уже прошел - считаем текущий период оплаты
-                month_start = datetime(now.year, now.month, min(payment_day, 28))
-                if now.month == 12:
-                    next_month_start = datetime(now.year + 1, 1, min(payment_day, 28))
-                else:
-                    next_month_start = datetime(now.year, now.month + 1, min(payment_day, 28))
-            else:
-                # День оплаты еще не наступил - считаем предыдущий период оплаты
-                if now.month == 1:
-                    month_start = datetime(now.year - 1, 12, min(payment_day, 28))
-                    next_month_start = datetime(now.year, 1, min(payment_day, 28))
-                else:
-                    month_start = datetime(now.year, now.month - 1, min(payment_day, 28))
-                    next_month_start = datetime(now.year, now.month, min(payment_day, 28))
-
-            # Для расчета статистики учитываем только до текущей даты (но не позже конца периода)
-            month_end_for_stats = min(now, next_month_start - timedelta(days=1))
-
-            stats_month = self._calculate_student_stats(att_data, date_fields, month_start, month_end_for_stats)
+        for student in group.get("students", []):
+            fio = student.get("ФИО") or "Неизвестно"
+            student_url = student.get("student_url", "")
+            stats_all_time = student["all_time"]
+            stats_month = student["period"]
+            month_start = date.fromisoformat(stats_month["start"])
+            next_month_start = date.fromisoformat(stats_month["next"])
 
             # Формируем ФИО с ссылкой
             if student_url:
@@ -389,23 +245,10 @@ class ReportService:
                 f"{stats_all_time['absent']}/{stats_all_time['absent_reason']}"
             )
 
-            # Статистика за месяц
-            month_names = {
-                1: "января", 2: "февраля", 3: "марта", 4: "апреля",
-                5: "мая", 6: "июня", 7: "июля", 8: "августа",
-                9: "сентября", 10: "октября", 11: "ноября", 12: "декабря"
-            }
-
-            current_month_name = month_names[now.month]
-            # Определяем название следующего месяца для отображения
-            if next_month_start.month <= 12:
-                next_month_name = month_names[next_month_start.month]
-            else:
-                next_month_name = month_names[1]
-
+            # Статистика за период оплаты
             lines.append(
                 f"за месяц: с {month_start.strftime('%d')} {current_month_name} до "
-                f"{next_month_start.strftime('%d')} {next_month_name}/"
+                f"{next_month_start.strftime('%d')} {month_names[next_month_start.month]}/"
                 f"{stats_month['present']}/{stats_month['late']}/"
                 f"{stats_month['absent']}/{stats_month['absent_reason']}"
             )
@@ -668,19 +511,18 @@ class ReportService:
         total_students = 0
         all_attendance_percents = []
         
-        # Собираем отчеты по всем городам
-        for city_name in CITIES:
-            try:
-                city_report = self.get_city_report(city_name)
-                all_cities_reports.append(city_report)
-                total_groups += city_report.get("groups_count", 0)
-                total_students += city_report.get("total_students", 0)
-                avg_att = city_report.get("avg_attendance_percent_city", 0)
-                if avg_att > 0:
-                    all_attendance_percents.append(avg_att)
-            except Exception as e:
-                print(f"Ошибка при генерации отчета для города {city_name}: {e}")
+        # Собираем отчеты по всем городам (параллельно, по процессу на город)
+        for city_name, city_report, error in map_cities(_build_city_report, CITIES):
+            if error:
+                print(f"Ошибка при генерации отчета для города {city_name}: {error}")
                 continue
+
+            all_cities_reports.append(city_report)
+            total_groups += city_report.get("groups_count", 0)
+            total_students += city_report.get("total_students", 0)
+            avg_att = city_report.get("avg_attendance_percent_city", 0)
+            if avg_att > 0:
+                all_attendance_percents.append(avg_att)
         
         # Вычисляем среднюю посещаемость по всем городам
         avg_attendance_all = 0
@@ -727,3 +569,8 @@ class ReportService:
             lines.append("")
         
         return "\n".join(lines)
+
+
+def _build_city_report(city_name: str) -> Dict[str, Any]:
+    """Отчет по городу для пула процессов (функция уровня модуля)"""
+    return ReportService().get_city_report(city_name)
@@ -1,16 +1,65 @@
-"""Сервис для работы с хранилищем ролей"""
+"""
+Сервис для работы с хранилищем ролей
+
+Роли читаются из roles.json один раз и хранятся в памяти (общий реестр на файл
+для всех экземпляров RoleStorage). Изменения применяются к реестру и сразу
+атомарно сохраняются в файл. Файл перечитывается, только если его изменили
+извне (проверка mtime/размера не чаще раза в RELOAD_CHECK_INTERVAL секунд).
+"""
 import json
-import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Tuple
 from bot.config import ROLES_FILE
 
 
+# Как часто проверять, не изменился ли файл ролей извне (секунд)
+RELOAD_CHECK_INTERVAL = 2.0
+
+
+class _RolesRegistry:
+    """Роли одного файла в памяти"""
+
+    def __init__(self):
+        self.roles: Dict[str, Dict[str, Any]] = {}
+        # (mtime_ns, размер) файла, из которого загружены роли
+        self.version: Optional[Tuple[int, int]] = None
+        # Счетчик изменений ролей (для кэшей, построенных по ролям)
+        self.revision = 0
+        self.checked_at = 0.0
+        self.lock = threading.RLock()
+
+
+# Реестры ролей: путь к файлу -> реестр
+_registries: Dict[Path, _RolesRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def _get_registry(file_path: Path) -> _RolesRegistry:
+    """Возвращает общий реестр для файла ролей"""
+    with _registries_lock:
+        registry = _registries.get(file_path)
+        if registry is None:
+            registry = _registries[file_path] = _RolesRegistry()
+        return registry
+
+
+def _file_version(file_path: Path) -> Optional[Tuple[int, int]]:
+    """Версия файла (mtime_ns, размер) или None, если файла нет"""
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 class RoleStorage:
     """Класс для работы с roles.json"""
     
     def __init__(self, file_path: Path = ROLES_FILE):
         self.file_path = file_path
+        self._registry = _get_registry(file_path)
         self.ensure_file_exists()
     
     def ensure_file_exists(self) -> None:
@@ -23,8 +72,8 @@ class RoleStorage:
         except Exception as e:
             raise RuntimeError(f"❌ Ошибка при создании файла ролей: {e}")
     
-    def load_roles(self) -> Dict[str, Any]:
-        """Загружает роли из файла"""
+    def _read_file(self) -> Dict[str, Any]:
+        """Читает роли из файла"""
         try:
             if not self.file_path.exists():
                 return {}
@@ -39,24 +88,62 @@ class RoleStorage:
             print(f"⚠️ Ошибка при загрузке ролей: {e}")
             return {}
     
+    def _roles(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Роли из реестра (без копирования - только для чтения под блокировкой реестра)
+
+        Файл перечитывается, если он изменился с момента загрузки.
+        """
+        registry = self._registry
+        now = time.monotonic()
+        if registry.version is not None and now - registry.checked_at < RELOAD_CHECK_INTERVAL:
+            return registry.roles
+
+        with registry.lock:
+            version = _file_version(self.file_path)
+            if version is None or version != registry.version:
+                registry.roles = self._read_file()
+                registry.version = version
+                registry.revision += 1
+            registry.checked_at = now
+            return registry.roles
+    
+    def get_revision(self) -> int:
+        """Номер версии ролей (меняется при каждом изменении или перечитывании файла)"""
+        with self._registry.lock:
+            self._roles()
+            return self._registry.revision
+    
+    def load_roles(self) -> Dict[str, Any]:
+        """Возвращает копию всех ролей"""
+        with self._registry.lock:
+            return {user_id: dict(user_data) for user_id, user_data in self._roles().items()}
+    
     def save_roles(self, data: Dict[str, Any]) -> None:
-        """Сохраняет роли в файл (атомарная запись)"""
-        try:
-            # Записываем во временный файл
-            temp_file = self.file_path.with_suffix('.tmp')
-            
-            with open(temp_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        """Сохраняет роли в файл (атомарная запись) и обновляет реестр"""
+        registry = self._registry
+        with registry.lock:
+            try:
+                # Записываем во временный файл
+                temp_file = self.file_path.with_suffix('.tmp')
+                
+                with open(temp_file, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                
+                # Атомарная замена
+                temp_file.replace(self.file_path)
+            except Exception as e:
+                raise RuntimeError(f"❌ Ошибка при сохранении ролей: {e}")
             
-            # Атомарная замена
-            temp_file.replace(self.file_path)
-        except Exception as e:
-            raise RuntimeError(f"❌ Ошибка при сохранении ролей: {e}")
+            registry.roles = {str(k): dict(v) for k, v in data.items()}
+            registry.version = _file_version(self.file_path)
+            registry.revision += 1
+            registry.checked_at = time.monotonic()
     
     def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Получает данные пользователя по ID"""
-        roles = self.load_roles()
-        return roles.get(str(user_id))
+        """Получает данные пользователя по ID (поиск в памяти)"""
+        user_data = self._roles().get(str(user_id))
+        return dict(user_data) if user_data is not None else None
     
     def add_user(
         self, 
@@ -67,19 +154,20 @@ class RoleStorage:
         city: str = "all"
     ) -> None:
         """Добавляет или обновляет пользователя"""
-        roles = self.load_roles()
-        roles[str(user_id)] = {
-            "fio": fio,
-            "username": username,
-            "role": role,
-            "city": city
-        }
-        self.save_roles(roles)
+        # Чтение и запись под блокировкой реестра, чтобы не потерять параллельные изменения
+        with self._registry.lock:
+            roles = self.load_roles()
+            roles[str(user_id)] = {
+                "fio": fio,
+                "username": username,
+                "role": role,
+                "city": city
+            }
+            self.save_roles(roles)
     
     def user_exists(self, user_id: int) -> bool:
         """Проверяет существование пользователя"""
-        roles = self.load_roles()
-        return str(user_id) in roles
+        return str(user_id) in self._roles()
     
     def is_owner(self, user_id: int) -> bool:
         """Проверяет, является ли пользователь владельцем"""
@@ -102,47 +190,50 @@ class RoleStorage:
     
     def remove_user(self, user_id: int) -> bool:
         """Удаляет пользователя из системы"""
-        roles = self.load_roles()
-        user_id_str = str(user_id)
-        
-        if user_id_str not in roles:
-            return False
-        
-        # Не позволяем удалять владельца
-        from bot.config import OWNER_ID
-        if user_id == OWNER_ID:
-            return False
-        
-        del roles[user_id_str]
-        self.save_roles(roles)
-        return True
+        with self._registry.lock:
+            roles = self.load_roles()
+            user_id_str = str(user_id)
+            
+            if user_id_str not in roles:
+                return False
+            
+            # Не позволяем удалять владельца
+            from bot.config import OWNER_ID
+            if user_id == OWNER_ID:
+                return False
+            
+            del roles[user_id_str]
+            self.save_roles(roles)
+            return True
     
     def update_user_role(self, user_id: int, new_role: str) -> bool:
         """Обновляет роль пользователя"""
-        roles = self.load_roles()
-        user_id_str = str(user_id)
-        
-        if user_id_str not in roles:
-            return False
-        
-        # Не позволяем изменять роль владельца
-        from bot.config import OWNER_ID
-        if user_id == OWNER_ID:
-            return False
-        
-        roles[user_id_str]["role"] = new_role
-        self.save_roles(roles)
-        return True
+        with self._registry.lock:
+            roles = self.load_roles()
+            user_id_str = str(user_id)
+            
+            if user_id_str not in roles:
+                return False
+            
+            # Не позволяем изменять роль владельца
+            from bot.config import OWNER_ID
+            if user_id == OWNER_ID:
+                return False
+            
+            roles[user_id_str]["role"] = new_role
+            self.save_roles(roles)
+            return True
     
     def update_user_city(self, user_id: int, new_city: str) -> bool:
         """Обновляет город пользователя"""
-        roles = self.load_roles()
-        user_id_str = str(user_id)
-        
-        if user_id_str not in roles:
-            return False
-        
-        roles[user_id_str]["city"] = new_city
-        self.save_roles(roles)
-        return True
+        with self._registry.lock:
+            roles = self.load_roles()
+            user_id_str = str(user_id)
+            
+            if user_id_str not in roles:
+                return False
+            
+            roles[user_id_str]["city"] = new_city
+            self.save_roles(roles)
+            return True
 
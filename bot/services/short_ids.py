@@ -0,0 +1,143 @@
+"""
+Короткие коды для callback_data
+
+Telegram ограничивает callback_data 64 байтами, поэтому UUID из Notion и названия
+городов не передаются в кнопках целиком. Каждое значение получает порядковый
+номер в реестре, записанный в base62 ("0", "1", ..., "a", ..., "Z", "10", ...).
+Реестр двусторонний: кодирование и восстановление - поиск в словаре.
+
+Номера не переиспользуются, а реестр хранится в журнале data/short_ids.jsonl
+(одна строка - одно значение, номер = номер строки). Новое значение дописывается
+в журнал до того, как код уйдет в кнопку, поэтому после перезапуска тот же код
+указывает на то же значение, и кнопки в старых сообщениях остаются рабочими.
+Неизвестный код восстанавливается в None.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from bot.config import ROOT_DIR
+from bot.services.file_io import read_json
+
+
+SHORT_IDS_FILE = ROOT_DIR / "data" / "short_ids.jsonl"
+
+BASE62_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def to_base62(number: int) -> str:
+    """Записывает неотрицательное число в base62"""
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    digits = []
+    while number:
+        number, rest = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[rest])
+    return "".join(reversed(digits))
+
+
+def from_base62(code: str) -> Optional[int]:
+    """Читает число из base62 (None, если в коде есть посторонние символы)"""
+    number = 0
+    for char in code:
+        digit = BASE62_ALPHABET.find(char)
+        if digit < 0:
+            return None
+        number = number * 62 + digit
+    return number if code else None
+
+
+class ShortIdRegistry:
+    """Двусторонний реестр: значение <-> короткий код"""
+
+    def __init__(self, file_path: Path = SHORT_IDS_FILE):
+        self.file_path = file_path
+        self.legacy_file = file_path.with_suffix(".json")
+        self._lock = threading.Lock()
+        # Номер значения = индекс в списке
+        self._values: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._migrate_legacy()
+        self._load()
+
+    def _migrate_legacy(self) -> None:
+        """Переносит значения из старого short_ids.json (один JSON список) в журнал"""
+        if self.file_path.exists() or not self.legacy_file.exists():
+            return
+        try:
+            values = (read_json(self.legacy_file, {}) or {}).get("values", [])
+            temp_file = self.file_path.with_suffix(".tmp")
+            with open(temp_file, "w", encoding="utf-8") as f:
+                for value in values:
+                    f.write(json.dumps(value, ensure_ascii=False) + "\n")
+            temp_file.replace(self.file_path)
+            self.legacy_file.replace(self.legacy_file.with_suffix(".json.bak"))
+            print(f"📦 Короткие коды перенесены в {self.file_path} ({len(values)} значений)")
+        except Exception as e:
+            print(f"⚠️ Ошибка при переносе коротких кодов: {e}")
+
+    def _load(self) -> None:
+        """Читает журнал; недописанная последняя строка (сбой при записи) отрезается"""
+        if not self.file_path.exists():
+            return
+        with open(self.file_path, "rb") as f:
+            content = f.read()
+        complete = content.rfind(b"\n") + 1
+        if complete < len(content):
+            with open(self.file_path, "r+b") as f:
+                f.truncate(complete)
+
+        for line in content[:complete].splitlines():
+            try:
+                value = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Строка все равно занимает номер, чтобы не сдвинуть следующие коды
+                value = ""
+            self._index.setdefault(value, len(self._values))
+            self._values.append(value)
+
+    def encode(self, value: str) -> str:
+        """Возвращает короткий код значения (регистрирует новое значение)"""
+        if not value:
+            return ""
+        idx = self._index.get(value)
+        if idx is None:
+            with self._lock:
+                idx = self._index.get(value)
+                if idx is None:
+                    # Сначала запись в журнал, затем выдача кода
+                    with open(self.file_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(value, ensure_ascii=False) + "\n")
+                    idx = len(self._values)
+                    self._values.append(value)
+                    self._index[value] = idx
+        return to_base62(idx)
+
+    def decode(self, code: str) -> Optional[str]:
+        """Восстанавливает значение по короткому коду (None для неизвестного кода)"""
+        idx = from_base62(code or "")
+        if idx is None or idx >= len(self._values) or not self._values[idx]:
+            return None
+        return self._values[idx]
+
+
+_registry: Optional[ShortIdRegistry] = None
+
+
+def get_short_ids() -> ShortIdRegistry:
+    """Возвращает общий реестр коротких кодов"""
+    global _registry
+    if _registry is None:
+        _registry = ShortIdRegistry()
+    return _registry
+
+
+def short_id(value: str) -> str:
+    """Короткий код значения для callback_data (пустая строка для пустого значения)"""
+    return get_short_ids().encode(value)
+
+
+def resolve_short_id(code: str) -> Optional[str]:
+    """Исходное значение по короткому коду из callback_data"""
+    return get_short_ids().decode(code)
@@ -1,54 +1,190 @@
-"""Сервис для отслеживания привлеченных SMM учеников"""
+"""
+Сервис для отслеживания привлеченных SMM учеников
+
+Источник правды - журнал событий data/smm_tracking_events.jsonl, в который
+только дописываются строки:
+    {"op": "add", "id": "...", "data": {...}}            - ученик добавлен
+    {"op": "first_payment", "id": "...", "date": "..."}  - первая оплата
+    {"op": "first_attendance", "id": "...", "date": "..."} - первое посещение
+    {"op": "deleted", "id": "...", "date": "...", "reason": "..."} - удален
+
+При загрузке события применяются к записям учеников в памяти, а вместе с ними
+ведутся счетчики по (сотрудник, месяц) и (город, месяц). Отчеты владельца и SMM
+читают готовые счетчики и не перебирают всех когда-либо добавленных учеников.
+Каждое изменение - одна дописанная строка (в фоне через пул файловых операций).
+"""
 import json
+from collections import defaultdict
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List
-from datetime import datetime
 from bot.config import ROOT_DIR
+from bot.services.file_io import submit_file_io
+
+
+def _month_key(date_str: Optional[str]) -> Optional[str]:
+    """Ключ месяца "ГГГГ-ММ" для даты "ГГГГ-ММ-ДД" (None для пустой или неверной даты)"""
+    if not date_str:
+        return None
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m")
+    except ValueError:
+        return None
+
+
+def _resolve_month(year: Optional[int], month: Optional[int]) -> str:
+    """Ключ месяца для отчета (текущий месяц по умолчанию)"""
+    if year is None or month is None:
+        now = datetime.now()
+        year = year or now.year
+        month = month or now.month
+    return f"{year:04d}-{month:02d}"
 
 
 class SMMTrackingService:
     """Сервис для отслеживания привлеченных SMM учеников"""
-    
-    def __init__(self):
-        self.data_dir = ROOT_DIR / "data"
+
+    def __init__(self, data_dir: Path = None):
+        self.data_dir = data_dir or ROOT_DIR / "data"
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.tracking_file = self.data_dir / "smm_tracking.json"
-        self._ensure_file_exists()
-    
-    def _ensure_file_exists(self) -> None:
-        """Создает файл отслеживания если его нет"""
-        if not self.tracking_file.exists():
-            with open(self.tracking_file, "w", encoding="utf-8") as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
-    
-    def _load_data(self) -> Dict[str, Any]:
-        """Загружает данные отслеживания"""
+        self.events_file = self.data_dir / "smm_tracking_events.jsonl"
+        self.legacy_file = self.data_dir / "smm_tracking.json"
+
+        # student_id -> запись об ученике
+        self._students: Dict[str, Dict[str, Any]] = {}
+        # user_id -> ID всех добавленных им учеников (в порядке добавления)
+        self._by_user: Dict[Any, Dict[str, None]] = defaultdict(dict)
+        # user_id -> роль (по первому добавленному ученику)
+        self._user_roles: Dict[Any, str] = {}
+        # Неудаленные ученики: всего и по месяцам добавления
+        self._user_active: Dict[Any, int] = defaultdict(int)
+        self._user_month_active: Dict[Any, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # Город -> количество записей и пришедшие/ушедшие по месяцам
+        self._city_records: Dict[str, int] = defaultdict(int)
+        self._city_month_added: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._city_month_deleted: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # Месяц удаления -> ID удаленных учеников (в порядке удаления)
+        self._deleted_by_month: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self._total_active = 0
+        self._total_deleted = 0
+
+        self._migrate_legacy()
+        self._load()
+
+    # ---------- Загрузка ----------
+
+    def _migrate_legacy(self) -> None:
+        """Переносит записи из старого smm_tracking.json в журнал событий"""
+        if self.events_file.exists() or not self.legacy_file.exists():
+            return
         try:
-            if not self.tracking_file.exists():
-                return {}
-            
-            with open(self.tracking_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(self.legacy_file, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            temp_file = self.events_file.with_suffix('.tmp')
+            with open(temp_file, "w", encoding="utf-8") as f:
+                for student_id, student_info in legacy.items():
+                    f.write(json.dumps({"op": "add", "id": student_id, "data": student_info}, ensure_ascii=False) + "\n")
+            temp_file.replace(self.events_file)
+            self.legacy_file.replace(self.legacy_file.with_suffix(".json.bak"))
+            print(f"📦 Данные отслеживания перенесены в {self.events_file} ({len(legacy)} учеников)")
         except json.JSONDecodeError:
-            return {}
+            self.legacy_file.replace(self.legacy_file.with_suffix(".json.bak"))
         except Exception as e:
-            print(f"⚠️ Ошибка при загрузке данных отслеживания: {e}")
-            return {}
-    
-    def _save_data(self, data: Dict[str, Any]) -> None:
-        """Сохраняет данные отслеживания"""
+            print(f"⚠️ Ошибка при переносе данных отслеживания: {e}")
+
+    def _load(self) -> None:
+        """Восстанавливает записи и счетчики из журнала событий"""
+        if not self.events_file.exists():
+            return
         try:
-            # Записываем во временный файл
-            temp_file = self.tracking_file.with_suffix('.tmp')
-            
-            with open(temp_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Атомарная замена
-            temp_file.replace(self.tracking_file)
+            with open(self.events_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._apply(event)
         except Exception as e:
-            raise RuntimeError(f"❌ Ошибка при сохранении данных отслеживания: {e}")
-    
+            print(f"⚠️ Ошибка при загрузке данных отслеживания: {e}")
+
+    # ---------- События и счетчики ----------
+
+    def _count(self, student_id: str, student_info: Dict[str, Any], sign: int) -> None:
+        """Добавляет (sign=1) или убирает (sign=-1) вклад записи в счетчики"""
+        city = student_info.get("city_name", "Не указан")
+        self._city_records[city] += sign
+
+        if student_info.get("deleted", False):
+            self._total_deleted += sign
+            deleted_month = _month_key(student_info.get("deleted_date"))
+            if deleted_month:
+                self._city_month_deleted[city][deleted_month] += sign
+                if sign > 0:
+                    self._deleted_by_month[deleted_month][student_id] = None
+                else:
+                    self._deleted_by_month[deleted_month].pop(student_id, None)
+            return
+
+        self._total_active += sign
+        added_month = _month_key(student_info.get("date_added"))
+        if added_month:
+            self._city_month_added[city][added_month] += sign
+
+        user_id = student_info.get("added_by_user_id")
+        if user_id:
+            self._user_active[user_id] += sign
+            if added_month:
+                self._user_month_active[user_id][added_month] += sign
+
+    def _apply(self, event: Dict[str, Any]) -> bool:
+        """Применяет событие к записям и счетчикам; False, если событие ничего не меняет"""
+        student_id = event.get("id")
+        op = event.get("op")
+        old_info = self._students.get(student_id)
+
+        if op == "add":
+            new_info = dict(event.get("data", {}))
+        elif old_info is None:
+            return False
+        elif op == "first_payment":
+            if old_info.get("first_payment_notified", False):
+                return False
+            new_info = {**old_info, "first_payment_notified": True, "first_payment_date": event.get("date")}
+        elif op == "first_attendance":
+            if old_info.get("first_attendance_notified", False):
+                return False
+            new_info = {**old_info, "first_attendance_notified": True, "first_attendance_date": event.get("date")}
+        elif op == "deleted":
+            new_info = {**old_info, "deleted": True, "deleted_date": event.get("date"), "deleted_reason": event.get("reason")}
+        else:
+            return False
+
+        if old_info is not None:
+            self._count(student_id, old_info, -1)
+            self._by_user[old_info.get("added_by_user_id")].pop(student_id, None)
+
+        self._students[student_id] = new_info
+        self._count(student_id, new_info, 1)
+        user_id = new_info.get("added_by_user_id")
+        self._by_user[user_id][student_id] = None
+        if user_id and not new_info.get("deleted", False):
+            self._user_roles.setdefault(user_id, new_info.get("user_role", "unknown"))
+        return True
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        """Дописывает событие в журнал"""
+        with open(self.events_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def _record(self, event: Dict[str, Any]) -> bool:
+        """Применяет событие и ставит его запись в очередь файловых операций"""
+        if not self._apply(event):
+            return False
+        submit_file_io(self._append, event)
+        return True
+
+    # ---------- Изменения ----------
+
     def add_student(
         self,
         student_id: str,
@@ -61,7 +197,7 @@ class SMMTrackingService:
     ) -> None:
         """
         Добавляет ученика в отслеживание
-        
+
         Args:
             student_id: ID ученика в Notion
             added_by_user_id: ID пользователя, который добавил ученика
@@ -70,34 +206,29 @@ class SMMTrackingService:
             group_name: Название группы
             date_added: Дата добавления (если None, используется текущая)
         """
-        data = self._load_data()
-        
         if date_added is None:
             date_added = datetime.now().strftime("%Y-%m-%d")
-        
-        data[student_id] = {
-            "added_by_user_id": added_by_user_id,
-            "student_fio": student_fio,
-            "city_name": city_name,
-            "group_name": group_name,
-            "user_role": user_role,
-            "date_added": date_added,
-            "first_payment_notified": False,
-            "first_attendance_notified": False,
-            "first_payment_date": None,
-            "first_attendance_date": None,
-            "deleted": False,
-            "deleted_date": None,
-            "deleted_reason": None
-        }
-        
-        self._save_data(data)
-    
-    def get_student_info(self, student_id: str) -> Optional[Dict[str, Any]]:
-        """Получает информацию об ученике"""
-        data = self._load_data()
-        return data.get(student_id)
-    
+
+        self._record({
+            "op": "add",
+            "id": student_id,
+            "data": {
+                "added_by_user_id": added_by_user_id,
+                "student_fio": student_fio,
+                "city_name": city_name,
+                "group_name": group_name,
+                "user_role": user_role,
+                "date_added": date_added,
+                "first_payment_notified": False,
+                "first_attendance_notified": False,
+                "first_payment_date": None,
+                "first_attendance_date": None,
+                "deleted": False,
+                "deleted_date": None,
+                "deleted_reason": None
+            }
+        })
+
     def mark_first_payment(
         self,
         student_id: str,
@@ -105,35 +236,19 @@ class SMMTrackingService:
     ) -> bool:
         """
         Отмечает первую оплату ученика
-        
+
         Args:
             student_id: ID ученика
             payment_date: Дата оплаты (если None, используется текущая)
-        
+
         Returns:
             True если это первая оплата и уведомление еще не отправлялось, False иначе
         """
-        data = self._load_data()
-        
-        if student_id not in data:
-            return False
-        
-        student_info = data[student_id]
-        
-        # Если уведомление уже отправлялось, возвращаем False
-        if student_info.get("first_payment_notified", False):
-            return False
-        
-        # Отмечаем первую оплату
         if payment_date is None:
             payment_date = datetime.now().strftime("%Y-%m-%d")
-        
-        student_info["first_payment_notified"] = True
-        student_info["first_payment_date"] = payment_date
-        
-        self._save_data(data)
-        return True
-    
+
+        return self._record({"op": "first_payment", "id": student_id, "date": payment_date})
+
     def mark_first_attendance(
         self,
         student_id: str,
@@ -141,57 +256,63 @@ class SMMTrackingService:
     ) -> bool:
         """
         Отмечает первое посещение ученика
-        
+
         Args:
             student_id: ID ученика
             attendance_date: Дата посещения (если None, используется текущая)
-        
+
         Returns:
             True если это первое посещение и уведомление еще не отправлялось, False иначе
         """
-        data = self._load_data()
-        
-        if student_id not in data:
-            return False
-        
-        student_info = data[student_id]
-        
-        # Если уведомление уже отправлялось, возвращаем False
-        if student_info.get("first_attendance_notified", False):
-            return False
-        
-        # Отмечаем первое посещение
         if attendance_date is None:
             attendance_date = datetime.now().strftime("%Y-%m-%d")
-        
-        student_info["first_attendance_notified"] = True
-        student_info["first_attendance_date"] = attendance_date
-        
-        self._save_data(data)
-        return True
-    
+
+        return self._record({"op": "first_attendance", "id": student_id, "date": attendance_date})
+
+    def mark_deleted(
+        self,
+        student_id: str,
+        reason: str,
+        deleted_date: Optional[str] = None
+    ) -> None:
+        """
+        Отмечает ученика как удаленного
+
+        Args:
+            student_id: ID ученика
+            reason: Причина удаления
+            deleted_date: Дата удаления (если None, используется текущая)
+        """
+        if deleted_date is None:
+            deleted_date = datetime.now().strftime("%Y-%m-%d")
+
+        self._record({"op": "deleted", "id": student_id, "date": deleted_date, "reason": reason})
+
+    # ---------- Чтение ----------
+
+    def get_student_info(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """Получает информацию об ученике"""
+        student_info = self._students.get(student_id)
+        return dict(student_info) if student_info is not None else None
+
     def get_students_by_smm(self, smm_user_id: int) -> List[Dict[str, Any]]:
         """
         Получает список всех учеников, привлеченных указанным SMM
-        
+
         Args:
             smm_user_id: ID SMM пользователя
-        
+
         Returns:
             Список словарей с информацией об учениках
         """
-        data = self._load_data()
-        
-        students = []
-        for student_id, student_info in data.items():
-            if student_info.get("added_by_user_id") == smm_user_id:
-                students.append({
-                    "student_id": student_id,
-                    **student_info
-                })
-        
-        return students
-    
+        return [
+            {
+                "student_id": student_id,
+                **self._students[student_id]
+            }
+            for student_id in self._by_user.get(smm_user_id, ())
+        ]
+
     def get_students_by_smm_in_month(
         self,
         smm_user_id: int,
@@ -200,166 +321,79 @@ class SMMTrackingService:
     ) -> List[Dict[str, Any]]:
         """
         Получает список учеников, привлеченных SMM в указанном месяце
-        
+
         Args:
             smm_user_id: ID SMM пользователя
             year: Год (если None, используется текущий)
             month: Месяц (1-12, если None, используется текущий)
-        
+
         Returns:
             Список словарей с информацией об учениках
         """
-        if year is None or month is None:
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        data = self._load_data()
-        
-        students = []
-        for student_id, student_info in data.items():
-            if student_info.get("added_by_user_id") != smm_user_id:
-                continue
-            
-            date_added = student_info.get("date_added", "")
-            if not date_added:
-                continue
-            
-            try:
-                added_date = datetime.strptime(date_added, "%Y-%m-%d")
-                if added_date.year == year and added_date.month == month:
-                    students.append({
-                        "student_id": student_id,
-                        **student_info
-                    })
-            except ValueError:
-                continue
-        
-        return students
-    
+        month_key = _resolve_month(year, month)
+        return [
+            student for student in self.get_students_by_smm(smm_user_id)
+            if _month_key(student.get("date_added")) == month_key
+        ]
+
     def get_statistics(self, smm_user_id: int) -> Dict[str, Any]:
         """
         Получает статистику по привлеченным ученикам для SMM
-        
+
         Args:
             smm_user_id: ID SMM пользователя
-        
+
         Returns:
             Словарь со статистикой
         """
         all_students = self.get_students_by_smm(smm_user_id)
-        now = datetime.now()
-        current_month_students = self.get_students_by_smm_in_month(
-            smm_user_id,
-            now.year,
-            now.month
-        )
-        
-        total_count = len(all_students)
-        current_month_count = len(current_month_students)
-        
-        # Подсчитываем с первой оплатой и первым посещением
-        with_first_payment = sum(
-            1 for s in all_students
-            if s.get("first_payment_notified", False)
-        )
-        with_first_attendance = sum(
-            1 for s in all_students
-            if s.get("first_attendance_notified", False)
-        )
-        
+        month_key = _resolve_month(None, None)
+
         return {
-            "total_students": total_count,
-            "current_month_students": current_month_count,
-            "with_first_payment": with_first_payment,
-            "with_first_attendance": with_first_attendance
+            "total_students": len(all_students),
+            "current_month_students": sum(
+                1 for s in all_students
+                if _month_key(s.get("date_added")) == month_key
+            ),
+            "with_first_payment": sum(
+                1 for s in all_students
+                if s.get("first_payment_notified", False)
+            ),
+            "with_first_attendance": sum(
+                1 for s in all_students
+                if s.get("first_attendance_notified", False)
+            )
         }
-    
-    def mark_deleted(
-        self,
-        student_id: str,
-        reason: str,
-        deleted_date: Optional[str] = None
-    ) -> None:
-        """
-        Отмечает ученика как удаленного
-        
-        Args:
-            student_id: ID ученика
-            reason: Причина удаления
-            deleted_date: Дата удаления (если None, используется текущая)
-        """
-        data = self._load_data()
-        
-        if student_id not in data:
-            return
-        
-        if deleted_date is None:
-            deleted_date = datetime.now().strftime("%Y-%m-%d")
-        
-        data[student_id]["deleted"] = True
-        data[student_id]["deleted_date"] = deleted_date
-        data[student_id]["deleted_reason"] = reason
-        
-        self._save_data(data)
-    
+
     def get_all_employees_statistics(
         self,
         year: Optional[int] = None,
         month: Optional[int] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
-        Получает статистику по всем сотрудникам
-        
+        Получает статистику по всем сотрудникам (без удаленных учеников)
+
         Args:
             year: Год (если None, используется текущий)
             month: Месяц (1-12, если None, используется текущий)
-        
+
         Returns:
             Словарь {user_id: {"fio": ..., "total": ..., "month": ..., "role": ...}}
         """
-        if year is None or month is None:
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        data = self._load_data()
-        
-        employees_stats = {}
-        
-        for student_id, student_info in data.items():
-            # Пропускаем удаленных учеников при подсчете привлеченных
-            if student_info.get("deleted", False):
-                continue
-            
-            user_id = student_info.get("added_by_user_id")
-            if not user_id:
-                continue
-            
-            if user_id not in employees_stats:
-                employees_stats[user_id] = {
-                    "user_id": user_id,
-                    "fio": None,  # Будет заполнено из role_storage
-                    "role": student_info.get("user_role", "unknown"),
-                    "total": 0,
-                    "month": 0
-                }
-            
-            # Подсчитываем общее количество
-            employees_stats[user_id]["total"] += 1
-            
-            # Подсчитываем за месяц
-            date_added = student_info.get("date_added", "")
-            if date_added:
-                try:
-                    added_date = datetime.strptime(date_added, "%Y-%m-%d")
-                    if added_date.year == year and added_date.month == month:
-                        employees_stats[user_id]["month"] += 1
-                except ValueError:
-                    pass
-        
-        return employees_stats
-    
+        month_key = _resolve_month(year, month)
+
+        return {
+            user_id: {
+                "user_id": user_id,
+                "fio": None,  # Будет заполнено из role_storage
+                "role": self._user_roles.get(user_id, "unknown"),
+                "total": total,
+                "month": self._user_month_active[user_id].get(month_key, 0)
+            }
+            for user_id, total in self._user_active.items()
+            if total > 0
+        }
+
     def get_city_statistics(
         self,
         year: Optional[int] = None,
@@ -367,226 +401,30 @@ class SMMTrackingService:
     ) -> Dict[str, Dict[str, int]]:
         """
         Получает статистику по городам (сколько пришло и ушло)
-        
+
         Args:
             year: Год (если None, используется текущий)
             month: Месяц (1-12, если None, используется текущий)
-        
+
         Returns:
             Словарь {city_name: {"added": ..., "deleted": ..., "net": ...}}
         """
-        if year is None or month is None:
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        data = self._load_data()
-        
+        month_key = _resolve_month(year, month)
+
         city_stats = {}
-        
-        for student_id, student_info in data.items():
-            city = student_info.get("city_name", "Не указан")
-            
-            if city not in city_stats:
-                city_stats[city] = {
-                    "added": 0,
-                    "deleted": 0,
-                    "net": 0
-                }
-            
-            # Подсчитываем пришедших за месяц
-            if not student_info.get("deleted", False):
-                date_added = student_info.get("date_added", "")
-                if date_added:
-                    try:
-                        added_date = datetime.strptime(date_added, "%Y-%m-%d")
-                        if added_date.year == year and added_date.month == month:
-                            city_stats[city]["added"] += 1
-                    except ValueError:
-                        pass
-            
-            # Подсчитываем ушедших за месяц
-            if student_info.get("deleted", False):
-                deleted_date = student_info.get("deleted_date", "")
-                if deleted_date:
-                    try:
-                        deleted_date_obj = datetime.strptime(deleted_date, "%Y-%m-%d")
-                        if deleted_date_obj.year == year and deleted_date_obj.month == month:
-                            city_stats[city]["deleted"] += 1
-                    except ValueError:
-                        pass
-        
-        # Вычисляем чистый прирост для каждого города
-        for city in city_stats:
-            city_stats[city]["net"] = city_stats[city]["added"] - city_stats[city]["deleted"]
-        
-        return city_stats
-    
-    def get_deleted_students_statistics(
-        self,
-        year: Optional[int] = None,
-        month: Optional[int] = None
-    ) -> Dict[str, Any]:
-        """
-        Получает статистику по удаленным ученикам
-        
-        Args:
-            year: Год (если None, используется текущий)
-            month: Месяц (1-12, если None, используется текущий)
-        
-        Returns:
-            Словарь со статистикой ухода
-        """
-        if year is None or month is None:
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        data = self._load_data()
-        
-        deleted_in_month = []
-        deleted_by_city = {}
-        deleted_by_group = {}
-        
-        total_students = len([s for s in data.values() if not s.get("deleted", False)])
-        total_deleted = len([s for s in data.values() if s.get("deleted", False)])
-        
-        for student_id, student_info in data.items():
-            if not student_info.get("deleted", False):
-                continue
-            
-            deleted_date = student_info.get("deleted_date", "")
-            if not deleted_date:
-                continue
-            
-            try:
-                deleted_date_obj = datetime.strptime(deleted_date, "%Y-%m-%d")
-                if deleted_date_obj.year == year and deleted_date_obj.month == month:
-                    city = student_info.get("city_name", "Не указан")
-                    group = student_info.get("group_name", "Не указана")
-                    
-                    deleted_in_month.append({
-                        "student_id": student_id,
-                        "student_fio": student_info.get("student_fio", "Неизвестно"),
-                        "city_name": city,
-                        "group_name": group,
-                        "deleted_date": deleted_date,
-                        "deleted_reason": student_info.get("deleted_reason", "")
-                    })
-                    
-                    # Подсчитываем по городам
-                    if city not in deleted_by_city:
-                        deleted_by_city[city] = 0
-                    deleted_by_city[city] += 1
-                    
-                    # Подсчитываем по группам
-                    group_key = f"{city} - {group}"
-                    if group_key not in deleted_by_group:
-                        deleted_by_group[group_key] = 0
-                    deleted_by_group[group_key] += 1
-            except ValueError:
-                continue
-        
-        # Вычисляем процент ухода
-        dropout_rate = 0.0
-        if total_students + total_deleted > 0:
-            dropout_rate = (total_deleted / (total_students + total_deleted)) * 100
-        
-        return {
-            "deleted_in_month": len(deleted_in_month),
-            "deleted_list": deleted_in_month,
-            "deleted_by_city": deleted_by_city,
-            "deleted_by_group": deleted_by_group,
-            "total_students": total_students,
-            "total_deleted": total_deleted,
-            "dropout_rate": round(dropout_rate, 2)
-        }
-    
-    def mark_deleted(
-        self,
-        student_id: str,
-        reason: str,
-        deleted_date: Optional[str] = None
-    ) -> None:
-        """
-        Отмечает ученика как удаленного
-        
-        Args:
-            student_id: ID ученика
-            reason: Причина удаления
-            deleted_date: Дата удаления (если None, используется текущая)
-        """
-        data = self._load_data()
-        
-        if student_id not in data:
-            return
-        
-        if deleted_date is None:
-            deleted_date = datetime.now().strftime("%Y-%m-%d")
-        
-        data[student_id]["deleted"] = True
-        data[student_id]["deleted_date"] = deleted_date
-        data[student_id]["deleted_reason"] = reason
-        
-        self._save_data(data)
-    
-    def get_all_employees_statistics(
-        self,
-        year: Optional[int] = None,
-        month: Optional[int] = None
-    ) -> Dict[str, Dict[str, Any]]:
-        """
-        Получает статистику по всем сотрудникам
-        
-        Args:
-            year: Год (если None, используется текущий)
-            month: Месяц (1-12, если None, используется текущий)
-        
-        Returns:
-            Словарь {user_id: {"fio": ..., "total": ..., "month": ..., "role": ...}}
-        """
-        if year is None or month is None:
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        data = self._load_data()
-        
-        employees_stats = {}
-        
-        for student_id, student_info in data.items():
-            # Пропускаем удаленных учеников при подсчете привлеченных
-            if student_info.get("deleted", False):
-                continue
-            
-            user_id = student_info.get("added_by_user_id")
-            if not user_id:
+        for city, records in self._city_records.items():
+            if records <= 0:
                 continue
-            
-            if user_id not in employees_stats:
-                employees_stats[user_id] = {
-                    "user_id": user_id,
-                    "fio": None,  # Будет заполнено из role_storage
-                    "role": student_info.get("user_role", "unknown"),
-                    "total": 0,
-                    "month": 0
-                }
-            
-            # Подсчитываем общее количество
-            employees_stats[user_id]["total"] += 1
-            
-            # Подсчитываем за месяц
-            date_added = student_info.get("date_added", "")
-            if date_added:
-                try:
-                    added_date = datetime.strptime(date_added, "%Y-%m-%d")
-                    if added_date.year == year and added_date.month == month:
-                        employees_stats[user_id]["month"] += 1
-                except ValueError:
-                    pass
-        
-        return employees_stats
-    
+            added = self._city_month_added[city].get(month_key, 0)
+            deleted = self._city_month_deleted[city].get(month_key, 0)
+            city_stats[city] = {
+                "added": added,
+                "deleted": deleted,
+                "net": added - deleted
+            }
+
+        return city_stats
+
     def get_deleted_students_statistics(
         self,
         year: Optional[int] = None,
@@ -594,75 +432,60 @@ class SMMTrackingService:
     ) -> Dict[str, Any]:
         """
         Получает статистику по удаленным ученикам
-        
+
         Args:
             year: Год (если None, используется текущий)
             month: Месяц (1-12, если None, используется текущий)
-        
+
         Returns:
             Словарь со статистикой ухода
         """
-        if year is None or month is None:
-            now = datetime.now()
-            year = year or now.year
-            month = month or now.month
-        
-        data = self._load_data()
-        
+        month_key = _resolve_month(year, month)
+
         deleted_in_month = []
         deleted_by_city = {}
         deleted_by_group = {}
-        
-        total_students = len([s for s in data.values() if not s.get("deleted", False)])
-        total_deleted = len([s for s in data.values() if s.get("deleted", False)])
-        
-        for student_id, student_info in data.items():
-            if not student_info.get("deleted", False):
-                continue
-            
-            deleted_date = student_info.get("deleted_date", "")
-            if not deleted_date:
-                continue
-            
-            try:
-                deleted_date_obj = datetime.strptime(deleted_date, "%Y-%m-%d")
-                if deleted_date_obj.year == year and deleted_date_obj.month == month:
-                    city = student_info.get("city_name", "Не указан")
-                    group = student_info.get("group_name", "Не указана")
-                    
-                    deleted_in_month.append({
-                        "student_id": student_id,
-                        "student_fio": student_info.get("student_fio", "Неизвестно"),
-                        "city_name": city,
-                        "group_name": group,
-                        "deleted_date": deleted_date,
-                        "deleted_reason": student_info.get("deleted_reason", "")
-                    })
-                    
-                    # Подсчитываем по городам
-                    if city not in deleted_by_city:
-                        deleted_by_city[city] = 0
-                    deleted_by_city[city] += 1
-                    
-                    # Подсчитываем по группам
-                    group_key = f"{city} - {group}"
-                    if group_key not in deleted_by_group:
-                        deleted_by_group[group_key] = 0
-                    deleted_by_group[group_key] += 1
-            except ValueError:
-                continue
-        
+
+        for student_id in self._deleted_by_month.get(month_key, {}):
+            student_info = self._students[student_id]
+            city = student_info.get("city_name", "Не указан")
+            group = student_info.get("group_name", "Не указана")
+
+            deleted_in_month.append({
+                "student_id": student_id,
+                "student_fio": student_info.get("student_fio", "Неизвестно"),
+                "city_name": city,
+                "group_name": group,
+                "deleted_date": student_info.get("deleted_date"),
+                "deleted_reason": student_info.get("deleted_reason", "")
+            })
+
+            deleted_by_city[city] = deleted_by_city.get(city, 0) + 1
+            group_key = f"{city} - {group}"
+            deleted_by_group[group_key] = deleted_by_group.get(group_key, 0) + 1
+
         # Вычисляем процент ухода
         dropout_rate = 0.0
-        if total_students + total_deleted > 0:
-            dropout_rate = (total_deleted / (total_students + total_deleted)) * 100
-        
+        if self._total_active + self._total_deleted > 0:
+            dropout_rate = (self._total_deleted / (self._total_active + self._total_deleted)) * 100
+
         return {
             "deleted_in_month": len(deleted_in_month),
             "deleted_list": deleted_in_month,
             "deleted_by_city": deleted_by_city,
             "deleted_by_group": deleted_by_group,
-            "total_students": total_students,
-            "total_deleted": total_deleted,
+            "total_students": self._total_active,
+            "total_deleted": self._total_deleted,
             "dropout_rate": round(dropout_rate, 2)
         }
+
+
+_service: Optional[SMMTrackingService] = None
+
+
+def get_smm_tracking() -> SMMTrackingService:
+    """Возвращает общий сервис отслеживания привлеченных учеников"""
+    global _service
+    if _service is None:
+        _service = SMMTrackingService()
+    return _service
@@ -0,0 +1,173 @@
+"""
+Данные ученика из анкеты: шаблон, разбор, проверка и подготовка к сохранению
+
+Общие для Telegram и VK ботов; обработчики только отправляют шаблон и ответы
+своей платформы.
+"""
+import re
+from datetime import date
+from typing import Dict, Any, Tuple
+
+
+# Доступные тарифы и статусы
+AVAILABLE_TARIFFS = [
+    "Группа 2 раза",
+    "Группа 3 раза",
+    "Группа 1 раз",
+    "Индивидуальные 1 раз",
+    "Индивидуальные 2 раза",
+    "Индивидуальные 3 раза",
+    "Индивидуальные 4 раза",
+    "Индивидуальные 5 раз",
+]
+
+AVAILABLE_STATUSES = [
+    "Обучается",
+    "Не начал",
+    "Закончил",
+    "Не обучается",
+]
+
+
+def get_template_text() -> str:
+    """Шаблон для ввода данных ученика (без разметки, одинаковый для Telegram и VK)"""
+    return ("ФИО: Сусуркиев Абдул-Азиз Назирович\n"
+            "Возраст: 21\n"
+            "Дата поступления: 2025-11-22\n"
+            "Номер родителя: +79623331909\n"
+            "Имя родителя: Назир\n"
+            "Тариф: Группа 2 раза\n"
+            "Статус: Обучается\n"
+            "Ссылка на WA, TG:\n"
+            "Комментарий: Доп информация")
+
+
+def parse_student_data(text: str) -> Dict[str, Any]:
+    """
+    Парсит данные ученика из текста
+    Формат: Ключ: значение (каждая строка отдельно)
+
+    Допускаются и строки старого шаблона VK: "Ключ": "значение", (кавычки и
+    запятая в конце строки отбрасываются).
+    """
+    data = {}
+    text = text.strip()
+
+    # Разбиваем текст на строки
+    lines = text.split('\n')
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        # Ищем двоеточие для разделения ключа и значения
+        if ':' in line:
+            # Разделяем по первому двоеточию
+            parts = line.split(':', 1)
+            if len(parts) == 2:
+                key = parts[0].strip().strip('"')
+                value = parts[1].strip().rstrip(',').strip().strip('"').strip()
+
+                # Пропускаем пустые ключи
+                if not key:
+                    continue
+
+                # Обработка разных типов данных
+                if key == "Возраст":
+                    if value:
+                        try:
+                            data[key] = int(value)
+                        except ValueError:
+                            data[key] = value  # Оставим строку для валидации
+                elif key == "Дата поступления":
+                    if value:  # Добавляем только если значение не пустое
+                        data[key] = value
+                elif key in ["ФИО", "Номер родителя"]:
+                    # Обязательные поля - добавляем даже если пустые (валидация поймает)
+                    data[key] = value
+                elif key in ["Имя родителя", "Ссылка на WA, TG", "Комментарий"]:
+                    # Необязательные поля - добавляем только если не пустые
+                    if value:
+                        data[key] = value
+                elif key in ["Тариф", "Статус"]:
+                    # Эти поля могут быть пустыми - используем значения по умолчанию
+                    if value:
+                        data[key] = value
+                else:
+                    # Неизвестные поля - добавляем только если не пустые
+                    if value:
+                        data[key] = value
+
+    return data
+
+
+def validate_student_data(data: Dict[str, Any]) -> Tuple[bool, str]:
+    """
+    Валидирует данные ученика
+    Возвращает (is_valid, error_message)
+    """
+    # Проверка обязательных полей
+    if not data.get("ФИО"):
+        return False, "❌ Поле 'ФИО' обязательно для заполнения"
+
+    if not data.get("Возраст"):
+        return False, "❌ Поле 'Возраст' обязательно для заполнения"
+
+    try:
+        age = int(data.get("Возраст"))
+        if age < 0 or age > 150:
+            return False, "❌ Возраст должен быть от 0 до 150"
+    except (ValueError, TypeError):
+        return False, "❌ Возраст должен быть числом"
+
+    if not data.get("Номер родителя"):
+        return False, "❌ Поле 'Номер родителя' обязательно для заполнения"
+
+    # Валидация номера телефона
+    phone = data.get("Номер родителя", "")
+    phone_digits = re.sub(r"\D", "", phone)
+    if len(phone_digits) != 11 or (not phone_digits.startswith("7") and not phone_digits.startswith("8")):
+        return False, "❌ Номер телефона должен быть в формате +7XXXXXXXXXX (11 цифр)"
+
+    # Нормализация номера
+    if phone_digits.startswith("8"):
+        phone_digits = "7" + phone_digits[1:]
+    if not phone.startswith("+"):
+        data["Номер родителя"] = f"+{phone_digits}"
+    else:
+        data["Номер родителя"] = f"+{phone_digits}"
+
+    # Валидация тарифа
+    if data.get("Тариф") and data.get("Тариф") not in AVAILABLE_TARIFFS:
+        return False, f"❌ Неверный тариф. Доступные: {', '.join(AVAILABLE_TARIFFS)}"
+
+    # Валидация статуса
+    if data.get("Статус") and data.get("Статус") not in AVAILABLE_STATUSES:
+        return False, f"❌ Неверный статус. Доступные: {', '.join(AVAILABLE_STATUSES)}"
+
+    return True, ""
+
+
+def prepare_student_data(data: Dict[str, Any], city_name: str) -> Dict[str, Any]:
+    """Подготавливает данные ученика для сохранения"""
+    # Устанавливаем дату поступления если не указана
+    if not data.get("Дата поступления"):
+        today = date.today()
+        data["Дата поступления"] = today.strftime("%Y-%m-%d")
+
+    # Устанавливаем значения по умолчанию
+    result = {
+        "ФИО": data.get("ФИО", ""),
+        "Возраст": int(data.get("Возраст", 0)) if data.get("Возраст") else 0,
+        "Дата поступления": data.get("Дата поступления", ""),
+        "Номер родителя": data.get("Номер родителя", ""),
+        "Имя родителя": data.get("Имя родителя", "") or "",  # Пустая строка если не указано
+        "Тариф": data.get("Тариф", "Группа 2 раза"),
+        "Статус": data.get("Статус", "Обучается"),
+        "Город": city_name,
+        "Ссылка на WA, TG": data.get("Ссылка на WA, TG", "") or "",  # Пустая строка если не указано
+        "Комментарий": data.get("Комментарий", "") or "",  # Пустая строка если не указано
+    }
+
+    return result
@@ -4,6 +4,8 @@ import re
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from bot.config import ROOT_DIR, CITY_MAPPING, CITIES
+from bot.services.info_read_model import get_city_read_model
+from src.sync_data.sqlite_mirror import CRMMirror, DATASET_STUDENTS, get_mirror
 
 
 class StudentSearchService:
@@ -11,6 +13,38 @@ class StudentSearchService:
     
     def __init__(self):
         self.root_dir = ROOT_DIR
+        self.mirror = get_mirror()
+    
+    def _get_mirror(self, city_name: str) -> Optional[CRMMirror]:
+        """Зеркало SQLite, если оно включено и ученики города в него загружены"""
+        if self.mirror and self.mirror.has_city(CITY_MAPPING.get(city_name, city_name), DATASET_STUDENTS):
+            return self.mirror
+        return None
+    
+    def _with_city(self, student: Dict[str, Any], city_name: str) -> Dict[str, Any]:
+        """Полная информация об ученике из зеркала (группа уже указана) с городом"""
+        result = student.copy()
+        result["Город"] = city_name
+        return result
+    
+    def _short_info(self, student: Dict[str, Any], group_name: str, group_id: str, city_name: str) -> Dict[str, Any]:
+        """Краткая информация об ученике для списка результатов"""
+        return {
+            "ФИО": student.get("ФИО", "").strip(),
+            "Номер родителя": student.get("Номер родителя", ""),
+            "group_name": group_name,
+            "group_id": group_id,
+            "ID": student.get("ID", ""),
+            "student_url": student.get("student_url", ""),
+            "Город": student.get("Город", city_name),
+            "Возраст": student.get("Возраст", ""),
+            "Дата поступления": student.get("Дата поступления", ""),
+            "Имя родителя": student.get("Имя родителя", ""),
+            "Тариф": student.get("Тариф", ""),
+            "Статус": student.get("Статус", ""),
+            "Ссылка на WA, TG": student.get("Ссылка на WA, TG", ""),
+            "Комментарий": student.get("Комментарий", "")
+        }
     
     def _load_city_students(self, city_name: str) -> Dict[str, Any]:
         """Загружает данные учеников для города"""
@@ -72,6 +106,12 @@ class StudentSearchService:
     
     def search_by_phone(self, city_name: str, phone: str) -> Optional[Dict[str, Any]]:
         """Поиск ученика по номеру телефона (полная информация)"""
+        mirror = self._get_mirror(city_name)
+        if mirror:
+            # Индексный поиск по последним 10 цифрам номера
+            found = mirror.find_students_by_phone(CITY_MAPPING.get(city_name, city_name), phone)
+            return self._with_city(found[0], city_name) if found else None
+        
         students_data = self._load_city_students(city_name)
         normalized_phone = self._normalize_phone_for_search(phone)
         
@@ -105,6 +145,11 @@ class StudentSearchService:
     
     def search_by_full_name(self, city_name: str, full_name: str) -> Optional[Dict[str, Any]]:
         """Поиск ученика по полному ФИО (полная информация)"""
+        mirror = self._get_mirror(city_name)
+        if mirror:
+            found = mirror.find_students_by_fio(CITY_MAPPING.get(city_name, city_name), full_name)
+            return self._with_city(found[0], city_name) if found else None
+        
         students_data = self._load_city_students(city_name)
         search_name = full_name.lower().strip()
         
@@ -119,14 +164,27 @@ class StudentSearchService:
                     return result
         
         return None
-    
+
+    def get_student_by_id(self, city_name: str, student_id: str) -> Optional[Dict[str, Any]]:
+        """Данные ученика по полному ID (с group_name и group_id) или None"""
+        if not student_id:
+            return None
+        return get_city_read_model(city_name).get_student(student_id)
+
     def search_by_name_or_surname(self, city_name: str, name: str) -> List[Dict[str, Any]]:
         """
         Поиск по имени или фамилии (список с краткой информацией)
         Возвращает список: номер, группа, полное ФИО
         """
-        students_data = self._load_city_students(city_name)
         search_term = name.lower().strip()
+        mirror = self._get_mirror(city_name)
+        if mirror:
+            return [
+                self._short_info(student, student["group_name"], student["group_id"], city_name)
+                for student in mirror.find_students_by_name_part(CITY_MAPPING.get(city_name, city_name), search_term)
+            ]
+        
+        students_data = self._load_city_students(city_name)
         results = []
         
         for group_id, group_data in students_data.items():
@@ -140,22 +198,7 @@ class StudentSearchService:
                 
                 # Проверяем, совпадает ли с именем или фамилией
                 if any(part == search_term for part in fio_parts):
-                    results.append({
-                        "ФИО": fio,
-                        "Номер родителя": student.get("Номер родителя", ""),
-                        "group_name": group_name,
-                        "group_id": group_id,
-                        "ID": student.get("ID", ""),
-                        "student_url": student.get("student_url", ""),
-                        "Город": student.get("Город", city_name),
-                        "Возраст": student.get("Возраст", ""),
-                        "Дата поступления": student.get("Дата поступления", ""),
-                        "Имя родителя": student.get("Имя родителя", ""),
-                        "Тариф": student.get("Тариф", ""),
-                        "Статус": student.get("Статус", ""),
-                        "Ссылка на WA, TG": student.get("Ссылка на WA, TG", ""),
-                        "Комментарий": student.get("Комментарий", "")
-                    })
+                    results.append(self._short_info(student, group_name, group_id, city_name))
         
         return results
     
@@ -1,93 +1,188 @@
-"""Сервис для хранения необработанных учеников"""
+"""
+Сервис для хранения необработанных учеников
+
+После добавления ученика менеджерам и владельцу приходит уведомление с кнопкой
+"Обработано". Запись об уведомлении (сообщения, данные ученика) нужна кнопке и
+ежедневному напоминанию о необработанных учениках, поэтому хранится одна:
+
+- в памяти: словарь notification_id -> запись (добавление, удаление и поиск - O(1));
+- на диске: журнал операций data/unprocessed_students.jsonl
+      {"op": "add", "id": "...", "data": {...}}
+      {"op": "remove", "id": "..."}
+  который сжимается до текущих записей, когда в нем накапливается много
+  удаленных строк.
+
+Записи старше UNPROCESSED_TTL_DAYS удаляются при очистке, а при переполнении
+(MAX_UNPROCESSED) вытесняются самые старые. Запись на диск идет в фоне через
+пул файловых операций.
+"""
 import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 from bot.config import ROOT_DIR
+from bot.services.file_io import submit_file_io
+
+
+# Сколько дней уведомление считается актуальным
+UNPROCESSED_TTL_DAYS = 30
+
+# Максимум хранимых уведомлений
+MAX_UNPROCESSED = 1000
+
+# Журнал сжимается, когда строк в нем больше живых записей на это число
+COMPACT_THRESHOLD = 200
 
 
 class UnprocessedStudentsStorage:
     """Класс для работы с необработанными учениками"""
-    
+
     def __init__(self, file_path: Path = None):
         if file_path is None:
-            file_path = ROOT_DIR / "data" / "unprocessed_students.json"
+            file_path = ROOT_DIR / "data" / "unprocessed_students.jsonl"
         self.file_path = file_path
-        self.ensure_file_exists()
-    
-    def ensure_file_exists(self) -> None:
-        """Создает файл если его нет"""
+        self.legacy_file = file_path.with_suffix(".json")
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._log_lines = 0
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._migrate_legacy()
+        self._load()
+
+    # ---------- Загрузка ----------
+
+    def _migrate_legacy(self) -> None:
+        """Переносит записи из старого unprocessed_students.json в журнал"""
+        if self.file_path.exists() or not self.legacy_file.exists():
+            return
         try:
-            if not self.file_path.exists():
-                self.file_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(self.file_path, "w", encoding="utf-8") as f:
-                    json.dump({}, f, ensure_ascii=False, indent=2)
+            with open(self.legacy_file, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            self._rewrite([(notification_id, data) for notification_id, data in legacy.items()])
+            self.legacy_file.replace(self.legacy_file.with_suffix(".json.bak"))
+            print(f"📦 Необработанные ученики перенесены в {self.file_path} ({len(legacy)} записей)")
         except Exception as e:
-            raise RuntimeError(f"❌ Ошибка при создании файла необработанных учеников: {e}")
-    
-    def load_unprocessed(self) -> Dict[str, Any]:
-        """Загружает необработанных учеников из файла"""
+            print(f"⚠️ Ошибка при переносе необработанных учеников: {e}")
+
+    def _load(self) -> None:
+        """Восстанавливает записи из журнала"""
+        if not self.file_path.exists():
+            return
         try:
-            if not self.file_path.exists():
-                return {}
-            
             with open(self.file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._log_lines += 1
+                    notification_id = record.get("id")
+                    if record.get("op") == "add":
+                        self._entries[notification_id] = record.get("data", {})
+                        self._entries.move_to_end(notification_id)
+                    elif record.get("op") == "remove":
+                        self._entries.pop(notification_id, None)
         except Exception as e:
             print(f"⚠️ Ошибка при загрузке необработанных учеников: {e}")
-            return {}
-    
-    def save_unprocessed(self, data: Dict[str, Any]) -> None:
-        """Сохраняет необработанных учеников в файл (атомарная запись)"""
-        try:
-            temp_file = self.file_path.with_suffix('.tmp')
-            
-            with open(temp_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            temp_file.replace(self.file_path)
-        except Exception as e:
-            raise RuntimeError(f"❌ Ошибка при сохранении необработанных учеников: {e}")
-    
+        self.sweep_expired()
+
+    # ---------- Запись на диск (в пуле файловых операций) ----------
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Дописывает операцию в журнал"""
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _rewrite(self, entries: List[tuple]) -> None:
+        """Перезаписывает журнал текущими записями (атомарная запись)"""
+        temp_file = self.file_path.with_suffix('.tmp')
+        with open(temp_file, "w", encoding="utf-8") as f:
+            for notification_id, data in entries:
+                f.write(json.dumps({"op": "add", "id": notification_id, "data": data}, ensure_ascii=False) + "\n")
+        temp_file.replace(self.file_path)
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        """Ставит операцию в очередь записи и при необходимости сжимает журнал"""
+        self._log_lines += 1
+        if self._log_lines - len(self._entries) > COMPACT_THRESHOLD:
+            self._log_lines = len(self._entries)
+            submit_file_io(self._rewrite, list(self._entries.items()))
+        else:
+            submit_file_io(self._append, record)
+
+    # ---------- Операции ----------
+
+    def _remove(self, notification_id: str) -> None:
+        """Удаляет запись из памяти и журнала"""
+        del self._entries[notification_id]
+        self._log({"op": "remove", "id": notification_id})
+
+    def sweep_expired(self, now: Optional[datetime] = None) -> int:
+        """Удаляет записи старше UNPROCESSED_TTL_DAYS; возвращает их количество"""
+        border = ((now or datetime.now()) - timedelta(days=UNPROCESSED_TTL_DAYS)).isoformat()
+        # Записи идут в порядке добавления, поэтому просроченные - в начале
+        expired = []
+        for notification_id, data in self._entries.items():
+            if data.get("added_at", "") >= border:
+                break
+            expired.append(notification_id)
+        for notification_id in expired:
+            self._remove(notification_id)
+        if expired:
+            print(f"🧹 Удалено устаревших необработанных учеников: {len(expired)}")
+        return len(expired)
+
     def add_unprocessed_student(self, notification_id: str, student_data: Dict[str, Any]) -> None:
         """Добавляет необработанного ученика"""
-        unprocessed = self.load_unprocessed()
-        unprocessed[notification_id] = {
+        data = {
             **student_data,
             "added_at": datetime.now().isoformat()
         }
-        self.save_unprocessed(unprocessed)
-    
+        self._entries.pop(notification_id, None)
+        self._entries[notification_id] = data
+        self._log({"op": "add", "id": notification_id, "data": data})
+
+        # При переполнении вытесняем самые старые записи
+        while len(self._entries) > MAX_UNPROCESSED:
+            self._remove(next(iter(self._entries)))
+
     def remove_unprocessed_student(self, notification_id: str) -> bool:
         """Удаляет необработанного ученика"""
-        unprocessed = self.load_unprocessed()
-        if notification_id not in unprocessed:
+        if notification_id not in self._entries:
             return False
-        
-        del unprocessed[notification_id]
-        self.save_unprocessed(unprocessed)
+
+        self._remove(notification_id)
         return True
-    
+
     def get_all_unprocessed(self) -> List[Dict[str, Any]]:
         """Получает список всех необработанных учеников"""
-        unprocessed = self.load_unprocessed()
+        self.sweep_expired()
         return [
             {
                 "notification_id": notif_id,
                 **data
             }
-            for notif_id, data in unprocessed.items()
+            for notif_id, data in self._entries.items()
         ]
-    
+
     def get_unprocessed_by_notification_id(self, notification_id: str) -> Optional[Dict[str, Any]]:
         """Получает необработанного ученика по notification_id"""
-        unprocessed = self.load_unprocessed()
-        if notification_id not in unprocessed:
+        data = self._entries.get(notification_id)
+        if data is None:
             return None
-        
+
         return {
             "notification_id": notification_id,
-            **unprocessed[notification_id]
+            **data
         }
+
+
+_storage: Optional[UnprocessedStudentsStorage] = None
+
+
+def get_unprocessed_storage() -> UnprocessedStudentsStorage:
+    """Возвращает общее хранилище необработанных учеников"""
+    global _storage
+    if _storage is None:
+        _storage = UnprocessedStudentsStorage()
+    return _storage
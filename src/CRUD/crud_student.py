@@ -25,6 +25,7 @@ import os
 from typing import Any, Dict, Optional, Tuple
 
 from src.config import ROOT_DIR, get_notion_client
+from src.sync_data.capacity_index import load_capacity_index, record_student_added, record_student_removed
 from src.utils import (
     build_rich_text,
     build_title,
@@ -107,32 +108,9 @@ class NotionStudentCRUD:
 
     async def _check_group_capacity(self, group_id: str) -> None:
         """
-        Проверяет лимит мест в классе по main_page_info.json.
+        Проверяет лимит мест в классе по индексу заполненности групп.
         """
-        if not self.main_info_path.exists():
-            raise ValueError("❌ Файл main_page_info.json не найден.")
-
-        with open(self.main_info_path, "r", encoding="utf-8") as f:
-            info = json.load(f)
-
-        seats_raw = info.get("number_seats", "")
-        digits = "".join(ch for ch in seats_raw if ch.isdigit())
-        if not digits:
-            raise ValueError("❌ Не удалось получить число мест в классе из number_seats.")
-
-        seats = int(digits)
-
-        if not self.students_path.exists():
-            return
-
-        with open(self.students_path, "r", encoding="utf-8") as f:
-            students_data = json.load(f)
-
-        group_data = students_data.get(group_id, {})
-        current_count = group_data.get("total_students", 0)
-
-        if current_count >= seats:
-            raise ValueError(f"❌ Лимит учеников исчерпан: {current_count}/{seats} мест занято.")
+        load_capacity_index(self.students_path.parent).check_capacity(group_id)
 
     async def _find_existing_student(
             self, group_id: str, fio: str
@@ -219,6 +197,9 @@ class NotionStudentCRUD:
         # 6) Создаём запись в таблице оплат
         await self._add_student_to_payments(student_data, student_id)
 
+        # 7) Учитываем ученика в индексе свободных мест
+        record_student_added(self.students_path.parent, group_id)
+
         return {
             "duplicate": False,
             "student_id": student_id,
@@ -543,6 +524,8 @@ class NotionStudentCRUD:
                 )
                 result["archived_from_students"] = True
                 print(f"✅ Ученик '{fio}' архивирован из основной таблицы")
+                if found_group_id:
+                    record_student_removed(self.students_path.parent, found_group_id)
             except Exception as e:
                 error_msg = f"❌ Ошибка архивирования из основной таблицы: {e}"
                 result["errors"].append(error_msg)
@@ -5,6 +5,10 @@ from pathlib import Path
 from dotenv import load_dotenv
 from notion_client import AsyncClient
 from src.config import ROOT_DIR
+from src.sync_data.attendance_matrix import MATRIX_FILENAME, build_city_matrices, save_city_matrices, load_city_matrices
+from src.sync_data.student_stats import STATS_FILENAME, build_city_student_stats, save_student_stats
+from src.sync_data.history import record_attendance_snapshot
+from src.sync_data.sqlite_mirror import get_mirror
 
 
 class NotionAttendanceFetcher:
@@ -22,6 +26,8 @@ class NotionAttendanceFetcher:
         self.structure_path = self.root_dir / f"data/{self.city_name}/structure.json"
         self.students_path = self.root_dir / f"data/{self.city_name}/students.json"
         self.output_path = self.root_dir / f"data/{self.city_name}/attendance.json"
+        self.matrix_path = self.root_dir / f"data/{self.city_name}/{MATRIX_FILENAME}"
+        self.stats_path = self.root_dir / f"data/{self.city_name}/{STATS_FILENAME}"
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
 
         # === Словарь для подстановки данных учеников ===
@@ -162,5 +168,31 @@ class NotionAttendanceFetcher:
         print(f"\n📁 Посещаемость сохранена: {self.output_path}")
         print(f"📊 Всего записей по городу {self.city_name}: {total_records}")
 
+        # Компактная матрица статусов для напоминаний и отчетов
+        save_city_matrices(build_city_matrices(all_attendance), self.matrix_path)
+        print(f"📁 Матрица посещаемости сохранена: {self.matrix_path}")
+
+        # Статистика учеников по группам для детальных отчетов
+        save_student_stats(build_city_student_stats(self.stats_path.parent), self.stats_path)
+        print(f"📁 Статистика учеников сохранена: {self.stats_path}")
+
+        # Дневные агрегаты в историю (для динамики без запросов к Notion)
+        try:
+            record_attendance_snapshot(self.output_path.parent)
+            print(f"📈 Посещаемость записана в историю города {self.city_name}")
+        except Exception as e:
+            print(f"⚠️ Ошибка записи истории посещаемости: {e}")
+
+        # Зеркало SQLite (если включено)
+        mirror = get_mirror()
+        if mirror:
+            try:
+                mirror.replace_attendance(
+                    self.output_path.parent.name, load_city_matrices(self.output_path.parent), all_attendance
+                )
+                print(f"🗄️ Посещаемость загружена в SQLite: {mirror.db_path}")
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки посещаемости в SQLite: {e}")
+
     async def close(self):
         await self.notion.close()
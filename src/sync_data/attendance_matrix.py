@@ -0,0 +1,303 @@
+"""
+Компактная матрица посещаемости группы: ученики × даты занятий.
+
+Строится при синхронизации из attendance.json и сохраняется в
+data/{city_name}/attendance_matrix.json.
+
+Формат сохранения:
+    "group_id": {
+        "format": 2,                                      # версия формата (другая - матрица строится заново)
+        "group_name": "Назрань вт/ср 14:00",
+        "dates": ["2025-11-04", "2025-11-05", ...],      # отсортированы по возрастанию
+        "date_keys": ["04.11.2025", "05.11.2025 ", ...],  # исходные названия столбцов
+        "students": [{"student_id": "...", "ФИО": "...", "student_url": "..."}, ...],
+        "rows": ["0113...", ...]                          # по символу-коду на каждую дату
+    }
+
+Каждая строка "rows" - код статуса на каждую дату (см. коды статусов ниже), поэтому
+"последние N отметок", длина серии и подсчет за период выполняются строковыми
+операциями без повторного разбора дат. Даты хранятся в ISO формате и
+сравниваются как строки; названия столбцов разбираются только при синхронизации.
+"""
+import json
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# Коды статусов посещаемости (по одному символу на дату в строке матрицы)
+EMPTY = "0"
+PRESENT = "1"
+LATE = "2"
+ABSENT = "3"
+ABSENT_REASON = "4"
+OTHER = "5"
+# "Был": присутствием считается только в общем отчете по городу (present_total(include_was=True)),
+# в статистике учеников и подробном отчете - нет (как до появления матрицы)
+WAS = "6"
+
+# Статус из Notion (в нижнем регистре) -> код
+STATUS_CODES = {
+    "": EMPTY,
+    "присутствовал": PRESENT,
+    "был": WAS,
+    "опоздал": LATE,
+    "отсутствовал": ABSENT,
+    "отсутствовал по причине": ABSENT_REASON,
+}
+
+MATRIX_FILENAME = "attendance_matrix.json"
+
+# Версия формата матрицы (в матрицах другой версии "Был" закодирован как "Присутствовал")
+MATRIX_FORMAT = 2
+
+
+def encode_status(status: Any) -> str:
+    """Преобразует статус посещаемости в код"""
+    status_clean = str(status).strip().lower() if status else ""
+    return STATUS_CODES.get(status_clean, OTHER)
+
+
+@lru_cache(maxsize=4096)
+def normalize_date_key(date_key: str) -> Optional[str]:
+    """
+    Приводит название столбца с датой ("дд.мм.гггг", возможно с пробелами) к ISO формату
+
+    Названия столбцов повторяются во всех группах, поэтому каждое разбирается
+    один раз за процесс. Возвращает None, если это не дата.
+    """
+    try:
+        return sys.intern(datetime.strptime(date_key.strip(), "%d.%m.%Y").date().isoformat())
+    except (ValueError, AttributeError):
+        return None
+
+
+class AttendanceMatrix:
+    """Матрица посещаемости одной группы"""
+
+    def __init__(
+        self,
+        group_name: str,
+        dates: List[str],
+        date_keys: List[str],
+        students: List[Dict[str, str]],
+        rows: List[str]
+    ):
+        self.group_name = group_name
+        self.dates = dates
+        self.date_keys = date_keys
+        self.students = students
+        self.rows = rows
+        self._index = {
+            student.get("student_id"): idx
+            for idx, student in enumerate(students)
+            if student.get("student_id")
+        }
+
+    @classmethod
+    def from_group(cls, group_info: Dict[str, Any]) -> "AttendanceMatrix":
+        """Строит матрицу из блока группы attendance.json"""
+        fields = [
+            field for field in group_info.get("fields", [])
+            if field not in ("№", "ФИО")
+        ]
+
+        # Разбираем каждую дату один раз и сортируем столбцы по дате (ISO сортируется как строка)
+        parsed = []
+        for field in fields:
+            iso_date = normalize_date_key(field)
+            if iso_date:
+                parsed.append((iso_date, field))
+        parsed.sort(key=lambda x: x[0])
+
+        dates = [iso_date for iso_date, _ in parsed]
+        date_keys = [field for _, field in parsed]
+
+        students = []
+        rows = []
+        for record in group_info.get("attendance", []):
+            attendance_dict = record.get("attendance", {})
+            students.append({
+                "student_id": record.get("student_id", ""),
+                "ФИО": record.get("ФИО", "").strip(),
+                "student_url": record.get("student_url", ""),
+            })
+            rows.append("".join(encode_status(attendance_dict.get(field, "")) for field in date_keys))
+
+        return cls(group_info.get("group_name", ""), dates, date_keys, students, rows)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AttendanceMatrix":
+        """Восстанавливает матрицу из attendance_matrix.json"""
+        # Даты совпадают у групп города - храним одну копию каждой строки
+        return cls(
+            data.get("group_name", ""),
+            [sys.intern(iso_date) for iso_date in data.get("dates", [])],
+            [sys.intern(date_key) for date_key in data.get("date_keys", [])],
+            data.get("students", []),
+            data.get("rows", []),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализует матрицу для сохранения в JSON"""
+        return {
+            "format": MATRIX_FORMAT,
+            "group_name": self.group_name,
+            "dates": self.dates,
+            "date_keys": self.date_keys,
+            "students": self.students,
+            "rows": self.rows,
+        }
+
+    def student_index(self, student_id: str) -> Optional[int]:
+        """Возвращает номер строки ученика или None"""
+        return self._index.get(student_id)
+
+    def last_marks(self, idx: int, n: int) -> List[Tuple[str, str]]:
+        """
+        Возвращает последние n непустых отметок ученика (от новых к старым)
+
+        Returns:
+            Список (исходное название столбца, код статуса)
+        """
+        row = self.rows[idx]
+        marks = []
+        pos = len(row)
+        while len(marks) < n:
+            # Ищем ближайшую слева непустую отметку
+            pos = max(row.rfind(code, 0, pos) for code in (PRESENT, LATE, ABSENT, ABSENT_REASON, OTHER, WAS))
+            if pos < 0:
+                break
+            marks.append((self.date_keys[pos].strip(), row[pos]))
+        return marks
+
+    def trailing_streak(self, idx: int, code: str = ABSENT) -> int:
+        """Длина серии одинаковых последних отметок (пустые ячейки пропускаются)"""
+        marks = self.rows[idx].replace(EMPTY, "")
+        return len(marks) - len(marks.rstrip(code))
+
+    def _period_slice(self, start: Optional[date] = None, end: Optional[date] = None) -> Tuple[int, int]:
+        """Границы столбцов для периода [start, end] (включительно)"""
+        lo = bisect_left(self.dates, start.isoformat()) if start else 0
+        hi = bisect_right(self.dates, end.isoformat()) if end else len(self.dates)
+        return lo, hi
+
+    def counts(self, idx: int, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, int]:
+        """
+        Статистика посещаемости ученика за период (границы включительно)
+
+        Returns:
+            {"total", "present", "late", "absent", "absent_reason"};
+            "Опоздал" учитывается и как опоздание, и как присутствие
+        """
+        lo, hi = self._period_slice(start, end)
+        segment = self.rows[idx][lo:hi]
+        late = segment.count(LATE)
+        return {
+            "total": hi - lo - segment.count(EMPTY),
+            "present": segment.count(PRESENT) + late,
+            "late": late,
+            "absent": segment.count(ABSENT),
+            "absent_reason": segment.count(ABSENT_REASON),
+        }
+
+    def marks_between(self, idx: int, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[str, str, str]]:
+        """
+        Отметки ученика за период (границы включительно, по возрастанию дат)
+
+        Returns:
+            Список (дата ISO, исходное название столбца, код статуса)
+        """
+        lo, hi = self._period_slice(start, end)
+        row = self.rows[idx]
+        return [(self.dates[pos], self.date_keys[pos].strip(), row[pos]) for pos in range(lo, hi)]
+
+    def unmarked_recent_lessons(self, until: Optional[date] = None) -> int:
+        """
+        Сколько последних занятий (не позже until) подряд не отмечены ни у одного ученика
+
+        У группы без учеников отмечать некого, поэтому для нее всегда 0.
+        """
+        if not self.rows:
+            return 0
+        _, hi = self._period_slice(None, until)
+        count = 0
+        for pos in range(hi - 1, -1, -1):
+            if any(row[pos] != EMPTY for row in self.rows):
+                break
+            count += 1
+        return count
+
+    def present_total(self, include_was: bool = False) -> int:
+        """Количество отметок присутствия (включая опоздания, а с include_was - и "Был") по всей группе"""
+        codes = (PRESENT, LATE, WAS) if include_was else (PRESENT, LATE)
+        return sum(row.count(code) for row in self.rows for code in codes)
+
+
+def build_city_matrices(attendance_data: Dict[str, Any]) -> Dict[str, AttendanceMatrix]:
+    """Строит матрицы для всех групп города из содержимого attendance.json"""
+    return {
+        group_id: AttendanceMatrix.from_group(group_info)
+        for group_id, group_info in attendance_data.items()
+    }
+
+
+def save_city_matrices(matrices: Dict[str, AttendanceMatrix], path: Path) -> None:
+    """Сохраняет матрицы города в файл (атомарная запись)"""
+    temp_file = path.with_suffix('.tmp')
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {group_id: matrix.to_dict() for group_id, matrix in matrices.items()},
+            f, ensure_ascii=False
+        )
+    temp_file.replace(path)
+
+
+# Кэш загруженных матриц: путь к городу -> (mtime исходного файла, матрицы)
+_matrices_cache: Dict[Path, Tuple[float, Dict[str, AttendanceMatrix]]] = {}
+
+
+def load_city_matrices(city_dir: Path) -> Dict[str, AttendanceMatrix]:
+    """
+    Загружает матрицы посещаемости города
+
+    Читает attendance_matrix.json, построенный при синхронизации. Если его нет,
+    он старше attendance.json или записан в старом формате, матрицы строятся
+    из attendance.json.
+    Результат кэшируется до изменения файлов.
+    """
+    matrix_path = city_dir / MATRIX_FILENAME
+    attendance_path = city_dir / "attendance.json"
+
+    if not attendance_path.exists() and not matrix_path.exists():
+        return {}
+
+    attendance_mtime = attendance_path.stat().st_mtime if attendance_path.exists() else 0
+    matrix_mtime = matrix_path.stat().st_mtime if matrix_path.exists() else 0
+    version = max(attendance_mtime, matrix_mtime)
+
+    cached = _matrices_cache.get(city_dir)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    try:
+        raw = None
+        if matrix_mtime >= attendance_mtime:
+            with open(matrix_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if attendance_mtime and any(data.get("format") != MATRIX_FORMAT for data in raw.values()):
+                raw = None
+        if raw is not None:
+            matrices = {group_id: AttendanceMatrix.from_dict(data) for group_id, data in raw.items()}
+        else:
+            with open(attendance_path, "r", encoding="utf-8") as f:
+                matrices = build_city_matrices(json.load(f))
+    except Exception as e:
+        print(f"⚠️ Ошибка загрузки матрицы посещаемости {city_dir}: {e}")
+        return {}
+
+    _matrices_cache[city_dir] = (version, matrices)
+    return matrices
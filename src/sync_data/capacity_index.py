@@ -0,0 +1,219 @@
+"""
+Индекс заполненности групп города (свободные места).
+
+Строится из main_page_info.json (число мест в классе), groups.json и
+students.json и сохраняется в data/{city_name}/capacity.json:
+
+    "source_version": [[mtime_ns, size], ...],  # версии исходных файлов
+    "seats": 12,                                # None, если main_page_info.json нет
+    "groups": {
+        "group_id": {
+            "group_name": "Назрань вт/ср 14:00",
+            "city": "Назрань",
+            "status": "Набор открыт",
+            "total_students": 9
+        }
+    }
+
+После добавления и удаления ученика через бота число учеников группы
+обновляется сразу (record_student_added / record_student_removed), не дожидаясь
+синхронизации. Когда синхронизация перезаписывает исходные файлы, индекс
+строится из них заново при следующем обращении. Экран свободных мест и проверка
+лимита при добавлении читают готовый индекс из памяти.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+CAPACITY_FILENAME = "capacity.json"
+
+# Файлы, из которых строится индекс
+SOURCE_FILES = ("main_page_info.json", "groups.json", "students.json")
+
+
+def parse_seats(seats_raw: str) -> int:
+    """Число мест в классе из строки number_seats (0, если цифр нет)"""
+    digits = "".join(ch for ch in seats_raw or "" if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+def _load_json(path: Path) -> Dict[str, Any]:
+    """Читает JSON файл (пустой словарь, если файла нет или он поврежден)"""
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _source_version(city_dir: Path) -> List[List[int]]:
+    """Версии исходных файлов (время изменения и размер)"""
+    version = []
+    for filename in SOURCE_FILES:
+        path = city_dir / filename
+        if path.exists():
+            stat = path.stat()
+            version.append([stat.st_mtime_ns, stat.st_size])
+        else:
+            version.append([0, 0])
+    return version
+
+
+class CapacityIndex:
+    """Места в классе и число учеников по группам одного города"""
+
+    def __init__(self, source_version: List[List[int]], seats: Optional[int], groups: Dict[str, Dict[str, Any]]):
+        self.source_version = source_version
+        self.seats = seats
+        self.groups = groups
+
+    @classmethod
+    def build(cls, city_dir: Path) -> "CapacityIndex":
+        """Строит индекс из исходных файлов города"""
+        version = _source_version(city_dir)
+        main_info_path = city_dir / "main_page_info.json"
+        seats = parse_seats(_load_json(main_info_path).get("number_seats", "")) if main_info_path.exists() else None
+        students_data = _load_json(city_dir / "students.json")
+
+        groups = {}
+        for group_id, group_info in _load_json(city_dir / "groups.json").items():
+            groups[group_id] = {
+                "group_name": group_info.get("Название группы", "Без названия"),
+                "city": group_info.get("Город", ""),
+                "status": group_info.get("Статус группы", ""),
+                "total_students": students_data.get(group_id, {}).get("total_students", 0),
+            }
+
+        # Группы, которых еще нет в groups.json, учитываются только при проверке лимита
+        for group_id, group_data in students_data.items():
+            if group_id not in groups:
+                groups[group_id] = {
+                    "group_name": group_data.get("group_name", ""),
+                    "city": "",
+                    "status": "",
+                    "total_students": group_data.get("total_students", 0),
+                    "listed": False,
+                }
+
+        return cls(version, seats, groups)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CapacityIndex":
+        """Восстанавливает индекс из capacity.json"""
+        return cls(data.get("source_version", []), data.get("seats"), data.get("groups", {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализует индекс для сохранения в JSON"""
+        return {"source_version": self.source_version, "seats": self.seats, "groups": self.groups}
+
+    def free_places(self, group_id: str) -> int:
+        """Свободные места в группе (может быть отрицательным при переполнении)"""
+        group = self.groups.get(group_id, {})
+        return (self.seats or 0) - group.get("total_students", 0)
+
+    def get_groups(self, city_name: str = "") -> List[Dict[str, Any]]:
+        """Группы города из groups.json с числом учеников и свободными местами"""
+        return [
+            {
+                "group_id": group_id,
+                "group_name": group["group_name"],
+                "city": group["city"] or city_name,
+                "status": group["status"],
+                "total_students": group["total_students"],
+                "free_places": self.free_places(group_id),
+            }
+            for group_id, group in self.groups.items()
+            if group.get("listed", True)
+        ]
+
+    def check_capacity(self, group_id: str) -> None:
+        """Проверяет лимит мест в группе; ValueError, если мест нет или их число неизвестно"""
+        if self.seats is None:
+            raise ValueError("❌ Файл main_page_info.json не найден.")
+        if not self.seats:
+            raise ValueError("❌ Не удалось получить число мест в классе из number_seats.")
+
+        current_count = self.groups.get(group_id, {}).get("total_students", 0)
+        if current_count >= self.seats:
+            raise ValueError(f"❌ Лимит учеников исчерпан: {current_count}/{self.seats} мест занято.")
+
+
+def save_capacity_index(index: CapacityIndex, path: Path) -> None:
+    """Сохраняет индекс в файл (атомарная запись)"""
+    temp_file = path.with_suffix('.tmp')
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False)
+    temp_file.replace(path)
+
+
+def _file_version(path: Path) -> Tuple[int, int]:
+    """Время изменения и размер файла ((0, 0), если его нет)"""
+    if not path.exists():
+        return 0, 0
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Кэш загруженных индексов: путь к городу -> (версия файлов, индекс)
+_capacity_cache: Dict[Path, Tuple[Tuple[Any, ...], CapacityIndex]] = {}
+
+
+def load_capacity_index(city_dir: Path) -> CapacityIndex:
+    """
+    Индекс заполненности групп города
+
+    Берется из памяти, пока не менялись исходные файлы и capacity.json (его
+    может обновить и другой процесс, например VK бот); иначе читается из
+    capacity.json, если он построен по текущим исходным файлам, или строится заново.
+    """
+    source_version = _source_version(city_dir)
+    capacity_path = city_dir / CAPACITY_FILENAME
+    cached = _capacity_cache.get(city_dir)
+    if cached and cached[0] == (source_version, _file_version(capacity_path)):
+        return cached[1]
+
+    index = CapacityIndex.from_dict(_load_json(capacity_path))
+    if index.source_version != source_version:
+        index = CapacityIndex.build(city_dir)
+        if not city_dir.exists():
+            return index
+        try:
+            save_capacity_index(index, capacity_path)
+        except Exception as e:
+            print(f"⚠️ Ошибка сохранения индекса мест {city_dir}: {e}")
+
+    _capacity_cache[city_dir] = ((source_version, _file_version(capacity_path)), index)
+    return index
+
+
+def _remember(city_dir: Path, index: CapacityIndex) -> None:
+    """Сохраняет измененный индекс и обновляет версию в кэше"""
+    capacity_path = city_dir / CAPACITY_FILENAME
+    try:
+        save_capacity_index(index, capacity_path)
+    except Exception as e:
+        print(f"⚠️ Ошибка сохранения индекса мест {city_dir}: {e}")
+    _capacity_cache[city_dir] = ((index.source_version, _file_version(capacity_path)), index)
+
+
+def _change_group_count(city_dir: Path, group_id: str, delta: int) -> None:
+    """Меняет число учеников группы в индексе и сохраняет его"""
+    index = load_capacity_index(city_dir)
+    group = index.groups.get(group_id)
+    if group is None:
+        return
+    group["total_students"] = max(group.get("total_students", 0) + delta, 0)
+    _remember(city_dir, index)
+
+
+def record_student_added(city_dir: Path, group_id: str) -> None:
+    """Учитывает добавленного в группу ученика"""
+    _change_group_count(city_dir, group_id, 1)
+
+
+def record_student_removed(city_dir: Path, group_id: str) -> None:
+    """Учитывает удаленного из группы ученика"""
+    _change_group_count(city_dir, group_id, -1)
@@ -0,0 +1,232 @@
+"""
+История синхронизаций города: дневные агрегаты посещаемости и оплат.
+
+Каждая синхронизация перезаписывает attendance.json и payments.json, поэтому
+после загрузки данных в историю дописывается компактная запись. Записи
+хранятся в data/{city_name}/history/ по файлу JSON Lines на месяц:
+
+    history/2025-11.jsonl
+        {"date": "2025-11-20", "time": "09:15:02", "kind": "attendance",
+         "groups": 12, "students": 140, "lessons": 310,
+         "total": ..., "present": ..., "late": ..., "absent": ..., "absent_reason": ...,
+         "week": {"total", "present", "late", "absent", "absent_reason"}}   # за последние 7 дней
+        {"date": "2025-11-20", "time": "09:16:40", "kind": "payments",
+         "month": "Ноябрь", "students": 150,
+         "paid": ..., "wrote": ..., "not_paid": ..., "deferred": ..., "not_studying": ...,
+         "changes_total": 3,
+         "changes": [{"payment_id", "student_id", "ФИО", "month", "from", "to"}, ...]}
+
+Файлы только дописываются; запрос за период читает лишь месяцы периода.
+Последние статусы оплат (для поиска изменений) хранятся в history/payment_state.json
+по ID записи оплаты.
+"""
+import json
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+from src.sync_data.attendance_matrix import load_city_matrices
+
+
+HISTORY_DIRNAME = "history"
+PAYMENT_STATE_FILENAME = "payment_state.json"
+
+KIND_ATTENDANCE = "attendance"
+KIND_PAYMENTS = "payments"
+
+MONTH_NAMES = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+]
+
+# Статус оплаты -> ключ счетчика
+PAYMENT_KEYS = {
+    "Оплатил": "paid",
+    "Написали": "wrote",
+    "Не оплатил": "not_paid",
+    "Отсрочка": "deferred",
+    "Не учился": "not_studying",
+}
+
+# Сколько изменений статусов хранить в одной записи
+MAX_CHANGES_PER_RECORD = 500
+
+
+class HistoryStore:
+    """Хранилище истории одного города"""
+
+    def __init__(self, city_dir: Path):
+        self.city_dir = city_dir
+        self.history_dir = city_dir / HISTORY_DIRNAME
+
+    def _partition_path(self, month_key: str) -> Path:
+        """Файл месяца (month_key - "ГГГГ-ММ")"""
+        return self.history_dir / f"{month_key}.jsonl"
+
+    def append(self, record: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Дописывает запись в файл текущего месяца (дата и время проставляются автоматически)"""
+        now = now or datetime.now()
+        record = {"date": now.date().isoformat(), "time": now.strftime("%H:%M:%S"), **record}
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._partition_path(record["date"][:7]), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def _months_between(self, start: date, end: date) -> List[str]:
+        """Ключи месяцев "ГГГГ-ММ" от start до end включительно"""
+        months = []
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    def iter_records(self, start: date, end: date, kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Записи за период [start, end] в порядке записи (при kind - только этого вида)"""
+        start_iso, end_iso = start.isoformat(), end.isoformat()
+        for month_key in self._months_between(start, end):
+            path = self._partition_path(month_key)
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная строка (например, при сбое во время записи)
+                        continue
+                    if not start_iso <= record.get("date", "") <= end_iso:
+                        continue
+                    if kind and record.get("kind") != kind:
+                        continue
+                    yield record
+
+    def daily(self, kind: str, start: date, end: date) -> Dict[str, Dict[str, Any]]:
+        """Последняя запись вида kind за каждый день периода: дата ISO -> запись"""
+        days: Dict[str, Dict[str, Any]] = {}
+        for record in self.iter_records(start, end, kind):
+            days[record["date"]] = record
+        return dict(sorted(days.items()))
+
+    def get_delta(self, kind: str, days: int = 7, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """
+        Сравнивает последнюю запись с записью на days дней раньше
+
+        Returns:
+            {"current": запись, "previous": запись или None} или None, если истории нет
+        """
+        today = today or date.today()
+        # Запас в неделю, чтобы найти запись, если в нужный день синхронизации не было
+        records = self.daily(kind, today - timedelta(days=days + 7), today)
+        if not records:
+            return None
+
+        current_date, current = list(records.items())[-1]
+        border = (date.fromisoformat(current_date) - timedelta(days=days)).isoformat()
+        previous = None
+        for record_date, record in records.items():
+            if record_date <= border:
+                previous = record
+        return {"current": current, "previous": previous}
+
+
+def _count_codes(counts: Dict[str, int], other: Dict[str, int]) -> None:
+    """Прибавляет счетчики посещаемости other к counts"""
+    for key, value in other.items():
+        counts[key] = counts.get(key, 0) + value
+
+
+def record_attendance_snapshot(city_dir: Path, today: Optional[date] = None) -> Dict[str, Any]:
+    """Дописывает в историю агрегаты посещаемости города (из матриц посещаемости)"""
+    today = today or date.today()
+    matrices = load_city_matrices(city_dir)
+    week_start = today - timedelta(days=6)
+
+    totals: Dict[str, int] = {}
+    week: Dict[str, int] = {}
+    students = 0
+    lessons = 0
+    for matrix in matrices.values():
+        students += len(matrix.students)
+        lessons += len(matrix.dates)
+        for idx in range(len(matrix.rows)):
+            _count_codes(totals, matrix.counts(idx))
+            _count_codes(week, matrix.counts(idx, week_start, today))
+
+    return HistoryStore(city_dir).append({
+        "kind": KIND_ATTENDANCE,
+        "groups": len(matrices),
+        "students": students,
+        "lessons": lessons,
+        **totals,
+        "week": week,
+    })
+
+
+def record_payments_snapshot(payments_data: Dict[str, Any], city_dir: Path, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Дописывает в историю статистику оплат за текущий месяц и изменения статусов
+
+    Изменения ищутся по всем месяцам относительно предыдущей синхронизации
+    (при первой записи изменений нет).
+    """
+    today = today or date.today()
+    store = HistoryStore(city_dir)
+    month_name = MONTH_NAMES[today.month - 1]
+    state_path = store.history_dir / PAYMENT_STATE_FILENAME
+
+    previous_state: Dict[str, Dict[str, str]] = {}
+    if state_path.exists():
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                previous_state = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Ошибка загрузки состояния оплат {state_path}: {e}")
+
+    counts = {key: 0 for key in PAYMENT_KEYS.values()}
+    state: Dict[str, Dict[str, str]] = {}
+    changes = []
+    payments = payments_data.get("payments", [])
+    for payment in payments:
+        payment_id = payment.get("ID", "")
+        statuses = {
+            month: str(status).strip()
+            for month, status in payment.get("payments_data", {}).items()
+        }
+
+        key = PAYMENT_KEYS.get(statuses.get(month_name, ""))
+        if key:
+            counts[key] += 1
+
+        if not payment_id:
+            continue
+        state[payment_id] = statuses
+
+        previous = previous_state.get(payment_id)
+        if previous is None:
+            continue
+        for month, status in statuses.items():
+            if previous.get(month, "") != status:
+                changes.append({
+                    "payment_id": payment_id,
+                    "student_id": payment.get("student_id", ""),
+                    "ФИО": payment.get("ФИО", "").strip(),
+                    "month": month,
+                    "from": previous.get(month, ""),
+                    "to": status,
+                })
+
+    record = store.append({
+        "kind": KIND_PAYMENTS,
+        "month": month_name,
+        "students": len(payments),
+        **counts,
+        "changes_total": len(changes),
+        "changes": changes[:MAX_CHANGES_PER_RECORD],
+    })
+
+    temp_file = state_path.with_suffix('.tmp')
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    temp_file.replace(state_path)
+
+    return record
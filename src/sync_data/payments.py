@@ -5,6 +5,10 @@ from pathlib import Path
 from dotenv import load_dotenv
 from notion_client import AsyncClient
 from src.config import ROOT_DIR
+from src.sync_data.payments_calendar import CALENDAR_FILENAME, build_payments_calendar, save_payments_calendar
+from src.sync_data.student_stats import STATS_FILENAME, build_city_student_stats, save_student_stats
+from src.sync_data.history import record_payments_snapshot
+from src.sync_data.sqlite_mirror import get_mirror
 
 
 class NotionPaymentsFetcher:
@@ -19,6 +23,8 @@ class NotionPaymentsFetcher:
         # === Пути ===
         self.students_path = self.root_dir / f"data/{self.city_name}/students.json"
         self.output_path = self.root_dir / f"data/{self.city_name}/payments.json"
+        self.calendar_path = self.root_dir / f"data/{self.city_name}/{CALENDAR_FILENAME}"
+        self.stats_path = self.root_dir / f"data/{self.city_name}/{STATS_FILENAME}"
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
 
         # === ID таблицы из .env ===
@@ -150,6 +156,34 @@ class NotionPaymentsFetcher:
 
             print(f"✅ Успешно сохранено: {total} записей в {self.output_path}")
 
+            # Календарь оплат (день месяца -> ученики) для ежедневных напоминаний
+            students_data = {}
+            if self.students_path.exists():
+                with open(self.students_path, "r", encoding="utf-8") as f:
+                    students_data = json.load(f)
+            save_payments_calendar(build_payments_calendar(all_payments, students_data), self.calendar_path)
+            print(f"📁 Календарь оплат сохранен: {self.calendar_path}")
+
+            # Периоды оплаты в статистике учеников зависят от дат оплаты
+            save_student_stats(build_city_student_stats(self.stats_path.parent), self.stats_path)
+            print(f"📁 Статистика учеников сохранена: {self.stats_path}")
+
+            # Статистика месяца и изменения статусов в историю
+            try:
+                record = record_payments_snapshot(all_payments, self.output_path.parent)
+                print(f"📈 Оплаты записаны в историю, изменений статусов: {record['changes_total']}")
+            except Exception as e:
+                print(f"⚠️ Ошибка записи истории оплат: {e}")
+
+            # Зеркало SQLite (если включено)
+            mirror = get_mirror()
+            if mirror:
+                try:
+                    mirror.replace_payments(self.output_path.parent.name, all_payments)
+                    print(f"🗄️ Оплаты загружены в SQLite: {mirror.db_path}")
+                except Exception as e:
+                    print(f"⚠️ Ошибка загрузки оплат в SQLite: {e}")
+
         except Exception as e:
             print(f"⚠️ Ошибка при загрузке таблицы оплат: {e}")
 
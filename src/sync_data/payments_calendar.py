@@ -0,0 +1,168 @@
+"""
+Календарь оплат города: день месяца -> ученики с этой датой оплаты.
+
+Строится при синхронизации из payments.json и students.json и сохраняется в
+data/{city_name}/payments_calendar.json.
+
+Формат сохранения:
+    "days": {
+        "17": [
+            {
+                "fio": "...",
+                "student_id": "...",
+                "payment_date": "17 числа",
+                "student_data": {...},   # данные ученика из students.json (найден по ID или ФИО)
+                "payment_data": {...}    # запись из payments.json
+            },
+            ...
+        ],
+        ...
+    }
+
+Поиск учеников с оплатой в конкретную дату - это выборка одного "ведра",
+для последнего дня месяца добавляются дни, которых в этом месяце нет
+(оплата "31 числа" в ноябре приходится на 30-е).
+"""
+import calendar
+import json
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+
+CALENDAR_FILENAME = "payments_calendar.json"
+
+
+def parse_payment_day(payment_date_str: str) -> int:
+    """Извлекает число из строки типа '27 числа' или '6 числа' (0 если числа нет)"""
+    if not payment_date_str:
+        return 0
+
+    match = re.search(r'(\d+)', payment_date_str)
+    if match:
+        return int(match.group(1))
+    return 0
+
+
+def _student_entry(student: Dict[str, Any], group_name: str) -> Dict[str, Any]:
+    """Данные ученика в том же виде, что и PaymentService.get_city_students"""
+    return {
+        "ID": student.get("ID", ""),
+        "ФИО": student.get("ФИО", "").strip(),
+        "group_name": group_name,
+        "student_url": student.get("student_url", ""),
+        "Номер родителя": student.get("Номер родителя", ""),
+        "Имя родителя": student.get("Имя родителя", ""),
+        "Возраст": student.get("Возраст", ""),
+        "Дата поступления": student.get("Дата поступления", ""),
+        "Тариф": student.get("Тариф", ""),
+        "Статус": student.get("Статус", ""),
+        "Город": student.get("Город", ""),
+    }
+
+
+def build_payments_calendar(payments_data: Dict[str, Any], students_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Строит календарь оплат из содержимого payments.json и students.json"""
+    students_by_id = {}
+    students_by_fio = {}
+    for group_data in students_data.values():
+        group_name = group_data.get("group_name", "")
+        for student in group_data.get("students", []):
+            entry = _student_entry(student, group_name)
+            students_by_id[entry["ID"]] = entry
+            students_by_fio.setdefault(entry["ФИО"].lower(), entry)
+
+    days: Dict[str, List[Dict[str, Any]]] = {}
+    for payment in payments_data.get("payments", []):
+        payment_date_str = payment.get("Дата оплаты", "")
+        payment_day = parse_payment_day(payment_date_str)
+        if not 1 <= payment_day <= 31:
+            continue
+
+        student_id = payment.get("student_id", "")
+        fio = payment.get("ФИО", "").strip()
+
+        # Связь с учеником ищется один раз при синхронизации: по ID, затем по ФИО
+        student_data = students_by_id.get(student_id) or students_by_fio.get(fio.lower(), {})
+
+        days.setdefault(str(payment_day), []).append({
+            "fio": fio,
+            "student_id": student_id,
+            "payment_date": payment_date_str,
+            "student_data": student_data,
+            "payment_data": payment,
+        })
+
+    return {"days": days}
+
+
+def save_payments_calendar(payments_calendar: Dict[str, Any], path: Path) -> None:
+    """Сохраняет календарь оплат в файл (атомарная запись)"""
+    temp_file = path.with_suffix('.tmp')
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(payments_calendar, f, ensure_ascii=False)
+    temp_file.replace(path)
+
+
+def get_due_entries(payments_calendar: Dict[str, Any], target: date) -> List[Dict[str, Any]]:
+    """Ученики, у которых оплата приходится на дату target (с учетом длины месяца)"""
+    days = payments_calendar.get("days", {})
+    entries = list(days.get(str(target.day), []))
+
+    last_day = calendar.monthrange(target.year, target.month)[1]
+    if target.day == last_day:
+        for payment_day in range(last_day + 1, 32):
+            entries.extend(days.get(str(payment_day), []))
+
+    return entries
+
+
+# Кэш загруженных календарей: путь к городу -> (версия файлов, календарь)
+_calendar_cache: Dict[Path, Tuple[Tuple[float, float], Dict[str, Any]]] = {}
+
+
+def load_payments_calendar(city_dir: Path) -> Dict[str, Any]:
+    """
+    Загружает календарь оплат города
+
+    Читает payments_calendar.json, построенный при синхронизации. Если его нет
+    или он старше payments.json/students.json, календарь строится заново.
+    Результат кэшируется до изменения файлов.
+    """
+    calendar_path = city_dir / CALENDAR_FILENAME
+    payments_path = city_dir / "payments.json"
+    students_path = city_dir / "students.json"
+
+    if not payments_path.exists() and not calendar_path.exists():
+        return {}
+
+    source_mtime = max(
+        payments_path.stat().st_mtime if payments_path.exists() else 0,
+        students_path.stat().st_mtime if students_path.exists() else 0,
+    )
+    calendar_mtime = calendar_path.stat().st_mtime if calendar_path.exists() else 0
+    version = (source_mtime, calendar_mtime)
+
+    cached = _calendar_cache.get(city_dir)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    try:
+        if calendar_mtime >= source_mtime:
+            with open(calendar_path, "r", encoding="utf-8") as f:
+                payments_calendar = json.load(f)
+        else:
+            with open(payments_path, "r", encoding="utf-8") as f:
+                payments_data = json.load(f)
+            students_data = {}
+            if students_path.exists():
+                with open(students_path, "r", encoding="utf-8") as f:
+                    students_data = json.load(f)
+            payments_calendar = build_payments_calendar(payments_data, students_data)
+    except Exception as e:
+        print(f"⚠️ Ошибка загрузки календаря оплат {city_dir}: {e}")
+        return {}
+
+    _calendar_cache[city_dir] = (version, payments_calendar)
+    return payments_calendar
@@ -0,0 +1,407 @@
+"""
+Необязательное зеркало данных CRM в SQLite.
+
+Включается переменной окружения CRM_SQLITE_PATH (путь к файлу базы,
+например data/crm.sqlite3). Без нее бот работает только с JSON файлами.
+
+Таблицы заполняются синхронизацией (по городу целиком, в одной транзакции)
+и обновляются построчно при изменениях из бота:
+
+    students        - ученики (индексы по телефону, ФИО и группе)
+    student_names   - части ФИО для поиска по имени или фамилии
+    attendance      - отметки посещаемости с исходным текстом статуса (индекс по ученику
+                      и дате; из нее строится просмотр посещаемости ученика)
+    payments        - записи оплат (индекс по ученику и ФИО)
+    payment_months  - статусы оплат по месяцам (индекс по ученику и месяцу)
+
+Данные города считаются загруженными, если для него есть запись в sync_state;
+до первой синхронизации сервисы читают JSON файлы.
+
+Методы блокирующие: из асинхронного кода они вызываются через пул файловых
+операций (bot/services/file_io.py).
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from src.config import ROOT_DIR
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    city TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    fio TEXT NOT NULL,
+    fio_lower TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    phone_digits TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_students_phone ON students (city, phone_digits);
+CREATE INDEX IF NOT EXISTS idx_students_fio ON students (city, fio_lower);
+CREATE INDEX IF NOT EXISTS idx_students_group ON students (city, group_id);
+CREATE INDEX IF NOT EXISTS idx_students_id ON students (student_id);
+
+CREATE TABLE IF NOT EXISTS student_names (
+    city TEXT NOT NULL,
+    part TEXT NOT NULL,
+    student_rowid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_student_names ON student_names (city, part);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    city TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    date_key TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    status_text TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (city, group_id, student_id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance (student_id, date);
+
+CREATE TABLE IF NOT EXISTS payments (
+    city TEXT NOT NULL,
+    payment_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    fio_lower TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_payments_student ON payments (city, student_id);
+CREATE INDEX IF NOT EXISTS idx_payments_fio ON payments (city, fio_lower);
+
+CREATE TABLE IF NOT EXISTS payment_months (
+    city TEXT NOT NULL,
+    payment_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (city, payment_id, month)
+);
+CREATE INDEX IF NOT EXISTS idx_payment_months_student ON payment_months (city, student_id, month);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    city TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (city, dataset)
+);
+"""
+
+DATASET_STUDENTS = "students"
+DATASET_ATTENDANCE = "attendance"
+DATASET_PAYMENTS = "payments"
+
+
+def phone_digits(phone: str) -> str:
+    """Последние 10 цифр телефона (без кода страны) для сравнения номеров"""
+    return re.sub(r"\D", "", phone or "")[-10:]
+
+
+class CRMMirror:
+    """Зеркало данных CRM в файле SQLite"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Одно соединение на процесс; запросы сериализуются блокировкой
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate_attendance()
+            self._conn.commit()
+
+    def _migrate_attendance(self) -> None:
+        """
+        Добавляет в старую таблицу посещаемости столбцы с названием столбца и текстом статуса
+
+        Текста статуса в старых отметках нет, поэтому посещаемость городов считается
+        не загруженной (читается из файлов) до следующей синхронизации.
+        """
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(attendance)")}
+        if "status_text" in columns:
+            return
+        self._conn.execute("ALTER TABLE attendance ADD COLUMN date_key TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("ALTER TABLE attendance ADD COLUMN status_text TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("DELETE FROM sync_state WHERE dataset = ?", (DATASET_ATTENDANCE,))
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """Выполняет запрос на чтение"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _mark_synced(self, city: str, dataset: str) -> None:
+        """Отмечает загрузку набора данных города (внутри транзакции)"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (city, dataset, synced_at) VALUES (?, ?, ?)",
+            (city, dataset, datetime.now().isoformat())
+        )
+
+    def has_city(self, city: str, dataset: str) -> bool:
+        """Загружен ли набор данных города"""
+        return bool(self._query(
+            "SELECT 1 FROM sync_state WHERE city = ? AND dataset = ?", (city, dataset)
+        ))
+
+    # ---------- Загрузка при синхронизации ----------
+
+    def replace_students(self, city: str, students_data: Dict[str, Any]) -> None:
+        """Заменяет учеников города содержимым students.json"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM student_names WHERE city = ?", (city,))
+            self._conn.execute("DELETE FROM students WHERE city = ?", (city,))
+            for group_id, group_data in students_data.items():
+                group_name = group_data.get("group_name", "")
+                for student in group_data.get("students", []):
+                    fio = student.get("ФИО", "").strip()
+                    phone = student.get("Номер родителя", "")
+                    cursor = self._conn.execute(
+                        "INSERT INTO students (city, student_id, group_id, group_name, fio, fio_lower, "
+                        "phone, phone_digits, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (city, student.get("ID", ""), group_id, group_name, fio, fio.lower(),
+                         phone, phone_digits(phone), json.dumps(student, ensure_ascii=False))
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO student_names (city, part, student_rowid) VALUES (?, ?, ?)",
+                        [(city, part, cursor.lastrowid) for part in set(fio.lower().split())]
+                    )
+            self._mark_synced(city, DATASET_STUDENTS)
+
+    def replace_attendance(
+        self,
+        city: str,
+        matrices: Dict[str, Any],
+        attendance_data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Заменяет отметки посещаемости города (из матриц посещаемости)
+
+        Хранятся и пустые ячейки: просмотр посещаемости показывает их как "Не указано".
+        Исходный текст статусов берется из содержимого attendance.json (attendance_data).
+        """
+        attendance_data = attendance_data or {}
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM attendance WHERE city = ?", (city,))
+            for group_id, matrix in matrices.items():
+                raw_by_student = {}
+                for record in attendance_data.get(group_id, {}).get("attendance", []):
+                    raw_by_student.setdefault(record.get("student_id", ""), record.get("attendance", {}))
+
+                rows = []
+                for student, row in zip(matrix.students, matrix.rows):
+                    student_id = student.get("student_id", "")
+                    raw_statuses = raw_by_student.get(student_id, {})
+                    for iso_date, date_key, code in zip(matrix.dates, matrix.date_keys, row):
+                        status_text = raw_statuses.get(date_key)
+                        rows.append((
+                            city, group_id, student_id, iso_date, date_key.strip(), code,
+                            str(status_text) if status_text else ""
+                        ))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO attendance (city, group_id, student_id, date, date_key, status, "
+                    "status_text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            self._mark_synced(city, DATASET_ATTENDANCE)
+
+    def replace_payments(self, city: str, payments_data: Dict[str, Any]) -> None:
+        """Заменяет записи оплат города содержимым payments.json"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM payment_months WHERE city = ?", (city,))
+            self._conn.execute("DELETE FROM payments WHERE city = ?", (city,))
+            for payment in payments_data.get("payments", []):
+                payment_id = payment.get("ID", "")
+                student_id = payment.get("student_id", "")
+                self._conn.execute(
+                    "INSERT INTO payments (city, payment_id, student_id, fio_lower, data) VALUES (?, ?, ?, ?, ?)",
+                    (city, payment_id, student_id, payment.get("ФИО", "").strip().lower(),
+                     json.dumps(payment, ensure_ascii=False))
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO payment_months (city, payment_id, student_id, month, status) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (city, payment_id, student_id, month, str(status).strip())
+                        for month, status in payment.get("payments_data", {}).items()
+                    ]
+                )
+            self._mark_synced(city, DATASET_PAYMENTS)
+
+    # ---------- Построчные изменения из бота ----------
+
+    def set_attendance(
+        self,
+        city: str,
+        group_id: str,
+        student_id: str,
+        iso_date: str,
+        code: str,
+        date_key: str = "",
+        status_text: str = ""
+    ) -> None:
+        """Сохраняет одну отметку посещаемости (код и исходный текст статуса)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO attendance (city, group_id, student_id, date, date_key, status, status_text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (city, group_id, student_id, iso_date, date_key.strip(), code, status_text)
+            )
+
+    def _find_payment_row(self, city: str, student_identifier: str) -> Optional[sqlite3.Row]:
+        """Запись оплаты по ID ученика или ФИО (вызывается под блокировкой)"""
+        return self._conn.execute(
+            "SELECT rowid, payment_id, student_id, data FROM payments "
+            "WHERE city = ? AND (student_id = ? OR fio_lower = ?) ORDER BY rowid LIMIT 1",
+            (city, student_identifier, student_identifier.strip().lower())
+        ).fetchone()
+
+    def set_payment_status(self, city: str, student_identifier: str, month: str, status: str) -> bool:
+        """Меняет статус оплаты ученика (по ID или ФИО) за месяц"""
+        with self._lock, self._conn:
+            row = self._find_payment_row(city, student_identifier)
+            if not row:
+                return False
+            payment = json.loads(row["data"])
+            payment.setdefault("payments_data", {})[month] = status
+            self._conn.execute(
+                "UPDATE payments SET data = ? WHERE rowid = ?",
+                (json.dumps(payment, ensure_ascii=False), row["rowid"])
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO payment_months (city, payment_id, student_id, month, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (city, row["payment_id"], row["student_id"], month, status)
+            )
+            return True
+
+    def set_payment_comment(self, city: str, student_identifier: str, comment: str) -> bool:
+        """Меняет комментарий к оплате ученика (по ID или ФИО)"""
+        with self._lock, self._conn:
+            row = self._find_payment_row(city, student_identifier)
+            if not row:
+                return False
+            payment = json.loads(row["data"])
+            payment["Комментарий"] = comment
+            self._conn.execute(
+                "UPDATE payments SET data = ? WHERE rowid = ?",
+                (json.dumps(payment, ensure_ascii=False), row["rowid"])
+            )
+            return True
+
+    # ---------- Запросы ----------
+
+    def _student_rows(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        """Ученики из строк запроса (данные students.json + группа)"""
+        results = []
+        for row in self._query(sql, params):
+            student = json.loads(row["data"])
+            student["group_name"] = row["group_name"]
+            student["group_id"] = row["group_id"]
+            results.append(student)
+        return results
+
+    def find_students_by_phone(self, city: str, phone: str) -> List[Dict[str, Any]]:
+        """Ученики города с телефоном родителя (сравниваются последние 10 цифр)"""
+        digits = phone_digits(phone)
+        if not digits:
+            return []
+        return self._student_rows(
+            "SELECT data, group_name, group_id FROM students WHERE city = ? AND phone_digits = ? ORDER BY rowid",
+            (city, digits)
+        )
+
+    def find_students_by_fio(self, city: str, fio: str) -> List[Dict[str, Any]]:
+        """Ученики города с точным совпадением ФИО (без учета регистра)"""
+        return self._student_rows(
+            "SELECT data, group_name, group_id FROM students WHERE city = ? AND fio_lower = ? ORDER BY rowid",
+            (city, fio.strip().lower())
+        )
+
+    def find_students_by_name_part(self, city: str, part: str) -> List[Dict[str, Any]]:
+        """Ученики города, у которых одно из слов ФИО совпадает с part"""
+        return self._student_rows(
+            "SELECT s.data, s.group_name, s.group_id FROM student_names n "
+            "JOIN students s ON s.rowid = n.student_rowid "
+            "WHERE n.city = ? AND n.part = ? ORDER BY s.rowid",
+            (city, part.strip().lower())
+        )
+
+    def get_payment(self, city: str, student_id: str, fio: str) -> Optional[Dict[str, Any]]:
+        """Запись оплаты ученика: первая по порядку с совпадением ID или ФИО"""
+        rows = self._query(
+            "SELECT data FROM payments WHERE city = ? AND (student_id = ? OR fio_lower = ?) ORDER BY rowid LIMIT 1",
+            (city, student_id, fio.strip().lower())
+        )
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def get_payment_statuses(self, city: str, student_ids: List[str], month: str) -> Dict[str, str]:
+        """Статусы оплаты учеников за месяц: {student_id: статус} (пустые статусы пропускаются)"""
+        statuses = {}
+        ids = list(student_ids)
+        # Ограничение SQLite на число параметров в запросе
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._query(
+                f"SELECT student_id, status FROM payment_months WHERE city = ? AND month = ? "
+                f"AND student_id IN ({placeholders}) ORDER BY rowid",
+                (city, month, *chunk)
+            ):
+                if row["status"]:
+                    statuses[row["student_id"]] = row["status"]
+        return statuses
+
+    def get_student_attendance(
+        self,
+        city: str,
+        student_id: str,
+        start: str = "",
+        end: str = "9999-12-31"
+    ) -> List[Dict[str, str]]:
+        """
+        Отметки ученика города за период (даты ISO, границы включительно, по возрастанию дат)
+
+        Returns:
+            [{"group_id", "date", "date_key", "status", "status_text"}, ...]
+        """
+        return [
+            dict(row) for row in self._query(
+                "SELECT group_id, date, date_key, status, status_text FROM attendance "
+                "WHERE student_id = ? AND date BETWEEN ? AND ? AND city = ? ORDER BY date, rowid",
+                (student_id, start, end, city)
+            )
+        ]
+
+
+_mirror: Optional[CRMMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror() -> Optional[CRMMirror]:
+    """
+    Возвращает зеркало SQLite или None, если оно не включено (CRM_SQLITE_PATH не задан)
+
+    Относительный путь отсчитывается от корня проекта.
+    """
+    global _mirror
+    db_path = os.getenv("CRM_SQLITE_PATH", "").strip()
+    if not db_path:
+        return None
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                path = Path(db_path).expanduser()
+                if not path.is_absolute():
+                    path = ROOT_DIR / path
+                _mirror = CRMMirror(path)
+    return _mirror
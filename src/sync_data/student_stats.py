@@ -0,0 +1,266 @@
+"""
+Таблица статистики учеников города, сгруппированная по группам.
+
+Строится при синхронизации из матриц посещаемости (attendance_matrix.json),
+attendance.json (исходный текст статусов), payments.json и students.json и
+сохраняется в data/{city_name}/student_stats.json.
+
+Формат сохранения:
+    "format": 3,                               # версия формата (другая - таблица пересчитывается)
+    "built_on": "2025-11-20",                  # дата, на которую посчитаны периоды
+    "groups": {
+        "group_id": {
+            "group_name": "Назрань вт/ср 14:00",
+            "total_students": 12,               # из students.json
+            "lessons": 24,                      # количество дат занятий
+            "present_total": 230,               # отметок присутствия по группе
+            "students": [
+                {
+                    "student_id": "...", "ФИО": "...", "student_url": "...",
+                    "payment_date": "17 числа",
+                    "all_time": {"total", "present", "late", "absent", "absent_reason"},
+                    "period": {"start": "2025-11-17", "next": "2025-12-17", "total", ...},
+                    # последние RECENT_DAYS дней: дата, столбец, код, статус как в Notion
+                    "recent": [["2025-11-04", "04.11.2025", "1", "Присутствовал"], ...]
+                },
+                ...
+            ]
+        }
+    }
+
+Детальный отчет по группе и просмотр посещаемости ученика только форматируют
+эти данные. Периоды оплаты зависят от текущей даты, поэтому таблица, посчитанная
+в другой день, пересчитывается из матриц при загрузке.
+"""
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from src.sync_data.attendance_matrix import AttendanceMatrix, load_city_matrices
+from src.sync_data.payments_calendar import parse_payment_day
+
+
+STATS_FILENAME = "student_stats.json"
+
+# Версия формата файла (3: отметки "recent" хранят исходный текст статуса, "Был" - отдельный код)
+STATS_FORMAT = 3
+
+# Файлы, из которых строится таблица
+SOURCE_FILES = ("attendance.json", "attendance_matrix.json", "payments.json", "students.json")
+
+# Глубина истории отметок для просмотра посещаемости ученика (дней)
+RECENT_DAYS = 30
+
+
+def payment_period(payment_day: int, today: date) -> Tuple[date, date]:
+    """
+    Текущий период оплаты ученика по дню оплаты
+
+    Если день оплаты в этом месяце уже наступил, период начинается в этом месяце,
+    иначе - в предыдущем. Дни после 28-го сдвигаются на 28-е.
+
+    Returns:
+        Tuple[начало_периода, начало_следующего_периода]
+    """
+    day = min(payment_day, 28)
+    if today.day >= payment_day:
+        start = date(today.year, today.month, day)
+        if today.month == 12:
+            next_start = date(today.year + 1, 1, day)
+        else:
+            next_start = date(today.year, today.month + 1, day)
+    else:
+        if today.month == 1:
+            start = date(today.year - 1, 12, day)
+        else:
+            start = date(today.year, today.month - 1, day)
+        next_start = date(today.year, today.month, day)
+    return start, next_start
+
+
+def _student_row(
+    matrix: AttendanceMatrix,
+    idx: int,
+    payment_date_str: str,
+    today: date,
+    raw_statuses: Dict[str, str]
+) -> Dict[str, Any]:
+    """Статистика одного ученика группы (raw_statuses: столбец без пробелов -> статус из Notion)"""
+    student = matrix.students[idx]
+    period_start, next_period_start = payment_period(max(parse_payment_day(payment_date_str), 1), today)
+    # Период считаем только до текущей даты (но не позже конца периода)
+    period_end = min(today, next_period_start - timedelta(days=1))
+
+    period = matrix.counts(idx, period_start, period_end)
+    period["start"] = period_start.isoformat()
+    period["next"] = next_period_start.isoformat()
+
+    recent = [
+        [iso_date, date_key, code, raw_statuses.get(date_key, "")]
+        for iso_date, date_key, code in matrix.marks_between(idx, today - timedelta(days=RECENT_DAYS - 1), today)
+    ]
+
+    return {
+        "student_id": student.get("student_id", ""),
+        "ФИО": student.get("ФИО", ""),
+        "student_url": student.get("student_url", ""),
+        "payment_date": payment_date_str,
+        "all_time": matrix.counts(idx),
+        "period": period,
+        "recent": recent,
+    }
+
+
+def _raw_statuses(group_info: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """Исходный текст статусов группы: ID ученика -> столбец без пробелов -> статус"""
+    result = {}
+    for record in group_info.get("attendance", []):
+        student_id = record.get("student_id", "")
+        if student_id and student_id not in result:
+            result[student_id] = {
+                str(date_key).strip(): str(status) if status else ""
+                for date_key, status in record.get("attendance", {}).items()
+            }
+    return result
+
+
+class StudentStatsTable:
+    """Статистика учеников города по группам"""
+
+    def __init__(self, built_on: str, groups: Dict[str, Dict[str, Any]]):
+        self.built_on = built_on
+        self.groups = groups
+        # ID ученика без дефисов -> [(group_id, строка статистики)]
+        self._by_student: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for group_id, group in groups.items():
+            for row in group.get("students", []):
+                student_id = row.get("student_id", "").replace("-", "")
+                if student_id:
+                    self._by_student.setdefault(student_id, []).append((group_id, row))
+
+    @classmethod
+    def build(
+        cls,
+        matrices: Dict[str, AttendanceMatrix],
+        payments_data: Dict[str, Any],
+        students_data: Dict[str, Any],
+        today: Optional[date] = None,
+        attendance_data: Optional[Dict[str, Any]] = None
+    ) -> "StudentStatsTable":
+        """Строит таблицу из матриц посещаемости, payments.json, students.json и attendance.json"""
+        today = today or date.today()
+        payment_dates = {
+            payment.get("student_id", ""): payment.get("Дата оплаты", "")
+            for payment in payments_data.get("payments", [])
+        }
+
+        attendance_data = attendance_data or {}
+
+        groups = {}
+        for group_id, matrix in matrices.items():
+            raw_by_student = _raw_statuses(attendance_data.get(group_id, {}))
+            groups[group_id] = {
+                "group_name": matrix.group_name,
+                "total_students": students_data.get(group_id, {}).get("total_students", 0),
+                "lessons": len(matrix.dates),
+                "present_total": matrix.present_total(),
+                "students": [
+                    _student_row(
+                        matrix, idx, payment_dates.get(student.get("student_id", ""), ""), today,
+                        raw_by_student.get(student.get("student_id", ""), {})
+                    )
+                    for idx, student in enumerate(matrix.students)
+                ],
+            }
+
+        return cls(today.isoformat(), groups)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StudentStatsTable":
+        """Восстанавливает таблицу из student_stats.json"""
+        return cls(data.get("built_on", ""), data.get("groups", {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализует таблицу для сохранения в JSON"""
+        return {"format": STATS_FORMAT, "built_on": self.built_on, "groups": self.groups}
+
+    def get_group(self, group_id: str) -> Optional[Dict[str, Any]]:
+        """Статистика группы или None"""
+        return self.groups.get(group_id)
+
+    def find_student(self, student_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Строки статистики ученика во всех его группах (ID сравниваются без дефисов)"""
+        return self._by_student.get(student_id.replace("-", ""), [])
+
+
+def _load_json(path: Path) -> Dict[str, Any]:
+    """Читает JSON файл города (пустой словарь, если файла нет)"""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_city_student_stats(city_dir: Path, today: Optional[date] = None) -> StudentStatsTable:
+    """Строит таблицу статистики из файлов города"""
+    return StudentStatsTable.build(
+        load_city_matrices(city_dir),
+        _load_json(city_dir / "payments.json"),
+        _load_json(city_dir / "students.json"),
+        today,
+        _load_json(city_dir / "attendance.json")
+    )
+
+
+def save_student_stats(table: StudentStatsTable, path: Path) -> None:
+    """Сохраняет таблицу статистики в файл (атомарная запись)"""
+    temp_file = path.with_suffix('.tmp')
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(table.to_dict(), f, ensure_ascii=False)
+    temp_file.replace(path)
+
+
+# Кэш загруженных таблиц: путь к городу -> (версия файлов и дата, таблица)
+_stats_cache: Dict[Path, Tuple[Tuple[Any, ...], StudentStatsTable]] = {}
+
+
+def load_student_stats(city_dir: Path, today: Optional[date] = None) -> StudentStatsTable:
+    """
+    Загружает таблицу статистики учеников города
+
+    Читает student_stats.json, построенный при синхронизации. Если его нет,
+    он старше исходных файлов или посчитан не на сегодняшнюю дату, таблица
+    строится из матриц посещаемости. Результат кэшируется до изменения файлов
+    или смены даты.
+    """
+    today = today or date.today()
+    stats_path = city_dir / STATS_FILENAME
+
+    source_mtime = max(
+        (city_dir / filename).stat().st_mtime if (city_dir / filename).exists() else 0
+        for filename in SOURCE_FILES
+    )
+    stats_mtime = stats_path.stat().st_mtime if stats_path.exists() else 0
+    version = (source_mtime, stats_mtime, today.isoformat())
+
+    cached = _stats_cache.get(city_dir)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    table = None
+    try:
+        if stats_mtime >= source_mtime:
+            with open(stats_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == STATS_FORMAT:
+                table = StudentStatsTable.from_dict(data)
+            if table is not None and table.built_on != today.isoformat():
+                table = None
+        if table is None:
+            table = build_city_student_stats(city_dir, today)
+    except Exception as e:
+        print(f"⚠️ Ошибка загрузки статистики учеников {city_dir}: {e}")
+        return StudentStatsTable("", {})
+
+    _stats_cache[city_dir] = (version, table)
+    return table
@@ -2,6 +2,7 @@ import json
 import asyncio
 from src.config import ROOT_DIR, get_notion_client
 from src.utils import normalize_phone
+from src.sync_data.sqlite_mirror import get_mirror
 
 
 class NotionStudentsFetcher:
@@ -135,6 +136,15 @@ class NotionStudentsFetcher:
         print(f"\n📁 Все ученики сохранены: {self.output_path}")
         print(f"📊 Всего учеников по городу {self.city_name}: {total_city_students}")
 
+        # Зеркало SQLite (если включено)
+        mirror = get_mirror()
+        if mirror:
+            try:
+                mirror.replace_students(self.output_path.parent.name, all_students)
+                print(f"🗄️ Ученики загружены в SQLite: {mirror.db_path}")
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки учеников в SQLite: {e}")
+
     async def close(self):
         """
         Does nothing now as we use a shared client.
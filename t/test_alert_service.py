@@ -0,0 +1,109 @@
+"""Тесты инкрементальной оценки правил оповещений"""
+import sys
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from bot.services.alert_service import AlertService
+
+
+DATES = ["01.10.2026", "08.10.2026", "15.10.2026"]
+NOW = datetime(2026, 10, 16, 9, 0)
+
+
+def write_attendance(root: Path, groups):
+    """Записывает attendance.json Назрани: группа -> {ученик: отметки по датам}"""
+    city_dir = root / "data" / "Nazran"
+    city_dir.mkdir(parents=True, exist_ok=True)
+    data = {}
+    for group_id, students in groups.items():
+        dates = sorted({field for marks in students.values() for field in marks} | set(DATES))
+        data[group_id] = {
+            "group_name": f"Группа {group_id}",
+            "fields": ["№", "ФИО"] + dates,
+            "attendance": [
+                {"student_id": student_id, "ФИО": f"Ученик {student_id}", "attendance": marks}
+                for student_id, marks in students.items()
+            ],
+        }
+    (city_dir / "attendance.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def make_service(root: Path):
+    """Сервис оповещений, читающий данные из временного каталога"""
+    service = AlertService(rules_path=root / "alert_rules.json", state_path=root / "alert_state.json")
+    service.root_dir = root
+
+    calls = []
+    evaluate_group_data = service._evaluate_group_data
+
+    def counting_evaluate_group_data(*args, **kwargs):
+        calls.append(args[1])
+        return evaluate_group_data(*args, **kwargs)
+
+    service._evaluate_group_data = counting_evaluate_group_data
+    return service, calls
+
+
+ABSENT_STUDENT = {
+    "s1": dict(zip(DATES, ["Отсутствовал"] * 3)),
+    "s2": dict(zip(DATES, ["Присутствовал"] * 3)),
+}
+
+
+def test_data_rules_cached_across_days(tmp_path):
+    """Данные не менялись - правила по данным не пересчитываются на следующий день"""
+    write_attendance(tmp_path, {"g1": ABSENT_STUDENT})
+    service, calls = make_service(tmp_path)
+
+    alerts = service.evaluate(NOW)
+    assert [(a["rule"], a["student_id"]) for a in alerts] == [("absence_streak", "s1")]
+    assert calls == ["g1"]
+
+    # Другой день, те же данные: отпечаток совпадает, повторного оповещения нет
+    assert service.evaluate(NOW + timedelta(days=1)) == []
+    assert calls == ["g1"]
+
+
+def test_active_alert_not_resent(tmp_path):
+    """Действующее оповещение не повторяется, даже спустя долгое время"""
+    write_attendance(tmp_path, {"g1": ABSENT_STUDENT})
+    service, _ = make_service(tmp_path)
+
+    assert len(service.evaluate(NOW)) == 1
+    assert service.evaluate(NOW + timedelta(days=40)) == []
+
+    state = json.loads((tmp_path / "alert_state.json").read_text(encoding="utf-8"))
+    assert len(state["notified"]) == 1
+
+
+def test_changed_data_reevaluated(tmp_path):
+    """После новой отметки группа пересчитывается, а закрытое оповещение забывается"""
+    # Низкая посещаемость (1 из 4) здесь не проверяется
+    (tmp_path / "alert_rules.json").write_text(json.dumps({"low_attendance": {"enabled": False}}), encoding="utf-8")
+    write_attendance(tmp_path, {"g1": ABSENT_STUDENT})
+    service, calls = make_service(tmp_path)
+    assert len(service.evaluate(NOW)) == 1
+
+    students = {student_id: dict(marks) for student_id, marks in ABSENT_STUDENT.items()}
+    students["s1"]["22.10.2026"] = "Присутствовал"
+    students["s2"]["22.10.2026"] = "Присутствовал"
+    write_attendance(tmp_path, {"g1": students})
+
+    assert service.evaluate(NOW + timedelta(days=7)) == []
+    assert calls == ["g1", "g1"]
+
+    state = json.loads((tmp_path / "alert_state.json").read_text(encoding="utf-8"))
+    assert state["notified"] == {}
+
+
+def test_empty_group_has_no_alerts(tmp_path):
+    """Группа без учеников не считается неотмеченной"""
+    write_attendance(tmp_path, {"g1": {}})
+    service, _ = make_service(tmp_path)
+
+    assert service.evaluate(NOW + timedelta(days=30)) == []
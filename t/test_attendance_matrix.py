@@ -0,0 +1,96 @@
+"""Тесты матрицы посещаемости: коды статусов и правило присутствия"""
+import sys
+import json
+from datetime import date
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.sync_data.attendance_matrix import (
+    AttendanceMatrix,
+    MATRIX_FILENAME,
+    PRESENT,
+    WAS,
+    encode_status,
+    load_city_matrices,
+)
+
+
+DATES = ["01.10.2026", "08.10.2026", "15.10.2026", "22.10.2026 "]
+
+
+def make_group(marks_by_student):
+    """Блок группы attendance.json: ученик -> отметки по DATES"""
+    return {
+        "group_name": "Тестовая группа",
+        "fields": ["№", "ФИО"] + DATES,
+        "attendance": [
+            {
+                "student_id": student_id,
+                "ФИО": f"Ученик {student_id}",
+                "attendance": dict(zip(DATES, marks)),
+            }
+            for student_id, marks in marks_by_student.items()
+        ],
+    }
+
+
+def test_was_has_own_code():
+    """'Был' кодируется отдельно от 'Присутствовал'"""
+    assert encode_status("Был") == WAS
+    assert encode_status(" присутствовал ") == PRESENT
+    assert WAS != PRESENT
+
+
+def test_counts_present_rule():
+    """В counts() присутствие - 'Присутствовал' и 'Опоздал', но не 'Был'"""
+    matrix = AttendanceMatrix.from_group(make_group({
+        "s1": ["Был", "Присутствовал", "Опоздал", "Отсутствовал"],
+    }))
+    idx = matrix.student_index("s1")
+
+    stats = matrix.counts(idx)
+    assert stats == {"total": 4, "present": 2, "late": 1, "absent": 1, "absent_reason": 0}
+
+    # Границы периода включительно
+    stats = matrix.counts(idx, date(2026, 10, 8), date(2026, 10, 15))
+    assert stats["total"] == 2
+    assert stats["present"] == 2
+
+
+def test_present_total_include_was():
+    """'Был' учитывается в общем числе присутствий только с include_was"""
+    matrix = AttendanceMatrix.from_group(make_group({
+        "s1": ["Был", "Присутствовал", "Опоздал", ""],
+        "s2": ["Отсутствовал", "Был", "", ""],
+    }))
+    assert matrix.present_total() == 2
+    assert matrix.present_total(include_was=True) == 4
+
+
+def test_unmarked_recent_lessons():
+    """Неотмеченные последние занятия; у группы без учеников - 0"""
+    matrix = AttendanceMatrix.from_group(make_group({
+        "s1": ["Присутствовал", "Отсутствовал", "", ""],
+    }))
+    assert matrix.unmarked_recent_lessons(date(2026, 10, 31)) == 2
+    assert matrix.unmarked_recent_lessons(date(2026, 10, 15)) == 1
+
+    empty = AttendanceMatrix.from_group(make_group({}))
+    assert empty.unmarked_recent_lessons(date(2026, 10, 31)) == 0
+
+
+def test_old_format_matrix_is_rebuilt(tmp_path):
+    """Матрица старого формата ('Был' = 'Присутствовал') строится заново из attendance.json"""
+    group = make_group({"s1": ["Был", "Присутствовал", "", ""]})
+    (tmp_path / "attendance.json").write_text(json.dumps({"g1": group}, ensure_ascii=False), encoding="utf-8")
+
+    old = AttendanceMatrix.from_group(group).to_dict()
+    old.pop("format")
+    old["rows"] = [PRESENT + PRESENT + "00"]
+    (tmp_path / MATRIX_FILENAME).write_text(json.dumps({"g1": old}, ensure_ascii=False), encoding="utf-8")
+
+    matrices = load_city_matrices(tmp_path)
+    assert matrices["g1"].rows == [WAS + PRESENT + "00"]
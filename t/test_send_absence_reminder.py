@@ -2,6 +2,7 @@
 import sys
 import os
 import asyncio
+from datetime import datetime
 from pathlib import Path
 
 # Добавляем корневую директорию в путь
@@ -55,11 +56,12 @@ async def test_send_absence_reminder():
         
         print("\n📤 Отправка уведомлений...\n")
         
-        # Очищаем set отправленных уведомлений, чтобы можно было отправить сейчас
-        reminder_handler.sent_absence_reminders.clear()
+        # Сбрасываем отметку о сегодняшней рассылке, чтобы можно было отправить сейчас
+        reminder_handler.delivery_queue.forget(f"absence_reminder:{datetime.now().strftime('%Y-%m-%d')}")
         
-        # Отправляем уведомления
+        # Ставим уведомления в очередь и сразу доставляем их
         await reminder_handler.send_absence_reminder()
+        await reminder_handler.delivery_queue.process_pending(bot)
         
         print("\n✅ Тест завершен!")
         print("=" * 60)
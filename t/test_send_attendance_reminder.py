@@ -70,9 +70,6 @@ async def test_send_attendance_reminder():
         
         print("\n📤 Отправка напоминаний...\n")
         
-        # Очищаем set отправленных напоминаний, чтобы можно было отправить сейчас
-        reminder_handler.sent_reminders.clear()
-        
         # Отправляем напоминания
         for group_info in groups_needing_reminder:
             teacher_user_id = group_info["teacher_user_id"]
@@ -85,6 +82,9 @@ async def test_send_attendance_reminder():
             except Exception as e:
                 print(f"❌ Ошибка отправки преподавателю {teacher_user_id}: {e}")
         
+        # Доставляем поставленные в очередь напоминания
+        await reminder_handler.delivery_queue.process_pending(bot)
+        
         print("\n✅ Тест завершен!")
         print("=" * 60)
         
@@ -1,11 +1,17 @@
 """Обработчик добавления ученика для VK"""
-import re
 from vkbottle.bot import BotLabeler, Message, rules
 from vkbottle import BaseStateGroup, CtxStorage
 from vk_bot.services.role_storage import RoleStorage
 from vk_bot.keyboards.add_student_keyboards import get_cities_keyboard, get_groups_keyboard, get_cancel_keyboard
 from bot.services.group_service import GroupService
 from bot.services.action_logger import ActionLogger
+from bot.services.file_io import run_file_io
+from bot.services.student_form import (
+    get_template_text,
+    parse_student_data,
+    validate_student_data,
+    prepare_student_data
+)
 from bot.config import CITY_MAPPING
 from src.CRUD.crud_student import NotionStudentCRUD
 
@@ -23,68 +29,11 @@ class AddStudentState(BaseStateGroup):
 def get_template_message() -> str:
     """Возвращает шаблон для ввода данных"""
     return ("📝 Введите данные ученика в следующем формате:\n\n"
-            "\"ФИО\": Иванов Иван Иванович,\n"
-            "\"Возраст\": 10,\n"
-            "\"Дата поступления\": \"2023-10-25\",\n"
-            "\"Номер родителя\": +79001234567,\n"
-            "\"Имя родителя\": Мария,\n"
-            "\"Тариф\": \"Группа 2 раза\",\n"
-            "\"Статус\": \"Обучается\",\n"
-            "\"Ссылка на WA, TG\": \"\",\n"
-            "\"Комментарий\": \"\""
+            f"{get_template_text()}"
             "\n\n"
             "⚠️ Обязательные поля: ФИО, Возраст, Номер родителя"
             )
 
-def parse_student_data(text: str) -> dict:
-    """Парсит данные ученика из текста"""
-    data = {}
-    text = text.strip()
-    pattern = r'"([^"]+)":\s*"([^"]*)"|"([^"]+)":\s*([^,\n]+)'
-    matches = re.findall(pattern, text, re.MULTILINE)
-
-    for match in matches:
-        if match[0]:
-            key = match[0].strip()
-            value = match[1].strip()
-        else:
-            key = match[2].strip()
-            value = match[3].strip()
-
-        if key == "Возраст":
-            try:
-                data[key] = int(value)
-            except ValueError:
-                data[key] = value
-        else:
-            data[key] = value
-    return data
-
-def validate_student_data(data: dict) -> tuple:
-    """Валидирует данные ученика"""
-    if not data.get("ФИО"):
-        return False, "❌ Поле 'ФИО' обязательно"
-    if not data.get("Возраст"):
-        return False, "❌ Поле 'Возраст' обязательно"
-    if not data.get("Номер родителя"):
-        return False, "❌ Поле 'Номер родителя' обязательно"
-    return True, ""
-
-def prepare_student_data(data: dict, city_name: str) -> dict:
-    """Подготавливает данные"""
-    return {
-        "ФИО": data.get("ФИО", ""),
-        "Возраст": int(data.get("Возраст", 0)),
-        "Дата поступления": data.get("Дата поступления", ""),
-        "Номер родителя": data.get("Номер родителя", ""),
-        "Имя родителя": data.get("Имя родителя", ""),
-        "Тариф": data.get("Тариф", "Группа 2 раза"),
-        "Статус": data.get("Статус", "Обучается"),
-        "Город": city_name,
-        "Ссылка на WA, TG": data.get("Ссылка на WA, TG", ""),
-        "Комментарий": data.get("Комментарий", ""),
-    }
-
 @labeler.private_message(text="Добавить ученика")
 async def start_add_student(message: Message):
     user_id = message.from_id
@@ -100,7 +49,7 @@ async def start_add_student(message: Message):
         ctx_storage.set(user_id, {"selected_city": city})
         await message.answer(
             f"🏙️ Город: {city}\nВыберите группу:",
-            keyboard=get_groups_keyboard(group_service.get_city_groups(city))
+            keyboard=get_groups_keyboard(await run_file_io(group_service.get_city_groups, city))
         )
         await labeler.state_dispenser.set(user_id, AddStudentState.WAITING_GROUP)
     else:
@@ -122,7 +71,7 @@ async def city_selected(message: Message):
     
     ctx_storage.set(user_id, {"selected_city": city})
     
-    groups = group_service.get_city_groups(city)
+    groups = await run_file_io(group_service.get_city_groups, city)
     if not groups:
         await message.answer(f"❌ Группы не найдены для города {city}")
         await labeler.state_dispenser.delete(user_id)
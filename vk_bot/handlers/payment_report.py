@@ -2,6 +2,7 @@
 from vkbottle.bot import BotLabeler, Message
 from vk_bot.services.role_storage import RoleStorage
 from vk_bot.services.payment_report_service import generate_report
+from bot.services.file_io import run_compute
 import re
 
 labeler = BotLabeler()
@@ -95,7 +96,8 @@ async def handle_payment_report(message: Message):
     # Генерируем отчет
     try:
         await message.answer("⏳ Формирую отчет...")
-        report = generate_report(city_name, month)
+        # Отчет по всем городам строит снимки городов - не в цикле событий (VK бот может работать в процессе Telegram бота)
+        report = await run_compute(generate_report, city_name, month)
         
         # VK имеет ограничение на длину сообщения (примерно 4096 символов)
         # Разбиваем длинные отчеты на части
@@ -2,6 +2,7 @@
 from vkbottle.bot import BotLabeler, Message
 from vk_bot.services.role_storage import RoleStorage
 from bot.services.student_search import StudentSearchService
+from bot.services.file_io import run_file_io
 from bot.config import CITIES
 
 labeler = BotLabeler()
@@ -107,7 +108,7 @@ async def handle_search(message: Message):
 
     # Выполняем поиск
     try:
-        result_type, data = search_service.search(city_name, query)
+        result_type, data = await run_file_io(search_service.search, city_name, query)
         
         if result_type == "not_found":
             await message.answer(
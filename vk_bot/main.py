@@ -13,7 +13,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 async def main():
-    """Главная функция запуска бота"""
+    """
+    Главная функция запуска бота
+
+    Вызывается и из bot/main.py (RUN_VK_BOT=1), тогда оба бота работают в одном
+    процессе с общими кэшами. Поэтому обработчики читают данные городов и строят
+    отчеты через пулы bot/services/file_io.py, не блокируя общий цикл событий.
+    """
     if not VK_BOT_TOKEN:
         logger.error("❌ VK_BOT_TOKEN не установлен!")
         return